@@ -0,0 +1,47 @@
+"""
+벤치마크 공용 헬퍼
+
+backend 디렉토리에서 `python -m benchmarks.<name>` 으로 실행한다.
+모든 벤치마크는 Django 테스트 DB(기본 SQLite 인메모리)를 만들어 사용하므로
+개발 DB를 건드리지 않는다. DATABASES를 PostgreSQL로 바꾸면 같은 스크립트로
+운영과 동일한 엔진에서 측정할 수 있다.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crypto_rebate.settings')
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """벤치마크용 임시 테스트 DB 생성/삭제"""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def timer(label, count=None, unit='ops'):
+    """경과 시간과 처리율 출력"""
+    started = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - started
+    if count:
+        print(f'{label:<45} {elapsed:10.3f}s  {count / elapsed:14,.0f} {unit}/s  '
+              f'{elapsed / count * 1e6:10.2f} us/op')
+    else:
+        print(f'{label:<45} {elapsed:10.3f}s')
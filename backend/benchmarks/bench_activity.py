@@ -0,0 +1,72 @@
+"""
+사용자 활동 기록 처리율과 유실 여부 측정
+
+    python -m benchmarks.bench_activity [--records 200000] [--threads 16] [--users 100] [--legacy-records 2000]
+
+로그인이 몰릴 때 건별 get_or_create + F() UPDATE 방식과 활동 버퍼(activity_recorder)의
+초당 처리 건수를 비교하고, 기록 중 반복 반영(가산 upsert)한 뒤 DB 합계가 기록 수와 같은지 확인한다.
+REDIS_URL이 설정되어 있으면 Redis 버퍼를 측정한다.
+"""
+import argparse
+import threading
+
+from ._harness import setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--records', type=int, default=200_000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--legacy-records', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db.models import F, Sum
+    from django.utils import timezone
+
+    from crypto_rebate.apps.analytics.activity import activity_recorder
+    from crypto_rebate.apps.analytics.models import UserActivity
+
+    with test_database():
+        User = get_user_model()
+        users = User.objects.bulk_create(User(username=f'bench{i}') for i in range(args.users))
+        user_ids = [user.pk for user in users]
+        today = timezone.localdate()
+        print(f'buffer: {type(activity_recorder.buffer).__name__}')
+
+        with timer('legacy: get_or_create + F() update', args.legacy_records, 'records'):
+            for i in range(args.legacy_records):
+                activity, _ = UserActivity.objects.get_or_create(user_id=user_ids[i % args.users], date=today)
+                UserActivity.objects.filter(pk=activity.pk).update(login_count=F('login_count') + 1)
+        UserActivity.objects.all().delete()
+
+        per_thread = args.records // args.threads
+
+        def record(index):
+            for i in range(per_thread):
+                activity_recorder.record(user_ids[(index + i) % args.users], 'login_count')
+
+        workers = [threading.Thread(target=record, args=(index,)) for index in range(args.threads)]
+        flushes = 0
+        with timer(f'activity_recorder.record ({args.threads} threads)', per_thread * args.threads, 'records'):
+            for worker in workers:
+                worker.start()
+            # 기록이 들어오는 중에도 반복해서 반영
+            while any(worker.is_alive() for worker in workers):
+                activity_recorder.flush()
+                flushes += 1
+            for worker in workers:
+                worker.join()
+
+        with timer('activity_recorder.flush'):
+            activity_recorder.flush()
+
+        stored = UserActivity.objects.aggregate(total=Sum('login_count'))['total']
+        print(f'flushes during load: {flushes}')
+        print(f'logins stored: {stored} / {per_thread * args.threads}')
+
+
+if __name__ == '__main__':
+    main()
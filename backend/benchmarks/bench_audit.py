@@ -0,0 +1,80 @@
+"""
+감사 로그가 요청 지연에 주는 영향 측정
+
+    python -m benchmarks.bench_audit [--requests 2000] [--threads 1]
+
+같은 API(GET 사용자 기간별 통계)를 감사 로그 off / 비동기 큐(audit_sink 백그라운드 저장) /
+동기 저장(요청마다 INSERT 한 번)으로 각각 호출해 요청 지연 p50/p99와 처리율을 비교하고,
+비동기 모드의 enqueued/dropped/written 카운터를 출력한다.
+SQLite 인메모리 DB는 연결 간 테이블 잠금이 있어 --threads > 1은 PostgreSQL에서 측정한다.
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from ._harness import setup_django, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    from crypto_rebate.apps.analytics.audit import audit_sink
+    from crypto_rebate.apps.analytics.models import AuditLog
+
+    def run(label, audit_log, flush_each=False):
+        user = get_user_model().objects.get(username='bench')
+        url = reverse('analytics:user-stats')
+        per_thread = args.requests // args.threads
+        timings, lock = [], threading.Lock()
+
+        def worker():
+            client = Client()
+            client.force_login(user)
+            local = []
+            for _ in range(per_thread):
+                started = time.perf_counter()
+                client.get(url)
+                if flush_each:
+                    audit_sink.flush()
+                local.append(time.perf_counter() - started)
+            with lock:
+                timings.extend(local)
+
+        with override_settings(AUDIT_LOG={**settings.AUDIT_LOG, **audit_log}):
+            started = time.perf_counter()
+            workers = [threading.Thread(target=worker) for _ in range(args.threads)]
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            stats = audit_sink.stats()
+            audit_sink.reset()  # 스레드 종료 전 남은 이벤트 저장
+
+        timings.sort()
+        print(f'{label:<28} p50 {statistics.median(timings) * 1000:8.3f} ms  '
+              f'p99 {timings[int(len(timings) * 0.99)] * 1000:8.3f} ms  {len(timings) / elapsed:10,.0f} req/s')
+        if audit_log.get('ENABLED', True):
+            print(f'    {stats}')
+
+    with test_database():
+        get_user_model().objects.create_user(username='bench', password='bench')
+
+        run('audit off', {'ENABLED': False})
+        run('audit async (queue)', {'ENABLED': True, 'BACKGROUND': True})
+        run('audit sync (insert/request)', {'ENABLED': True, 'BACKGROUND': False}, flush_each=True)
+        print(f'audit rows stored: {AuditLog.objects.count()}')
+
+
+if __name__ == '__main__':
+    main()
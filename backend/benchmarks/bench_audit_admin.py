@@ -0,0 +1,79 @@
+"""
+AuditLog 관리자 목록 조회 시간 측정
+
+    python -m benchmarks.bench_audit_admin [--rows 50000000] [--months 24] [--repeat 5]
+
+--months 개월에 걸친 AuditLog --rows 건을 만들고 관리자 목록 페이지를
+기존 설정(전체 테이블 -timestamp 정렬 + 전체 COUNT(*) + model_name DISTINCT 필터)과
+현재 설정(최근 달 파티션 필터, 전체 COUNT 생략)으로 각각 요청해 응답 시간을 비교한다.
+PostgreSQL(0004 마이그레이션으로 월 파티션 테이블)에서는 최근 달 파티션만 읽는다.
+"""
+import argparse
+import statistics
+import time
+from datetime import timedelta
+
+from ._harness import setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=50_000_000)
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib import admin
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test import Client
+    from django.urls import reverse
+    from django.utils import timezone
+
+    from crypto_rebate.apps.analytics.models import AuditLog
+
+    def measure(client, params=None):
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            response = client.get(reverse('admin:analytics_auditlog_changelist'), params or {})
+            timings.append(time.perf_counter() - started)
+        assert response.status_code == 200
+        return statistics.median(timings) * 1000, response.context['cl'].result_count
+
+    with test_database():
+        user = get_user_model().objects.create_superuser(username='bench', password='bench')
+        now = timezone.now()
+        step = timedelta(days=30 * args.months) / args.rows
+        actions = [action for action, _ in AuditLog.ACTION_CHOICES]
+
+        with timer(f'insert {args.rows:,} audit rows', args.rows, 'rows'):
+            AuditLog.objects.bulk_create((
+                AuditLog(
+                    user=user, action=actions[i % len(actions)], model_name=f'model-{i % 20}',
+                    object_id=str(i), description=f'event {i}', timestamp=now - step * i,
+                ) for i in range(args.rows)
+            ), batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        client = Client()
+        client.force_login(user)
+        model_admin = admin.site._registry[AuditLog]
+        current = (model_admin.list_filter, model_admin.show_full_result_count)
+
+        # 기존 설정으로 잠시 되돌려 측정
+        model_admin.list_filter, model_admin.show_full_result_count = ('action', 'model_name', 'timestamp'), True
+        legacy_ms, legacy_count = measure(client, {})
+        model_admin.list_filter, model_admin.show_full_result_count = current
+
+        latest_ms, latest_count = measure(client)
+        all_ms, all_count = measure(client, {'month': 'all'})
+        print(f'{"legacy (whole table)":<32} {legacy_ms:10.2f} ms  rows={legacy_count:,}')
+        print(f'{"latest month partition":<32} {latest_ms:10.2f} ms  rows={latest_count:,}')
+        print(f'{"all months (no full count)":<32} {all_ms:10.2f} ms  rows={all_count:,}')
+
+
+if __name__ == '__main__':
+    main()
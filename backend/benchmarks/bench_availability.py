@@ -0,0 +1,99 @@
+"""
+사용자명/이메일 사용 가능 여부 확인 부하 테스트 (exists() vs Bloom 필터)
+
+    python -m benchmarks.bench_availability [--users 100000] [--rate 1000] [--seconds 5]
+
+사용자 --users명을 만든 뒤 가입 폼 입력처럼 새 이름의 접두어(대부분 사용 가능)와
+기존 사용자명/이메일을 섞어 check_username/check_email이 하는 확인(is_taken)을 초당 --rate건씩
+--seconds초 실행한다. 필터를 끈 기존 방식(확인마다 exists())과 Bloom 필터에서 달성한 처리율,
+지연 시간 분위수, 초당 DB 쿼리 수를 비교한다. 목표 처리율을 못 따라가면 achieved가 --rate보다
+낮게 나온다. 마지막으로 API를 테스트 클라이언트로 호출한 요청당 시간(미들웨어 포함)을 출력한다.
+"""
+import argparse
+import itertools
+import random
+import statistics
+import time
+
+from ._harness import setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--rate', type=int, default=1000)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import override_settings
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from crypto_rebate.apps.users.availability import username_availability
+
+    random.seed(0)
+    checks = []
+    for i in range(2000):
+        name = f'newbie{random.randrange(10 ** 6)}'
+        # 한 글자씩 입력할 때마다 호출 (3글자부터)
+        checks += [('username', name[:n]) for n in range(3, len(name) + 1)]
+        checks.append(('email', f'{name}@example.com'))
+        if i % 10 == 0:
+            existing = random.randrange(args.users)
+            checks += [('username', f'user{existing}'), ('email', f'USER{existing}@gmail.com')]
+    random.shuffle(checks)
+
+    def run(label):
+        latencies, queries = [], []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        total = int(args.rate * args.seconds)
+        started = time.perf_counter()
+        with connection.execute_wrapper(count):
+            for n, (field, value) in zip(range(total), itertools.cycle(checks)):
+                # 목표 처리율보다 앞서면 기다린다 (뒤처지면 쉬지 않고 보낸다)
+                delay = started + n / args.rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                sent = time.perf_counter()
+                username_availability.is_taken(field, value)
+                latencies.append(time.perf_counter() - sent)
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        print(f'{label:<22} achieved={total / elapsed:8,.0f}/s  '
+              f'p50={statistics.median(latencies) * 1e6:8.1f} us  '
+              f'p99={latencies[int(len(latencies) * 0.99)] * 1e6:8.1f} us  '
+              f'db queries={len(queries) / elapsed:8,.0f}/s')
+
+    # 감사 로그 저장 스레드가 SQLite 테이블 잠금을 잡지 않도록 끈다
+    with test_database(), override_settings(AUDIT_LOG={**settings.AUDIT_LOG, 'ENABLED': False}):
+        with timer(f'insert {args.users:,} users', args.users, 'rows'):
+            User.objects.bulk_create(
+                (User(username=f'user{i}', email=f'user{i}@gmail.com') for i in range(args.users)), batch_size=5000
+            )
+
+        with override_settings(USERNAME_AVAILABILITY={**settings.USERNAME_AVAILABILITY, 'ENABLED': False}):
+            run('exists() per check')
+
+        with timer(f'build filter ({args.users * 2:,} values)', args.users * 2, 'values'):
+            username_availability.rebuild()
+        run('bloom filter')
+        print(f'    {username_availability.stats()}')
+
+        client = APIClient()
+        client.force_authenticate(User.objects.get(username='user0'))
+        url = reverse('users:check_username')
+        with timer('check_username API (test client)', 2000, 'requests'):
+            for _, value in checks[:2000]:
+                client.post(url, {'username': value}, format='json')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+레퍼럴 링크 클릭 기록 처리율 측정
+
+    python -m benchmarks.bench_clicks [--clicks 200000] [--threads 16] [--legacy-clicks 2000]
+
+한 링크에 클릭이 몰릴 때 건별 save() 방식과 클릭 버퍼(click_counter)의
+초당 처리 클릭 수를 비교한다. REDIS_URL이 설정되어 있으면 Redis 버퍼를 측정한다.
+"""
+import argparse
+import threading
+
+from ._harness import setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clicks', type=int, default=200_000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--legacy-clicks', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+
+    from crypto_rebate.apps.exchanges.counters import click_counter
+    from crypto_rebate.apps.exchanges.models import Exchange, ReferralLink
+
+    with test_database():
+        user = get_user_model().objects.create(username='bench')
+        link = ReferralLink.objects.create(user=user, exchange=Exchange.objects.create(name='Binance'))
+        print(f'buffer: {type(click_counter.buffer).__name__}')
+
+        with timer('legacy: clicks += 1; save()', args.legacy_clicks, 'clicks'):
+            for _ in range(args.legacy_clicks):
+                link.clicks += 1
+                link.save(update_fields=['clicks'])
+
+        per_thread = args.clicks // args.threads
+
+        def click():
+            for _ in range(per_thread):
+                click_counter.record(link.pk)
+
+        workers = [threading.Thread(target=click) for _ in range(args.threads)]
+        with timer(f'click_counter.record ({args.threads} threads)', per_thread * args.threads, 'clicks'):
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+        with timer('click_counter.flush'):
+            click_counter.flush()
+
+        link.refresh_from_db()
+        print(f'clicks stored: {link.clicks - args.legacy_clicks} / {per_thread * args.threads}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+프로필 백필 비교 (사용자별 create vs create_user_profiles 배치)
+
+    python -m benchmarks.bench_create_user_profiles [--users 100000] [--batch-size 1000]
+
+프로필이 없는 사용자 --users명을 만들고, 기존 방식(사용자마다 UserProfile.objects.create)과
+create_user_profiles(id 스트리밍 + bulk_create(ignore_conflicts=True))로 각각 백필한다.
+기존 방식은 오래 걸리므로 앞 10%만 측정해 처리율을 비교한다.
+"""
+import argparse
+from io import StringIO
+
+from ._harness import setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.test import override_settings
+
+    from crypto_rebate.apps.users.models import UserProfile
+
+    # 감사 로그 저장 스레드가 SQLite 테이블 잠금을 잡지 않도록 끈다
+    with test_database(), override_settings(AUDIT_LOG={**settings.AUDIT_LOG, 'ENABLED': False}):
+        with timer(f'insert {args.users:,} users without profiles', args.users, 'rows'):
+            # post_save(프로필 생성)를 거치지 않도록 bulk_create 사용
+            User.objects.bulk_create((User(username=f'user{i}') for i in range(args.users)), batch_size=5000)
+
+        sample = args.users // 10
+        with timer(f'per-user create ({sample:,} users)', sample, 'profiles'):
+            for user in User.objects.filter(profile__isnull=True)[:sample]:
+                UserProfile.objects.create(user=user)
+        UserProfile.objects.all().delete()
+
+        out = StringIO()
+        with timer(f'create_user_profiles ({args.users:,} users)', args.users, 'profiles'):
+            call_command('create_user_profiles', '--batch-size', str(args.batch_size), stdout=out)
+        print(f'    {out.getvalue().splitlines()[-1]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+거래소 API 자격 증명 복호화 비용 비교
+
+    python -m benchmarks.bench_credentials [--keys 5000]
+
+기존 방식(호출마다 Fernet 생성)과 모듈 단위 코덱, decrypt_many 일괄 복호화의
+키당 비용을 비교한다.
+"""
+import argparse
+
+from cryptography.fernet import Fernet
+
+from ._harness import setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--keys', type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test.utils import override_settings
+
+    from crypto_rebate.apps.exchanges.credentials import codec
+    from crypto_rebate.apps.exchanges.models import Exchange, ExchangeAPI
+
+    key = Fernet.generate_key().decode()
+    with override_settings(ENCRYPTION_KEY=key, ENCRYPTION_KEY_FALLBACKS=[]), test_database():
+        User = get_user_model()
+        exchange = Exchange.objects.create(name='Binance')
+        users = User.objects.bulk_create(
+            User(username=f'bench{i}') for i in range(args.keys)
+        )
+        ExchangeAPI.objects.bulk_create(
+            ExchangeAPI(
+                user=user, exchange=exchange,
+                api_key=codec.encrypt(f'key-{user.pk}'),
+                api_secret=codec.encrypt(f'secret-{user.pk}'),
+                passphrase=codec.encrypt(f'pass-{user.pk}'),
+            )
+            for user in users
+        )
+        apis = list(ExchangeAPI.objects.all())
+
+        def legacy_decrypt(token):
+            fernet = Fernet(settings.ENCRYPTION_KEY.encode())
+            return fernet.decrypt(token.encode()).decode()
+
+        with timer('legacy: new Fernet per field', args.keys, 'keys'):
+            for api in apis:
+                legacy_decrypt(api.api_key)
+                legacy_decrypt(api.api_secret)
+                legacy_decrypt(api.passphrase)
+
+        with timer('codec: get_credentials()', args.keys, 'keys'):
+            for api in apis:
+                api.get_credentials()
+
+        with timer('codec: decrypt_many(queryset)', args.keys, 'keys'):
+            codec.decrypt_many(ExchangeAPI.objects.all())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Google ID 토큰 검증 비용 측정 (로컬 JWKS 검증)
+
+    python -m benchmarks.bench_google_tokens [--tokens 2000] [--latency 0.2]
+
+로컬 RSA 키로 서명한 토큰 --tokens개를 verify_google_id_token으로 검증한다. 공개키는
+--latency초 지연을 주는 스텁 JWKS 서버에서 받으므로 첫 검증(키 받기)과 캐시된 키로의
+검증 비용을 나눠 출력한다. tokeninfo 방식은 로그인마다 이 지연만큼의 왕복이 추가된다.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ._harness import setup_django, timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tokens', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.2)
+    args = parser.parse_args()
+
+    setup_django()
+    import jwt
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from django.conf import settings
+    from django.test import override_settings
+
+    from crypto_rebate.apps.users.google_tokens import google_key_set, verify_google_id_token
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = {**json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key())), 'kid': 'bench'}
+    body = json.dumps({'keys': [jwk]}).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(args.latency)
+            self.send_response(200)
+            self.send_header('Cache-Control', 'public, max-age=3600')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *log_args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    now = int(time.time())
+    tokens = [
+        jwt.encode({
+            'iss': 'https://accounts.google.com', 'aud': 'bench-client', 'sub': str(i),
+            'email': f'user{i}@gmail.com', 'email_verified': True, 'iat': now, 'exp': now + 3600,
+        }, private_key, algorithm='RS256', headers={'kid': 'bench'})
+        for i in range(args.tokens)
+    ]
+    with override_settings(GOOGLE_ID_TOKEN={
+        **settings.GOOGLE_ID_TOKEN, 'AUDIENCES': ['bench-client'],
+        'CERTS_URL': f'http://127.0.0.1:{server.server_port}/certs',
+    }):
+        google_key_set.shared.delete(google_key_set.SHARED_KEY)
+        with timer('first verify (fetch JWKS)'):
+            verify_google_id_token(tokens[0])
+        with timer(f'verify {args.tokens:,} tokens (cached keys)', args.tokens, 'tokens'):
+            for token in tokens:
+                verify_google_id_token(token)
+        print(f'    {google_key_set.stats()}')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+ReferralTransaction 수집 처리율 측정
+
+    python -m benchmarks.bench_ingest [--rows 1000000] [--batch-size 1000] [--legacy-rows 10000]
+
+건별 create() 방식과 bulk_ingest()의 초당 처리 행 수를 비교한다.
+bulk_ingest는 신규 수집(INSERT)과 같은 행 재수집(UPSERT)을 각각 측정한다.
+"""
+import argparse
+from datetime import timedelta
+from decimal import Decimal
+
+from ._harness import setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--links', type=int, default=100)
+    parser.add_argument('--legacy-rows', type=int, default=10_000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.utils import timezone
+
+    from crypto_rebate.apps.exchanges.models import Exchange, ReferralLink, ReferralTransaction
+
+    with test_database():
+        print(f'backend: {connection.vendor}, '
+              f'on conflict: {connection.features.supports_update_conflicts_with_target}')
+        User = get_user_model()
+        exchange = Exchange.objects.create(name='Binance')
+        users = User.objects.bulk_create(User(username=f'bench{i}') for i in range(args.links))
+        links = ReferralLink.objects.bulk_create(
+            ReferralLink(user=user, exchange=exchange) for user in users
+        )
+        started = timezone.now()
+
+        def synthetic(prefix, count, commission='1.25'):
+            for i in range(count):
+                link = links[i % len(links)]
+                yield ReferralTransaction(
+                    user_id=link.user_id, exchange=exchange, referral_link=link,
+                    transaction_id=f'{prefix}-{i}', amount=Decimal('1000'),
+                    commission=Decimal(commission), commission_rate=Decimal('0.2'),
+                    status='confirmed', created_at=started - timedelta(seconds=i),
+                )
+
+        with timer('legacy: create() per row', args.legacy_rows, 'rows'):
+            for tx in synthetic('legacy', args.legacy_rows):
+                tx.save()
+
+        with timer('bulk_ingest: insert', args.rows, 'rows'):
+            ReferralTransaction.objects.bulk_ingest(synthetic('bulk', args.rows), batch_size=args.batch_size)
+
+        with timer('bulk_ingest: upsert existing', args.rows, 'rows'):
+            ReferralTransaction.objects.bulk_ingest(
+                synthetic('bulk', args.rows, commission='1.50'), batch_size=args.batch_size
+            )
+
+
+if __name__ == '__main__':
+    main()
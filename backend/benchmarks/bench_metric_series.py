@@ -0,0 +1,88 @@
+"""
+일주일 지연 차트 조회 비교 (SystemMetrics 원본 vs hour 롤업)
+
+    python -m benchmarks.bench_metric_series [--routes 50] [--days 7] [--repeat 10]
+
+라우트 --routes개가 1분마다 api_response_time 요약 한 행씩 --days일 동안 저장했다고 보고,
+시간별 라우트 평균/최대 시계열을 원본 테이블 GROUP BY와 SystemMetricsRollup(hour) GROUP BY로
+각각 측정한다. 롤업 생성 시간과 읽은 행 수도 출력한다.
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from ._harness import setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--routes', type=int, default=50)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.db.models import Avg, Count, Max
+    from django.db.models.fields.json import KeyTextTransform
+    from django.db.models.functions import Trunc
+    from django.utils import timezone
+
+    from crypto_rebate.apps.analytics.metric_rollups import floor_bucket, rollup_metrics
+    from crypto_rebate.apps.analytics.models import SystemMetrics, SystemMetricsRollup
+
+    def measure(label, queryset):
+        timings, rows = [], 0
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            rows = len(list(queryset.all()))
+            timings.append(time.perf_counter() - started)
+        print(f'{label:<45} {statistics.median(timings) * 1000:10.2f} ms  points={rows:,}')
+
+    with test_database():
+        end = floor_bucket(timezone.now(), 'hour')
+        start = end - timedelta(days=args.days)
+        minutes = args.days * 24 * 60
+        count = minutes * args.routes
+        rng = random.Random(0)
+
+        with timer(f'insert {count:,} raw metric rows', count, 'rows'):
+            SystemMetrics.objects.bulk_create((
+                SystemMetrics(
+                    metric_type='performance', name='api_response_time', value=rng.lognormvariate(3, 0.5),
+                    unit='ms', metadata={'route': f'GET /api/v1/route-{route}/'},
+                )
+                for minute in range(minutes) for route in range(args.routes)
+            ), batch_size=5000)
+            # timestamp는 auto_now_add라 생성 후 id 순서대로 1분 간격으로 맞춘다
+            with connection.cursor() as cursor:
+                first_id = SystemMetrics.objects.order_by('id').values_list('id', flat=True).first()
+                table = SystemMetrics._meta.db_table
+                for minute in range(minutes):
+                    low = first_id + minute * args.routes
+                    cursor.execute(f'UPDATE {table} SET timestamp = %s WHERE id >= %s AND id < %s',
+                                   [start + timedelta(minutes=minute), low, low + args.routes])
+
+        with timer('build minute/hour rollups'):
+            rows = rollup_metrics(start, end)
+        print(f'    rollup rows: {rows:,} (hour: {SystemMetricsRollup.objects.filter(resolution="hour").count():,})')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        measure('raw SystemMetrics GROUP BY hour, route', SystemMetrics.objects.filter(
+            name='api_response_time', timestamp__gte=start, timestamp__lt=end,
+        ).order_by().values(
+            route=KeyTextTransform('route', 'metadata'), time=Trunc('timestamp', 'hour'),
+        ).annotate(count=Count('id'), avg=Avg('value'), max=Max('value')))
+        measure('hour rollup series(by_route)', SystemMetricsRollup.objects.filter(
+            resolution='hour', name='api_response_time', bucket__gte=start, bucket__lt=end,
+        ).series('hour', by_route=True))
+        measure('hour rollup series(day)', SystemMetricsRollup.objects.filter(
+            resolution='hour', name='api_response_time', bucket__gte=start, bucket__lt=end,
+        ).series('day'))
+
+
+if __name__ == '__main__':
+    main()
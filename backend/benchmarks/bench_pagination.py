@@ -0,0 +1,90 @@
+"""
+목록 API 페이지네이션 깊이별 지연 측정
+
+    python -m benchmarks.bench_pagination [--rows 5000000] [--pages 1,10,100,1000,10000] [--repeat 5]
+
+한 사용자의 ReferralTransaction --rows 건에 대해 페이지 번호(OFFSET + COUNT) 방식과
+KeysetPagination((created_at, id) 커서)의 페이지 조회 시간을 페이지 깊이별로 비교한다.
+키셋 커서는 해당 페이지 직전 행의 위치로 만들어 측정하므로(커서 생성은 측정 제외)
+앞 페이지들을 차례로 넘겨 온 경우와 같은 쿼리를 실행한다.
+"""
+import argparse
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+from urllib.parse import parse_qs, urlsplit
+
+from ._harness import setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5_000_000)
+    parser.add_argument('--pages', default='1,10,100,1000,10000')
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    pages = [int(page) for page in args.pages.split(',')]
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+    from rest_framework.pagination import Cursor, PageNumberPagination
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from crypto_rebate.apps.exchanges.models import Exchange, ReferralLink, ReferralTransaction
+    from crypto_rebate.pagination import KeysetPagination
+
+    factory = APIRequestFactory()
+
+    def measure(paginator_class, params):
+        timings = []
+        for _ in range(args.repeat):
+            paginator = paginator_class()
+            paginator.page_size = args.page_size
+            request = Request(factory.get('/transactions/', params))
+            started = time.perf_counter()
+            page = paginator.paginate_queryset(queryset, request)
+            timings.append(time.perf_counter() - started)
+        assert len(page) == args.page_size
+        return statistics.median(timings) * 1000
+
+    with test_database():
+        user = get_user_model().objects.create(username='bench')
+        exchange = Exchange.objects.create(name='Binance')
+        link = ReferralLink.objects.create(user=user, exchange=exchange)
+        started = timezone.now()
+
+        def synthetic():
+            for i in range(args.rows):
+                # 같은 시각의 행이 섞이도록 두 건마다 같은 created_at 사용
+                yield ReferralTransaction(
+                    user=user, exchange=exchange, referral_link=link, transaction_id=f'tx-{i}',
+                    amount=Decimal('1000'), commission=Decimal('1.25'), status='confirmed',
+                    created_at=started - timedelta(seconds=i // 2),
+                )
+
+        with timer(f'insert {args.rows:,} rows', args.rows, 'rows'):
+            ReferralTransaction.objects.bulk_create(synthetic(), batch_size=5000)
+
+        queryset = ReferralTransaction.objects.filter(user=user)
+        ordered = queryset.order_by(*KeysetPagination.ordering)
+        print(f'{"page":>8} {"page number (ms)":>18} {"keyset (ms)":>14}')
+        for page in pages:
+            offset_ms = measure(PageNumberPagination, {'page': page})
+            params = {}
+            if page > 1:
+                keyset = KeysetPagination()
+                keyset.base_url = 'http://testserver/transactions/'
+                previous = ordered[(page - 1) * args.page_size - 1]
+                position = keyset._get_position_from_instance(previous, keyset.ordering)
+                url = keyset.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+                params = {'cursor': parse_qs(urlsplit(url).query)['cursor'][0]}
+            keyset_ms = measure(KeysetPagination, params)
+            print(f'{page:>8} {offset_ms:>18.2f} {keyset_ms:>14.2f}')
+
+
+if __name__ == '__main__':
+    main()
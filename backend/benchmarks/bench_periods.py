@@ -0,0 +1,85 @@
+"""
+이번 달 집계 필터 비교 (created_at__month vs 반열린 구간)
+
+    python -m benchmarks.bench_periods [--rows 1000000] [--years 5] [--repeat 20]
+
+한 사용자에게 --years 년에 걸친 지급 완료 Rebate --rows 건을 만들고, 이번 달 지급 합계를
+`created_at__month=<이번 달>` 조회(EXTRACT로 감싸 인덱스 범위 스캔 불가, 다른 해의 같은 달 포함)와
+period_window('month') 구간 조회((user, status, created_at) 인덱스 범위 스캔)로 각각 측정한다.
+"""
+import argparse
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from ._harness import setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.db.models import OuterRef, Subquery, Sum
+    from django.utils import timezone
+
+    from crypto_rebate.apps.exchanges.models import Exchange, ReferralLink, ReferralTransaction
+    from crypto_rebate.apps.rebates.models import Rebate, RebatePolicy
+    from crypto_rebate.periods import period_window
+
+    def measure(label, queryset):
+        timings, total = [], None
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            total = queryset.aggregate(total=Sum('amount'))['total']
+            timings.append(time.perf_counter() - started)
+        print(f'{label:<45} {statistics.median(timings) * 1000:10.2f} ms  total={total}')
+        return queryset
+
+    with test_database():
+        user = get_user_model().objects.create(username='bench')
+        exchange = Exchange.objects.create(name='Binance')
+        link = ReferralLink.objects.create(user=user, exchange=exchange)
+        policy = RebatePolicy.objects.create(name='bench', description='', policy_type='percentage')
+        now = timezone.now()
+        step = timedelta(days=365 * args.years) / args.rows
+
+        with timer(f'insert {args.rows:,} transactions + rebates', args.rows, 'rows'):
+            # 신호를 거치지 않도록 bulk_create 사용 (스냅샷/원장 갱신은 측정 대상이 아님)
+            transactions = ReferralTransaction.objects.bulk_create((
+                ReferralTransaction(
+                    user=user, exchange=exchange, referral_link=link, transaction_id=f'tx-{i}',
+                    commission=Decimal('1.00'), created_at=now - step * i,
+                ) for i in range(args.rows)
+            ), batch_size=5000)
+            Rebate.objects.bulk_create((
+                Rebate(
+                    user=user, referral_transaction=tx, policy=policy, amount=Decimal('1.00'),
+                    currency='USDT', status='paid',
+                ) for tx in transactions
+            ), batch_size=5000)
+            # created_at은 auto_now_add라 생성 후 거래 시각으로 맞춘다
+            Rebate.objects.update(created_at=Subquery(
+                ReferralTransaction.objects.filter(pk=OuterRef('referral_transaction_id')).values('created_at')
+            ))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        paid = Rebate.objects.filter(user=user, status='paid')
+        start, end = period_window('month')
+        for label, queryset in (
+            ('created_at__month=<this month>', paid.filter(created_at__month=now.month)),
+            ('period_window("month") range', paid.filter(created_at__gte=start, created_at__lt=end)),
+        ):
+            measure(label, queryset)
+            print(f'    {queryset.explain()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+요청 계측 미들웨어 오버헤드와 SystemMetrics 저장 행 수 측정
+
+    python -m benchmarks.bench_request_metrics [--requests 2000] [--flush-every 500]
+
+같은 API(GET 사용자 기간별 통계)를 계측 off / 히스토그램 누적(--flush-every 요청마다 구간 요약 저장) /
+요청마다 SystemMetrics 한 행 저장으로 각각 호출해 요청 지연 p50/p99와 저장된 행 수를 비교하고,
+누적 모드에서는 Prometheus 출력 크기와 렌더링 시간도 출력한다.
+"""
+import argparse
+import statistics
+import time
+
+from ._harness import setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--flush-every', type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    from crypto_rebate.apps.analytics.metrics import metrics_registry
+    from crypto_rebate.apps.analytics.models import SystemMetrics
+
+    def run(label, enabled, per_request_row=False):
+        client = Client()
+        client.force_login(get_user_model().objects.get(username='bench'))
+        url = reverse('analytics:user-stats')
+        SystemMetrics.objects.all().delete()
+        timings = []
+        with override_settings(REQUEST_METRICS={**settings.REQUEST_METRICS, 'ENABLED': enabled, 'AUTO_FLUSH': False}):
+            for i in range(1, args.requests + 1):
+                started = time.perf_counter()
+                client.get(url)
+                if per_request_row:
+                    SystemMetrics.objects.create(
+                        metric_type='performance', name='api_response_time',
+                        value=(time.perf_counter() - started) * 1000, unit='ms',
+                    )
+                elif enabled and i % args.flush_every == 0:
+                    metrics_registry.flush()
+                timings.append(time.perf_counter() - started)
+            if enabled:
+                # 설정을 되돌리면 레지스트리가 초기화되므로 그 전에 측정
+                with timer('    render prometheus text x100', 100, 'renders'):
+                    for _ in range(100):
+                        body = metrics_registry.prometheus()
+                print(f'    {len(body.splitlines())} lines, {len(body):,} bytes')
+        timings.sort()
+        print(f'{label:<28} p50 {statistics.median(timings) * 1000:8.3f} ms  '
+              f'p99 {timings[int(len(timings) * 0.99)] * 1000:8.3f} ms  rows {SystemMetrics.objects.count():>6}')
+
+    # 감사 로그 저장 스레드가 SQLite 테이블 잠금을 잡지 않도록 끈다
+    with test_database(), override_settings(AUDIT_LOG={**settings.AUDIT_LOG, 'ENABLED': False}):
+        get_user_model().objects.create_user(username='bench', password='bench')
+
+        run('metrics off', False)
+        run('histograms + interval rows', True)
+        run('one row per request', False, per_request_row=True)
+
+
+if __name__ == '__main__':
+    main()
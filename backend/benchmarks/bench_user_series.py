@@ -0,0 +1,92 @@
+"""
+헤비 사용자 기간별 통계: 원본 테이블 GROUP BY vs 사용자 일별 집계
+
+    python -m benchmarks.bench_user_series [--rows 2000000] [--years 3] [--exchanges 3] [--repeat 5]
+
+한 사용자에게 --years 년에 걸친 ReferralTransaction --rows 건을 만들고(신호 없이 bulk_create),
+rebuild로 UserDailyStatistics를 채운 뒤, 기간(1개월/1년/전체) x 단위(day/week/month)별로
+원본 거래를 created_at 기준으로 묶어 합산하는 쿼리와 일별 집계 series() 쿼리를 비교한다.
+"""
+import argparse
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from ._harness import setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--exchanges', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.db.models import Count, Sum
+    from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+    from django.utils import timezone
+
+    from crypto_rebate.apps.analytics.models import UserDailyStatistics
+    from crypto_rebate.apps.exchanges.models import Exchange, ReferralLink, ReferralTransaction
+
+    def measure(run):
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            rows = run()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) * 1000, rows
+
+    with test_database():
+        user = get_user_model().objects.create(username='heavy')
+        exchanges = [Exchange.objects.create(name=f'exchange-{i}') for i in range(args.exchanges)]
+        links = [ReferralLink.objects.create(user=user, exchange=exchange) for exchange in exchanges]
+        now = timezone.now()
+        step = timedelta(days=365 * args.years) / args.rows
+
+        with timer(f'insert {args.rows:,} transactions', args.rows, 'rows'):
+            # 신호를 거치지 않도록 bulk_create 사용 후 rebuild로 집계를 한 번에 만든다
+            ReferralTransaction.objects.bulk_create((
+                ReferralTransaction(
+                    user=user, exchange=exchanges[i % args.exchanges], referral_link=links[i % args.exchanges],
+                    transaction_id=f'tx-{i}', amount=Decimal('100'), commission=Decimal('1.25'),
+                    created_at=now - step * i,
+                ) for i in range(args.rows)
+            ), batch_size=5000)
+        with timer('rebuild user daily statistics', args.rows, 'rows'):
+            UserDailyStatistics.objects.rebuild([user.pk])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        print(f'{UserDailyStatistics.objects.count():,} rollup rows')
+
+        tz = timezone.get_current_timezone()
+        truncs = {
+            'day': TruncDate('created_at', tzinfo=tz),
+            'week': TruncWeek('created_at', tzinfo=tz),
+            'month': TruncMonth('created_at', tzinfo=tz),
+        }
+        today = timezone.localdate()
+        print(f'{"range":>8} {"granularity":>12} {"raw (ms)":>12} {"rollup (ms)":>12} {"buckets":>8}')
+        for label, days in (('1 month', 30), ('1 year', 365), ('all', 365 * args.years)):
+            start_date = today - timedelta(days=days)
+            start = timezone.make_aware(timezone.datetime.combine(start_date, timezone.datetime.min.time()), tz)
+            raw = ReferralTransaction.objects.filter(user=user, created_at__gte=start)
+            rollup = UserDailyStatistics.objects.filter(user=user, date__range=(start_date, today))
+            for granularity, trunc in truncs.items():
+                raw_ms, raw_rows = measure(lambda: list(
+                    raw.order_by().values(period=trunc).annotate(
+                        count=Count('id'), volume=Sum('amount'), commission=Sum('commission')
+                    ).order_by('period')
+                ))
+                rollup_ms, rollup_rows = measure(lambda: list(rollup.series(granularity)))
+                assert len(raw_rows) == len(rollup_rows)
+                print(f'{label:>8} {granularity:>12} {raw_ms:>12.2f} {rollup_ms:>12.2f} {len(rollup_rows):>8}')
+
+
+if __name__ == '__main__':
+    main()
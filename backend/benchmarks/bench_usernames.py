@@ -0,0 +1,66 @@
+"""
+Google 가입 사용자명 할당 비교 (exists() 반복 vs 접두어 쿼리 한 번)
+
+    python -m benchmarks.bench_usernames [--users 10000] [--others 50000] [--repeat 5]
+
+john, john1 ... john<--users - 1> 과 접두어가 다른 사용자 --others명을 만든 뒤
+기존 방식(번호를 1씩 올리며 exists() 조회)과 next_username(최대 숫자 접미사 한 번 조회)으로
+다음 사용자명을 구하는 시간과 쿼리 수를 측정한다.
+"""
+import argparse
+import statistics
+import time
+
+from ._harness import setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--others', type=int, default=50_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth.models import User
+    from django.db import connection
+
+    from crypto_rebate.apps.users.usernames import next_username
+
+    def exists_loop(base):
+        username, counter = base, 1
+        while User.objects.filter(username=username).exists():
+            username = f'{base}{counter}'
+            counter += 1
+        return username
+
+    def measure(label, allocate):
+        timings, queries = [], []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        for _ in range(args.repeat):
+            queries.clear()
+            with connection.execute_wrapper(count):
+                started = time.perf_counter()
+                username = allocate('john')
+                timings.append(time.perf_counter() - started)
+        print(f'{label:<30} {statistics.median(timings) * 1000:10.2f} ms  '
+              f'queries={len(queries):>6}  -> {username}')
+
+    with test_database():
+        names = ['john'] + [f'john{i}' for i in range(1, args.users)]
+        names += [f'user{i}' for i in range(args.others)] + [f'johnny{i}' for i in range(100)]
+        with timer(f'insert {len(names):,} users', len(names), 'rows'):
+            User.objects.bulk_create((User(username=name) for name in names), batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        measure('exists() loop', exists_loop)
+        measure('next_username (one query)', next_username)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+사용자 활동 기록 (write-behind)
+
+로그인/거래마다 UserActivity (user, date) 행을 읽고 고쳐 쓰면 활동이 많은 사용자의 행에
+잠금 경합이 생기므로, 증분은 버퍼에 누적하고 주기적으로 UserActivity.objects.add_counts()
+(INSERT ... ON CONFLICT DO UPDATE 가산 upsert)로 한 번에 반영한다.
+REDIS_URL이 설정되면 프로세스 간 공유되는 Redis 해시(HINCRBY)를 버퍼로 쓰고 Celery beat가
+반영하며, 아니면 프로세스 내 샤드 카운터를 쓰고 그 프로세스의 백그라운드 스레드가
+FLUSH_INTERVAL마다(그리고 프로세스 종료 시) 반영한다. 이때 Celery beat 작업은 워커 자신의
+빈 버퍼만 반영하므로 아무 일도 하지 않는다.
+BACKGROUND가 꺼져 있으면 스레드를 띄우지 않으며 flush()를 호출해야 반영된다(테스트용).
+"""
+import atexit
+import itertools
+import logging
+import threading
+from collections import Counter, defaultdict
+from datetime import date
+
+import redis
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from crypto_rebate.apps.exchanges.signals import transactions_changed
+
+from .models import UserActivity, UserActivityQuerySet
+
+logger = logging.getLogger(__name__)
+
+
+def activity_config(key, default):
+    return getattr(settings, 'USER_ACTIVITY', {}).get(key, default)
+
+
+class LocalActivityBuffer:
+    """프로세스 내 샤드 카운터 (스레드마다 샤드를 나누어 잠금 경합 분산)"""
+
+    flushes_in_process = True
+
+    def __init__(self, shards=16):
+        self._shards = [(threading.Lock(), Counter()) for _ in range(shards)]
+        self._next_shard = itertools.count()
+        self._thread = threading.local()
+
+    def _shard(self):
+        index = getattr(self._thread, 'shard', None)
+        if index is None:
+            index = self._thread.shard = next(self._next_shard) % len(self._shards)
+        return self._shards[index]
+
+    def incr(self, key, amount=1):
+        lock, counts = self._shard()
+        with lock:
+            counts[key] += amount
+
+    def drain(self):
+        """누적된 증분을 꺼내고 버퍼를 비움"""
+        drained = Counter()
+        for lock, counts in self._shards:
+            with lock:
+                drained.update(counts)
+                counts.clear()
+        return drained
+
+    def restore(self, counts):
+        """DB 반영에 실패한 증분을 되돌려 놓음"""
+        for key, amount in counts.items():
+            self.incr(key, amount)
+
+
+class RedisActivityBuffer:
+    """Redis 해시 버퍼 (HINCRBY, 프로세스 간 공유, 필드는 'user_id:date:필드')"""
+
+    KEY = 'user_activity'
+    flushes_in_process = False
+
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(url)
+
+    @staticmethod
+    def _encode(key):
+        user_id, day, field = key
+        return f'{user_id}:{day.isoformat()}:{field}'
+
+    @staticmethod
+    def _decode(value):
+        user_id, day, field = value.decode().split(':')
+        return int(user_id), date.fromisoformat(day), field
+
+    def incr(self, key, amount=1):
+        self.client.hincrby(self.KEY, self._encode(key), amount)
+
+    def drain(self):
+        # MULTI로 해시를 읽고 지워 동시에 반영하는 다른 프로세스와 겹치지 않게 한다
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hgetall(self.KEY)
+        pipe.delete(self.KEY)
+        values, _ = pipe.execute()
+        return Counter({self._decode(key): int(amount) for key, amount in values.items()})
+
+    def restore(self, counts):
+        pipe = self.client.pipeline()
+        for key, amount in counts.items():
+            pipe.hincrby(self.KEY, self._encode(key), amount)
+        pipe.execute()
+
+
+class ActivityRecorder:
+    """활동 버퍼와 DB 반영 관리 (버퍼는 설정에 따라 지연 생성)"""
+
+    def __init__(self):
+        self._buffer = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._flush_at_exit = False
+
+    @property
+    def buffer(self):
+        if self._buffer is None:
+            with self._lock:
+                if self._buffer is None:
+                    if settings.REDIS_URL:
+                        self._buffer = RedisActivityBuffer(settings.REDIS_URL)
+                    else:
+                        self._buffer = LocalActivityBuffer(activity_config('SHARDS', 16))
+        return self._buffer
+
+    def reset(self):
+        """반영 스레드를 멈추고 버퍼를 비움 (설정 변경/테스트용)"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+        if thread is not None:
+            thread.join()
+        with self._lock:
+            self._stop = threading.Event()
+            self._buffer = None
+
+    def record(self, user_id, field, amount=1, day=None):
+        """user_id의 day(기본값 오늘, TIME_ZONE 기준) 활동 field(login_count/transaction_count)에 amount 누적"""
+        if field not in UserActivityQuerySet.COUNT_FIELDS:
+            raise ValueError(f'Unknown activity field: {field}')
+        buffer = self.buffer
+        buffer.incr((user_id, day or timezone.localdate(), field), amount)
+        if buffer.flushes_in_process and activity_config('BACKGROUND', True):
+            self._ensure_thread()
+
+    def flush(self):
+        """누적된 증분을 DB에 반영하고 반영한 증분 합계 반환"""
+        with self._flush_lock:
+            return self._flush(self.buffer)
+
+    def _flush(self, buffer):
+        drained = {key: amount for key, amount in buffer.drain().items() if amount}
+        if not drained:
+            return 0
+        counts = defaultdict(dict)
+        for (user_id, day, field), amount in drained.items():
+            counts[user_id, day][field] = amount
+        try:
+            UserActivity.objects.add_counts(counts, batch_size=activity_config('BATCH_SIZE', 500))
+        except Exception:
+            buffer.restore(drained)
+            raise
+        return sum(drained.values())
+
+    def _flush_logged(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Failed to store user activity, keeping it for the next flush')
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, args=(self._stop,), name='user-activity', daemon=True
+                    )
+                    self._thread.start()
+                    if not self._flush_at_exit:
+                        # 프로세스 종료 시 남은 증분 반영
+                        atexit.register(self._flush_logged)
+                        self._flush_at_exit = True
+
+    def _run(self, stop):
+        try:
+            while not stop.wait(activity_config('FLUSH_INTERVAL', 5)):
+                self._flush_logged()
+                close_old_connections()
+        finally:
+            close_old_connections()
+
+
+activity_recorder = ActivityRecorder()
+
+
+@receiver(user_logged_in)
+def record_login(sender, user, **kwargs):
+    """로그인(UserLoginView/GoogleLoginView 등 django.contrib.auth.login 경로) 기록"""
+    activity_recorder.record(user.pk, 'login_count')
+
+
+@receiver(transactions_changed)
+def record_transactions(sender, rows, using, **kwargs):
+    """거래 생성/삭제(일괄 수집 포함)를 거래일 활동으로 기록 (커밋된 변경만)"""
+    counts = Counter()
+    for previous, current in rows:
+        if previous:
+            counts[previous['user_id'], timezone.localdate(previous['created_at'])] -= 1
+        if current:
+            counts[current['user_id'], timezone.localdate(current['created_at'])] += 1
+
+    def record():
+        for (user_id, day), amount in counts.items():
+            if amount:
+                activity_recorder.record(user_id, 'transaction_count', amount, day)
+
+    transaction.on_commit(record, using=using)
+
+
+@receiver(setting_changed)
+def reset_activity_recorder(*, setting, **kwargs):
+    if setting in ('REDIS_URL', 'USER_ACTIVITY'):
+        activity_recorder.reset()
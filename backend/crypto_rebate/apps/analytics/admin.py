@@ -1,5 +1,58 @@
+from datetime import datetime, timezone as dt_timezone
+
 from django.contrib import admin
-from .models import DailyStatistics, ExchangeStatistics, UserActivity, SystemMetrics, AuditLog
+from .partitions import PARTITIONED_MODELS, add_months, latest_month, partition_months
+from .models import DailyStatistics, ExchangeStatistics, UserDailyStatistics, UserActivity, SystemMetrics, SystemMetricsRollup, AuditLog
+
+
+class PartitionMonthFilter(admin.SimpleListFilter):
+    """월 파티션 필터 (기본값은 가장 최근 행이 있는 달, 전체 테이블 조회는 'All months' 선택)"""
+    title = 'month'
+    parameter_name = 'month'
+    ALL = 'all'
+
+    def __init__(self, request, params, model, model_admin):
+        self.model = model
+        self._default = None
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        months = [f'{month:%Y-%m}' for month in reversed(partition_months(model_admin.model))]
+        return [(self.ALL, 'All months')] + [(month, month) for month in months]
+
+    def value(self):
+        value = super().value()
+        if value:
+            return value
+        if self._default is None:
+            latest = latest_month(self.model)
+            self._default = f'{latest:%Y-%m}' if latest else self.ALL
+        return self._default
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value == self.ALL:
+            return queryset
+        try:
+            month = datetime.strptime(value, '%Y-%m').replace(tzinfo=dt_timezone.utc)
+        except ValueError:
+            return queryset.none()
+        field = PARTITIONED_MODELS[self.model._meta.label]
+        # 파티션 키 범위 조건이라 PostgreSQL에서는 해당 월 파티션만 읽는다
+        return queryset.filter(**{f'{field}__gte': month, f'{field}__lt': add_months(month, 1)})
+
+    def choices(self, changelist):
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': self.value() == lookup,
+                'query_string': changelist.get_query_string({self.parameter_name: lookup}),
+                'display': title,
+            }
+
+
+class PartitionedModelAdmin(admin.ModelAdmin):
+    """월 파티션 테이블 목록: 기본으로 최근 달만 보여주고 전체 행 수(COUNT(*))는 세지 않는다"""
+    show_full_result_count = False
 
 
 @admin.register(DailyStatistics)
@@ -39,6 +92,16 @@ class ExchangeStatisticsAdmin(admin.ModelAdmin):
     ordering = ('-date',)
 
 
+@admin.register(UserDailyStatistics)
+class UserDailyStatisticsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'exchange', 'date', 'transaction_count', 'total_volume', 'total_commission', 'total_rebates', 'paid_rebates')
+    list_filter = ('exchange', 'date')
+    search_fields = ('user__username', 'exchange__name')
+    readonly_fields = ('updated_at',)
+    raw_id_fields = ('user',)
+    ordering = ('-date',)
+
+
 @admin.register(UserActivity)
 class UserActivityAdmin(admin.ModelAdmin):
     list_display = ('user', 'date', 'login_count', 'transaction_count', 'rebate_amount')
@@ -49,9 +112,9 @@ class UserActivityAdmin(admin.ModelAdmin):
 
 
 @admin.register(SystemMetrics)
-class SystemMetricsAdmin(admin.ModelAdmin):
+class SystemMetricsAdmin(PartitionedModelAdmin):
     list_display = ('metric_type', 'name', 'value', 'unit', 'timestamp')
-    list_filter = ('metric_type', 'timestamp')
+    list_filter = (PartitionMonthFilter, 'metric_type')
     search_fields = ('name', 'metric_type')
     readonly_fields = ('timestamp',)
     ordering = ('-timestamp',)
@@ -71,10 +134,20 @@ class SystemMetricsAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(SystemMetricsRollup)
+class SystemMetricsRollupAdmin(admin.ModelAdmin):
+    list_display = ('name', 'route', 'resolution', 'bucket', 'samples', 'minimum', 'maximum', 'percentile_95')
+    list_filter = ('resolution',)
+    search_fields = ('name', 'route')
+    ordering = ('-bucket',)
+
+
 @admin.register(AuditLog)
-class AuditLogAdmin(admin.ModelAdmin):
+class AuditLogAdmin(PartitionedModelAdmin):
     list_display = ('user', 'action', 'model_name', 'object_id', 'ip_address', 'timestamp')
-    list_filter = ('action', 'model_name', 'timestamp')
+    # model_name 필터는 전체 테이블 DISTINCT 조회라 제외
+    list_filter = (PartitionMonthFilter, 'action')
+    list_select_related = ('user',)
     search_fields = ('user__username', 'description', 'model_name', 'object_id')
     readonly_fields = ('timestamp',)
     ordering = ('-timestamp',)
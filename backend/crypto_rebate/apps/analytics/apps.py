@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AnalyticsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'crypto_rebate.apps.analytics'
+
+    def ready(self):
+        # 로그인/거래 활동 기록, 감사 로그, 요청 메트릭 신호 수신기 등록
+        from . import activity, audit, metrics  # noqa: F401
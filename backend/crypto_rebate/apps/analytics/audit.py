@@ -0,0 +1,244 @@
+"""
+감사 로그(AuditLog) 비동기 기록
+
+API 호출/모델 변경/로그인마다 AuditLog 행을 동기로 INSERT하면 요청의 쓰기 부하가 두 배가 되므로,
+미들웨어와 신호 수신기는 이벤트를 프로세스 내 bounded 큐에 넣기만 하고 백그라운드 스레드가
+BATCH_SIZE개씩 모아 bulk_create로 저장한다.
+
+큐가 가득 차면 BLOCK_TIMEOUT초까지 기다린 뒤(배압) 이벤트를 버리고 dropped 카운터를 올린다.
+저장에 실패한 배치는 failed 카운터에 더한다. 카운터는 audit_sink.stats()로 확인한다.
+BACKGROUND가 꺼져 있으면 스레드를 띄우지 않으며 flush()를 호출해야 저장된다(테스트용).
+"""
+import atexit
+import logging
+import queue
+import threading
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+# 모델 변경 이벤트에 사용자/IP를 붙이기 위해 처리 중인 요청을 보관
+_current_request = ContextVar('audit_request', default=None)
+
+
+def audit_config(key, default):
+    return getattr(settings, 'AUDIT_LOG', {}).get(key, default)
+
+
+class AuditSink:
+    """bounded 큐와 배치 저장 스레드 (큐와 스레드는 첫 이벤트에서 지연 생성)"""
+
+    def __init__(self):
+        self._queue = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._counters = Counter()
+        self._counter_lock = threading.Lock()
+        self._flush_at_exit = False
+
+    @property
+    def queue(self):
+        if self._queue is None:
+            with self._lock:
+                if self._queue is None:
+                    self._queue = queue.Queue(maxsize=audit_config('QUEUE_SIZE', 10000))
+        return self._queue
+
+    def reset(self):
+        """스레드를 멈추고 큐와 카운터를 비움 (설정 변경/테스트용)"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+        if thread is not None:
+            thread.join()
+        with self._lock:
+            self._stop = threading.Event()
+            self._queue = None
+        with self._counter_lock:
+            self._counters.clear()
+
+    def _count(self, name, amount=1):
+        with self._counter_lock:
+            self._counters[name] += amount
+
+    def stats(self):
+        """enqueued/dropped/written/failed 누적 수와 현재 대기 수"""
+        with self._counter_lock:
+            stats = {name: self._counters[name] for name in ('enqueued', 'dropped', 'written', 'failed')}
+        stats['queued'] = self.queue.qsize()
+        return stats
+
+    def emit(self, action, model_name, description, object_id='', user_id=None, ip_address=None, user_agent=''):
+        """이벤트를 큐에 넣고 성공 여부 반환 (큐가 가득 차 있으면 BLOCK_TIMEOUT초 대기 후 버림)"""
+        if not audit_config('ENABLED', True):
+            return False
+        entry = AuditLog(
+            user_id=user_id, action=action, model_name=model_name[:100], object_id=str(object_id)[:100],
+            description=description, ip_address=ip_address, user_agent=user_agent, timestamp=timezone.now(),
+        )
+        try:
+            self.queue.put(entry, timeout=audit_config('BLOCK_TIMEOUT', 0.005))
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('enqueued')
+        if audit_config('BACKGROUND', True):
+            self._ensure_thread()
+        return True
+
+    def flush(self):
+        """대기 중인 이벤트를 현재 스레드에서 모두 저장하고 저장한 수 반환"""
+        written = 0
+        while True:
+            batch = self._take(block=False)
+            if not batch:
+                return written
+            written += self._write(batch)
+
+    def _take(self, block):
+        """큐에서 최대 BATCH_SIZE개를 꺼냄 (block이면 첫 이벤트를 FLUSH_INTERVAL초까지 기다림)"""
+        batch = []
+        try:
+            if block:
+                batch.append(self.queue.get(timeout=audit_config('FLUSH_INTERVAL', 1)))
+            while len(batch) < audit_config('BATCH_SIZE', 500):
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch):
+        try:
+            # 큐에 있는 동안 삭제된 사용자의 이벤트는 사용자 없이 저장한다
+            user_ids = {entry.user_id for entry in batch if entry.user_id is not None}
+            existing = set(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True)) if user_ids else set()
+            for entry in batch:
+                if entry.user_id not in existing:
+                    entry.user_id = None
+            AuditLog.objects.bulk_create(batch)
+        except Exception:
+            logger.exception('Failed to store %d audit log entries', len(batch))
+            self._count('failed', len(batch))
+            return 0
+        self._count('written', len(batch))
+        return len(batch)
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, args=(self._stop,), name='audit-sink', daemon=True
+                    )
+                    self._thread.start()
+                    if not self._flush_at_exit:
+                        # 프로세스 종료 시 남은 이벤트 저장
+                        atexit.register(self.flush)
+                        self._flush_at_exit = True
+
+    def _run(self, stop):
+        try:
+            while not stop.is_set():
+                batch = self._take(block=True)
+                if batch:
+                    self._write(batch)
+                close_old_connections()
+            self.flush()
+        finally:
+            close_old_connections()
+
+
+audit_sink = AuditSink()
+
+
+def _request_context(request):
+    if request is None:
+        return {}
+    user = getattr(request, 'user', None)
+    return {
+        'user_id': user.pk if user is not None and user.is_authenticated else None,
+        'ip_address': request.META.get('REMOTE_ADDR') or None,
+        'user_agent': request.META.get('HTTP_USER_AGENT', ''),
+    }
+
+
+class AuditMiddleware:
+    """PATH_PREFIX 아래 요청을 api_call 이벤트로 기록하고, 처리 중 모델 변경 이벤트에 요청 정보를 제공"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not audit_config('ENABLED', True):
+            return self.get_response(request)
+        token = _current_request.set(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        if request.path.startswith(audit_config('PATH_PREFIX', '/api/')):
+            match = request.resolver_match
+            audit_sink.emit(
+                'api_call', model_name=match.view_name if match else '',
+                object_id=match.kwargs.get('pk', '') if match else '',
+                description=f'{request.method} {request.path} {response.status_code}',
+                **_request_context(request),
+            )
+        return response
+
+
+@receiver(post_save)
+def audit_model_save(sender, instance, created, raw=False, **kwargs):
+    if not raw and sender._meta.label in audit_config('MODELS', ()):
+        action = 'create' if created else 'update'
+        audit_sink.emit(
+            action, model_name=sender._meta.label, object_id=instance.pk,
+            description=f'{action} {sender._meta.label} #{instance.pk}',
+            **_request_context(_current_request.get()),
+        )
+
+
+@receiver(post_delete)
+def audit_model_delete(sender, instance, **kwargs):
+    if sender._meta.label in audit_config('MODELS', ()):
+        audit_sink.emit(
+            'delete', model_name=sender._meta.label, object_id=instance.pk,
+            description=f'delete {sender._meta.label} #{instance.pk}',
+            **_request_context(_current_request.get()),
+        )
+
+
+@receiver(user_logged_in)
+def audit_login(sender, request, user, **kwargs):
+    audit_sink.emit(
+        'login', model_name=User._meta.label, object_id=user.pk, description=f'login {user.username}',
+        **{**_request_context(request), 'user_id': user.pk},
+    )
+
+
+@receiver(user_logged_out)
+def audit_logout(sender, request, user, **kwargs):
+    if user is not None:
+        audit_sink.emit(
+            'logout', model_name=User._meta.label, object_id=user.pk, description=f'logout {user.username}',
+            **{**_request_context(request), 'user_id': user.pk},
+        )
+
+
+@receiver(setting_changed)
+def reset_audit_sink(*, setting, **kwargs):
+    if setting == 'AUDIT_LOG':
+        audit_sink.reset()
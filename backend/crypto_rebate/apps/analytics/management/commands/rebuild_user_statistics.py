@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from crypto_rebate.apps.analytics.models import UserDailyStatistics
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-user daily statistics from the transaction and rebate tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Rebuild only this user id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        rebuilt = UserDailyStatistics.objects.rebuild(options['user_ids'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt daily statistics for {rebuilt} users.'))
@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crypto_rebate.apps.analytics.rollups import rollup_days, rollup_recent
+
+
+class Command(BaseCommand):
+    help = 'Recompute DailyStatistics/ExchangeStatistics rollups (recent days by default, or a backfill range)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help='First day to roll up (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last day to roll up (defaults to --start)')
+        parser.add_argument('--days', type=int, help='Recompute this many recent days (without --start)')
+
+    def handle(self, *args, **options):
+        if options['start']:
+            if options['end'] and options['end'] < options['start']:
+                raise CommandError('--end must not be before --start')
+            days = rollup_days(options['start'], options['end'])
+        else:
+            days = rollup_recent(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully rolled up {days} days of statistics.'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from crypto_rebate.apps.analytics.metric_rollups import rollup_metrics, rollup_recent_metrics
+
+
+def aware_datetime(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(value)
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+class Command(BaseCommand):
+    help = 'Recompute SystemMetrics minute/hour rollups (recent minutes by default, or a backfill range)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=aware_datetime, help='Start of the backfill range (ISO datetime)')
+        parser.add_argument('--end', type=aware_datetime, help='End of the backfill range (defaults to now)')
+        parser.add_argument('--minutes', type=int, help='Recompute this many recent minutes (without --start)')
+
+    def handle(self, *args, **options):
+        if options['start']:
+            end = options['end'] or timezone.now()
+            if end <= options['start']:
+                raise CommandError('--end must be after --start')
+            rows = rollup_metrics(options['start'], end)
+        else:
+            rows = rollup_recent_metrics(options['minutes'])
+        self.stdout.write(self.style.SUCCESS(f'Successfully wrote {rows} metric rollup rows.'))
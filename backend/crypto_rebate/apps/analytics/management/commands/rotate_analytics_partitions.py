@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from crypto_rebate.apps.analytics.partitions import (
+    apply_retention, ensure_partitions, partitioned_models, retention_config,
+)
+
+
+class Command(BaseCommand):
+    help = ('Create upcoming monthly partitions for AuditLog/SystemMetrics and archive/drop months '
+            'older than the retention period')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-months', type=int,
+                            help='Months to keep including the current one (defaults to ANALYTICS_RETENTION)')
+        parser.add_argument('--archive-dir', help='Write expired months to this directory as .jsonl.gz')
+        parser.add_argument('--no-archive', action='store_true', help='Drop expired months without archiving')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the months that would be dropped')
+
+    def handle(self, *args, **options):
+        archive_dir = None if options['no_archive'] else (
+            options['archive_dir'] or retention_config('ARCHIVE_DIR', None)
+        )
+        for model in partitioned_models():
+            label = model._meta.label
+            if not options['dry_run']:
+                created = ensure_partitions(model)
+                if created:
+                    self.stdout.write(f'{label}: partitions ready through {created[-1]:%Y-%m}')
+            expired = apply_retention(
+                model, options['keep_months'], archive_dir=archive_dir, dry_run=options['dry_run']
+            )
+            for month, rows in expired:
+                if options['dry_run']:
+                    self.stdout.write(f'{label}: would drop {month:%Y-%m}')
+                else:
+                    action = 'archived and dropped' if archive_dir else 'dropped'
+                    self.stdout.write(f'{label}: {action} {month:%Y-%m} ({rows} rows)')
+            self.stdout.write(self.style.SUCCESS(f'{label}: {len(expired)} expired months.'))
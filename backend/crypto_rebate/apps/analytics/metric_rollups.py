@@ -0,0 +1,93 @@
+"""
+시스템 메트릭 롤업
+
+SystemMetrics 원본 행을 (이름, metadata['route'], minute/hour 버킷)별로 묶어 SystemMetricsRollup에
+개수/합계/최솟값/최댓값/p95를 저장한다. 개수/합계/최솟값/최댓값은 SQL GROUP BY로, p95는
+같은 구간 값을 정렬해 nearest-rank로 계산한다. 구간의 기존 롤업 행을 지우고 새로 넣으므로
+몇 번 다시 계산해도 결과가 같다.
+
+Celery beat는 최근 LOOKBACK_MINUTES분(hour 롤업은 그 시각이 속한 시간부터)을 주기적으로
+다시 계산하고, 그보다 오래된 구간은 rollup_system_metrics 명령으로 백필한다.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import CharField, Count, Max, Min, Sum, Value
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Coalesce, Trunc
+from django.utils import timezone
+
+from .models import METRIC_BUCKETS, SystemMetrics, SystemMetricsRollup
+
+RESOLUTIONS = ('minute', 'hour')
+
+
+def metric_rollup_config(key, default):
+    return getattr(settings, 'SYSTEM_METRICS_ROLLUP', {}).get(key, default)
+
+
+def floor_bucket(value, resolution):
+    """value가 속한 resolution 버킷 시작 시각 (UTC)"""
+    value = value.astimezone(dt_timezone.utc).replace(second=0, microsecond=0)
+    return value.replace(minute=0) if resolution == 'hour' else value
+
+
+def rollup_metrics(start, end, resolutions=RESOLUTIONS):
+    """[start, end)가 걸친 버킷을 resolution별로 원본에서 다시 계산, 저장한 롤업 행 수 반환"""
+    chunk = timedelta(hours=metric_rollup_config('CHUNK_HOURS', 24))
+    rows = 0
+    for resolution in resolutions:
+        first = floor_bucket(start, resolution)
+        last = floor_bucket(end, resolution)
+        if last < end:
+            last += METRIC_BUCKETS[resolution]
+        while first < last:
+            window_end = min(first + chunk, last)
+            rows += _rollup_window(resolution, first, window_end)
+            first = window_end
+    return rows
+
+
+def rollup_recent_metrics(minutes=None):
+    """최근 minutes분(기본값 LOOKBACK_MINUTES) 롤업을 다시 계산하고 보관 기간이 지난 롤업 삭제"""
+    now = timezone.now()
+    minutes = minutes or metric_rollup_config('LOOKBACK_MINUTES', 5)
+    rows = rollup_metrics(now - timedelta(minutes=minutes), now)
+    for resolution, days in (
+        ('minute', metric_rollup_config('MINUTE_RETENTION_DAYS', 14)),
+        ('hour', metric_rollup_config('HOUR_RETENTION_DAYS', 400)),
+    ):
+        SystemMetricsRollup.objects.filter(
+            resolution=resolution, bucket__lt=now - timedelta(days=days)
+        ).delete()
+    return rows
+
+
+def _rollup_window(resolution, first, last):
+    metrics = SystemMetrics.objects.filter(timestamp__gte=first, timestamp__lt=last).order_by().annotate(
+        route_key=Coalesce(KeyTextTransform('route', 'metadata'), Value(''), output_field=CharField()),
+        bucket_key=Trunc('timestamp', resolution, tzinfo=dt_timezone.utc),
+    )
+    rollups = {
+        (row['name'], row['route_key'], row['bucket_key']): SystemMetricsRollup(
+            resolution=resolution, name=row['name'], route=row['route_key'], bucket=row['bucket_key'],
+            samples=row['samples'], total=row['total'], minimum=row['minimum'], maximum=row['maximum'],
+        )
+        for row in metrics.values('name', 'route_key', 'bucket_key').annotate(
+            samples=Count('id'), total=Sum('value'), minimum=Min('value'), maximum=Max('value'),
+        )
+    }
+    values = defaultdict(list)
+    for name, route, bucket, value in metrics.values_list('name', 'route_key', 'bucket_key', 'value').order_by('value'):
+        values[name, route, bucket].append(value)
+    for key, rollup in rollups.items():
+        ordered = values[key]
+        rollup.percentile_95 = ordered[max(math.ceil(len(ordered) * 0.95), 1) - 1]
+
+    with transaction.atomic():
+        SystemMetricsRollup.objects.filter(resolution=resolution, bucket__gte=first, bucket__lt=last).delete()
+        SystemMetricsRollup.objects.bulk_create(rollups.values())
+    return len(rollups)
@@ -0,0 +1,321 @@
+"""
+요청 지연/쿼리 수 계측
+
+MetricsMiddleware가 요청마다 라우트(메서드 + URL 패턴)별로 응답 시간, DB 쿼리 수, DB 시간을
+프로세스 내 고정 버킷 히스토그램에 누적한다. 요청마다 SystemMetrics 행을 쓰지 않고
+백그라운드 스레드가 FLUSH_INTERVAL마다 라우트별 요약(p50/p95/p99) 한 행씩만 저장하며(요청 처리
+스레드는 DB에 쓰지 않는다), 실시간 값은 관리자 API와 Prometheus 텍스트 형식(누적 히스토그램)으로 제공한다.
+저장에 실패한 구간은 로그를 남기고 다음 구간에 합쳐 다시 저장한다.
+
+히스토그램은 프로세스마다 따로 쌓이므로 워커 프로세스가 여럿이면 Prometheus에서 합산한다.
+"""
+import atexit
+import hmac
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, connections
+from django.dispatch import receiver
+from rest_framework import permissions
+
+from .models import SystemMetrics
+
+logger = logging.getLogger(__name__)
+
+# 버킷 상한 (ms / 개), 마지막 버킷은 +Inf
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+UNMATCHED_ROUTE = '<unmatched>'
+# 라우트 키가 임의의 메서드 이름으로 늘어나지 않도록 나머지는 OTHER로 묶는다
+HTTP_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS', 'CONNECT', 'TRACE'})
+OTHER_METHOD = 'OTHER'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def metrics_config(key, default):
+    return getattr(settings, 'REQUEST_METRICS', {}).get(key, default)
+
+
+class Histogram:
+    """고정 버킷 히스토그램 (버킷별 개수, 전체 개수/합계)"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+
+    def percentile(self, q):
+        """q(0~1) 분위수 추정 (해당 버킷 안에서 선형 보간, +Inf 버킷은 마지막 상한)"""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(self.buckets):
+                    return float(self.buckets[-1])
+                lower = self.buckets[index - 1] if index else 0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return float(self.buckets[-1])
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.sum / self.count if self.count else None,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+        }
+
+
+class RouteStats:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.errors = 0
+
+    def observe(self, latency_ms, queries, db_ms, error):
+        self.latency.observe(latency_ms)
+        self.db_time.observe(db_ms)
+        self.queries.observe(queries)
+        self.errors += error
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        self.db_time.merge(other.db_time)
+        self.queries.merge(other.queries)
+        self.errors += other.errors
+
+    def summary(self):
+        count = self.latency.count
+        return {
+            'count': count,
+            'errors': self.errors,
+            'error_rate': self.errors / count if count else 0,
+            'latency_ms': self.latency.summary(),
+            'db_time_ms': self.db_time.summary(),
+            'db_queries': self.queries.summary(),
+        }
+
+
+class MetricsRegistry:
+    """라우트별 히스토그램 (누적값은 Prometheus용, 구간값은 SystemMetrics 요약용)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._flush_at_exit = False
+        self._totals = {}
+        self._interval = {}
+        self._last_flush = time.monotonic()
+
+    def reset(self):
+        """저장 스레드를 멈추고 누적값을 비움 (설정 변경/테스트용)"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+        if thread is not None:
+            thread.join()
+        with self._lock:
+            self._stop = threading.Event()
+            self._totals = {}
+            self._interval = {}
+            self._last_flush = time.monotonic()
+
+    def observe(self, route, latency_ms, queries, db_ms, error):
+        with self._lock:
+            for stats in (self._totals, self._interval):
+                if route not in stats:
+                    stats[route] = RouteStats()
+                stats[route].observe(latency_ms, queries, db_ms, error)
+        if metrics_config('AUTO_FLUSH', True):
+            self._ensure_thread()
+
+    def snapshot(self):
+        """라우트별 누적 요약 {route: summary}"""
+        with self._lock:
+            return {route: stats.summary() for route, stats in sorted(self._totals.items())}
+
+    def flush(self):
+        """지난 저장 이후 구간을 라우트별 SystemMetrics 한 행(+ 전체 오류율 한 행)으로 저장, 저장한 행 수 반환"""
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self):
+        with self._lock:
+            interval, self._interval = self._interval, {}
+            started, self._last_flush = self._last_flush, time.monotonic()
+            seconds = round(self._last_flush - started, 3)
+        if not interval:
+            return 0
+        try:
+            return self._write(interval, seconds)
+        except Exception:
+            self._restore(interval, started)
+            raise
+
+    def _restore(self, interval, started):
+        """저장하지 못한 구간을 현재 구간에 되돌려 다음 저장에 합친다"""
+        with self._lock:
+            for route, stats in self._interval.items():
+                if route in interval:
+                    interval[route].merge(stats)
+                else:
+                    interval[route] = stats
+            self._interval = interval
+            self._last_flush = started
+
+    def _write(self, interval, seconds):
+        rows = []
+        for route, stats in sorted(interval.items()):
+            summary = stats.summary()
+            rows.append(SystemMetrics(
+                metric_type='performance', name='api_response_time', value=summary['latency_ms']['p95'],
+                unit='ms', metadata={'route': route, 'interval_seconds': seconds, **summary},
+            ))
+        requests = sum(stats.latency.count for stats in interval.values())
+        errors = sum(stats.errors for stats in interval.values())
+        rows.append(SystemMetrics(
+            metric_type='error', name='error_rate', value=errors / requests, unit='ratio',
+            metadata={'requests': requests, 'errors': errors, 'interval_seconds': seconds},
+        ))
+        SystemMetrics.objects.bulk_create(rows)
+        return len(rows)
+
+    def _flush_logged(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Failed to store request metrics, keeping the interval for the next flush')
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, args=(self._stop,), name='request-metrics', daemon=True
+                    )
+                    self._thread.start()
+                    if not self._flush_at_exit:
+                        # 프로세스 종료 시 남은 구간 저장
+                        atexit.register(self._flush_logged)
+                        self._flush_at_exit = True
+
+    def _run(self, stop):
+        try:
+            while not stop.wait(metrics_config('FLUSH_INTERVAL', 60)):
+                self._flush_logged()
+                close_old_connections()
+        finally:
+            close_old_connections()
+
+    def prometheus(self):
+        """누적 히스토그램을 Prometheus 텍스트 형식(0.0.4)으로 반환"""
+        with self._lock:
+            totals = {route: stats for route, stats in sorted(self._totals.items())}
+            lines = []
+            for metric, help_text, attribute, scale in (
+                ('http_request_duration_seconds', 'Request latency by route.', 'latency', 1000),
+                ('http_request_db_duration_seconds', 'Database time per request by route.', 'db_time', 1000),
+                ('http_request_db_queries', 'Database queries per request by route.', 'queries', 1),
+            ):
+                lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} histogram']
+                for route, stats in totals.items():
+                    histogram = getattr(stats, attribute)
+                    label = _label(route)
+                    cumulative = 0
+                    for bound, count in zip((*histogram.buckets, None), histogram.counts):
+                        cumulative += count
+                        le = '+Inf' if bound is None else _number(bound / scale)
+                        lines.append(f'{metric}_bucket{{route="{label}",le="{le}"}} {cumulative}')
+                    lines.append(f'{metric}_sum{{route="{label}"}} {_number(histogram.sum / scale)}')
+                    lines.append(f'{metric}_count{{route="{label}"}} {histogram.count}')
+            lines += ['# HELP http_request_errors_total Requests answered with 5xx by route.',
+                      '# TYPE http_request_errors_total counter']
+            lines += [f'http_request_errors_total{{route="{_label(route)}"}} {stats.errors}'
+                      for route, stats in totals.items()]
+        return '\n'.join(lines) + '\n'
+
+
+def _label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value))
+
+
+metrics_registry = MetricsRegistry()
+
+
+class QueryTimer:
+    """connection.execute_wrapper: 요청 중 실행된 쿼리 수와 시간(ms) 누적"""
+
+    def __init__(self):
+        self.count = 0
+        self.ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.ms += (time.perf_counter() - started) * 1000
+
+
+class MetricsMiddleware:
+    """라우트별 응답 시간/DB 쿼리 수/DB 시간을 metrics_registry에 기록"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not metrics_config('ENABLED', True):
+            return self.get_response(request)
+        queries = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        latency_ms = (time.perf_counter() - started) * 1000
+        match = request.resolver_match
+        method = request.method if request.method in HTTP_METHODS else OTHER_METHOD
+        route = f'{method} /{match.route}' if match else UNMATCHED_ROUTE
+        metrics_registry.observe(route, latency_ms, queries.count, queries.ms, response.status_code >= 500)
+        return response
+
+
+class HasMetricsToken(permissions.BasePermission):
+    """Authorization: Bearer <PROMETHEUS_TOKEN> (스크레이퍼용, 토큰을 설정하지 않으면 거부)"""
+
+    def has_permission(self, request, view):
+        token = metrics_config('PROMETHEUS_TOKEN', None)
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        return bool(token) and hmac.compare_digest(header.encode(), f'Bearer {token}'.encode())
+
+
+@receiver(setting_changed)
+def reset_metrics_registry(*, setting, **kwargs):
+    if setting == 'REQUEST_METRICS':
+        metrics_registry.reset()
@@ -0,0 +1,113 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('exchanges', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('total_users', models.IntegerField(default=0)),
+                ('active_users', models.IntegerField(default=0)),
+                ('total_transactions', models.IntegerField(default=0)),
+                ('total_volume', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('total_rebates', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('total_payments', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Daily Statistics',
+                'verbose_name_plural': 'Daily Statistics',
+                'ordering': ('-date',),
+            },
+        ),
+        migrations.CreateModel(
+            name='SystemMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric_type', models.CharField(choices=[('performance', 'Performance'), ('error', 'Error'), ('security', 'Security'), ('business', 'Business')], max_length=20)),
+                ('name', models.CharField(max_length=100)),
+                ('value', models.FloatField()),
+                ('unit', models.CharField(blank=True, max_length=20)),
+                ('timestamp', models.DateTimeField(auto_now_add=True)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+            ],
+            options={
+                'verbose_name': 'System Metric',
+                'verbose_name_plural': 'System Metrics',
+                'ordering': ('-timestamp',),
+            },
+        ),
+        migrations.CreateModel(
+            name='AuditLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete'), ('login', 'Login'), ('logout', 'Logout'), ('api_call', 'API Call')], max_length=20)),
+                ('model_name', models.CharField(max_length=100)),
+                ('object_id', models.CharField(blank=True, max_length=100)),
+                ('description', models.TextField()),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('user_agent', models.TextField(blank=True)),
+                ('timestamp', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='audit_logs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Audit Log',
+                'verbose_name_plural': 'Audit Logs',
+                'ordering': ('-timestamp',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ExchangeStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total_users', models.IntegerField(default=0)),
+                ('total_transactions', models.IntegerField(default=0)),
+                ('total_volume', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('total_commissions', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('exchange', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statistics', to='exchanges.exchange')),
+            ],
+            options={
+                'verbose_name': 'Exchange Statistics',
+                'verbose_name_plural': 'Exchange Statistics',
+                'ordering': ('-date',),
+                'unique_together': {('exchange', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='UserActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('login_count', models.IntegerField(default=0)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('rebate_amount', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='activities', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Activity',
+                'verbose_name_plural': 'User Activities',
+                'ordering': ('-date',),
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('exchanges', '0006_referraltransaction_created_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDailyStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('total_volume', models.DecimalField(decimal_places=8, default=0, max_digits=30)),
+                ('total_commission', models.DecimalField(decimal_places=8, default=0, max_digits=30)),
+                ('rebate_count', models.IntegerField(default=0)),
+                ('total_rebates', models.DecimalField(decimal_places=8, default=0, max_digits=30)),
+                ('paid_rebates', models.DecimalField(decimal_places=8, default=0, max_digits=30)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('exchange', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_daily_statistics', to='exchanges.exchange')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_statistics', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Daily Statistics',
+                'verbose_name_plural': 'User Daily Statistics',
+                'ordering': ('-date',),
+                'indexes': [models.Index(fields=['user', 'date'], name='user_daily_stats_date_idx')],
+                'unique_together': {('user', 'exchange', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+from crypto_rebate.apps.analytics.partitions import convert_to_partitioned, convert_to_plain
+
+PARTITIONED_TABLES = [('analytics_auditlog', 'timestamp'), ('analytics_systemmetrics', 'timestamp')]
+
+
+def partition_tables(apps, schema_editor):
+    """PostgreSQL에서만 월 단위 RANGE 파티션 테이블로 교체 (SQLite 등은 일반 테이블 유지)"""
+    if schema_editor.connection.vendor == 'postgresql':
+        for table, field in PARTITIONED_TABLES:
+            convert_to_partitioned(schema_editor.connection, table, field)
+
+
+def unpartition_tables(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for table, field in PARTITIONED_TABLES:
+            convert_to_plain(schema_editor.connection, table, field)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_auditlog_event_timestamp'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['-timestamp'], name='auditlog_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemmetrics',
+            index=models.Index(fields=['-timestamp'], name='systemmetrics_timestamp_idx'),
+        ),
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_timestamp_indexes_partitions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SystemMetricsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour')], max_length=10)),
+                ('name', models.CharField(max_length=100)),
+                ('route', models.CharField(blank=True, max_length=200)),
+                ('bucket', models.DateTimeField()),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('minimum', models.FloatField()),
+                ('maximum', models.FloatField()),
+                ('percentile_95', models.FloatField()),
+            ],
+            options={
+                'verbose_name': 'System Metrics Rollup',
+                'verbose_name_plural': 'System Metrics Rollups',
+                'ordering': ('-bucket',),
+                'indexes': [models.Index(fields=['resolution', 'name', 'bucket'], name='metrics_rollup_name_idx')],
+                'unique_together': {('resolution', 'name', 'route', 'bucket')},
+            },
+        ),
+    ]
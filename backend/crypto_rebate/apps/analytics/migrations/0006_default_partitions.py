@@ -0,0 +1,26 @@
+from django.db import migrations
+
+from crypto_rebate.apps.analytics.partitions import create_default_partition, is_partitioned
+
+PARTITIONED_TABLES = ['analytics_auditlog', 'analytics_systemmetrics']
+
+
+def add_default_partitions(apps, schema_editor):
+    """월 파티션이 없는 행을 받을 DEFAULT 파티션 추가 (0004로 파티션 테이블이 된 PostgreSQL만)"""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        for table in PARTITIONED_TABLES:
+            if is_partitioned(connection, table):
+                create_default_partition(cursor, table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_systemmetricsrollup'),
+    ]
+
+    operations = [
+        # 되돌려도 DEFAULT 파티션은 그대로 둔다 (0004를 되돌리면 행과 함께 일반 테이블로 합쳐진다)
+        migrations.RunPython(add_default_partitions, migrations.RunPython.noop),
+    ]
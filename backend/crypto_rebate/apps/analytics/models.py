@@ -1,6 +1,18 @@
-from django.db import models
+from collections import Counter, defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.db import connections, models, transaction
 from django.contrib.auth.models import User
-from crypto_rebate.apps.exchanges.models import Exchange
+from django.db.models import Case, Count, F, FloatField, Max, Min, Q, Sum, When
+from django.db.models.functions import Cast, Trunc, TruncDate, TruncMonth, TruncWeek
+from django.dispatch import receiver
+from django.utils import timezone
+from crypto_rebate.apps.exchanges.models import Exchange, ReferralTransaction
+from crypto_rebate.apps.exchanges.signals import transactions_changed
+from crypto_rebate.apps.rebates.models import Rebate
+from crypto_rebate.apps.rebates.signals import rebates_changed
 
 
 class DailyStatistics(models.Model):
@@ -43,7 +55,234 @@ class ExchangeStatistics(models.Model):
         ordering = ('-date',)
 
 
+def pks_by_key(queryset, fields, keys, chunk_size=500):
+    """복합 키 튜플(fields 순서) -> pk
+
+    키마다 Q를 OR로 묶으면 키가 많을 때 SQLite 식 트리 깊이 제한(1000)을 넘으므로
+    chunk_size개씩 필드별 __in 조건으로 후보 행을 거르고 정확한 키는 파이썬에서 맞춘다.
+    """
+    keys = sorted(set(keys))
+    pks = {}
+    for start in range(0, len(keys), chunk_size):
+        chunk = keys[start:start + chunk_size]
+        wanted = set(chunk)
+        candidates = queryset.filter(**{
+            f'{field}__in': {key[index] for key in chunk} for index, field in enumerate(fields)
+        }).values_list('pk', *fields)
+        for pk, *key in candidates:
+            if tuple(key) in wanted:
+                pks[tuple(key)] = pk
+    return pks
+
+
+# 사용자 통계 다운샘플링 단위 (week/month는 해당 주 월요일/월 1일로 묶는다)
+GRANULARITIES = {
+    'day': F('date'),
+    'week': TruncWeek('date'),
+    'month': TruncMonth('date'),
+}
+
+
+class UserDailyStatisticsQuerySet(models.QuerySet):
+    SUM_FIELDS = [
+        'transaction_count', 'total_volume', 'total_commission', 'rebate_count', 'total_rebates', 'paid_rebates',
+    ]
+
+    def apply(self, deltas, created=()):
+        """{(user_id, exchange_id, date): {필드: 증분}}을 Case/When F() 증분 UPDATE 한 번으로 반영
+
+        created에 있는 키는 행이 없으면 0으로 먼저 만든다. 삭제 경로(감소분만 있는 키)에서는
+        삭제 중인 사용자/거래소의 행을 새로 만들지 않는다.
+        """
+        deltas = {
+            key: {field: amount for field, amount in amounts.items() if amount}
+            for key, amounts in deltas.items()
+        }
+        deltas = {key: amounts for key, amounts in deltas.items() if amounts}
+        if not deltas:
+            return
+        now = timezone.now()
+        with transaction.atomic(using=self.db):
+            self.bulk_create([
+                self.model(user_id=user_id, exchange_id=exchange_id, date=date)
+                for user_id, exchange_id, date in deltas if (user_id, exchange_id, date) in created
+            ], ignore_conflicts=True)
+            pks = pks_by_key(self, ('user_id', 'exchange_id', 'date'), deltas)
+            updates = {}
+            for field in self.SUM_FIELDS:
+                whens = [
+                    When(pk=pks[key], then=F(field) + amounts[field])
+                    for key, amounts in deltas.items() if key in pks and amounts.get(field)
+                ]
+                if whens:
+                    updates[field] = Case(*whens, default=F(field))
+            if updates:
+                self.filter(pk__in=pks.values()).update(updated_at=now, **updates)
+
+    def rebuild(self, user_ids=None, batch_size=500):
+        """원본 테이블(ReferralTransaction/Rebate)에서 사용자별 일별 집계를 다시 계산, 재구성한 사용자 수 반환"""
+        users = User.objects.using(self.db).order_by('pk').values_list('pk', flat=True)
+        if user_ids is not None:
+            users = users.filter(pk__in=list(user_ids))
+        users = users.iterator(chunk_size=batch_size)
+        rebuilt = 0
+        while True:
+            batch = list(islice(users, batch_size))
+            if not batch:
+                return rebuilt
+            with transaction.atomic(using=self.db):
+                # 재구성하는 동안 증분 반영이 끼어들지 않도록 기존 행을 잠근다
+                list(self.select_for_update().filter(user_id__in=batch).values_list('pk'))
+                rows = self._build(batch)
+                self.filter(user_id__in=batch).delete()
+                self.bulk_create(rows, batch_size=1000)
+            rebuilt += len(batch)
+
+    def _build(self, user_ids):
+        day = TruncDate('created_at', tzinfo=timezone.get_current_timezone())
+        rows = {}
+
+        def row(user_id, exchange_id, date):
+            key = (user_id, exchange_id, date)
+            if key not in rows:
+                rows[key] = self.model(
+                    user_id=user_id, exchange_id=exchange_id, date=date, total_volume=Decimal(0),
+                    total_commission=Decimal(0), total_rebates=Decimal(0), paid_rebates=Decimal(0),
+                )
+            return rows[key]
+
+        for values in ReferralTransaction.objects.using(self.db).filter(user_id__in=user_ids).order_by().values(
+            'user_id', 'exchange_id', date=day
+        ).annotate(count=Count('id'), volume=Sum('amount'), commission=Sum('commission')):
+            stats = row(values['user_id'], values['exchange_id'], values['date'])
+            stats.transaction_count = values['count']
+            stats.total_volume, stats.total_commission = values['volume'], values['commission']
+
+        for values in Rebate.objects.using(self.db).filter(user_id__in=user_ids).exclude(
+            status__in=Rebate.UNCOUNTED_STATUSES
+        ).order_by().values('user_id', date=day, exchange_id=F('referral_transaction__exchange_id')).annotate(
+            count=Count('id'), rebates=Sum('amount'), paid=Sum('amount', filter=Q(status='paid'), default=0),
+        ):
+            stats = row(values['user_id'], values['exchange_id'], values['date'])
+            stats.rebate_count = values['count']
+            stats.total_rebates, stats.paid_rebates = values['rebates'], values['paid']
+        return list(rows.values())
+
+    def _sums(self):
+        return {field: Sum(field, default=0) for field in self.SUM_FIELDS}
+
+    def totals(self):
+        return self.order_by().aggregate(**self._sums())
+
+    def series(self, granularity='day'):
+        """일별 행을 granularity(day/week/month) 단위로 SQL GROUP BY로 묶어 합산"""
+        return self.order_by().values(period=GRANULARITIES[granularity]).annotate(**self._sums()).order_by('period')
+
+    def by_exchange(self):
+        return self.order_by().values('exchange_id', 'exchange__name').annotate(
+            **self._sums()
+        ).order_by('exchange__name')
+
+
+class UserDailyStatistics(models.Model):
+    """사용자 x 거래소 x 날짜(TIME_ZONE 기준) 집계
+
+    거래/페이백 변경 신호로 증분 갱신되므로 기간별 사용자 통계를 원본 테이블 스캔 없이
+    구간 내 일수 x 거래소 수 만큼의 행만 읽어 계산한다. rebuild_user_statistics 명령으로 재구성한다.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_statistics')
+    exchange = models.ForeignKey(Exchange, on_delete=models.CASCADE, related_name='user_daily_statistics')
+    date = models.DateField()
+    transaction_count = models.IntegerField(default=0)
+    total_volume = models.DecimalField(max_digits=30, decimal_places=8, default=0)
+    total_commission = models.DecimalField(max_digits=30, decimal_places=8, default=0)
+    rebate_count = models.IntegerField(default=0)
+    total_rebates = models.DecimalField(max_digits=30, decimal_places=8, default=0)  # 거절 제외
+    paid_rebates = models.DecimalField(max_digits=30, decimal_places=8, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = UserDailyStatisticsQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.user.username} - {self.exchange.name} - {self.date}"
+
+    class Meta:
+        verbose_name = "User Daily Statistics"
+        verbose_name_plural = "User Daily Statistics"
+        unique_together = ['user', 'exchange', 'date']
+        ordering = ('-date',)
+        indexes = [
+            models.Index(fields=['user', 'date'], name='user_daily_stats_date_idx'),
+        ]
+
+
+class UserActivityQuerySet(models.QuerySet):
+    COUNT_FIELDS = ['login_count', 'transaction_count']
+
+    def add_counts(self, counts, batch_size=500):
+        """{(user_id, date): {필드: 증분}}을 가산 upsert로 반영, 반영한 행 수 반환
+
+        INSERT ... ON CONFLICT (user_id, date) DO UPDATE SET 필드 = 필드 + EXCLUDED.필드로
+        배치마다 쿼리 한 번에 처리한다(행을 읽고 고쳐 쓰지 않으므로 동시 반영에도 증분이 유실되지 않음).
+        그 사이 삭제된 사용자의 증분은 버린다.
+        """
+        user_ids = set(User.objects.using(self.db).filter(
+            pk__in={user_id for user_id, _ in counts}
+        ).values_list('pk', flat=True))
+        rows = [(key, amounts) for key, amounts in counts.items() if key[0] in user_ids and any(amounts.values())]
+        connection = connections[self.db]
+        with transaction.atomic(using=self.db):
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                if connection.features.supports_update_conflicts_with_target:
+                    self._upsert(connection, batch)
+                else:
+                    self._create_and_update(batch)
+        return len(rows)
+
+    def _upsert(self, connection, rows):
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        columns = ['user_id', 'date', *self.COUNT_FIELDS, 'rebate_amount', 'created_at', 'updated_at']
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        params = []
+        for (user_id, date), amounts in rows:
+            params += [
+                user_id, connection.ops.adapt_datefield_value(date),
+                *(amounts.get(field, 0) for field in self.COUNT_FIELDS), 0, now, now,
+            ]
+        placeholders = ', '.join([f"({', '.join(['%s'] * len(columns))})"] * len(rows))
+        updates = ', '.join(
+            f'{quote(field)} = {table}.{quote(field)} + EXCLUDED.{quote(field)}' for field in self.COUNT_FIELDS
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(quote(column) for column in columns)}) VALUES {placeholders} "
+                f"ON CONFLICT ({quote('user_id')}, {quote('date')}) "
+                f"DO UPDATE SET {updates}, {quote('updated_at')} = EXCLUDED.{quote('updated_at')}",
+                params,
+            )
+
+    def _create_and_update(self, rows):
+        """ON CONFLICT 미지원 DB: 없는 행을 0으로 만든 뒤 Case/When F() 증분 UPDATE"""
+        self.bulk_create(
+            [self.model(user_id=user_id, date=date) for (user_id, date), _ in rows], ignore_conflicts=True
+        )
+        pks = pks_by_key(self, ('user_id', 'date'), (key for key, _ in rows))
+        updates = {}
+        for field in self.COUNT_FIELDS:
+            whens = [When(pk=pks[key], then=F(field) + amounts[field]) for key, amounts in rows if amounts.get(field)]
+            if whens:
+                updates[field] = Case(*whens, default=F(field))
+        self.filter(pk__in=pks.values()).update(updated_at=timezone.now(), **updates)
+
+
 class UserActivity(models.Model):
+    """사용자 일별 활동 (로그인/거래 수)
+
+    요청마다 같은 행을 갱신하지 않도록 activity.activity_recorder가 증분을 버퍼에 모아
+    주기적으로 add_counts()로 반영한다.
+    """
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='activities')
     date = models.DateField()
     login_count = models.IntegerField(default=0)
@@ -52,6 +291,8 @@ class UserActivity(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UserActivityQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.user.username} - {self.date}"
 
@@ -84,6 +325,71 @@ class SystemMetrics(models.Model):
         verbose_name = "System Metric"
         verbose_name_plural = "System Metrics"
         ordering = ('-timestamp',)
+        # PostgreSQL에서는 timestamp 월 단위 RANGE 파티션 테이블 (partitions.py)
+        indexes = [
+            models.Index(fields=['-timestamp'], name='systemmetrics_timestamp_idx'),
+        ]
+
+
+# 시스템 메트릭 시계열 버킷 (롤업은 minute/hour 해상도로 저장, hour 이상 버킷은 hour 롤업을 묶는다)
+METRIC_BUCKETS = {
+    'minute': timedelta(minutes=1),
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+    'week': timedelta(weeks=1),
+}
+METRIC_AGGREGATIONS = ('count', 'min', 'avg', 'max', 'p95')
+
+
+class SystemMetricsRollupQuerySet(models.QuerySet):
+    def series(self, bucket, by_route=False):
+        """롤업 행을 bucket 단위로 SQL GROUP BY(date_trunc)로 묶어 count/min/avg/max/p95 계산
+
+        avg는 sum/count 가중 평균이고, 여러 롤업 행을 묶는 p95는 각 행 p95의 최댓값(상한 근사)이다.
+        """
+        keys = ['name', 'route'] if by_route else ['name']
+        return self.order_by().values(
+            *keys, time=Trunc('bucket', bucket, tzinfo=timezone.get_current_timezone())
+        ).annotate(
+            count=Sum('samples'), min=Min('minimum'), max=Max('maximum'), p95=Max('percentile_95'),
+            avg=Cast(Sum('total'), FloatField()) / Sum('samples'),
+        ).order_by(*keys, 'time')
+
+
+class SystemMetricsRollup(models.Model):
+    """SystemMetrics 이름 x 라우트 x minute/hour 버킷 요약
+
+    metric_rollups.py가 최근 구간을 주기적으로 다시 계산한다. 일주일 차트도 원본 행 대신
+    hour 롤업(라우트당 168행)만 읽는다.
+    """
+    RESOLUTION_CHOICES = [
+        ('minute', 'Minute'),
+        ('hour', 'Hour'),
+    ]
+
+    resolution = models.CharField(max_length=10, choices=RESOLUTION_CHOICES)
+    name = models.CharField(max_length=100)
+    route = models.CharField(max_length=200, blank=True)  # metadata['route'], 없으면 ''
+    bucket = models.DateTimeField()
+    samples = models.PositiveIntegerField(default=0)
+    total = models.FloatField(default=0)
+    minimum = models.FloatField()
+    maximum = models.FloatField()
+    percentile_95 = models.FloatField()
+
+    objects = SystemMetricsRollupQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.name} {self.route} {self.resolution} {self.bucket}"
+
+    class Meta:
+        verbose_name = "System Metrics Rollup"
+        verbose_name_plural = "System Metrics Rollups"
+        unique_together = ['resolution', 'name', 'route', 'bucket']
+        ordering = ('-bucket',)
+        indexes = [
+            models.Index(fields=['resolution', 'name', 'bucket'], name='metrics_rollup_name_idx'),
+        ]
 
 
 class AuditLog(models.Model):
@@ -103,7 +409,8 @@ class AuditLog(models.Model):
     description = models.TextField()
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # audit.audit_sink가 모아서 늦게 저장하므로 저장 시각이 아니라 이벤트 발생 시각을 넣는다
+    timestamp = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
         return f"{self.user.username if self.user else 'System'} - {self.action} - {self.timestamp}"
@@ -112,3 +419,47 @@ class AuditLog(models.Model):
         verbose_name = "Audit Log"
         verbose_name_plural = "Audit Logs"
         ordering = ('-timestamp',)
+        # PostgreSQL에서는 timestamp 월 단위 RANGE 파티션 테이블 (partitions.py)
+        indexes = [
+            models.Index(fields=['-timestamp'], name='auditlog_timestamp_idx'),
+        ]
+
+
+def _statistics_key(state):
+    return state['user_id'], state['exchange_id'], timezone.localdate(state['created_at'])
+
+
+def _apply_statistics_changes(rows, amounts, using):
+    deltas, created = defaultdict(Counter), set()
+    for previous, current in rows:
+        if previous:
+            deltas[_statistics_key(previous)].subtract(amounts(previous))
+        if current:
+            deltas[_statistics_key(current)].update(amounts(current))
+            created.add(_statistics_key(current))
+    UserDailyStatistics.objects.using(using).apply(deltas, created)
+
+
+def _transaction_amounts(state):
+    return {'transaction_count': 1, 'total_volume': state['amount'], 'total_commission': state['commission']}
+
+
+def _rebate_amounts(state):
+    if state['status'] in Rebate.UNCOUNTED_STATUSES:
+        return {}
+    return {
+        'rebate_count': 1, 'total_rebates': state['amount'],
+        'paid_rebates': state['amount'] if state['status'] == 'paid' else 0,
+    }
+
+
+@receiver(transactions_changed)
+def update_user_statistics_on_transactions_changed(sender, rows, using, **kwargs):
+    """거래 생성/변경/삭제(일괄 수집 포함) 시 사용자 일별 집계 증분 갱신"""
+    _apply_statistics_changes(rows, _transaction_amounts, using)
+
+
+@receiver(rebates_changed)
+def update_user_statistics_on_rebates_changed(sender, rows, using, **kwargs):
+    """페이백 생성/변경/삭제 시 사용자 일별 집계 증분 갱신"""
+    _apply_statistics_changes(rows, _rebate_amounts, using)
@@ -0,0 +1,325 @@
+"""
+AuditLog/SystemMetrics 월 단위 파티션과 보관 기간 관리
+
+두 테이블은 timestamp 순으로 쌓이기만 하므로 PostgreSQL에서는 timestamp 월(UTC) 단위
+RANGE 파티션 테이블로 바꾸고(0004 마이그레이션), 다음 PARTITIONS_AHEAD개월 파티션을 미리
+만들어 둔다. 보관 기간이 지난 달은 파티션을 DETACH 후 DROP하므로 대량 DELETE/VACUUM이 없다.
+주기 작업이 멈춰 월 파티션이 없는 행은 DEFAULT 파티션(<테이블>_default)에 들어가 INSERT가
+실패하지 않고, 다음 ensure_partitions가 그 달의 월 파티션을 만들어 행을 옮긴다.
+SQLite 등 파티션을 지원하지 않는 DB는 일반 테이블 그대로 두고 같은 월 구간을 청크 단위로 지운다.
+
+지우기 전에 ARCHIVE_DIR이 설정되어 있으면 해당 월의 행을 `<테이블>_<YYYY_MM>.jsonl.gz`로 보관한다.
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+# 월 단위 파티션을 쓰는 모델과 파티션 키
+PARTITIONED_MODELS = {
+    'analytics.AuditLog': 'timestamp',
+    'analytics.SystemMetrics': 'timestamp',
+}
+
+
+def retention_config(key, default):
+    return getattr(settings, 'ANALYTICS_RETENTION', {}).get(key, default)
+
+
+def month_start(value):
+    """value가 속한 달의 1일 00:00 (UTC)"""
+    value = value.astimezone(dt_timezone.utc) if timezone.is_aware(value) else value
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y%m}'
+
+
+def default_partition_name(table):
+    return f'{table}_default'
+
+
+def is_partitioned(connection, table):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [table])
+        row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def _create_partition(cursor, table, month):
+    quote = cursor.db.ops.quote_name
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {quote(partition_name(table, month))} PARTITION OF {quote(table)} '
+        f'FOR VALUES FROM (%s) TO (%s)',
+        [month, add_months(month, 1)],
+    )
+
+
+def create_default_partition(cursor, table):
+    quote = cursor.db.ops.quote_name
+    cursor.execute(
+        f'CREATE TABLE IF NOT EXISTS {quote(default_partition_name(table))} PARTITION OF {quote(table)} DEFAULT'
+    )
+
+
+def _split_default_partition(cursor, table, field, month):
+    """DEFAULT 파티션에 들어간 month 행을 새 월 파티션으로 옮김
+
+    DEFAULT 파티션에 그 구간의 행이 있으면 월 파티션을 바로 만들 수 없으므로
+    DEFAULT 파티션을 떼어 낸 상태에서 월 파티션을 만들고 행을 옮긴 뒤 다시 붙인다.
+    """
+    quote = cursor.db.ops.quote_name
+    default = quote(default_partition_name(table))
+    cursor.execute(f'ALTER TABLE {quote(table)} DETACH PARTITION {default}')
+    _create_partition(cursor, table, month)
+    cursor.execute(
+        f'WITH moved AS (DELETE FROM {default} WHERE {quote(field)} >= %s AND {quote(field)} < %s RETURNING *) '
+        f'INSERT INTO {quote(table)} SELECT * FROM moved',
+        [month, add_months(month, 1)],
+    )
+    cursor.execute(f'ALTER TABLE {quote(table)} ATTACH PARTITION {default} DEFAULT')
+    # 옮긴 행의 지연 외래 키 검사를 바로 실행한다 (남아 있으면 같은 트랜잭션에서 이 파티션을 DROP할 수 없다)
+    cursor.db.check_constraints()
+
+
+def ensure_partitions(model, months_ahead=None, using='default'):
+    """이번 달부터 months_ahead개월 뒤까지와 DEFAULT 파티션에 들어간 달의 파티션 생성, 그 달 목록 반환
+
+    파티션 테이블이 아니면 아무것도 하지 않는다.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if not is_partitioned(connection, table):
+        return []
+    field = PARTITIONED_MODELS[model._meta.label]
+    quote = connection.ops.quote_name
+    months_ahead = retention_config('PARTITIONS_AHEAD', 2) if months_ahead is None else months_ahead
+    current = month_start(timezone.now())
+    existing = set(partition_months(model, using))
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        create_default_partition(cursor, table)
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', {quote(field)} AT TIME ZONE 'UTC') "
+            f"FROM {quote(default_partition_name(table))}"
+        )
+        stray = {month.replace(tzinfo=dt_timezone.utc) for month, in cursor.fetchall()}
+        months = {add_months(current, offset) for offset in range(months_ahead + 1)} | stray
+        for month in sorted(months - existing):
+            if month in stray:
+                _split_default_partition(cursor, table, field, month)
+            else:
+                _create_partition(cursor, table, month)
+    return sorted(months)
+
+
+def partition_months(model, using='default'):
+    """파티션(또는 행이 있는 달) 목록 (오래된 순)
+
+    파티션 테이블이면 자식 파티션 이름에서, 아니면 다음 달 이후 최소 timestamp를 반복 조회해
+    (달마다 인덱스 조회 한 번) 행이 있는 달만 구한다.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if is_partitioned(connection, table):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT child.relname FROM pg_inherits '
+                'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+                'WHERE pg_inherits.inhparent = to_regclass(%s)',
+                [table],
+            )
+            names = [name for name, in cursor.fetchall()]
+        prefix = f'{table}_p'
+        return sorted(
+            datetime.strptime(name[len(prefix):], '%Y%m').replace(tzinfo=dt_timezone.utc)
+            for name in names if name.startswith(prefix)
+        )
+    field = PARTITIONED_MODELS[model._meta.label]
+    rows = model.objects.using(using).order_by()
+    months, first = [], rows.aggregate(first=Min(field))['first']
+    while first is not None:
+        months.append(month_start(first))
+        first = rows.filter(**{f'{field}__gte': add_months(months[-1], 1)}).aggregate(first=Min(field))['first']
+    return months
+
+
+def latest_month(model, using='default'):
+    """가장 최근 행이 있는 달 (행이 없으면 None)"""
+    field = PARTITIONED_MODELS[model._meta.label]
+    last = model.objects.using(using).aggregate(last=Max(field))['last']
+    return month_start(last) if last else None
+
+
+def archive_month(model, month, archive_dir=None, using='default'):
+    """month 한 달치 행을 (archive_dir이 있으면 gzip JSONL로 보관한 뒤) 삭제, 처리한 행 수 반환"""
+    connection = connections[using]
+    table = model._meta.db_table
+    field = PARTITIONED_MODELS[model._meta.label]
+    rows = model.objects.using(using).filter(**{
+        f'{field}__gte': month, f'{field}__lt': add_months(month, 1),
+    })
+
+    count = None
+    if archive_dir:
+        path = Path(archive_dir) / f'{table}_{month:%Y_%m}.jsonl.gz'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + '.partial')
+        count = 0
+        with gzip.open(partial, 'wt', encoding='utf-8') as archive:
+            for row in rows.order_by(field, 'pk').values().iterator(chunk_size=5000):
+                archive.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+                count += 1
+        # 다 쓴 파일만 최종 이름으로 바꿔 중단된 보관본이 남지 않게 한다
+        os.replace(partial, path)
+
+    if is_partitioned(connection, table):
+        if count is None:
+            count = rows.count()
+        quote = connection.ops.quote_name
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            partition = quote(partition_name(table, month))
+            cursor.execute(f'ALTER TABLE {quote(table)} DETACH PARTITION {partition}')
+            cursor.execute(f'DROP TABLE {partition}')
+        return count
+
+    deleted, chunk_size = 0, retention_config('DELETE_CHUNK_SIZE', 10000)
+    while True:
+        pks = list(rows.order_by().values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return deleted if count is None else count
+        deleted += model.objects.using(using).filter(pk__in=pks).delete()[0]
+
+
+def apply_retention(model, keep_months=None, archive_dir=None, dry_run=False, using='default'):
+    """보관 기간(이번 달 포함 keep_months개월)이 지난 달을 보관/삭제, [(월, 행 수)] 반환"""
+    label = model._meta.label
+    keep_months = keep_months or retention_config('MONTHS', {}).get(label)
+    if not keep_months:
+        return []
+    cutoff = add_months(month_start(timezone.now()), -(keep_months - 1))
+    expired = [month for month in partition_months(model, using) if month < cutoff]
+    if dry_run:
+        return [(month, None) for month in expired]
+    return [(month, archive_month(model, month, archive_dir, using)) for month in expired]
+
+
+def partitioned_models():
+    return [apps.get_model(label) for label in PARTITIONED_MODELS]
+
+
+def convert_to_partitioned(connection, table, field):
+    """PostgreSQL 일반 테이블을 field 월 RANGE 파티션 테이블로 교체 (기존 행이 있는 월과 앞으로의 월 파티션 생성)
+
+    파티션 키는 기본 키에 포함되어야 하므로 기본 키를 (id, field)로 바꾼다.
+    인덱스와 외래 키는 같은 이름으로 다시 만든다.
+    """
+    quote = connection.ops.quote_name
+    legacy = f'{table}_legacy'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+            [table, f'{table}_pkey'],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f'SELECT min({quote(field)}), max({quote(field)}) FROM {quote(table)}')
+        first, last = cursor.fetchone()
+
+        cursor.execute(f'ALTER TABLE {quote(table)} RENAME TO {quote(legacy)}')
+        cursor.execute(f'ALTER TABLE {quote(legacy)} RENAME CONSTRAINT {quote(table + "_pkey")} '
+                       f'TO {quote(legacy + "_pkey")}')
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {quote(name)}')
+        for name, _ in foreign_keys:
+            cursor.execute(f'ALTER TABLE {quote(legacy)} DROP CONSTRAINT {quote(name)}')
+
+        cursor.execute(
+            f'CREATE TABLE {quote(table)} (LIKE {quote(legacy)} INCLUDING DEFAULTS INCLUDING IDENTITY '
+            f'INCLUDING CONSTRAINTS) PARTITION BY RANGE ({quote(field)})'
+        )
+        cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(table + "_pkey")} '
+                       f'PRIMARY KEY ("id", {quote(field)})')
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}')
+
+        month = month_start(first or timezone.now())
+        end = add_months(month_start(max(last or timezone.now(), timezone.now())),
+                         retention_config('PARTITIONS_AHEAD', 2))
+        while month <= end:
+            _create_partition(cursor, table, month)
+            month = add_months(month, 1)
+        create_default_partition(cursor, table)
+
+        cursor.execute(f'INSERT INTO {quote(table)} SELECT * FROM {quote(legacy)}')
+        cursor.execute(f'DROP TABLE {quote(legacy)}')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(max(id), 0) + 1, false) "
+            f"FROM {quote(table)}",
+            [table],
+        )
+
+
+def convert_to_plain(connection, table, field):
+    """convert_to_partitioned 되돌리기 (파티션 테이블을 일반 테이블로 교체)"""
+    quote = connection.ops.quote_name
+    legacy = f'{table}_partitioned'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s",
+            [table, f'{table}_pkey'],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+
+        cursor.execute(f'ALTER TABLE {quote(table)} RENAME TO {quote(legacy)}')
+        cursor.execute(f'ALTER TABLE {quote(legacy)} RENAME CONSTRAINT {quote(table + "_pkey")} '
+                       f'TO {quote(legacy + "_pkey")}')
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX {quote(name)}')
+        for name, _ in foreign_keys:
+            cursor.execute(f'ALTER TABLE {quote(legacy)} DROP CONSTRAINT {quote(name)}')
+
+        cursor.execute(
+            f'CREATE TABLE {quote(table)} (LIKE {quote(legacy)} INCLUDING DEFAULTS INCLUDING IDENTITY '
+            f'INCLUDING CONSTRAINTS)'
+        )
+        cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(table + "_pkey")} PRIMARY KEY ("id")')
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}')
+        cursor.execute(f'INSERT INTO {quote(table)} SELECT * FROM {quote(legacy)}')
+        cursor.execute(f'DROP TABLE {quote(legacy)}')
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(max(id), 0) + 1, false) "
+            f"FROM {quote(table)}",
+            [table],
+        )
@@ -0,0 +1,110 @@
+"""
+일별 통계 롤업
+
+ReferralTransaction/Rebate/RebatePayment/User를 날짜(TIME_ZONE 기준)별로 묶어
+DailyStatistics(전체)와 ExchangeStatistics(거래소별)를 만든다. 구간은 최대 CHUNK_DAYS일씩
+나누어 테이블마다 GROUP BY 한 번으로 집계하고, 같은 구간의 기존 롤업 행을 지운 뒤
+새로 넣으므로 같은 날짜를 몇 번 다시 계산해도 결과가 같다(백필 재실행 가능).
+
+Celery beat는 늦게 동기화된 거래를 반영하도록 최근 LOOKBACK_DAYS일을 주기적으로 다시 계산하고,
+그보다 오래된 구간은 rollup_statistics 명령으로 백필한다.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from crypto_rebate.apps.exchanges.models import ReferralTransaction
+from crypto_rebate.apps.rebates.models import Rebate, RebatePayment
+from crypto_rebate.periods import period_bounds
+
+from .models import DailyStatistics, ExchangeStatistics
+
+
+def rollup_config(key, default):
+    return getattr(settings, 'ANALYTICS_ROLLUP', {}).get(key, default)
+
+
+def rollup_days(start_date, end_date=None):
+    """start_date~end_date(포함) 롤업을 원본 테이블에서 다시 계산, 계산한 일수 반환"""
+    end_date = end_date or start_date
+    chunk_days = rollup_config('CHUNK_DAYS', 31)
+    first, days = start_date, 0
+    while first <= end_date:
+        last = min(first + timedelta(days=chunk_days - 1), end_date)
+        _rollup_window(first, last)
+        days += (last - first).days + 1
+        first = last + timedelta(days=1)
+    return days
+
+
+def rollup_recent(days=None):
+    """오늘을 포함한 최근 days일(기본값 LOOKBACK_DAYS) 롤업 재계산"""
+    days = days or rollup_config('LOOKBACK_DAYS', 3)
+    today = timezone.localdate()
+    return rollup_days(today - timedelta(days=days - 1), today)
+
+
+def _rollup_window(first, last):
+    tz = timezone.get_current_timezone()
+    start = period_bounds('today', first, tz)[0]
+    end = period_bounds('today', last, tz)[1]
+    dates = [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+    daily = {
+        date: DailyStatistics(
+            date=date, total_volume=Decimal(0), total_rebates=Decimal(0), total_payments=Decimal(0)
+        )
+        for date in dates
+    }
+
+    transactions = ReferralTransaction.objects.filter(created_at__gte=start, created_at__lt=end).order_by()
+    transaction_day = TruncDate('created_at', tzinfo=tz)
+    exchange_stats = [
+        ExchangeStatistics(
+            exchange_id=row['exchange_id'], date=row['day'], total_users=row['users'],
+            total_transactions=row['count'], total_volume=row['volume'], total_commissions=row['commission'],
+        )
+        for row in transactions.values('exchange_id', day=transaction_day).annotate(
+            users=Count('user_id', distinct=True), count=Count('id'),
+            volume=Sum('amount'), commission=Sum('commission'),
+        )
+    ]
+    for row in transactions.values(day=transaction_day).annotate(
+        users=Count('user_id', distinct=True), count=Count('id'), volume=Sum('amount')
+    ):
+        stats = daily[row['day']]
+        stats.active_users, stats.total_transactions, stats.total_volume = row['users'], row['count'], row['volume']
+
+    for row in Rebate.objects.filter(
+        created_at__gte=start, created_at__lt=end
+    ).exclude(status__in=Rebate.UNCOUNTED_STATUSES).order_by().values(
+        day=TruncDate('created_at', tzinfo=tz)
+    ).annotate(amount=Sum('amount')):
+        daily[row['day']].total_rebates = row['amount']
+
+    for row in RebatePayment.objects.filter(
+        payment_date__gte=start, payment_date__lt=end
+    ).order_by().values(day=TruncDate('payment_date', tzinfo=tz)).annotate(amount=Sum('amount')):
+        daily[row['day']].total_payments = row['amount']
+
+    # 전체 사용자 수는 구간 시작 전 가입자 수에 일별 가입자 수를 누적한다
+    users = User.objects.order_by()
+    joined = defaultdict(int, users.filter(date_joined__gte=start, date_joined__lt=end).values(
+        day=TruncDate('date_joined', tzinfo=tz)
+    ).annotate(count=Count('id')).values_list('day', 'count'))
+    total_users = users.filter(date_joined__lt=start).count()
+    for date in dates:
+        total_users += joined[date]
+        daily[date].total_users = total_users
+
+    with transaction.atomic():
+        DailyStatistics.objects.filter(date__range=(first, last)).delete()
+        ExchangeStatistics.objects.filter(date__range=(first, last)).delete()
+        DailyStatistics.objects.bulk_create(daily.values())
+        ExchangeStatistics.objects.bulk_create(exchange_stats)
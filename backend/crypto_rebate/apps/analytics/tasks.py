@@ -0,0 +1,39 @@
+from celery import shared_task
+
+from .activity import activity_recorder
+from .metric_rollups import rollup_recent_metrics
+from .partitions import apply_retention, ensure_partitions, partitioned_models, retention_config
+from .rollups import rollup_recent
+
+
+@shared_task
+def rollup_daily_statistics(days=None):
+    """최근 일별/거래소별 통계 롤업 재계산 (Celery beat 주기 작업)"""
+    return rollup_recent(days)
+
+
+@shared_task
+def flush_user_activity():
+    """Redis 버퍼에 누적된 사용자 활동 증분을 DB에 반영 (Celery beat 주기 작업)
+
+    REDIS_URL이 없으면 증분은 각 웹 프로세스의 버퍼에 있고 그 프로세스의 스레드가 반영하므로
+    이 작업은 워커 자신의 빈 버퍼만 반영한다.
+    """
+    return activity_recorder.flush()
+
+
+@shared_task
+def rotate_analytics_partitions():
+    """다음 달 파티션을 미리 만들고 보관 기간이 지난 달을 보관/삭제 (Celery beat 주기 작업)"""
+    dropped = {}
+    for model in partitioned_models():
+        ensure_partitions(model)
+        expired = apply_retention(model, archive_dir=retention_config('ARCHIVE_DIR', None))
+        dropped[model._meta.label] = [f'{month:%Y-%m}' for month, _ in expired]
+    return dropped
+
+
+@shared_task
+def rollup_system_metrics(minutes=None):
+    """최근 시스템 메트릭 minute/hour 롤업 재계산 (Celery beat 주기 작업)"""
+    return rollup_recent_metrics(minutes)
@@ -1,3 +1,903 @@
-from django.test import TestCase
+import gzip
+import json
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from crypto_rebate.apps.exchanges.models import Exchange, ReferralLink, ReferralTransaction
+from crypto_rebate.apps.rebates.models import Rebate, RebatePayment, RebatePolicy
+
+from .activity import activity_recorder
+from .audit import audit_sink
+from .metric_rollups import floor_bucket, rollup_metrics, rollup_recent_metrics
+from .metrics import Histogram, metrics_registry
+from .partitions import (
+    add_months, apply_retention, default_partition_name, ensure_partitions, month_start, partition_months,
+)
+from .models import (
+    AuditLog, DailyStatistics, ExchangeStatistics, SystemMetrics, SystemMetricsRollup, UserActivity, UserActivityQuerySet, UserDailyStatistics,
+    UserDailyStatisticsQuerySet,
+)
+from .rollups import rollup_days, rollup_recent
+from .tasks import flush_user_activity, rollup_daily_statistics
+
+
+class DailyRollupTest(TestCase):
+    """일별/거래소별 통계 롤업 검증"""
+
+    def setUp(self):
+        self.day = timezone.localdate() - timedelta(days=10)
+        self.noon = timezone.make_aware(datetime.combine(self.day, datetime.min.time())) + timedelta(hours=12)
+        self.policy = RebatePolicy.objects.create(name='기본', description='', policy_type='percentage')
+        self.binance = Exchange.objects.create(name='Binance')
+        self.okx = Exchange.objects.create(name='OKX')
+        self.users = [User.objects.create_user(username=f'user{i}') for i in range(3)]
+        User.objects.filter(pk__in=[user.pk for user in self.users[:2]]).update(date_joined=self.noon - timedelta(days=1))
+        User.objects.filter(pk=self.users[2].pk).update(date_joined=self.noon + timedelta(days=1))
+
+    def _transaction(self, user, exchange, tx_id, amount, created_at, rebate_status=None):
+        link, _ = ReferralLink.objects.get_or_create(user=user, exchange=exchange)
+        tx = ReferralTransaction.objects.create(
+            user=user, exchange=exchange, referral_link=link, transaction_id=tx_id,
+            amount=Decimal(amount), commission=Decimal(amount) / 10, created_at=created_at,
+        )
+        if rebate_status:
+            rebate = Rebate.objects.create(
+                user=user, referral_transaction=tx, policy=self.policy,
+                amount=Decimal(amount) / 100, currency='USDT', status=rebate_status,
+            )
+            Rebate.objects.filter(pk=rebate.pk).update(created_at=created_at)
+            if rebate_status == 'paid':
+                payment = RebatePayment.objects.create(
+                    rebate=rebate, payment_method='crypto', transaction_id=f'pay-{tx_id}',
+                    amount=rebate.amount, currency='USDT', net_amount=rebate.amount,
+                )
+                RebatePayment.objects.filter(pk=payment.pk).update(payment_date=created_at)
+        return tx
+
+    def _seed(self):
+        first, second, _ = self.users
+        self._transaction(first, self.binance, 'b-1', '100', self.noon, 'paid')
+        self._transaction(first, self.binance, 'b-2', '50', self.noon, 'rejected')
+        self._transaction(second, self.binance, 'b-3', '200', self.noon, 'pending')
+        self._transaction(second, self.okx, 'o-1', '300', self.noon + timedelta(days=1))
+
+    def test_rollup_aggregates_by_day_and_exchange(self):
+        self._seed()
+        self.assertEqual(rollup_days(self.day, self.day + timedelta(days=2)), 3)
+
+        stats = DailyStatistics.objects.get(date=self.day)
+        self.assertEqual(
+            (stats.total_users, stats.active_users, stats.total_transactions, stats.total_volume,
+             stats.total_rebates, stats.total_payments),
+            (2, 2, 3, Decimal('350'), Decimal('3.00'), Decimal('1.00')),
+        )
+        next_day = DailyStatistics.objects.get(date=self.day + timedelta(days=1))
+        self.assertEqual((next_day.total_users, next_day.active_users, next_day.total_volume), (3, 1, Decimal('300')))
+        empty = DailyStatistics.objects.get(date=self.day + timedelta(days=2))
+        self.assertEqual((empty.total_users, empty.total_transactions, empty.total_volume), (3, 0, 0))
+
+        binance = ExchangeStatistics.objects.get(exchange=self.binance, date=self.day)
+        self.assertEqual(
+            (binance.total_users, binance.total_transactions, binance.total_volume, binance.total_commissions),
+            (2, 3, Decimal('350'), Decimal('35.00')),
+        )
+        self.assertFalse(ExchangeStatistics.objects.filter(exchange=self.okx, date=self.day).exists())
+
+    def test_rollup_is_idempotent_and_backfills_changes(self):
+        self._seed()
+        rollup_days(self.day, self.day + timedelta(days=1))
+        before = list(DailyStatistics.objects.order_by('date').values('date', 'total_volume', 'total_users'))
+        rollup_days(self.day, self.day + timedelta(days=1))
+        after = list(DailyStatistics.objects.order_by('date').values('date', 'total_volume', 'total_users'))
+        self.assertEqual(before, after)
+        self.assertEqual(ExchangeStatistics.objects.count(), 2)
+
+        # 지난 거래가 삭제/추가되면 해당 구간을 다시 계산해 반영한다
+        ReferralTransaction.objects.filter(transaction_id='o-1').delete()
+        self._transaction(self.users[0], self.okx, 'o-2', '10', self.noon)
+        out = StringIO()
+        call_command('rollup_statistics', start=self.day, end=self.day + timedelta(days=1), stdout=out)
+        self.assertIn('rolled up 2 days', out.getvalue())
+        self.assertEqual(DailyStatistics.objects.get(date=self.day).total_volume, Decimal('360'))
+        self.assertEqual(DailyStatistics.objects.get(date=self.day + timedelta(days=1)).total_volume, 0)
+        self.assertCountEqual(
+            ExchangeStatistics.objects.values_list('exchange__name', 'date'),
+            [('OKX', self.day), ('Binance', self.day)],
+        )
+
+    def test_recent_rollup_uses_lookback_and_chunks(self):
+        self._transaction(self.users[0], self.binance, 'today', '5', timezone.now())
+        with self.settings(ANALYTICS_ROLLUP={'LOOKBACK_DAYS': 4, 'CHUNK_DAYS': 3}):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(rollup_daily_statistics(), 4)
+        self.assertEqual(DailyStatistics.objects.count(), 4)
+        self.assertEqual(DailyStatistics.objects.get(date=timezone.localdate()).total_transactions, 1)
+        # 구간(청크)마다 테이블별 GROUP BY 한 번씩
+        grouped = [q for q in ctx.captured_queries if 'GROUP BY' in q['sql'] and 'referral_transactions' in q['sql']]
+        self.assertEqual(len(grouped), 4)
+        self.assertEqual(rollup_recent(1), 1)
+
+    def test_views_read_rollups_only(self):
+        admin = User.objects.create_user(username='admin', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        self._seed()
+        today = timezone.localdate()
+        rollup_days(today - timedelta(days=365), today)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(reverse('analytics:stats'), {'period': 'year'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['daily_stats']), 366)
+        self.assertFalse(any(
+            table in query['sql'] for query in ctx.captured_queries
+            for table in ('referral_transactions', 'rebates_rebate')
+        ))
+        self.assertEqual(
+            {row['exchange__name']: row['total_volume'] for row in response.data['exchange_stats']},
+            {'Binance': Decimal('350'), 'OKX': Decimal('300')},
+        )
+
+        dashboard = client.get(reverse('analytics:dashboard'))
+        self.assertEqual(dashboard.status_code, 200)
+        self.assertEqual(dashboard.data['today']['total_users'], 4)
+
+        client.force_authenticate(self.users[0])
+        self.assertEqual(client.get(reverse('analytics:stats')).status_code, 403)
+
+
+class UserDailyStatisticsTest(TestCase):
+    """사용자 일별 집계 증분 갱신과 기간별 통계 API 검증"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='trader')
+        self.other = User.objects.create_user(username='other')
+        self.policy = RebatePolicy.objects.create(name='기본', description='', policy_type='percentage')
+        self.binance = Exchange.objects.create(name='Binance')
+        self.okx = Exchange.objects.create(name='OKX')
+        self.start = timezone.make_aware(datetime(2025, 1, 30, 12))
+
+    def _transaction(self, exchange, tx_id, amount, created_at, user=None):
+        user = user or self.user
+        link, _ = ReferralLink.objects.get_or_create(user=user, exchange=exchange)
+        return ReferralTransaction(
+            user=user, exchange=exchange, referral_link=link, transaction_id=tx_id,
+            amount=Decimal(amount), commission=Decimal(amount) / 10, created_at=created_at,
+        )
+
+    def _rows(self):
+        fields = ['user_id', 'exchange_id', 'date', *UserDailyStatisticsQuerySet.SUM_FIELDS]
+        return sorted(
+            tuple(row[field] for field in fields)
+            for row in UserDailyStatistics.objects.values(*fields)
+            if any(row[field] for field in UserDailyStatisticsQuerySet.SUM_FIELDS)
+        )
+
+    def assertMatchesRebuild(self):
+        incremental = self._rows()
+        self.assertEqual(UserDailyStatistics.objects.rebuild(), 2)
+        self.assertEqual(incremental, self._rows())
+
+    def test_incremental_updates_match_rebuild(self):
+        first = self._transaction(self.binance, 'tx-1', '100', self.start)
+        first.save()
+        self._transaction(self.okx, 'tx-2', '40', self.start + timedelta(days=3)).save()
+        stats = UserDailyStatistics.objects.get(user=self.user, exchange=self.binance)
+        self.assertEqual(
+            (stats.date, stats.transaction_count, stats.total_volume, stats.total_commission),
+            (timezone.localdate(self.start), 1, Decimal('100'), Decimal('10')),
+        )
+
+        # 페이백 생성/상태 변경/삭제
+        rebate = Rebate.objects.create(
+            user=self.user, referral_transaction=first, policy=self.policy,
+            amount=Decimal('1.5'), currency='USDT', status='pending',
+        )
+        rejected = Rebate.objects.create(
+            user=self.user, referral_transaction=first, policy=self.policy,
+            amount=Decimal('9'), currency='USDT', status='rejected',
+        )
+        rebate.status = 'paid'
+        rebate.save()
+        rows = UserDailyStatistics.objects.filter(rebate_count__gt=0)
+        self.assertEqual(
+            list(rows.values_list('exchange_id', 'rebate_count', 'total_rebates', 'paid_rebates')),
+            [(self.binance.pk, 1, Decimal('1.5'), Decimal('1.5'))],
+        )
+        rejected.status = 'approved'
+        rejected.save()
+        rejected.delete()
+        self.assertMatchesRebuild()
+
+        # 일괄 수집: 신규 거래와 기존 거래의 금액/날짜 변경
+        ReferralTransaction.objects.bulk_ingest([
+            self._transaction(self.binance, 'tx-1', '70', self.start + timedelta(days=1)),
+            self._transaction(self.okx, 'tx-3', '25', self.start + timedelta(days=3)),
+            self._transaction(self.binance, 'tx-4', '5', self.start, user=self.other),
+        ])
+        self.assertEqual(
+            UserDailyStatistics.objects.get(
+                user=self.user, exchange=self.okx, date=timezone.localdate(self.start + timedelta(days=3))
+            ).transaction_count, 2,
+        )
+        self.assertMatchesRebuild()
+
+        # 거래 삭제 시 연결된 페이백도 함께 빠진다
+        ReferralTransaction.objects.get(transaction_id='tx-1').delete()
+        self.assertMatchesRebuild()
+        self.assertFalse(UserDailyStatistics.objects.filter(exchange=self.binance, user=self.user).exclude(
+            transaction_count=0
+        ).exists())
+
+        # 사용자 삭제 시 감소분만 남은 행을 새로 만들지 않는다
+        self.other.delete()
+        self.assertFalse(UserDailyStatistics.objects.filter(user_id=self.other.pk).exists())
+
+    def test_bulk_ingest_with_many_distinct_keys(self):
+        # 키마다 OR로 묶은 Q는 SQLite 식 트리 깊이 제한(1000)을 넘어 청크 전체가 롤백됐다
+        users = User.objects.bulk_create([User(username=f'bulk{i}') for i in range(1200)])
+        links = ReferralLink.objects.bulk_create([ReferralLink(user=user, exchange=self.binance) for user in users])
+        transactions = [
+            ReferralTransaction(
+                user=user, exchange=self.binance, referral_link=link, transaction_id=f'bulk-{user.pk}',
+                amount=Decimal('10'), commission=Decimal('1'), created_at=self.start,
+            )
+            for user, link in zip(users, links)
+        ]
+        self.assertEqual(ReferralTransaction.objects.bulk_ingest(transactions, batch_size=1200), (1200, 0))
+        rows = UserDailyStatistics.objects.filter(user__in=users)
+        self.assertEqual(rows.count(), 1200)
+        self.assertEqual(set(rows.values_list('transaction_count', 'total_volume')), {(1, Decimal('10'))})
+
+        # 기존 행 갱신 경로 (키 조회 후 Case/When 증분)
+        for tx in transactions:
+            tx.amount = Decimal('25')
+        self.assertEqual(ReferralTransaction.objects.bulk_ingest(transactions, batch_size=1200), (0, 1200))
+        self.assertEqual(set(rows.values_list('transaction_count', 'total_volume')), {(1, Decimal('25'))})
+
+    def test_rebuild_command(self):
+        ReferralTransaction.objects.bulk_create([self._transaction(self.binance, 'tx-1', '100', self.start)])
+        self.assertFalse(UserDailyStatistics.objects.exists())
+        out = StringIO()
+        call_command('rebuild_user_statistics', user_ids=[self.user.pk], stdout=out)
+        self.assertIn('rebuilt daily statistics for 1 users', out.getvalue())
+        self.assertEqual(UserDailyStatistics.objects.get().total_volume, Decimal('100'))
+
+    def test_stats_api_downsamples_rollups_in_sql(self):
+        ReferralTransaction.objects.bulk_ingest(
+            [self._transaction(self.binance, f'b-{day}', '10', self.start + timedelta(days=day)) for day in range(40)]
+            + [self._transaction(self.okx, 'o-1', '5', self.start + timedelta(days=2))]
+            + [self._transaction(self.okx, 'o-2', '999', self.start, user=self.other)]
+        )
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('analytics:user-stats')
+        first_day = timezone.localdate(self.start)
+        params = {'start_date': first_day.isoformat(), 'end_date': (first_day + timedelta(days=39)).isoformat()}
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url, {**params, 'granularity': 'month'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('referral_transactions' in query['sql'] for query in ctx.captured_queries))
+        # 2025-01-30 ~ 2025-03-10: 1월 2일, 2월 28일(+OKX 1건), 3월 10일
+        self.assertEqual(
+            [(str(row['period']), row['transaction_count'], row['total_volume']) for row in response.data['series']],
+            [('2025-01-01', 2, Decimal('20')), ('2025-02-01', 29, Decimal('285')), ('2025-03-01', 10, Decimal('100'))],
+        )
+        self.assertEqual(response.data['totals']['transaction_count'], 41)
+        self.assertEqual(
+            [(row['exchange__name'], row['total_volume']) for row in response.data['exchange_stats']],
+            [('Binance', Decimal('400')), ('OKX', Decimal('5'))],
+        )
+
+        weekly = client.get(url, {**params, 'granularity': 'week', 'exchange': self.okx.pk})
+        self.assertEqual([(str(row['period']), row['transaction_count']) for row in weekly.data['series']],
+                         [('2025-01-27', 1)])
+        daily = client.get(url, {'start_date': '2025-02-01', 'end_date': '2025-02-01'})
+        self.assertEqual(len(daily.data['series']), 1)
+        self.assertEqual(client.get(url, {'period': 'year'}).data['totals']['transaction_count'], 0)
+
+        for invalid in ({'granularity': 'hour'}, {'start_date': '2025-13-01'},
+                        {'start_date': '2025-02-02', 'end_date': '2025-02-01'}, {'exchange': 'abc'}):
+            self.assertEqual(client.get(url, invalid).status_code, 400)
+
+
+@override_settings(REDIS_URL='', USER_ACTIVITY={'SHARDS': 8, 'FLUSH_INTERVAL': 3600, 'BACKGROUND': False})
+class UserActivityRecorderTest(TestCase):
+    """사용자 활동 write-behind 버퍼와 가산 upsert 검증"""
+
+    def setUp(self):
+        activity_recorder.reset()
+        self.addCleanup(activity_recorder.reset)
+        self.users = [User.objects.create_user(username=f'user{i}', password='pw-12345') for i in range(4)]
+        self.today = timezone.localdate()
+
+    def _counts(self, field='login_count'):
+        return dict(UserActivity.objects.filter(date=self.today).values_list('user_id', field))
+
+    def test_concurrent_records_are_not_lost(self):
+        threads, records_per_thread = 16, 3000
+        start = threading.Barrier(threads + 1)
+
+        def record(index):
+            start.wait()
+            for i in range(records_per_thread):
+                activity_recorder.record(self.users[(index + i) % len(self.users)].pk, 'login_count')
+
+        workers = [threading.Thread(target=record, args=(index,)) for index in range(threads)]
+        for worker in workers:
+            worker.start()
+        start.wait()
+        # 기록이 들어오는 중에도 반복해서 DB에 반영 (같은 행에 여러 번 가산)
+        flushed = 0
+        while any(worker.is_alive() for worker in workers):
+            flushed += activity_recorder.flush()
+        for worker in workers:
+            worker.join()
+        flushed += flush_user_activity()
+
+        total = threads * records_per_thread
+        self.assertEqual(flushed, total)
+        self.assertEqual(self._counts(), {user.pk: total // len(self.users) for user in self.users})
+
+    def test_upsert_adds_to_existing_rows_in_one_query(self):
+        UserActivity.objects.create(user=self.users[0], date=self.today, login_count=5, transaction_count=2)
+        for user in self.users:
+            activity_recorder.record(user.pk, 'login_count')
+        activity_recorder.record(self.users[0].pk, 'transaction_count', 3)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(activity_recorder.flush(), 7)
+        self.assertEqual(len([q for q in ctx.captured_queries if 'ON CONFLICT' in q['sql']]), 1)
+        self.assertEqual(self._counts()[self.users[0].pk], 6)
+        self.assertEqual(self._counts('transaction_count'), {user.pk: 0 for user in self.users[1:]} | {
+            self.users[0].pk: 5
+        })
+        with self.assertRaises(ValueError):
+            activity_recorder.record(self.users[0].pk, 'rebate_amount')
+
+    def test_fallback_without_on_conflict(self):
+        UserActivity.objects.create(user=self.users[0], date=self.today, login_count=5)
+        for user in self.users:
+            activity_recorder.record(user.pk, 'login_count', 2)
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            with CaptureQueriesContext(connection) as ctx:
+                activity_recorder.flush()
+        self.assertFalse(any('ON CONFLICT' in q['sql'] and 'DO UPDATE' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(self._counts(), {self.users[0].pk: 7} | {user.pk: 2 for user in self.users[1:]})
+
+    def test_fallback_with_large_batches(self):
+        # 키마다 OR로 묶은 Q는 BATCH_SIZE가 1000 이상이면 SQLite 식 트리 깊이 제한을 넘었다
+        users = User.objects.bulk_create([User(username=f'bulk{i}') for i in range(1200)])
+        counts = {(user.pk, self.today): {'login_count': 1} for user in users}
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            UserActivity.objects.add_counts(counts, batch_size=1200)
+            UserActivity.objects.add_counts(counts, batch_size=1200)
+        self.assertEqual(set(self._counts().values()), {2})
+        self.assertEqual(len(self._counts()), 1200)
+
+    def test_login_views_record_activity(self):
+        client = APIClient()
+        for _ in range(2):
+            response = client.post(reverse('users:login'), {'username': 'user0', 'password': 'pw-12345'})
+            self.assertEqual(response.status_code, 200)
+        self.users[1].email = 'user1@example.com'
+        self.users[1].save()
+        google = {'email': 'user1@example.com', 'email_verified': True, 'name': 'User One'}
+        with mock.patch('crypto_rebate.apps.users.views.verify_google_id_token', return_value=google):
+            response = client.post(reverse('users:google_login'), {'credential': 'token'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertFalse(UserActivity.objects.exists())  # 아직 버퍼에만 있음
+        self.assertEqual(activity_recorder.flush(), 3)
+        self.assertEqual(self._counts(), {self.users[0].pk: 2, self.users[1].pk: 1})
+
+    def test_ingest_records_transaction_activity(self):
+        exchange = Exchange.objects.create(name='Binance')
+        link = ReferralLink.objects.create(user=self.users[0], exchange=exchange)
+        yesterday = timezone.now() - timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            ReferralTransaction.objects.bulk_ingest([
+                ReferralTransaction(
+                    user=self.users[0], exchange=exchange, referral_link=link, transaction_id=f'tx-{i}',
+                    commission=Decimal('1'), created_at=yesterday if i % 2 else timezone.now(),
+                ) for i in range(5)
+            ])
+        with self.captureOnCommitCallbacks(execute=True):
+            ReferralTransaction.objects.get(transaction_id='tx-0').delete()
+        activity_recorder.flush()
+        self.assertEqual(
+            dict(UserActivity.objects.values_list('date', 'transaction_count')),
+            {self.today: 2, timezone.localdate(yesterday): 2},
+        )
+
+    def test_failed_flush_keeps_counts_and_drops_deleted_users(self):
+        activity_recorder.record(self.users[0].pk, 'login_count')
+        activity_recorder.record(self.users[1].pk, 'login_count')
+        with mock.patch.object(UserActivityQuerySet, 'add_counts', side_effect=RuntimeError('db down')):
+            with self.assertRaises(RuntimeError):
+                activity_recorder.flush()
+        self.users[1].delete()
+        self.assertEqual(activity_recorder.flush(), 2)
+        self.assertEqual(self._counts(), {self.users[0].pk: 1})
+
+
+@override_settings(REDIS_URL='', USER_ACTIVITY={'SHARDS': 8, 'FLUSH_INTERVAL': 0.05})
+class UserActivityRecorderBackgroundTest(TransactionTestCase):
+    """프로세스 내 버퍼의 반영 스레드 검증 (기록은 DB에 쓰지 않음)"""
+
+    def setUp(self):
+        activity_recorder.reset()
+        self.addCleanup(activity_recorder.reset)
+        self.user = User.objects.create_user(username='member')
+
+    def _logins(self):
+        return UserActivity.objects.filter(user=self.user).values_list('login_count', flat=True).first()
+
+    def wait_for_logins(self, count):
+        deadline = time.monotonic() + 5
+        while self._logins() != count and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(self._logins(), count)
+
+    def test_flush_thread_stores_counts_without_further_records(self):
+        with self.assertNumQueries(0):
+            activity_recorder.record(self.user.pk, 'login_count')
+            activity_recorder.record(self.user.pk, 'login_count')
+        self.wait_for_logins(2)
+
+        # 반영에 실패한 증분은 로그를 남기고 다음 반영에 다시 시도한다
+        with mock.patch.object(UserActivityQuerySet, 'add_counts', side_effect=RuntimeError('db down')):
+            with self.assertLogs('crypto_rebate.apps.analytics.activity', 'ERROR'):
+                activity_recorder.record(self.user.pk, 'login_count')
+                time.sleep(0.2)
+        self.wait_for_logins(3)
+
+
+AUDIT_TEST_SETTINGS = {
+    'BACKGROUND': False, 'QUEUE_SIZE': 1000, 'BATCH_SIZE': 50, 'BLOCK_TIMEOUT': 0,
+    'PATH_PREFIX': '/api/', 'MODELS': ['rebates.RebatePolicy'],
+}
+
+
+@override_settings(AUDIT_LOG=AUDIT_TEST_SETTINGS)
+class AuditSinkTest(TestCase):
+    """감사 로그 큐 적재/배치 저장/배압 검증"""
+
+    def setUp(self):
+        audit_sink.reset()
+        self.addCleanup(audit_sink.reset)
+        self.user = User.objects.create_user(username='auditor', password='pw-12345')
+
+    def test_requests_and_model_changes_are_queued_not_written(self):
+        client = APIClient()
+        with CaptureQueriesContext(connection) as ctx:
+            client.post(reverse('users:login'), {'username': 'auditor', 'password': 'pw-12345'})
+            client.get(reverse('analytics:user-stats'))
+            policy = RebatePolicy.objects.create(name='기본', description='', policy_type='percentage')
+            policy.is_active = False
+            policy.save()
+            policy.delete()
+        self.assertFalse(any('analytics_auditlog' in query['sql'] for query in ctx.captured_queries))
+        self.assertEqual(audit_sink.stats()['queued'], 6)
+
+        self.assertEqual(audit_sink.flush(), 6)
+        logs = list(AuditLog.objects.order_by('timestamp', 'pk').values_list('action', 'model_name', 'user_id'))
+        self.assertEqual(logs, [
+            ('login', 'auth.User', self.user.pk),
+            ('api_call', 'users:login', self.user.pk),
+            ('api_call', 'analytics:user-stats', self.user.pk),
+            ('create', 'rebates.RebatePolicy', None),
+            ('update', 'rebates.RebatePolicy', None),
+            ('delete', 'rebates.RebatePolicy', None),
+        ])
+        api_call = AuditLog.objects.get(model_name='analytics:user-stats')
+        self.assertEqual((api_call.description, api_call.ip_address), ('GET /api/v1/analytics/stats/me/ 200', '127.0.0.1'))
+        self.assertEqual(audit_sink.stats(), {'enqueued': 6, 'dropped': 0, 'written': 6, 'failed': 0, 'queued': 0})
+
+    def test_full_queue_drops_and_counts(self):
+        with self.settings(AUDIT_LOG={**AUDIT_TEST_SETTINGS, 'QUEUE_SIZE': 3}):
+            results = [audit_sink.emit('api_call', 'test', f'event {i}') for i in range(5)]
+            self.assertEqual(results, [True, True, True, False, False])
+            self.assertEqual(audit_sink.flush(), 3)
+            self.assertEqual(audit_sink.stats(), {'enqueued': 3, 'dropped': 2, 'written': 3, 'failed': 0, 'queued': 0})
+
+    def test_batches_and_failures(self):
+        for i in range(120):
+            audit_sink.emit('api_call', 'test', f'event {i}', user_id=self.user.pk)
+        audit_sink.emit('api_call', 'test', 'deleted user', user_id=self.user.pk + 1000)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(audit_sink.flush(), 121)
+        self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]), 3)
+        self.assertIsNone(AuditLog.objects.get(description='deleted user').user_id)
+
+        audit_sink.emit('api_call', 'test', 'lost')
+        with mock.patch('crypto_rebate.apps.analytics.audit.AuditLog.objects.bulk_create', side_effect=RuntimeError):
+            with self.assertLogs('crypto_rebate.apps.analytics.audit', 'ERROR'):
+                self.assertEqual(audit_sink.flush(), 0)
+        self.assertEqual(audit_sink.stats()['failed'], 1)
+
+    def test_disabled(self):
+        with self.settings(AUDIT_LOG={**AUDIT_TEST_SETTINGS, 'ENABLED': False}):
+            APIClient().post(reverse('users:login'), {'username': 'auditor', 'password': 'pw-12345'})
+            self.assertEqual(audit_sink.stats()['enqueued'], 0)
+
+
+@override_settings(AUDIT_LOG={**AUDIT_TEST_SETTINGS, 'BACKGROUND': True, 'FLUSH_INTERVAL': 0.05})
+class AuditSinkBackgroundTest(TransactionTestCase):
+    """백그라운드 스레드 배치 저장 검증"""
+
+    def setUp(self):
+        audit_sink.reset()
+        self.addCleanup(audit_sink.reset)
+
+    def test_drain_thread_writes_concurrent_events(self):
+        threads, events_per_thread = 8, 100
+
+        def emit(index):
+            for i in range(events_per_thread):
+                # 큐가 가득 차면 버려지므로 성공할 때까지 다시 시도
+                while not audit_sink.emit('api_call', 'test', f'{index}-{i}'):
+                    time.sleep(0.001)
+
+        workers = [threading.Thread(target=emit, args=(index,)) for index in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        deadline = time.monotonic() + 10
+        while audit_sink.stats()['written'] < threads * events_per_thread and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(audit_sink.stats()['written'], threads * events_per_thread)
+        self.assertEqual(AuditLog.objects.count(), threads * events_per_thread)
+
+
+@override_settings(ANALYTICS_RETENTION={'MONTHS': {'analytics.AuditLog': 3, 'analytics.SystemMetrics': 1},
+                                        'ARCHIVE_DIR': None, 'DELETE_CHUNK_SIZE': 2})
+class AnalyticsRetentionTest(TestCase):
+    """AuditLog/SystemMetrics 월 단위 보관 기간과 관리자 목록 검증 (SQLite는 일반 테이블 경로)"""
+
+    def setUp(self):
+        self.current = month_start(timezone.now())
+        # 이번 달 2건, 1/3/13개월 전 각 3건
+        for offset, count in ((0, 2), (-1, 3), (-3, 3), (-13, 3)):
+            month = add_months(self.current, offset)
+            AuditLog.objects.bulk_create(
+                AuditLog(action='api_call', model_name='test', description=f'{month:%Y-%m} #{i}',
+                         timestamp=month + timedelta(days=1, minutes=i))
+                for i in range(count)
+            )
+        metric = SystemMetrics.objects.create(metric_type='performance', name='latency', value=1.0)
+        SystemMetrics.objects.filter(pk=metric.pk).update(timestamp=add_months(self.current, -2))
+        SystemMetrics.objects.create(metric_type='performance', name='latency', value=2.0)
+        # PostgreSQL: DEFAULT 파티션에 들어간 지난달 행을 월 파티션으로 옮긴다 (SQLite는 아무것도 안 함)
+        for model in (AuditLog, SystemMetrics):
+            ensure_partitions(model)
+
+    def test_retention_archives_and_drops_expired_months(self):
+        # PostgreSQL은 다음 PARTITIONS_AHEAD개월의 빈 파티션도 있다
+        self.assertEqual(
+            partition_months(AuditLog)[:4], [add_months(self.current, offset) for offset in (-13, -3, -1, 0)]
+        )
+        expired = [add_months(self.current, offset) for offset in (-13, -3)]
+        self.assertEqual(apply_retention(AuditLog, dry_run=True), [(month, None) for month in expired])
+        self.assertEqual(AuditLog.objects.count(), 11)
+
+        with tempfile.TemporaryDirectory() as archive_dir:
+            self.assertEqual(apply_retention(AuditLog, archive_dir=archive_dir), [(month, 3) for month in expired])
+            archive = f'{archive_dir}/analytics_auditlog_{expired[0]:%Y_%m}.jsonl.gz'
+            with gzip.open(archive, 'rt', encoding='utf-8') as lines:
+                rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['description'] for row in rows], [f'{expired[0]:%Y-%m} #{i}' for i in range(3)])
+        self.assertEqual(AuditLog.objects.count(), 5)
+        self.assertEqual(partition_months(AuditLog)[0], add_months(self.current, -1))
+
+    def test_rotate_command(self):
+        out = StringIO()
+        call_command('rotate_analytics_partitions', dry_run=True, stdout=out)
+        self.assertIn(f'analytics.SystemMetrics: would drop {add_months(self.current, -2):%Y-%m}', out.getvalue())
+        self.assertEqual(SystemMetrics.objects.count(), 2)
+
+        out = StringIO()
+        call_command('rotate_analytics_partitions', keep_months=2, stdout=out)
+        self.assertIn('analytics.AuditLog: 2 expired months.', out.getvalue())
+        self.assertEqual(AuditLog.objects.count(), 5)
+        self.assertEqual(list(SystemMetrics.objects.values_list('value', flat=True)), [2.0])
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL 파티션 테이블 전용')
+    def test_rows_without_a_monthly_partition_go_to_default(self):
+        # 주기 작업이 멈춰 월 파티션이 없는 달도 INSERT가 실패하지 않는다
+        later = add_months(self.current, 6)
+        metric = SystemMetrics.objects.create(metric_type='performance', name='latency', value=3.0)
+        SystemMetrics.objects.filter(pk=metric.pk).update(timestamp=later + timedelta(days=2))
+        table = SystemMetrics._meta.db_table
+        self.assertNotIn(later, partition_months(SystemMetrics))
+
+        def partition_of_row():
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT tableoid::regclass::text FROM {table} WHERE id = %s', [metric.pk])
+                return cursor.fetchone()[0]
+
+        self.assertEqual(partition_of_row(), default_partition_name(table))
+        self.assertIn(later, ensure_partitions(SystemMetrics))
+        self.assertIn(later, partition_months(SystemMetrics))
+        self.assertEqual(partition_of_row(), f'{table}_p{later:%Y%m}')
+        self.assertEqual(SystemMetrics.objects.count(), 3)
+
+    def test_admin_lists_latest_month_without_full_count(self):
+        admin = User.objects.create_superuser(username='admin', password='pw-12345')
+        self.client.force_login(admin)
+        url = reverse('admin:analytics_auditlog_changelist')
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['cl'].result_count, 2)
+        counts = [q['sql'] for q in ctx.captured_queries if 'COUNT(' in q['sql'] and 'analytics_auditlog' in q['sql']]
+        self.assertTrue(counts)
+        self.assertTrue(all('WHERE' in sql for sql in counts))
+
+        previous = add_months(self.current, -1)
+        self.assertEqual(self.client.get(url, {'month': f'{previous:%Y-%m}'}).context['cl'].result_count, 3)
+        self.assertEqual(self.client.get(url, {'month': 'all'}).context['cl'].result_count, 11)
+        self.assertEqual(self.client.get(url, {'month': 'bad'}).context['cl'].result_count, 0)
+        self.assertEqual(self.client.get(reverse('admin:analytics_systemmetrics_changelist')).status_code, 200)
+
+
+METRICS_TEST_SETTINGS = {'AUTO_FLUSH': False, 'PROMETHEUS_TOKEN': 'scrape-token'}
+
+
+@override_settings(REQUEST_METRICS=METRICS_TEST_SETTINGS)
+class RequestMetricsTest(TestCase):
+    """라우트별 지연/쿼리 히스토그램, 구간 요약 저장, 관리자/Prometheus 노출 검증"""
+
+    def setUp(self):
+        metrics_registry.reset()
+        self.addCleanup(metrics_registry.reset)
+        self.user = User.objects.create_user(username='member', password='pw-12345')
+        self.admin = User.objects.create_user(username='admin', password='pw-12345', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_histogram_percentiles(self):
+        histogram = Histogram((10, 20, 50))
+        self.assertIsNone(histogram.percentile(0.5))
+        for value in [5] * 50 + [15] * 45 + [40] * 4 + [100]:
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [50, 45, 4, 1])
+        self.assertEqual(histogram.percentile(0.5), 10)
+        self.assertEqual(histogram.percentile(0.95), 20)
+        self.assertEqual(histogram.percentile(0.99), 50)
+        self.assertAlmostEqual(histogram.summary()['mean'], 11.85)
+
+    def test_requests_are_grouped_by_route(self):
+        for _ in range(3):
+            self.client.get(reverse('analytics:user-stats'))
+        self.client.get(reverse('analytics:user-stats'), {'period': 'week'})
+        self.client.get('/api/v1/not-a-route/')
+
+        routes = metrics_registry.snapshot()
+        self.assertEqual(set(routes), {'GET /api/v1/analytics/stats/me/', '<unmatched>'})
+        stats = routes['GET /api/v1/analytics/stats/me/']
+        self.assertEqual((stats['count'], stats['errors']), (4, 0))
+        self.assertEqual(stats['db_queries']['count'], 4)
+        self.assertGreater(stats['db_queries']['mean'], 0)
+        self.assertGreater(stats['db_time_ms']['mean'], 0)
+        self.assertGreater(stats['latency_ms']['mean'], 0)
+        self.assertLessEqual(stats['latency_ms']['p50'], stats['latency_ms']['p99'])
+
+    def test_nonstandard_methods_share_one_route(self):
+        url = reverse('analytics:user-stats')
+        for method in ['PROPFIND', 'FOO', 'X' * 100]:
+            self.client.generic(method, url)
+        self.client.options(url)
+
+        routes = metrics_registry.snapshot()
+        self.assertEqual(set(routes), {'OTHER /api/v1/analytics/stats/me/', 'OPTIONS /api/v1/analytics/stats/me/'})
+        self.assertEqual(routes['OTHER /api/v1/analytics/stats/me/']['count'], 3)
+
+    def test_flush_writes_one_row_per_route(self):
+        for _ in range(5):
+            self.client.get(reverse('analytics:user-stats'))
+        with mock.patch('crypto_rebate.apps.analytics.views.UserDailyStatistics.objects.filter', side_effect=RuntimeError):
+            client = APIClient(raise_request_exception=False)
+            client.force_authenticate(self.user)
+            client.get(reverse('analytics:user-stats'))
+        self.assertEqual(SystemMetrics.objects.count(), 0)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(metrics_registry.flush(), 2)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        row = SystemMetrics.objects.get(name='api_response_time')
+        self.assertEqual((row.metric_type, row.unit), ('performance', 'ms'))
+        self.assertEqual(row.metadata['route'], 'GET /api/v1/analytics/stats/me/')
+        self.assertEqual((row.metadata['count'], row.metadata['errors']), (6, 1))
+        self.assertEqual(row.value, row.metadata['latency_ms']['p95'])
+        self.assertAlmostEqual(SystemMetrics.objects.get(name='error_rate').value, 1 / 6)
+        # 다음 구간은 새로 집계하고, 요청이 없으면 저장하지 않는다
+        self.assertEqual(metrics_registry.flush(), 0)
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(reverse('analytics:metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['api_response_times'][0]['route'], 'GET /api/v1/analytics/stats/me/')
+        self.assertAlmostEqual(response.data['error_rates'][0]['value'], 1 / 6)
+
+    def test_failed_flush_keeps_the_interval(self):
+        self.client.get(reverse('analytics:user-stats'))
+        with mock.patch('crypto_rebate.apps.analytics.metrics.SystemMetrics.objects.bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                metrics_registry.flush()
+        self.client.get(reverse('analytics:user-stats'))
+
+        self.assertEqual(metrics_registry.flush(), 2)
+        self.assertEqual(SystemMetrics.objects.get(name='api_response_time').metadata['count'], 2)
+        self.assertEqual(SystemMetrics.objects.get(name='error_rate').metadata['requests'], 2)
+
+    def test_live_and_prometheus_endpoints(self):
+        self.client.get(reverse('analytics:user-stats'))
+        for name in ('analytics:metrics', 'analytics:live-metrics', 'analytics:prometheus-metrics'):
+            self.assertEqual(self.client.get(reverse(name)).status_code, 403)
+
+        admin = APIClient()
+        admin.force_authenticate(self.admin)
+        response = admin.get(reverse('analytics:live-metrics'))
+        self.assertEqual(response.data['routes']['GET /api/v1/analytics/stats/me/']['count'], 1)
+
+        scraper = APIClient()
+        self.assertEqual(scraper.get(reverse('analytics:prometheus-metrics')).status_code, 403)
+        scraper.credentials(HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(scraper.get(reverse('analytics:prometheus-metrics')).status_code, 403)
+        scraper.credentials(HTTP_AUTHORIZATION='Bearer scrape-token')
+        response = scraper.get(reverse('analytics:prometheus-metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        route = 'route="GET /api/v1/analytics/stats/me/"'
+        self.assertIn('# TYPE http_request_duration_seconds histogram', body)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{route},le="+Inf"}} 1', body)
+        self.assertIn(f'http_request_duration_seconds_count{{{route}}} 1', body)
+        self.assertIn(f'http_request_db_queries_count{{{route}}} 1', body)
+        self.assertIn(f'http_request_errors_total{{{route}}} 0', body)
+
+
+@override_settings(REQUEST_METRICS={**METRICS_TEST_SETTINGS, 'AUTO_FLUSH': True, 'FLUSH_INTERVAL': 0.05})
+class RequestMetricsBackgroundTest(TransactionTestCase):
+    """요청 메트릭 저장 스레드 검증 (요청 처리 스레드는 저장하지 않음)"""
+
+    def setUp(self):
+        metrics_registry.reset()
+        self.addCleanup(metrics_registry.reset)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='member'))
+
+    def test_flush_thread_survives_failed_writes(self):
+        url = reverse('analytics:user-stats')
+        with mock.patch('crypto_rebate.apps.analytics.metrics.SystemMetrics.objects.bulk_create', side_effect=RuntimeError):
+            with self.assertLogs('crypto_rebate.apps.analytics.metrics', 'ERROR'):
+                for _ in range(3):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+                    time.sleep(0.1)
+
+        # 실패한 구간은 다음 저장에 합쳐진다
+        deadline = time.monotonic() + 5
+        while not SystemMetrics.objects.exists() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(SystemMetrics.objects.get(name='api_response_time').metadata['count'], 3)
+
+
+class SystemMetricsRollupTest(TestCase):
+    """SystemMetrics minute/hour 롤업과 시계열 다운샘플링 API 검증"""
+
+    ROUTE_A = 'GET /api/v1/a/'
+    ROUTE_B = 'GET /api/v1/b/'
+
+    def setUp(self):
+        self.hour = floor_bucket(timezone.now() - timedelta(days=2), 'hour')
+        for minute, route, values in (
+            (0, self.ROUTE_A, [30, 10, 20]),
+            (1, self.ROUTE_A, [40]),
+            (0, self.ROUTE_B, [100]),
+        ):
+            for value in values:
+                self._metric('api_response_time', value, self.hour + timedelta(minutes=minute), route=route)
+        self._metric('error_rate', 0.25, self.hour + timedelta(minutes=30))
+        self._metric('api_response_time', 500, self.hour + timedelta(hours=1), route=self.ROUTE_A)
+        self.admin = User.objects.create_user(username='admin', password='pw-12345', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _metric(self, name, value, at, route=None):
+        metric = SystemMetrics.objects.create(
+            metric_type='performance', name=name, value=value, metadata={'route': route} if route else {}
+        )
+        # timestamp는 auto_now_add라 생성 후 측정 시각으로 맞춘다
+        SystemMetrics.objects.filter(pk=metric.pk).update(timestamp=at)
+
+    def _rollups(self, resolution):
+        return {
+            (rollup.name, rollup.route, rollup.bucket): (
+                rollup.samples, rollup.total, rollup.minimum, rollup.maximum, rollup.percentile_95
+            )
+            for rollup in SystemMetricsRollup.objects.filter(resolution=resolution)
+        }
+
+    def test_rollup_metrics_is_idempotent(self):
+        for _ in range(2):
+            self.assertEqual(rollup_metrics(self.hour, self.hour + timedelta(minutes=59)), 4 + 3)
+        minute = timedelta(minutes=1)
+        self.assertEqual(self._rollups('minute'), {
+            ('api_response_time', self.ROUTE_A, self.hour): (3, 60, 10, 30, 30),
+            ('api_response_time', self.ROUTE_A, self.hour + minute): (1, 40, 40, 40, 40),
+            ('api_response_time', self.ROUTE_B, self.hour): (1, 100, 100, 100, 100),
+            ('error_rate', '', self.hour + 30 * minute): (1, 0.25, 0.25, 0.25, 0.25),
+        })
+        self.assertEqual(self._rollups('hour'), {
+            ('api_response_time', self.ROUTE_A, self.hour): (4, 100, 10, 40, 40),
+            ('api_response_time', self.ROUTE_B, self.hour): (1, 100, 100, 100, 100),
+            ('error_rate', '', self.hour): (1, 0.25, 0.25, 0.25, 0.25),
+        })
+
+    def test_series_downsamples_rollups(self):
+        rollup_metrics(self.hour, self.hour + timedelta(hours=2))
+        url = reverse('analytics:metric-series')
+        params = {'name': 'api_response_time', 'start': self.hour.isoformat(),
+                  'end': (self.hour + timedelta(hours=2)).isoformat()}
+
+        response = self.client.get(url, {**params, 'bucket': 'hour', 'by_route': 'true', 'agg': 'count,avg,p95'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['resolution'], 'hour')
+        self.assertEqual([(point['route'], point['count'], point['avg'], point['p95']) for point in response.data['points']], [
+            (self.ROUTE_A, 4, 25, 40), (self.ROUTE_A, 1, 500, 500), (self.ROUTE_B, 1, 100, 100),
+        ])
+        self.assertEqual(set(response.data['points'][0]), {'time', 'route', 'count', 'avg', 'p95'})
+
+        response = self.client.get(url, {**params, 'bucket': 'minute', 'route': self.ROUTE_A})
+        self.assertEqual(response.data['resolution'], 'minute')
+        self.assertEqual([(point['count'], point['min'], point['max']) for point in response.data['points']], [
+            (3, 10, 30), (1, 40, 40), (1, 500, 500),
+        ])
+
+        response = self.client.get(url, {**params, 'bucket': 'day', 'agg': 'count,min,max,avg'})
+        self.assertEqual([(point['count'], point['min'], point['max'], point['avg']) for point in response.data['points']],
+                         [(6, 10, 500, 700 / 6)] if timezone.localtime(self.hour).hour < 23 else
+                         [(5, 10, 100, 40), (1, 500, 500, 500)])
+
+    def test_series_validation_and_permissions(self):
+        url = reverse('analytics:metric-series')
+        for params in (
+            {},
+            {'name': 'api_response_time', 'bucket': 'second'},
+            {'name': 'api_response_time', 'agg': 'median'},
+            {'name': 'api_response_time', 'bucket': 'minute', 'period': 'month'},
+            {'name': 'api_response_time', 'start': '2025-02-01T00:00:00', 'end': '2025-01-01T00:00:00'},
+        ):
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
+        member = APIClient()
+        member.force_authenticate(User.objects.create_user(username='member', password='pw-12345'))
+        self.assertEqual(member.get(url, {'name': 'api_response_time'}).status_code, 403)
+
+    @override_settings(SYSTEM_METRICS_ROLLUP={'LOOKBACK_MINUTES': 5, 'MINUTE_RETENTION_DAYS': 1})
+    def test_recent_rollup_prunes_expired_minutes(self):
+        rollup_metrics(self.hour, self.hour + timedelta(hours=2))
+        self._metric('api_response_time', 7, timezone.now() - timedelta(minutes=1), route=self.ROUTE_B)
+        out = StringIO()
+        call_command('rollup_system_metrics', stdout=out)
+        self.assertIn('Successfully wrote', out.getvalue())
+        minute_rollups = SystemMetricsRollup.objects.filter(resolution='minute')
+        self.assertEqual(list(minute_rollups.values_list('route', 'samples')), [(self.ROUTE_B, 1)])
+        self.assertEqual(SystemMetricsRollup.objects.filter(resolution='hour', bucket__lte=self.hour).count(), 3)
+        self.assertEqual(rollup_recent_metrics(), 2)
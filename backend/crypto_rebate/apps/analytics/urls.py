@@ -9,10 +9,14 @@ urlpatterns = [
     
     # 통계 데이터
     path('stats/', views.analytics_stats, name='stats'),
+    path('stats/me/', views.user_statistics, name='user-stats'),
     
     # 사용자 활동
     path('activity/', views.user_activity, name='activity'),
     
     # 시스템 메트릭
     path('metrics/', views.system_metrics, name='metrics'),
+    path('metrics/series/', views.metric_series, name='metric-series'),
+    path('metrics/live/', views.live_metrics, name='live-metrics'),
+    path('metrics/prometheus/', views.prometheus_metrics, name='prometheus-metrics'),
 ] 
\ No newline at end of file
@@ -1,120 +1,153 @@
+from django.http import HttpResponse
 from django.shortcuts import render
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.db.models import Sum, Count, Avg
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from datetime import datetime, timedelta
-from .models import DailyStatistics, ExchangeStatistics, UserActivity, SystemMetrics
+from crypto_rebate.periods import period_start
+from .metric_rollups import metric_rollup_config
+from .metrics import PROMETHEUS_CONTENT_TYPE, HasMetricsToken, metrics_registry
+from .models import (
+    GRANULARITIES, METRIC_AGGREGATIONS, METRIC_BUCKETS, DailyStatistics, ExchangeStatistics, UserActivity,
+    UserDailyStatistics, SystemMetrics, SystemMetricsRollup,
+)
 
 
 # Create your views here.
 
 
+ROLLUP_TOTALS = {
+    'transactions': Sum('total_transactions'),
+    'volume': Sum('total_volume'),
+    'rebates': Sum('total_rebates'),
+    'payments': Sum('total_payments'),
+    'avg_daily_volume': Avg('total_volume'),
+}
+
+
+def _exchange_breakdown(start_date, end_date):
+    return list(
+        ExchangeStatistics.objects.filter(date__range=(start_date, end_date)).order_by('exchange__name')
+        .values('exchange__name').annotate(
+            total_transactions=Sum('total_transactions'),
+            total_volume=Sum('total_volume'),
+            total_commissions=Sum('total_commissions'),
+        )
+    )
+
+
 @api_view(['GET'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([permissions.IsAdminUser])
 def analytics_dashboard(request):
-    """분석 대시보드 API"""
-    user = request.user
-    
-    # 오늘 통계
-    today = timezone.now().date()
-    today_stats = DailyStatistics.objects.filter(
-        user=user, date=today
-    ).first()
-    
-    # 이번 주 통계
-    week_start = today - timedelta(days=today.weekday())
-    week_stats = DailyStatistics.objects.filter(
-        user=user, date__gte=week_start
-    ).aggregate(
-        total_earnings=Sum('total_earnings'),
-        total_transactions=Sum('transaction_count'),
-        avg_daily_earnings=Avg('total_earnings')
-    )
-    
-    # 이번 달 통계
-    month_start = today.replace(day=1)
-    month_stats = DailyStatistics.objects.filter(
-        user=user, date__gte=month_start
-    ).aggregate(
-        total_earnings=Sum('total_earnings'),
-        total_transactions=Sum('transaction_count'),
-        avg_daily_earnings=Avg('total_earnings')
-    )
-    
-    # 거래소별 통계
-    exchange_stats = ExchangeStatistics.objects.filter(
-        user=user
-    ).values('exchange__name').annotate(
-        total_earnings=Sum('total_earnings'),
-        total_transactions=Sum('transaction_count')
-    )
+    """분석 대시보드 API (일별 롤업만 조회)"""
+    today = timezone.localdate()
+    today_stats = DailyStatistics.objects.filter(date=today).first()
+    week_start = period_start('week')
+    month_start = period_start('month')
+    rollups = DailyStatistics.objects.filter(date__lte=today)
     
     return Response({
         'today': {
-            'earnings': today_stats.total_earnings if today_stats else 0,
-            'transactions': today_stats.transaction_count if today_stats else 0
+            'total_users': today_stats.total_users if today_stats else 0,
+            'active_users': today_stats.active_users if today_stats else 0,
+            'transactions': today_stats.total_transactions if today_stats else 0,
+            'volume': today_stats.total_volume if today_stats else 0,
+            'rebates': today_stats.total_rebates if today_stats else 0,
         },
-        'this_week': week_stats,
-        'this_month': month_stats,
-        'exchange_breakdown': list(exchange_stats)
+        'this_week': rollups.filter(date__gte=week_start).aggregate(**ROLLUP_TOTALS),
+        'this_month': rollups.filter(date__gte=month_start).aggregate(**ROLLUP_TOTALS),
+        'exchange_breakdown': _exchange_breakdown(month_start, today)
     }, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([permissions.IsAdminUser])
 def analytics_stats(request):
-    """분석 통계 API"""
-    user = request.user
-    
+    """분석 통계 API (일별 롤업만 조회, 1년 구간도 약 365행)"""
     # 기간 필터
     period = request.GET.get('period', 'month')  # week, month, year
-    end_date = timezone.now().date()
+    end_date = timezone.localdate()
     
     if period == 'week':
         start_date = end_date - timedelta(days=7)
-    elif period == 'month':
-        start_date = end_date - timedelta(days=30)
     elif period == 'year':
         start_date = end_date - timedelta(days=365)
     else:
+        period = 'month'
         start_date = end_date - timedelta(days=30)
     
     # 일별 통계
     daily_stats = DailyStatistics.objects.filter(
-        user=user, date__range=[start_date, end_date]
-    ).order_by('date')
-    
-    # 거래소별 통계
-    exchange_stats = ExchangeStatistics.objects.filter(
-        user=user, date__range=[start_date, end_date]
-    ).values('exchange__name').annotate(
-        total_earnings=Sum('total_earnings'),
-        total_transactions=Sum('transaction_count')
-    )
-    
-    # 사용자 활동
-    user_activity = UserActivity.objects.filter(
-        user=user, timestamp__date__range=[start_date, end_date]
-    ).values('activity_type').annotate(
-        count=Count('id')
+        date__range=[start_date, end_date]
+    ).order_by('date').values(
+        'date', 'total_users', 'active_users', 'total_transactions',
+        'total_volume', 'total_rebates', 'total_payments'
     )
     
     return Response({
         'period': period,
         'start_date': start_date,
         'end_date': end_date,
-        'daily_stats': [
-            {
-                'date': stat.date,
-                'earnings': stat.total_earnings,
-                'transactions': stat.transaction_count
-            }
-            for stat in daily_stats
-        ],
-        'exchange_stats': list(exchange_stats),
-        'user_activity': list(user_activity)
+        'daily_stats': list(daily_stats),
+        'exchange_stats': _exchange_breakdown(start_date, end_date)
+    }, status=status.HTTP_200_OK)
+
+
+PERIOD_DAYS = {'week': 7, 'month': 30, 'year': 365}
+
+
+def _date_range(request):
+    """start_date/end_date(YYYY-MM-DD, 포함) 또는 period(week/month/year)로 조회 구간 결정
+
+    잘못된 값이면 (None, None, 오류 메시지) 반환
+    """
+    try:
+        end_date = parse_date(request.GET.get('end_date', '')) or timezone.localdate()
+        start_date = parse_date(request.GET.get('start_date', ''))
+    except ValueError:
+        return None, None, 'start_date/end_date must be valid dates (YYYY-MM-DD)'
+    if start_date is None:
+        start_date = end_date - timedelta(days=PERIOD_DAYS.get(request.GET.get('period'), PERIOD_DAYS['month']))
+    if start_date > end_date:
+        return None, None, 'start_date must not be after end_date'
+    return start_date, end_date, None
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def user_statistics(request):
+    """사용자 기간별 통계 API (사용자 일별 집계만 조회, 다운샘플링은 SQL GROUP BY)
+
+    start_date/end_date 또는 period로 구간을, granularity(day/week/month)로 묶음 단위를,
+    exchange로 거래소를 지정한다.
+    """
+    start_date, end_date, error = _date_range(request)
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    granularity = request.GET.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return Response({
+            'error': f"granularity must be one of: {', '.join(GRANULARITIES)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = UserDailyStatistics.objects.filter(user=request.user, date__range=(start_date, end_date))
+    if request.GET.get('exchange'):
+        try:
+            exchange_id = int(request.GET['exchange'])
+        except ValueError:
+            return Response({'error': 'exchange must be an integer id'}, status=status.HTTP_400_BAD_REQUEST)
+        rows = rows.filter(exchange_id=exchange_id)
+
+    return Response({
+        'start_date': start_date,
+        'end_date': end_date,
+        'granularity': granularity,
+        'totals': rows.totals(),
+        'series': list(rows.series(granularity)),
+        'exchange_stats': list(rows.by_exchange()),
     }, status=status.HTTP_200_OK)
 
 
@@ -162,33 +195,28 @@ def user_activity(request):
 
 
 @api_view(['GET'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes([permissions.IsAdminUser])
 def system_metrics(request):
-    """시스템 메트릭 API"""
-    user = request.user
-    
+    """시스템 메트릭 API (MetricsMiddleware가 저장한 구간 요약)"""
     # 시스템 성능 메트릭
-    system_metrics = SystemMetrics.objects.filter(
-        user=user
-    ).order_by('-timestamp')[:10]
-    
-    # API 응답 시간
+    system_metrics = SystemMetrics.objects.order_by('-timestamp')[:10]
+
+    # API 응답 시간 (라우트별 구간 p95, ms)
     api_response_times = SystemMetrics.objects.filter(
-        user=user,
-        metric_type='api_response_time'
+        name='api_response_time'
     ).order_by('-timestamp')[:20]
-    
-    # 오류율
+
+    # 오류율 (구간 전체 5xx 비율)
     error_rates = SystemMetrics.objects.filter(
-        user=user,
-        metric_type='error_rate'
+        name='error_rate'
     ).order_by('-timestamp')[:20]
-    
+
     return Response({
         'system_metrics': [
             {
                 'id': metric.id,
                 'metric_type': metric.metric_type,
+                'name': metric.name,
                 'value': metric.value,
                 'timestamp': metric.timestamp
             }
@@ -196,7 +224,11 @@ def system_metrics(request):
         ],
         'api_response_times': [
             {
+                'route': metric.metadata.get('route'),
                 'value': metric.value,
+                'count': metric.metadata.get('count'),
+                'latency_ms': metric.metadata.get('latency_ms'),
+                'db_queries': metric.metadata.get('db_queries'),
                 'timestamp': metric.timestamp
             }
             for metric in api_response_times
@@ -204,8 +236,83 @@ def system_metrics(request):
         'error_rates': [
             {
                 'value': metric.value,
+                'requests': metric.metadata.get('requests'),
                 'timestamp': metric.timestamp
             }
             for metric in error_rates
         ]
     }, status=status.HTTP_200_OK)
+
+
+SERIES_PERIODS = {'day': timedelta(days=1), 'week': timedelta(weeks=1), 'month': timedelta(days=30)}
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def metric_series(request):
+    """시스템 메트릭 시계열 API (minute/hour 롤업을 SQL date_trunc + GROUP BY로 다운샘플링)
+
+    name(필수)으로 메트릭을, bucket(minute/hour/day/week)으로 묶음 단위를, agg(count,min,avg,max,p95 중
+    쉼표 구분)로 집계를 지정한다. start/end(ISO datetime) 또는 period(day/week/month, 기본 week)로 구간을,
+    route로 라우트를 고르고 by_route=true면 라우트별로 나눈다.
+    """
+    name = request.GET.get('name')
+    bucket = request.GET.get('bucket', 'hour')
+    aggregations = request.GET.get('agg', ','.join(METRIC_AGGREGATIONS)).split(',')
+    if not name:
+        return Response({'error': 'name is required'}, status=status.HTTP_400_BAD_REQUEST)
+    if bucket not in METRIC_BUCKETS:
+        return Response({'error': f'bucket must be one of {", ".join(METRIC_BUCKETS)}'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if not set(aggregations) <= set(METRIC_AGGREGATIONS):
+        return Response({'error': f'agg must be a subset of {",".join(METRIC_AGGREGATIONS)}'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        end = parse_datetime(request.GET.get('end', '')) or timezone.now()
+        start = parse_datetime(request.GET.get('start', '')) or end - SERIES_PERIODS.get(
+            request.GET.get('period'), SERIES_PERIODS['week']
+        )
+    except ValueError:
+        return Response({'error': 'start/end must be valid ISO datetimes'}, status=status.HTTP_400_BAD_REQUEST)
+    start, end = (value if timezone.is_aware(value) else timezone.make_aware(value) for value in (start, end))
+    if start >= end:
+        return Response({'error': 'start must be before end'}, status=status.HTTP_400_BAD_REQUEST)
+    max_points = metric_rollup_config('MAX_POINTS', 5000)
+    if (end - start) / METRIC_BUCKETS[bucket] > max_points:
+        return Response({'error': f'Too many {bucket} buckets in range (max {max_points}), use a larger bucket'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    # minute 버킷만 minute 롤업을 읽고, 그보다 큰 버킷은 hour 롤업을 묶는다
+    resolution = 'minute' if bucket == 'minute' else 'hour'
+    rollups = SystemMetricsRollup.objects.filter(
+        resolution=resolution, name=name, bucket__gte=start, bucket__lt=end
+    )
+    if 'route' in request.GET:
+        rollups = rollups.filter(route=request.GET['route'])
+    by_route = request.GET.get('by_route', '').lower() == 'true'
+    fields = ['time', *(['route'] if by_route else []), *aggregations]
+    return Response({
+        'name': name,
+        'bucket': bucket,
+        'resolution': resolution,
+        'start': start,
+        'end': end,
+        'points': [
+            {field: row[field] for field in fields}
+            for row in rollups.series(bucket, by_route=by_route)
+        ],
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def live_metrics(request):
+    """실시간 라우트별 요청 지연/DB 쿼리 히스토그램 요약 (이 프로세스 시작 이후 누적)"""
+    return Response({'routes': metrics_registry.snapshot()}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser | HasMetricsToken])
+def prometheus_metrics(request):
+    """Prometheus 텍스트 형식 메트릭 (관리자 또는 Bearer 토큰)"""
+    return HttpResponse(metrics_registry.prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
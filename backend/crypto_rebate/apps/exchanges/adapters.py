@@ -0,0 +1,366 @@
+"""
+거래소별 커미션/거래 내역 조회 어댑터
+
+각 어댑터는 거래소 API의 서명 방식과 페이지 넘김 방식을 캡슐화하고,
+응답 행을 공통 CommissionRecord 형태로 변환한다. 요청은 거래소별
+토큰 버킷으로 속도를 제한한다.
+"""
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from urllib.parse import urlencode
+
+import requests
+from django.conf import settings
+
+CommissionRecord = namedtuple(
+    'CommissionRecord',
+    ['transaction_id', 'amount', 'commission', 'commission_rate', 'created_at']
+)
+
+Watermark = namedtuple('Watermark', ['timestamp', 'last_id'])
+
+SYNC_STREAMS = {
+    'transactions': ('transactions',),
+    'commissions': ('commissions',),
+    'all': ('transactions', 'commissions'),
+}
+
+
+class ExchangeAPIError(Exception):
+    """거래소 API 호출 실패"""
+
+
+class RateLimiter:
+    """스레드 안전 토큰 버킷 (초당 rate 회, 최대 burst 회 연속 허용)"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name):
+    """프로세스 내에서 거래소별로 공유되는 속도 제한기"""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            rate, burst = sync_config('RATE_LIMITS').get(name, (5, 1))
+            limiter = _limiters[name] = RateLimiter(rate, burst)
+        return limiter
+
+
+def reset_rate_limiters():
+    with _limiters_lock:
+        _limiters.clear()
+
+
+def sync_config(key):
+    return getattr(settings, 'EXCHANGE_SYNC', {}).get(key, {})
+
+
+def _from_millis(value):
+    return datetime.fromtimestamp(int(value) / 1000, tz=dt_timezone.utc)
+
+
+def _to_millis(value):
+    return int(value.timestamp() * 1000)
+
+
+def _hmac_sha256(secret, message):
+    return hmac.new(secret.encode(), message.encode(), hashlib.sha256)
+
+
+class ExchangeAdapter:
+    """거래소 어댑터 기본 클래스"""
+
+    name = None
+    slug = None
+    default_base_url = None
+    paths = {}
+    page_size = 100
+    # True면 오래된 기록부터 반환하므로 페이지마다 워터마크를 전진시킬 수 있다
+    ascending = True
+
+    def __init__(self, credentials, session=None):
+        self.credentials = credentials
+        self.base_url = sync_config('BASE_URLS').get(self.name, self.default_base_url).rstrip('/')
+        self.page_size = sync_config('PAGE_SIZES').get(self.name, self.page_size)
+        self.timeout = getattr(settings, 'EXCHANGE_SYNC', {}).get('TIMEOUT', 10)
+        self.session = session or requests.Session()
+        self.limiter = get_rate_limiter(self.name)
+
+    def fetch(self, stream, watermark=None):
+        """stream('transactions'/'commissions')의 내역을 페이지 단위로 반환
+
+        watermark가 있으면 그 시각 이후의 기록만 거래소에 요청한다. 같은 시각의
+        기록은 다시 받을 수 있지만 transaction_id 기준 upsert라 중복되지 않는다.
+        """
+        path = self.paths[stream]
+        cursor = None
+        while True:
+            params = self.page_params(cursor)
+            if watermark and watermark.timestamp:
+                params.update(self.since_params(watermark.timestamp))
+            payload = self.request(path, params)
+            rows, cursor = self.parse_page(payload, cursor)
+            records = [self.parse_record(row) for row in rows]
+            if watermark and watermark.timestamp:
+                records = [
+                    record for record in records
+                    if record.created_at > watermark.timestamp
+                    or (record.created_at == watermark.timestamp and record.transaction_id != watermark.last_id)
+                ]
+            yield records
+            if cursor is None:
+                return
+
+    def request(self, path, params):
+        self.limiter.acquire()
+        query = urlencode(params)
+        headers = self.sign(path, query)
+        try:
+            response = self.session.get(
+                f'{self.base_url}{path}?{query}', headers=headers, timeout=self.timeout
+            )
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise ExchangeAPIError(f'{self.name} {path} 호출 실패: {e}') from e
+
+    def transaction_id(self, raw_id):
+        return f'{self.slug}-{raw_id}'
+
+    def page_params(self, cursor):
+        raise NotImplementedError
+
+    def since_params(self, timestamp):
+        """워터마크 시각 이후만 조회하는 거래소별 파라미터"""
+        raise NotImplementedError
+
+    def parse_page(self, payload, cursor):
+        """(행 목록, 다음 페이지 커서 또는 None)"""
+        raise NotImplementedError
+
+    def parse_record(self, row):
+        raise NotImplementedError
+
+    def sign(self, path, query):
+        raise NotImplementedError
+
+
+class BinanceAdapter(ExchangeAdapter):
+    """Binance: 페이지 번호 방식, 쿼리 HMAC-SHA256 서명"""
+
+    name = 'Binance'
+    slug = 'binance'
+    default_base_url = 'https://api.binance.com'
+    paths = {
+        'transactions': '/sapi/v1/apiReferral/rebate/recentRecord',
+        'commissions': '/sapi/v1/rebate/taxQuery',
+    }
+
+    def page_params(self, cursor):
+        return {'page': cursor or 1, 'limit': self.page_size, 'timestamp': int(time.time() * 1000)}
+
+    def since_params(self, timestamp):
+        return {'startTime': _to_millis(timestamp)}
+
+    def request(self, path, params):
+        query = urlencode(params)
+        params['signature'] = _hmac_sha256(self.credentials.api_secret, query).hexdigest()
+        return super().request(path, params)
+
+    def sign(self, path, query):
+        return {'X-MBX-APIKEY': self.credentials.api_key}
+
+    def parse_page(self, payload, cursor):
+        data = payload.get('data') or {}
+        page = int(data.get('page', 1))
+        next_page = page + 1 if page < int(data.get('totalPageNum', page)) else None
+        return data.get('data', []), next_page
+
+    def parse_record(self, row):
+        return CommissionRecord(
+            transaction_id=self.transaction_id(row['tranId']),
+            amount=Decimal(str(row.get('tradeVolume', 0))),
+            commission=Decimal(str(row['amount'])),
+            commission_rate=Decimal(str(row.get('rebateRate', 0))),
+            created_at=_from_millis(row['updateTime']),
+        )
+
+
+class BybitAdapter(ExchangeAdapter):
+    """Bybit v5: nextPageCursor 방식, 헤더 HMAC-SHA256 서명"""
+
+    name = 'Bybit'
+    slug = 'bybit'
+    default_base_url = 'https://api.bybit.com'
+    recv_window = '5000'
+    paths = {
+        'transactions': '/v5/affiliate/aff-user-list',
+        'commissions': '/v5/affiliate/commission-history',
+    }
+
+    def page_params(self, cursor):
+        params = {'limit': self.page_size}
+        if cursor:
+            params['cursor'] = cursor
+        return params
+
+    def since_params(self, timestamp):
+        return {'startTime': _to_millis(timestamp)}
+
+    def sign(self, path, query):
+        timestamp = str(int(time.time() * 1000))
+        message = f'{timestamp}{self.credentials.api_key}{self.recv_window}{query}'
+        return {
+            'X-BAPI-API-KEY': self.credentials.api_key,
+            'X-BAPI-TIMESTAMP': timestamp,
+            'X-BAPI-RECV-WINDOW': self.recv_window,
+            'X-BAPI-SIGN': _hmac_sha256(self.credentials.api_secret, message).hexdigest(),
+        }
+
+    def parse_page(self, payload, cursor):
+        if payload.get('retCode', 0) != 0:
+            raise ExchangeAPIError(f"Bybit 오류: {payload.get('retMsg')}")
+        result = payload.get('result') or {}
+        return result.get('list', []), result.get('nextPageCursor') or None
+
+    def parse_record(self, row):
+        return CommissionRecord(
+            transaction_id=self.transaction_id(row['id']),
+            amount=Decimal(str(row.get('tradeVolume', 0))),
+            commission=Decimal(str(row['commission'])),
+            commission_rate=Decimal(str(row.get('commissionRate', 0))),
+            created_at=_from_millis(row['createdTime']),
+        )
+
+
+class OKXAdapter(ExchangeAdapter):
+    """OKX v5: after(billId) 방식(최신순), Base64 HMAC-SHA256 서명 + 패스프레이즈"""
+
+    name = 'OKX'
+    slug = 'okx'
+    ascending = False
+    default_base_url = 'https://www.okx.com'
+    paths = {
+        'transactions': '/api/v5/affiliate/invitee/trades',
+        'commissions': '/api/v5/affiliate/invitee/rebates',
+    }
+
+    def page_params(self, cursor):
+        params = {'limit': self.page_size}
+        if cursor:
+            params['after'] = cursor
+        return params
+
+    def since_params(self, timestamp):
+        return {'begin': _to_millis(timestamp)}
+
+    def sign(self, path, query):
+        timestamp = datetime.now(dt_timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+        message = f'{timestamp}GET{path}?{query}'
+        signature = base64.b64encode(_hmac_sha256(self.credentials.api_secret, message).digest()).decode()
+        return {
+            'OK-ACCESS-KEY': self.credentials.api_key,
+            'OK-ACCESS-SIGN': signature,
+            'OK-ACCESS-TIMESTAMP': timestamp,
+            'OK-ACCESS-PASSPHRASE': self.credentials.passphrase or '',
+        }
+
+    def parse_page(self, payload, cursor):
+        if str(payload.get('code', '0')) != '0':
+            raise ExchangeAPIError(f"OKX 오류: {payload.get('msg')}")
+        rows = payload.get('data', [])
+        next_cursor = rows[-1]['billId'] if len(rows) >= self.page_size else None
+        return rows, next_cursor
+
+    def parse_record(self, row):
+        return CommissionRecord(
+            transaction_id=self.transaction_id(row['billId']),
+            amount=Decimal(str(row.get('volume', 0))),
+            commission=Decimal(str(row['rebate'])),
+            commission_rate=Decimal(str(row.get('rebateRate', 0))),
+            created_at=_from_millis(row['ts']),
+        )
+
+
+class GateAdapter(ExchangeAdapter):
+    """Gate.io v4: offset/limit 방식, HMAC-SHA512 서명"""
+
+    name = 'Gate.io'
+    slug = 'gate'
+    default_base_url = 'https://api.gateio.ws'
+    paths = {
+        'transactions': '/api/v4/rebate/agency/transaction_history',
+        'commissions': '/api/v4/rebate/agency/commission_history',
+    }
+
+    def page_params(self, cursor):
+        return {'limit': self.page_size, 'offset': cursor or 0}
+
+    def since_params(self, timestamp):
+        return {'from': int(timestamp.timestamp())}
+
+    def sign(self, path, query):
+        timestamp = str(int(time.time()))
+        body_hash = hashlib.sha512(b'').hexdigest()
+        message = f'GET\n{path}\n{query}\n{body_hash}\n{timestamp}'
+        return {
+            'KEY': self.credentials.api_key,
+            'Timestamp': timestamp,
+            'SIGN': hmac.new(self.credentials.api_secret.encode(), message.encode(), hashlib.sha512).hexdigest(),
+        }
+
+    def parse_page(self, payload, cursor):
+        rows = payload if isinstance(payload, list) else []
+        next_offset = (cursor or 0) + len(rows) if len(rows) >= self.page_size else None
+        return rows, next_offset
+
+    def parse_record(self, row):
+        return CommissionRecord(
+            transaction_id=self.transaction_id(row['id']),
+            amount=Decimal(str(row.get('amount', 0))),
+            commission=Decimal(str(row['commission_amount'])),
+            commission_rate=Decimal(str(row.get('rate', 0))),
+            created_at=datetime.fromtimestamp(int(row['commission_time']), tz=dt_timezone.utc),
+        )
+
+
+ADAPTERS = {
+    adapter.name: adapter
+    for adapter in (BinanceAdapter, BybitAdapter, OKXAdapter, GateAdapter)
+}
+
+
+def get_adapter(exchange, credentials, session=None):
+    """Exchange 이름에 맞는 어댑터 생성"""
+    try:
+        adapter_class = ADAPTERS[exchange.name]
+    except KeyError:
+        raise ExchangeAPIError(f'지원하지 않는 거래소입니다: {exchange.name}')
+    return adapter_class(credentials, session=session)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Exchange, UserExchangeRebateRate, ExchangeAPI, ReferralLink, ReferralTransaction
+from .models import Exchange, UserExchangeRebateRate, ExchangeAPI, ExchangeSyncCursor, ReferralLink, ReferralTransaction
 
 
 @admin.register(Exchange)
@@ -15,7 +15,7 @@ class ExchangeAdmin(admin.ModelAdmin):
     
     fieldsets = (
         ('기본 정보', {
-            'fields': ('name', 'logo', 'website', 'api_documentation')
+            'fields': ('name', 'logo', 'website', 'referral_domains', 'api_documentation')
         }),
         ('리베이트 설정', {
             'fields': ('base_rebate_rate', 'min_withdrawal')
@@ -94,6 +94,14 @@ class ExchangeAPIAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(ExchangeSyncCursor)
+class ExchangeSyncCursorAdmin(admin.ModelAdmin):
+    list_display = ['exchange_api', 'stream', 'last_timestamp', 'last_id', 'updated_at']
+    list_filter = ['stream', 'exchange_api__exchange']
+    search_fields = ['exchange_api__user__username', 'last_id']
+    readonly_fields = ['updated_at']
+
+
 @admin.register(ReferralLink)
 class ReferralLinkAdmin(admin.ModelAdmin):
     list_display = ['user', 'exchange', 'referral_code', 'clicks', 'conversions', 'total_commission', 'is_active', 'created_at']
@@ -0,0 +1,229 @@
+"""
+레퍼럴 링크 클릭 카운터
+
+클릭마다 ReferralLink 행을 갱신하면 인기 링크에서 행 잠금 경합이 생기므로
+클릭은 버퍼에 누적하고 주기적으로 UPDATE 한 번(F() 증분)으로 DB에 반영한다.
+REDIS_URL이 설정되면 프로세스 간 공유되는 Redis 해시(HINCRBY)를 버퍼로 쓰고
+Celery beat가 반영하며, 아니면 프로세스 내 샤드 카운터를 쓰고 그 프로세스의 백그라운드
+스레드가 FLUSH_INTERVAL마다(그리고 프로세스 종료 시) 반영한다. 이때 Celery beat 작업은
+워커 자신의 빈 버퍼만 반영하므로 아무 일도 하지 않는다.
+BACKGROUND가 꺼져 있으면 스레드를 띄우지 않으며 flush()를 호출해야 반영된다(테스트용).
+"""
+import atexit
+import itertools
+import logging
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db import close_old_connections
+from django.db.models import Case, F, IntegerField, Value, When
+from django.dispatch import receiver
+from django.utils.http import url_has_allowed_host_and_scheme
+
+from .models import ReferralLink
+
+logger = logging.getLogger(__name__)
+
+
+def click_config(key, default):
+    return getattr(settings, 'REFERRAL_CLICKS', {}).get(key, default)
+
+
+class LocalClickBuffer:
+    """프로세스 내 샤드 카운터 (스레드마다 샤드를 나누어 잠금 경합 분산)"""
+
+    flushes_in_process = True
+
+    def __init__(self, shards=16):
+        self._shards = [(threading.Lock(), Counter()) for _ in range(shards)]
+        self._next_shard = itertools.count()
+        self._thread = threading.local()
+
+    def _shard(self):
+        index = getattr(self._thread, 'shard', None)
+        if index is None:
+            index = self._thread.shard = next(self._next_shard) % len(self._shards)
+        return self._shards[index]
+
+    def incr(self, link_id, amount=1):
+        lock, counts = self._shard()
+        with lock:
+            counts[link_id] += amount
+
+    def drain(self):
+        """누적된 클릭을 꺼내고 버퍼를 비움"""
+        drained = Counter()
+        for lock, counts in self._shards:
+            with lock:
+                drained.update(counts)
+                counts.clear()
+        return drained
+
+    def restore(self, counts):
+        """DB 반영에 실패한 클릭을 되돌려 놓음"""
+        for link_id, amount in counts.items():
+            self.incr(link_id, amount)
+
+
+class RedisClickBuffer:
+    """Redis 해시 버퍼 (HINCRBY, 프로세스 간 공유)"""
+
+    KEY = 'referral_clicks'
+    flushes_in_process = False
+
+    def __init__(self, url):
+        self.client = redis.Redis.from_url(url)
+
+    def incr(self, link_id, amount=1):
+        self.client.hincrby(self.KEY, link_id, amount)
+
+    def drain(self):
+        # MULTI로 해시를 읽고 지워 동시에 반영하는 다른 프로세스와 겹치지 않게 한다
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hgetall(self.KEY)
+        pipe.delete(self.KEY)
+        values, _ = pipe.execute()
+        return Counter({int(link_id): int(amount) for link_id, amount in values.items()})
+
+    def restore(self, counts):
+        pipe = self.client.pipeline()
+        for link_id, amount in counts.items():
+            pipe.hincrby(self.KEY, link_id, amount)
+        pipe.execute()
+
+
+class ClickCounter:
+    """클릭 버퍼와 DB 반영 관리 (버퍼는 설정에 따라 지연 생성)"""
+
+    def __init__(self):
+        self._buffer = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._flush_at_exit = False
+
+    @property
+    def buffer(self):
+        if self._buffer is None:
+            with self._lock:
+                if self._buffer is None:
+                    if settings.REDIS_URL:
+                        self._buffer = RedisClickBuffer(settings.REDIS_URL)
+                    else:
+                        self._buffer = LocalClickBuffer(click_config('SHARDS', 16))
+        return self._buffer
+
+    def reset(self):
+        """반영 스레드를 멈추고 버퍼를 비움 (설정 변경/테스트용)"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+        if thread is not None:
+            thread.join()
+        with self._lock:
+            self._stop = threading.Event()
+            self._buffer = None
+
+    def record(self, link_id):
+        buffer = self.buffer
+        buffer.incr(link_id)
+        if buffer.flushes_in_process and click_config('BACKGROUND', True):
+            self._ensure_thread()
+
+    def flush(self):
+        """누적된 클릭을 DB에 반영하고 반영한 클릭 수 반환"""
+        with self._flush_lock:
+            return self._flush(self.buffer)
+
+    def _flush(self, buffer):
+        counts = {link_id: amount for link_id, amount in buffer.drain().items() if amount}
+        if not counts:
+            return 0
+        try:
+            ReferralLink.objects.filter(pk__in=counts).update(
+                clicks=F('clicks') + Case(
+                    *(When(pk=link_id, then=Value(amount)) for link_id, amount in counts.items()),
+                    default=Value(0), output_field=IntegerField(),
+                )
+            )
+        except Exception:
+            buffer.restore(counts)
+            raise
+        return sum(counts.values())
+
+    def _flush_logged(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Failed to store referral link clicks, keeping them for the next flush')
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, args=(self._stop,), name='referral-clicks', daemon=True
+                    )
+                    self._thread.start()
+                    if not self._flush_at_exit:
+                        # 프로세스 종료 시 남은 클릭 반영
+                        atexit.register(self._flush_logged)
+                        self._flush_at_exit = True
+
+    def _run(self, stop):
+        try:
+            while not stop.wait(click_config('FLUSH_INTERVAL', 5)):
+                self._flush_logged()
+                close_old_connections()
+        finally:
+            close_old_connections()
+
+
+click_counter = ClickCounter()
+
+
+def redirect_domains(website, referral_domains):
+    """거래소가 레퍼럴 이동을 허용하는 도메인 (website 도메인 + referral_domains)"""
+    host = (urlsplit(website).hostname or '').removeprefix('www.')
+    return {domain.lower().strip('.') for domain in [host, *referral_domains] if domain}
+
+
+def is_allowed_target(url, domains):
+    """url이 http(s)이고 호스트가 domains 중 하나이거나 그 하위 도메인인지"""
+    netloc = urlsplit(url).netloc
+    host = (urlsplit(url).hostname or '').rstrip('.')
+    if not any(host == domain or host.endswith(f'.{domain}') for domain in domains):
+        return False
+    # 역슬래시, 제어 문자 등 브라우저와 urlsplit의 해석이 갈리는 URL은 거부
+    return url_has_allowed_host_and_scheme(url, allowed_hosts={netloc})
+
+
+def get_redirect_target(link_id):
+    """활성 레퍼럴 링크의 이동 URL (없거나 거래소 도메인이 아니면 None, 공유 캐시 사용)"""
+    key = ReferralLink.redirect_cache_key(link_id)
+    target = cache.get(key)
+    if target is None:
+        link = ReferralLink.objects.filter(pk=link_id, is_active=True).values_list(
+            'referral_link', 'exchange__website', 'exchange__referral_domains'
+        ).first()
+        target = ''
+        if link is not None:
+            url, website, referral_domains = link
+            if is_allowed_target(url, redirect_domains(website, referral_domains or [])):
+                target = url
+            else:
+                logger.warning('레퍼럴 링크 %s의 이동 URL이 거래소 도메인이 아닙니다: %s', link_id, url)
+        cache.set(key, target, click_config('TARGET_TTL', 3600))
+    return target or None
+
+
+@receiver(setting_changed)
+def reset_click_counter(*, setting, **kwargs):
+    if setting in ('REDIS_URL', 'REFERRAL_CLICKS'):
+        click_counter.reset()
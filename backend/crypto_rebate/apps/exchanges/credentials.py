@@ -0,0 +1,94 @@
+"""
+거래소 API 자격 증명 암호화 코덱
+
+Fernet 키는 프로세스당 한 번만 구성하고, ENCRYPTION_KEY_FALLBACKS에 이전 키를
+두어 MultiFernet으로 키 교체(rotation)를 지원한다.
+"""
+import logging
+import threading
+from collections import namedtuple
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+Credentials = namedtuple('Credentials', ['api_key', 'api_secret', 'passphrase'])
+
+
+class CredentialCodec:
+    """ENCRYPTION_KEY 기반 암호화/복호화기 (지연 생성, 스레드 안전)"""
+
+    def __init__(self):
+        self._fernet = None
+        self._lock = threading.Lock()
+
+    @property
+    def fernet(self):
+        if self._fernet is None:
+            with self._lock:
+                if self._fernet is None:
+                    self._fernet = self._build()
+        return self._fernet
+
+    def _build(self):
+        keys = [getattr(settings, 'ENCRYPTION_KEY', '')]
+        keys += list(getattr(settings, 'ENCRYPTION_KEY_FALLBACKS', []))
+        keys = [key for key in keys if key]
+        if not keys:
+            raise ImproperlyConfigured('ENCRYPTION_KEY 설정이 필요합니다.')
+        # 첫 번째 키로 암호화하고, 복호화는 모든 키를 순서대로 시도
+        return MultiFernet([
+            Fernet(key.encode() if isinstance(key, str) else key) for key in keys
+        ])
+
+    def reset(self):
+        """키 설정 변경 후 다음 사용 시 다시 구성"""
+        with self._lock:
+            self._fernet = None
+
+    def encrypt(self, value):
+        return self.fernet.encrypt(value.encode()).decode()
+
+    def decrypt(self, token):
+        if not token:
+            return None
+        return self.fernet.decrypt(token.encode()).decode()
+
+    def rotate(self, token):
+        """이전 키로 암호화된 값을 현재 키로 다시 암호화"""
+        if not token:
+            return token
+        return self.fernet.rotate(token.encode()).decode()
+
+    def decrypt_many(self, queryset):
+        """ExchangeAPI 쿼리셋의 자격 증명을 {pk: Credentials} 형태로 일괄 복호화
+
+        복호화할 수 없는 행(설정에 없는 키로 암호화된 값 등)은 다른 행에 영향을 주지 않도록
+        None으로 표시한다.
+        """
+        rows = queryset.values_list('pk', 'api_key', 'api_secret', 'passphrase')
+        credentials = {}
+        for pk, api_key, api_secret, passphrase in rows.iterator(chunk_size=2000):
+            try:
+                credentials[pk] = Credentials(
+                    api_key=self.decrypt(api_key),
+                    api_secret=self.decrypt(api_secret),
+                    passphrase=self.decrypt(passphrase),
+                )
+            except InvalidToken:
+                logger.warning('Failed to decrypt credentials for ExchangeAPI %s', pk)
+                credentials[pk] = None
+        return credentials
+
+
+codec = CredentialCodec()
+
+
+@receiver(setting_changed)
+def reset_credential_codec(*, setting, **kwargs):
+    if setting in ('ENCRYPTION_KEY', 'ENCRYPTION_KEY_FALLBACKS'):
+        codec.reset()
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from crypto_rebate.apps.exchanges.credentials import codec
+from crypto_rebate.apps.exchanges.models import ExchangeAPI
+
+
+class Command(BaseCommand):
+    help = 'Re-encrypt stored exchange API credentials with the current ENCRYPTION_KEY'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fields = ['api_key', 'api_secret', 'passphrase']
+        rotated = 0
+        batch = []
+
+        queryset = ExchangeAPI.objects.only('pk', *fields).order_by('pk')
+        for api in queryset.iterator(chunk_size=batch_size):
+            for field in fields:
+                setattr(api, field, codec.rotate(getattr(api, field)))
+            batch.append(api)
+            if len(batch) >= batch_size:
+                rotated += self._flush(batch, fields)
+
+        rotated += self._flush(batch, fields)
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully re-encrypted {rotated} exchange API credentials.')
+        )
+
+    def _flush(self, batch, fields):
+        count = len(batch)
+        if count:
+            with transaction.atomic():
+                ExchangeAPI.objects.bulk_update(batch, fields)
+            batch.clear()
+        return count
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchanges', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='referraltransaction',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 00:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchanges', '0002_referraltransaction_created_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeSyncCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stream', models.CharField(choices=[('transactions', '거래 내역'), ('commissions', '커미션 내역')], max_length=20)),
+                ('last_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('last_id', models.CharField(blank=True, default='', max_length=255)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('exchange_api', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_cursors', to='exchanges.exchangeapi')),
+            ],
+            options={
+                'db_table': 'exchange_sync_cursors',
+                'ordering': ['exchange_api', 'stream'],
+                'unique_together': {('exchange_api', 'stream')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchanges', '0003_exchangesynccursor'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='referraltransaction',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='referral_tx_user_created_idx'),
+        ),
+    ]
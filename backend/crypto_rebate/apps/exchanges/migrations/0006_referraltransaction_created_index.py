@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchanges', '0005_referraltransaction_user_exchange_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='referraltransaction',
+            index=models.Index(fields=['created_at'], name='referral_tx_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 02:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchanges', '0006_referraltransaction_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exchange',
+            name='referral_domains',
+            field=models.JSONField(blank=True, default=list, help_text='레퍼럴 링크로 이동을 허용할 도메인 (하위 도메인 포함, website 도메인은 항상 허용)'),
+        ),
+    ]
@@ -1,9 +1,21 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
-from cryptography.fernet import Fernet
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
 import json
+from collections import defaultdict
+from decimal import Decimal
+from itertools import islice
+
+from .credentials import Credentials, codec
+from .rates import EffectiveRebateRateMixin, rebate_rate_cache
+from .signals import transactions_changed
 
 User = get_user_model()
 
@@ -13,6 +25,10 @@ class Exchange(models.Model):
     name = models.CharField(max_length=100, unique=True)
     logo = models.URLField(blank=True, default='')
     website = models.URLField(default='https://example.com')
+    referral_domains = models.JSONField(
+        default=list, blank=True,
+        help_text="레퍼럴 링크로 이동을 허용할 도메인 (하위 도메인 포함, website 도메인은 항상 허용)"
+    )
     api_documentation = models.URLField(blank=True, default='')
     base_rebate_rate = models.DecimalField(
         max_digits=5, decimal_places=4,  # 0.0000 ~ 1.0000 (0% ~ 100%)
@@ -78,7 +94,7 @@ class UserExchangeRebateRate(models.Model):
         return float(self.effective_rebate_rate) * 100
 
 
-class ExchangeAPI(models.Model):
+class ExchangeAPI(EffectiveRebateRateMixin, models.Model):
     """거래소 API 연동 정보"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='exchange_apis')
     exchange = models.ForeignKey(Exchange, on_delete=models.CASCADE, related_name='apis')
@@ -101,50 +117,52 @@ class ExchangeAPI(models.Model):
     def save(self, *args, **kwargs):
         """API 키 암호화 저장"""
         if not self.pk:  # 새로 생성되는 경우에만 암호화
-            fernet = Fernet(settings.ENCRYPTION_KEY.encode())
-            self.api_key = fernet.encrypt(self.api_key.encode()).decode()
-            self.api_secret = fernet.encrypt(self.api_secret.encode()).decode()
+            self.api_key = codec.encrypt(self.api_key)
+            self.api_secret = codec.encrypt(self.api_secret)
             if self.passphrase:
-                self.passphrase = fernet.encrypt(self.passphrase.encode()).decode()
+                self.passphrase = codec.encrypt(self.passphrase)
         super().save(*args, **kwargs)
 
     def get_api_key(self):
         """암호화된 API 키 복호화"""
-        fernet = Fernet(settings.ENCRYPTION_KEY.encode())
-        return fernet.decrypt(self.api_key.encode()).decode()
+        return codec.decrypt(self.api_key)
 
     def get_api_secret(self):
         """암호화된 API 시크릿 복호화"""
-        fernet = Fernet(settings.ENCRYPTION_KEY.encode())
-        return fernet.decrypt(self.api_secret.encode()).decode()
+        return codec.decrypt(self.api_secret)
 
     def get_passphrase(self):
         """암호화된 패스프레이즈 복호화"""
-        if not self.passphrase:
-            return None
-        fernet = Fernet(settings.ENCRYPTION_KEY.encode())
-        return fernet.decrypt(self.passphrase.encode()).decode()
+        return codec.decrypt(self.passphrase)
 
-    @property
-    def effective_rebate_rate(self):
-        """실제 적용되는 리베이트 비율"""
-        try:
-            user_rate = UserExchangeRebateRate.objects.get(
-                user=self.user, 
-                exchange=self.exchange,
-                is_active=True
-            )
-            return user_rate.effective_rebate_rate
-        except UserExchangeRebateRate.DoesNotExist:
-            return self.exchange.base_rebate_rate
+    def get_credentials(self):
+        """복호화된 API 키/시크릿/패스프레이즈"""
+        return Credentials(self.get_api_key(), self.get_api_secret(), self.get_passphrase())
 
-    @property
-    def effective_rebate_rate_percentage(self):
-        """실제 적용되는 리베이트 비율을 퍼센트로 반환"""
-        return float(self.effective_rebate_rate) * 100
 
+class ExchangeSyncCursor(models.Model):
+    """거래소 동기화 워터마크 (스트림별 마지막으로 반영한 거래소 측 시각/ID)"""
+    STREAM_CHOICES = [
+        ('transactions', '거래 내역'),
+        ('commissions', '커미션 내역'),
+    ]
+
+    exchange_api = models.ForeignKey(ExchangeAPI, on_delete=models.CASCADE, related_name='sync_cursors')
+    stream = models.CharField(max_length=20, choices=STREAM_CHOICES)
+    last_timestamp = models.DateTimeField(null=True, blank=True)
+    last_id = models.CharField(max_length=255, blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
 
-class ReferralLink(models.Model):
+    class Meta:
+        db_table = 'exchange_sync_cursors'
+        unique_together = ['exchange_api', 'stream']
+        ordering = ['exchange_api', 'stream']
+
+    def __str__(self):
+        return f"{self.exchange_api} - {self.stream}: {self.last_timestamp}"
+
+
+class ReferralLink(EffectiveRebateRateMixin, models.Model):
     """레퍼럴 링크"""
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='referral_links')
     exchange = models.ForeignKey(Exchange, on_delete=models.CASCADE, related_name='referral_links')
@@ -165,26 +183,107 @@ class ReferralLink(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.exchange.name} Referral"
 
-    @property
-    def effective_rebate_rate(self):
-        """실제 적용되는 리베이트 비율"""
-        try:
-            user_rate = UserExchangeRebateRate.objects.get(
-                user=self.user, 
-                exchange=self.exchange,
-                is_active=True
+    @staticmethod
+    def redirect_cache_key(pk):
+        """클릭 리다이렉트용 이동 URL 캐시 키"""
+        return f'referral_link_redirect:{pk}'
+
+
+# transactions_changed 신호로 전달하는 거래 상태 필드
+TRANSACTION_STATE_FIELDS = ('user_id', 'exchange_id', 'amount', 'commission', 'created_at')
+
+
+class ReferralTransactionQuerySet(models.QuerySet):
+    INGEST_UPDATE_FIELDS = ['amount', 'commission', 'commission_rate', 'status', 'created_at']
+
+    def bulk_ingest(self, transactions, update_fields=None, batch_size=1000):
+        """transaction_id 기준으로 일괄 생성/갱신하고 (생성 수, 갱신 수) 반환
+
+        청크마다 기존 행을 한 번 조회해 ReferralLink의 conversions/total_commission
+        증분을 계산하고 UPDATE 한 번으로 반영한다. ON CONFLICT를 지원하는
+        DB(PostgreSQL, SQLite 3.24+)는 한 문장으로 upsert하고, 그 외에는
+        bulk_create/bulk_update로 나누어 처리한다.
+        """
+        update_fields = update_fields or self.INGEST_UPDATE_FIELDS
+        transactions = iter(transactions)
+        created = updated = 0
+        while True:
+            chunk = list(islice(transactions, batch_size))
+            if not chunk:
+                return created, updated
+            # 같은 문장 안에서 같은 키를 두 번 갱신할 수 없으므로 청크 내 중복은 마지막 값만 남긴다
+            chunk = list({tx.transaction_id: tx for tx in chunk}.values())
+            with transaction.atomic(using=self.db):
+                chunk_created, chunk_updated = self._ingest_chunk(chunk, update_fields)
+            created += chunk_created
+            updated += chunk_updated
+
+    def _ingest_chunk(self, chunk, update_fields):
+        existing = {
+            row['transaction_id']: row
+            for row in self.filter(
+                transaction_id__in=[tx.transaction_id for tx in chunk]
+            ).values('pk', 'transaction_id', 'referral_link_id', *TRANSACTION_STATE_FIELDS)
+        }
+
+        def quantized(field, value):
+            return Decimal(value).quantize(Decimal(1).scaleb(-self.model._meta.get_field(field).decimal_places))
+
+        counters = defaultdict(lambda: [0, Decimal(0)])
+        new, changed, rows = [], [], []
+        for tx in chunk:
+            state = {
+                'user_id': tx.user_id, 'exchange_id': tx.exchange_id, 'amount': quantized('amount', tx.amount),
+                'commission': quantized('commission', tx.commission), 'created_at': tx.created_at,
+            }
+            previous = existing.get(tx.transaction_id)
+            if previous is None:
+                counters[tx.referral_link_id][0] += 1
+                counters[tx.referral_link_id][1] += state['commission']
+                new.append(tx)
+                rows.append((None, state))
+            else:
+                # 기존 행의 레퍼럴 링크/사용자/거래소와 update_fields에 없는 필드는 유지된다
+                previous_state = {key: previous[key] for key in TRANSACTION_STATE_FIELDS}
+                state = {
+                    key: state[key] if key in update_fields else value for key, value in previous_state.items()
+                }
+                counters[previous['referral_link_id']][1] += state['commission'] - previous['commission']
+                changed.append((previous['pk'], tx))
+                rows.append((previous_state, state))
+
+        connection = transaction.get_connection(self.db)
+        if connection.features.supports_update_conflicts_with_target:
+            self.bulk_create(
+                chunk, update_conflicts=True, unique_fields=['transaction_id'],
+                update_fields=[*update_fields, 'updated_at'],
             )
-            return user_rate.effective_rebate_rate
-        except UserExchangeRebateRate.DoesNotExist:
-            return self.exchange.base_rebate_rate
-
-    @property
-    def effective_rebate_rate_percentage(self):
-        """실제 적용되는 리베이트 비율을 퍼센트로 반환"""
-        return float(self.effective_rebate_rate) * 100
+        else:
+            now = timezone.now()
+            for pk, tx in changed:
+                tx.pk, tx.updated_at = pk, now
+            self.bulk_create(new)
+            self.bulk_update([tx for _, tx in changed], [*update_fields, 'updated_at'])
+
+        counters = {link_id: delta for link_id, delta in counters.items() if delta[0] or delta[1]}
+        if counters:
+            # 청크에 포함된 링크 전체를 UPDATE 한 번으로 갱신
+            ReferralLink.objects.using(self.db).filter(pk__in=counters).update(
+                conversions=F('conversions') + Case(
+                    *(When(pk=link_id, then=Value(n)) for link_id, (n, _) in counters.items()),
+                    default=Value(0), output_field=models.IntegerField(),
+                ),
+                total_commission=F('total_commission') + Case(
+                    *(When(pk=link_id, then=Value(amount)) for link_id, (_, amount) in counters.items()),
+                    default=Value(Decimal(0)), output_field=models.DecimalField(max_digits=10, decimal_places=2),
+                ),
+                updated_at=timezone.now(),
+            )
+        transactions_changed.send(sender=self.model, rows=rows, using=self.db)
+        return len(new), len(changed)
 
 
-class ReferralTransaction(models.Model):
+class ReferralTransaction(EffectiveRebateRateMixin, models.Model):
     """레퍼럴 거래 내역"""
     STATUS_CHOICES = [
         ('pending', '대기중'),
@@ -201,30 +300,78 @@ class ReferralTransaction(models.Model):
     commission = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     commission_rate = models.DecimalField(max_digits=5, decimal_places=4, default=0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now)  # 동기화 시 거래소 측 발생 시각
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ReferralTransactionQuerySet.as_manager()
+
     class Meta:
         db_table = 'referral_transactions'
         ordering = ['-created_at']
+        indexes = [
+            # 사용자별 (created_at, id) 키셋 페이지네이션
+            models.Index(fields=['user', '-created_at', '-id'], name='referral_tx_user_created_idx'),
+            # 사용자의 거래소별 집계 (user_exchange_stats, 마지막 거래 시각)
+            models.Index(fields=['user', 'exchange', '-created_at'], name='referral_tx_user_exchange_idx'),
+            # 전체 거래의 일별 롤업 구간 조회
+            models.Index(fields=['created_at'], name='referral_tx_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.exchange.name} - {self.transaction_id}"
 
-    @property
-    def effective_rebate_rate(self):
-        """실제 적용되는 리베이트 비율"""
-        try:
-            user_rate = UserExchangeRebateRate.objects.get(
-                user=self.user, 
-                exchange=self.exchange,
-                is_active=True
-            )
-            return user_rate.effective_rebate_rate
-        except UserExchangeRebateRate.DoesNotExist:
-            return self.exchange.base_rebate_rate
-
     @property
     def calculated_rebate_amount(self):
         """계산된 리베이트 금액"""
         return self.commission * self.effective_rebate_rate
+
+
+@receiver([post_save, post_delete], sender=UserExchangeRebateRate)
+def invalidate_user_rebate_rate(sender, instance, **kwargs):
+    """사용자별 리베이트 비율 변경 시 캐시 무효화"""
+    user_id, exchange_id = instance.user_id, instance.exchange_id
+    transaction.on_commit(lambda: rebate_rate_cache.invalidate(user_id, exchange_id))
+
+
+@receiver([post_save, post_delete], sender=Exchange)
+def invalidate_exchange_rebate_rates(sender, instance, **kwargs):
+    """거래소 기본 비율 변경 시 전체 리베이트 비율 캐시 무효화"""
+    transaction.on_commit(rebate_rate_cache.invalidate_all)
+
+
+@receiver([post_save, post_delete], sender=ReferralLink)
+def invalidate_referral_redirect(sender, instance, **kwargs):
+    """레퍼럴 링크 변경 시 리다이렉트 URL 캐시 무효화"""
+    key = ReferralLink.redirect_cache_key(instance.pk)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+@receiver(post_save, sender=Exchange)
+def invalidate_exchange_referral_redirects(sender, instance, **kwargs):
+    """거래소 도메인 변경 시 해당 거래소 링크의 리다이렉트 URL 캐시 무효화"""
+    keys = [ReferralLink.redirect_cache_key(pk) for pk in instance.referral_links.values_list('pk', flat=True)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _transaction_state(pk):
+    return ReferralTransaction.objects.filter(pk=pk).values(*TRANSACTION_STATE_FIELDS).first()
+
+
+@receiver(pre_save, sender=ReferralTransaction)
+@receiver(pre_delete, sender=ReferralTransaction)
+def remember_transaction_state(sender, instance, raw=False, **kwargs):
+    """변경 전 거래 상태 보관 (transactions_changed 신호용)"""
+    instance._previous_state = _transaction_state(instance.pk) if instance.pk and not raw else None
+
+
+@receiver(post_save, sender=ReferralTransaction)
+def send_transaction_saved(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        rows = [(instance._previous_state, _transaction_state(instance.pk))]
+        transactions_changed.send(sender=sender, rows=rows, using=using)
+
+
+@receiver(post_delete, sender=ReferralTransaction)
+def send_transaction_deleted(sender, instance, using=None, **kwargs):
+    transactions_changed.send(sender=sender, rows=[(instance._previous_state, None)], using=using)
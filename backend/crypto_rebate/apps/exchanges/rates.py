@@ -0,0 +1,239 @@
+"""
+리베이트 비율 조회 헬퍼
+
+(user, exchange) 쌍의 커스텀 리베이트 비율을 한 번의 쿼리로 읽어
+목록 직렬화 시 행마다 발생하던 UserExchangeRebateRate 조회를 제거한다.
+조회 결과는 2단계 캐시(프로세스 내 LRU + 공유 캐시)에 보관한다.
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class RebateRateCache:
+    """(user_id, exchange_id) 키의 실제 리베이트 비율 2단계 캐시
+
+    1단계는 TTL이 짧은 프로세스 내 LRU, 2단계는 CACHES 설정의 공유 캐시(Redis)다.
+    거래소 기본 비율이 바뀌면 공유 캐시의 epoch를 올려 전체 키를 무효화한다.
+    다른 프로세스의 1단계 캐시는 최대 LOCAL_TTL 동안 이전 값을 볼 수 있다.
+
+    DB를 읽은 뒤 저장하기 전에 무효화되면 이전 값으로 덮어쓰지 않도록, 채우기는 읽기 전에 받은
+    fill_token()의 epoch로 add만 하고 개별 무효화는 키를 지우는 대신 INVALIDATED_TTL 동안
+    무효화 표시를 남긴다.
+    """
+
+    EPOCH_KEY = 'rebate_rate:epoch'
+    INVALIDATED = 'invalidated'
+
+    def __init__(self):
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0  # 이 프로세스에서 무효화할 때마다 증가
+        self._stats = Counter()
+
+    @property
+    def config(self):
+        return getattr(settings, 'REBATE_RATE_CACHE', {})
+
+    @property
+    def shared(self):
+        return caches[self.config.get('CACHE_ALIAS', 'default')]
+
+    def _shared_key(self, user_id, exchange_id):
+        return f'rebate_rate:{user_id}:{exchange_id}'
+
+    def _epoch(self):
+        return self.shared.get(self.EPOCH_KEY, 1)
+
+    def get_many(self, pairs):
+        """캐시에 있는 비율만 {pair: rate} 형태로 반환"""
+        pairs = set(pairs)
+        found = {}
+        now = time.monotonic()
+
+        with self._lock:
+            for pair in pairs:
+                entry = self._local.get(pair)
+                if entry is None:
+                    continue
+                expires_at, rate = entry
+                if expires_at < now:
+                    del self._local[pair]
+                    continue
+                self._local.move_to_end(pair)
+                found[pair] = rate
+            self._stats['local_hits'] += len(found)
+
+        missing = pairs - found.keys()
+        if not missing:
+            return found
+
+        keys = {self._shared_key(*pair): pair for pair in missing}
+        shared_found = {
+            keys[key]: rate
+            for key, rate in self.shared.get_many(list(keys), version=self._epoch()).items()
+            if rate != self.INVALIDATED
+        }
+        with self._lock:
+            self._store_local(shared_found)
+        found.update(shared_found)
+
+        with self._lock:
+            self._stats['shared_hits'] += len(shared_found)
+            self._stats['misses'] += len(missing) - len(shared_found)
+        return found
+
+    def fill_token(self):
+        """DB를 읽기 전에 받아 set_many에 넘기는 (epoch, 무효화 세대)"""
+        with self._lock:
+            generation = self._generation
+        return self._epoch(), generation
+
+    def set_many(self, rates, token):
+        """DB에서 읽은 비율을 두 단계 캐시에 저장
+
+        token을 받은 뒤 이 프로세스에서 무효화했으면 1단계에 넣지 않는다. 2단계는 token의 epoch로
+        add만 하므로 전체 무효화 뒤의 값은 읽히지 않고 개별 무효화 표시도 덮어쓰지 않는다.
+        """
+        if not rates:
+            return
+        epoch, generation = token
+        with self._lock:
+            if generation == self._generation:
+                self._store_local(rates)
+        timeout = self.config.get('SHARED_TTL', 3600)
+        for pair, rate in rates.items():
+            self.shared.add(self._shared_key(*pair), rate, timeout=timeout, version=epoch)
+
+    def _store_local(self, rates):
+        """self._lock을 잡은 상태에서 호출"""
+        expires_at = time.monotonic() + self.config.get('LOCAL_TTL', 30)
+        maxsize = self.config.get('LOCAL_MAXSIZE', 10000)
+        for pair, rate in rates.items():
+            self._local[pair] = (expires_at, rate)
+            self._local.move_to_end(pair)
+        while len(self._local) > maxsize:
+            self._local.popitem(last=False)
+
+    def invalidate(self, user_id, exchange_id):
+        """특정 사용자/거래소 비율 무효화"""
+        with self._lock:
+            self._local.pop((user_id, exchange_id), None)
+            self._generation += 1
+            self._stats['invalidations'] += 1
+        # 무효화 전에 DB를 읽은 채우기가 이전 값을 add하지 못하도록 지우지 않고 표시를 남긴다
+        self.shared.set(
+            self._shared_key(user_id, exchange_id), self.INVALIDATED,
+            timeout=self.config.get('INVALIDATED_TTL', 60), version=self._epoch()
+        )
+
+    def invalidate_all(self):
+        """거래소 기본 비율 변경 시 전체 무효화"""
+        with self._lock:
+            self._local.clear()
+            self._generation += 1
+            self._stats['invalidations'] += 1
+        if self.shared.add(self.EPOCH_KEY, 2, timeout=None):
+            return
+        try:
+            self.shared.incr(self.EPOCH_KEY)
+        except ValueError:
+            # incr 직전에 키가 만료/삭제된 경우
+            self.shared.add(self.EPOCH_KEY, 2, timeout=None)
+
+    def clear(self):
+        """로컬 캐시와 통계 초기화 (테스트/운영 도구용)"""
+        with self._lock:
+            self._local.clear()
+            self._stats.clear()
+
+    def stats(self):
+        """캐시 적중률 통계"""
+        with self._lock:
+            stats = {
+                key: self._stats[key]
+                for key in ('local_hits', 'shared_hits', 'misses', 'invalidations')
+            }
+            stats['local_size'] = len(self._local)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_ratio'] = (
+            (stats['local_hits'] + stats['shared_hits']) / lookups if lookups else 0.0
+        )
+        return stats
+
+
+rebate_rate_cache = RebateRateCache()
+
+
+class RebateRateResolver:
+    """요청 단위 리베이트 비율 조회기
+
+    페이지에 포함된 모든 (user_id, exchange_id) 쌍의 실제 비율을 캐시에서 읽고,
+    캐시에 없는 쌍의 활성 커스텀 비율만 한 번의 쿼리로 조회한 뒤
+    모델 프로퍼티가 이를 참조하도록 인스턴스에 연결한다.
+    """
+
+    def __init__(self, rates=None):
+        self._rates = dict(rates or {})
+
+    @classmethod
+    def for_pairs(cls, base_rates):
+        """{(user_id, exchange_id): 거래소 기본 비율} 에 대한 실제 비율을 한 번에 조회"""
+        from .models import UserExchangeRebateRate
+
+        rates = rebate_rate_cache.get_many(base_rates)
+        missing = base_rates.keys() - rates.keys()
+        if not missing:
+            return cls(rates)
+
+        token = rebate_rate_cache.fill_token()
+
+        user_ids = {user_id for user_id, _ in missing}
+        exchange_ids = {exchange_id for _, exchange_id in missing}
+        rows = UserExchangeRebateRate.objects.filter(
+            user_id__in=user_ids,
+            exchange_id__in=exchange_ids,
+            is_active=True
+        ).values_list('user_id', 'exchange_id', 'custom_rebate_rate')
+        overrides = {(user_id, exchange_id): rate for user_id, exchange_id, rate in rows}
+
+        loaded = {pair: overrides.get(pair, base_rates[pair]) for pair in missing}
+        rebate_rate_cache.set_many(loaded, token)
+        rates.update(loaded)
+        return cls(rates)
+
+    @classmethod
+    def attach(cls, instances):
+        """인스턴스 목록에 공용 조회기를 연결하고 반환"""
+        instances = list(instances)
+        resolver = cls.for_pairs({
+            (obj.user_id, obj.exchange_id): obj.exchange.base_rebate_rate
+            for obj in instances
+        })
+        for obj in instances:
+            obj._rate_resolver = resolver
+        return resolver
+
+    def resolve(self, user_id, exchange_id, base_rate):
+        """조회된 실제 비율, 조회되지 않은 쌍이면 거래소 기본 비율"""
+        return self._rates.get((user_id, exchange_id), base_rate)
+
+
+class EffectiveRebateRateMixin:
+    """user/exchange FK를 가진 모델의 실제 리베이트 비율 프로퍼티"""
+
+    @property
+    def effective_rebate_rate(self):
+        """실제 적용되는 리베이트 비율"""
+        resolver = getattr(self, '_rate_resolver', None)
+        if resolver is None:
+            resolver = RebateRateResolver.attach([self])
+        return resolver.resolve(self.user_id, self.exchange_id, self.exchange.base_rebate_rate)
+
+    @property
+    def effective_rebate_rate_percentage(self):
+        """실제 적용되는 리베이트 비율을 퍼센트로 반환"""
+        return float(self.effective_rebate_rate) * 100
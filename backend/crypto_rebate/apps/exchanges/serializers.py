@@ -1,5 +1,17 @@
 from rest_framework import serializers
+from django.db import models
 from .models import Exchange, UserExchangeRebateRate, ExchangeAPI, ReferralLink, ReferralTransaction
+from .rates import RebateRateResolver
+
+
+class RebateRateListSerializer(serializers.ListSerializer):
+    """목록 직렬화 전에 (user, exchange) 리베이트 비율을 한 번에 조회하는 리스트 시리얼라이저"""
+    
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        instances = list(iterable)
+        RebateRateResolver.attach(instances)
+        return super().to_representation(instances)
 
 
 class ExchangeSerializer(serializers.ModelSerializer):
@@ -45,6 +57,7 @@ class ExchangeAPISerializer(serializers.ModelSerializer):
     
     class Meta:
         model = ExchangeAPI
+        list_serializer_class = RebateRateListSerializer
         fields = [
             'id', 'user', 'exchange', 'exchange_name', 'exchange_logo',
             'api_key', 'api_secret', 'passphrase', 'effective_rebate_rate_percentage',
@@ -105,6 +118,7 @@ class ReferralLinkSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = ReferralLink
+        list_serializer_class = RebateRateListSerializer
         fields = [
             'id', 'user', 'exchange', 'exchange_name', 'exchange_logo',
             'referral_code', 'referral_link', 'clicks', 'conversions',
@@ -122,6 +136,7 @@ class ReferralTransactionSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = ReferralTransaction
+        list_serializer_class = RebateRateListSerializer
         fields = [
             'id', 'user', 'exchange', 'exchange_name', 'referral_link',
             'transaction_id', 'amount', 'commission', 'commission_rate',
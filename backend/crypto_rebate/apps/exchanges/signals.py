@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# ReferralTransaction 생성/변경/삭제 후 발송 (save()/delete()와 bulk_ingest() 청크 모두)
+# rows: [(변경 전, 변경 후)] 목록, 각 값은 user_id/exchange_id/amount/commission/created_at dict
+# (신규 행의 변경 전 값과 삭제된 행의 변경 후 값은 None)
+transactions_changed = Signal()
@@ -0,0 +1,184 @@
+"""
+거래소 데이터 동기화 파이프라인
+
+거래소 API 호출(네트워크 대기)은 스레드 풀에서 동시에 수행하고,
+받아온 페이지는 큐를 통해 호출 스레드로 모아 DB에 일괄 반영한다.
+DB 쓰기는 한 스레드에서만 일어나므로 워커 스레드는 DB 연결을 사용하지 않는다.
+
+스트림별 워터마크(ExchangeSyncCursor) 이후의 기록만 요청하므로 매 실행의
+호출 수는 새로 생긴 기록 수에 비례한다. 오래된 기록부터 주는 거래소는 페이지를
+반영할 때마다 워터마크를 전진시켜 중단되더라도 이어서 동기화할 수 있고,
+최신순으로 주는 거래소는 스트림을 끝까지 반영한 뒤에만 전진시킨다.
+"""
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import transaction
+from django.utils import timezone
+
+from .adapters import SYNC_STREAMS, ExchangeAPIError, Watermark, get_adapter, sync_config
+from .credentials import codec
+from .models import ExchangeAPI, ExchangeSyncCursor, ReferralLink, ReferralTransaction
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+_STREAM_END = object()
+UPSERT_FIELDS = ['amount', 'commission', 'commission_rate', 'status', 'created_at']
+
+
+def upsert_transactions(exchange_api, referral_link, records):
+    """transaction_id 기준으로 ReferralTransaction 일괄 생성/갱신, (생성 수, 갱신 수) 반환"""
+    return ReferralTransaction.objects.bulk_ingest(
+        (
+            ReferralTransaction(
+                user_id=exchange_api.user_id,
+                exchange_id=exchange_api.exchange_id,
+                referral_link=referral_link,
+                transaction_id=record.transaction_id,
+                amount=record.amount,
+                commission=record.commission,
+                commission_rate=record.commission_rate,
+                status='confirmed',
+                created_at=record.created_at,
+            )
+            for record in records
+        ),
+        update_fields=UPSERT_FIELDS,
+    )
+
+
+def _put(pages, stop, item):
+    """중단 신호가 올 때까지 큐 적재를 재시도"""
+    while not stop.is_set():
+        try:
+            pages.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _produce(exchange_api, adapter, streams, watermarks, pages, stop):
+    """워커 스레드: 거래소 API를 페이지 단위로 조회하여 큐에 적재"""
+    try:
+        for stream in streams:
+            watermark = watermarks.get((exchange_api.pk, stream))
+            for records in adapter.fetch(stream, watermark):
+                if not _put(pages, stop, (exchange_api.pk, stream, records)):
+                    return
+            if not _put(pages, stop, (exchange_api.pk, stream, _STREAM_END)):
+                return
+    except Exception as e:
+        _put(pages, stop, (exchange_api.pk, None, e))
+    else:
+        _put(pages, stop, (exchange_api.pk, None, _DONE))
+
+
+def _page_watermark(records):
+    latest = max(records, key=lambda record: (record.created_at, record.transaction_id))
+    return Watermark(latest.created_at, latest.transaction_id)
+
+
+def _save_watermark(exchange_api_id, stream, watermark):
+    ExchangeSyncCursor.objects.update_or_create(
+        exchange_api_id=exchange_api_id, stream=stream,
+        defaults={'last_timestamp': watermark.timestamp, 'last_id': watermark.last_id}
+    )
+
+
+def run_sync(exchange_apis, sync_type='all', session=None):
+    """ExchangeAPI 목록을 동시에 동기화하고 API별 결과 dict를 반환
+
+    모든 페이지를 오류 없이 반영한 API만 last_sync가 갱신된다.
+    """
+    apis = {api.pk: api for api in exchange_apis.select_related('exchange')}
+    if not apis:
+        return {}
+
+    started_at = timezone.now()
+    streams = SYNC_STREAMS[sync_type]
+    credentials = codec.decrypt_many(ExchangeAPI.objects.filter(pk__in=list(apis)))
+    results = {
+        pk: {'exchange_api_id': pk, 'exchange': api.exchange.name, 'status': 'running',
+             'fetched': 0, 'created': 0, 'updated': 0}
+        for pk, api in apis.items()
+    }
+
+    adapters = {}
+    for pk, api in apis.items():
+        if credentials.get(pk) is None:
+            results[pk].update(status='failed', error='API 자격 증명을 복호화할 수 없습니다.')
+            continue
+        try:
+            adapters[pk] = get_adapter(api.exchange, credentials[pk], session=session)
+        except ExchangeAPIError as e:
+            results[pk].update(status='failed', error=str(e))
+
+    watermarks = {
+        (cursor.exchange_api_id, cursor.stream): Watermark(cursor.last_timestamp, cursor.last_id)
+        for cursor in ExchangeSyncCursor.objects.filter(exchange_api_id__in=list(adapters), stream__in=streams)
+    }
+    high_water = dict(watermarks)
+
+    links = {}
+    pages = queue.Queue(maxsize=sync_config('QUEUE_SIZE') or 64)
+    stop = threading.Event()
+    max_workers = sync_config('WORKERS') or 8
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='exchange-sync') as executor:
+        for pk, adapter in adapters.items():
+            executor.submit(_produce, apis[pk], adapter, streams, watermarks, pages, stop)
+
+        pending = len(adapters)
+        try:
+            while pending:
+                pk, stream, payload = pages.get()
+                result = results[pk]
+                if payload is _DONE:
+                    pending -= 1
+                    if result['status'] == 'running':
+                        result['status'] = 'success'
+                elif isinstance(payload, Exception):
+                    pending -= 1
+                    logger.warning('Exchange sync failed for ExchangeAPI %s: %s', pk, payload)
+                    result.update(status='failed', error=str(payload))
+                elif result['status'] != 'running':
+                    continue
+                elif payload is _STREAM_END:
+                    mark = high_water.get((pk, stream))
+                    if not adapters[pk].ascending and mark and mark != watermarks.get((pk, stream)):
+                        _save_watermark(pk, stream, mark)
+                else:
+                    api = apis[pk]
+                    try:
+                        if pk not in links:
+                            links[pk], _ = ReferralLink.objects.get_or_create(
+                                user_id=api.user_id, exchange_id=api.exchange_id
+                            )
+                        with transaction.atomic():
+                            created, updated = upsert_transactions(api, links[pk], payload)
+                            if payload:
+                                mark = _page_watermark(payload)
+                                current = high_water.get((pk, stream))
+                                if current is None or current.timestamp is None or mark > current:
+                                    high_water[(pk, stream)] = mark
+                                    if adapters[pk].ascending:
+                                        _save_watermark(pk, stream, mark)
+                    except Exception as e:
+                        logger.exception('Failed to store synced records for ExchangeAPI %s', pk)
+                        result.update(status='failed', error=str(e))
+                    else:
+                        result['fetched'] += len(payload)
+                        result['created'] += created
+                        result['updated'] += updated
+        finally:
+            # 소비 측이 먼저 종료되더라도 워커가 큐 적재에서 멈추지 않도록 한다
+            stop.set()
+
+    succeeded = [pk for pk, result in results.items() if result['status'] == 'success']
+    if succeeded:
+        ExchangeAPI.objects.filter(pk__in=succeeded).update(last_sync=started_at)
+    return results
@@ -0,0 +1,29 @@
+from celery import shared_task
+
+from .counters import click_counter
+from .models import ExchangeAPI
+from .sync import run_sync
+
+
+@shared_task
+def sync_exchange_data(exchange_api_id, sync_type='all'):
+    """단일 거래소 API 동기화"""
+    results = run_sync(ExchangeAPI.objects.filter(pk=exchange_api_id, is_active=True), sync_type)
+    return results.get(exchange_api_id, {'exchange_api_id': exchange_api_id, 'status': 'skipped'})
+
+
+@shared_task
+def sync_all_exchange_data(sync_type='all'):
+    """활성화된 모든 거래소 API 동기화 (Celery beat 주기 작업)"""
+    results = run_sync(ExchangeAPI.objects.filter(is_active=True), sync_type)
+    return list(results.values())
+
+
+@shared_task
+def flush_referral_clicks():
+    """Redis 버퍼에 누적된 레퍼럴 링크 클릭을 DB에 반영 (Celery beat 주기 작업)
+
+    REDIS_URL이 없으면 클릭은 각 웹 프로세스의 버퍼에 있고 그 프로세스의 스레드가 반영하므로
+    이 작업은 워커 자신의 빈 버퍼만 반영한다.
+    """
+    return click_counter.flush()
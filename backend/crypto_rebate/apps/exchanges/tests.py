@@ -1,3 +1,782 @@
-from django.test import TestCase
+import json
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from cryptography.fernet import Fernet
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from crypto_rebate.apps.rebates.models import Rebate, RebatePolicy
+
+from .adapters import BinanceAdapter, GateAdapter, OKXAdapter, reset_rate_limiters
+from .counters import click_counter
+from .credentials import Credentials, codec
+from .models import (
+    Exchange, UserExchangeRebateRate, ExchangeAPI, ExchangeSyncCursor, ReferralLink, ReferralTransaction
+)
+from .rates import rebate_rate_cache
+from .tasks import sync_all_exchange_data, sync_exchange_data
+
+User = get_user_model()
+
+TEST_ENCRYPTION_KEY = Fernet.generate_key().decode()
+
+
+class ReferralTransactionListQueryTest(TestCase):
+    """거래 내역 목록의 리베이트 비율 조회가 행 수와 무관한지 검증"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='trader', password='pass1234')
+        self.binance = Exchange.objects.create(name='Binance', base_rebate_rate=Decimal('0.4500'))
+        self.bybit = Exchange.objects.create(name='Bybit', base_rebate_rate=Decimal('0.4000'))
+        UserExchangeRebateRate.objects.create(
+            user=self.user, exchange=self.binance, custom_rebate_rate=Decimal('0.5000')
+        )
+        self.links = {
+            exchange.pk: ReferralLink.objects.create(user=self.user, exchange=exchange)
+            for exchange in (self.binance, self.bybit)
+        }
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('exchanges:transaction_list')
+
+    def _create_transactions(self, count, start=0):
+        for i in range(start, start + count):
+            exchange = self.binance if i % 2 == 0 else self.bybit
+            ReferralTransaction.objects.create(
+                user=self.user,
+                exchange=exchange,
+                referral_link=self.links[exchange.pk],
+                transaction_id=f'tx-{i}',
+                commission=Decimal('10.00'),
+            )
+
+    def _count_list_queries(self):
+        cache.clear()
+        rebate_rate_cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.data['results']
+
+    def test_query_count_independent_of_page_size(self):
+        self._create_transactions(2)
+        small_count, small_rows = self._count_list_queries()
+
+        self._create_transactions(30, start=2)
+        large_count, large_rows = self._count_list_queries()
+
+        self.assertEqual(len(small_rows), 2)
+        self.assertEqual(len(large_rows), 20)
+        self.assertEqual(small_count, large_count)
+
+    def test_custom_and_base_rates_applied(self):
+        self._create_transactions(2)
+        _, rows = self._count_list_queries()
+
+        by_exchange = {row['exchange_name']: row for row in rows}
+        self.assertEqual(Decimal(by_exchange['Binance']['effective_rebate_rate_percentage']), Decimal('50.00'))
+        self.assertEqual(Decimal(by_exchange['Binance']['calculated_rebate_amount']), Decimal('5.00'))
+        self.assertEqual(Decimal(by_exchange['Bybit']['effective_rebate_rate_percentage']), Decimal('40.00'))
+        self.assertEqual(Decimal(by_exchange['Bybit']['calculated_rebate_amount']), Decimal('4.00'))
+
+    def test_single_instance_resolves_once(self):
+        self._create_transactions(1)
+        transaction = ReferralTransaction.objects.select_related('exchange').get()
+        cache.clear()
+        rebate_rate_cache.clear()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(transaction.effective_rebate_rate, Decimal('0.5000'))
+            self.assertEqual(transaction.calculated_rebate_amount, Decimal('5.00'))
+
+
+class RebateRateCacheTest(TestCase):
+    """리베이트 비율 2단계 캐시와 시그널 기반 무효화 검증"""
+
+    def setUp(self):
+        cache.clear()
+        rebate_rate_cache.clear()
+        self.user = User.objects.create_user(username='trader', password='pass1234')
+        self.exchange = Exchange.objects.create(name='OKX', base_rebate_rate=Decimal('0.3500'))
+        self.link = ReferralLink.objects.create(user=self.user, exchange=self.exchange)
+
+    def _resolve(self):
+        link = ReferralLink.objects.select_related('exchange').get(pk=self.link.pk)
+        return link.effective_rebate_rate
+
+    def test_repeated_lookups_hit_cache(self):
+        self.assertEqual(self._resolve(), Decimal('0.3500'))
+        with self.assertNumQueries(1):  # ReferralLink 조회만 발생
+            self.assertEqual(self._resolve(), Decimal('0.3500'))
+
+        stats = rebate_rate_cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['local_hits'], 1)
+
+    def test_shared_tier_serves_after_local_eviction(self):
+        self._resolve()
+        with rebate_rate_cache._lock:
+            rebate_rate_cache._local.clear()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self._resolve(), Decimal('0.3500'))
+        self.assertEqual(rebate_rate_cache.stats()['shared_hits'], 1)
+
+    def test_user_rate_save_and_delete_invalidate(self):
+        self._resolve()
+        with self.captureOnCommitCallbacks(execute=True):
+            rate = UserExchangeRebateRate.objects.create(
+                user=self.user, exchange=self.exchange, custom_rebate_rate=Decimal('0.6000')
+            )
+        self.assertEqual(self._resolve(), Decimal('0.6000'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rate.delete()
+        self.assertEqual(self._resolve(), Decimal('0.3500'))
+
+    def test_exchange_base_rate_change_invalidates_all(self):
+        self._resolve()
+        self.exchange.base_rebate_rate = Decimal('0.2500')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.exchange.save()
+        self.assertEqual(self._resolve(), Decimal('0.2500'))
+
+    def test_fill_after_concurrent_invalidation_is_discarded(self):
+        # DB를 읽은 요청이 저장하기 전에 다른 요청이 비율을 바꾸고 무효화한 경우
+        pair = (self.user.pk, self.exchange.pk)
+        for invalidate in (lambda: rebate_rate_cache.invalidate(*pair), rebate_rate_cache.invalidate_all):
+            token = rebate_rate_cache.fill_token()
+            invalidate()
+            rebate_rate_cache.set_many({pair: Decimal('0.3500')}, token)
+            self.assertEqual(rebate_rate_cache.get_many([pair]), {})
+            rebate_rate_cache.clear()  # 다른 프로세스처럼 1단계 없이 공유 캐시만 본다
+            self.assertEqual(rebate_rate_cache.get_many([pair]), {})
+
+        # 무효화 뒤에 읽은 값은 다시 캐시된다
+        self.assertEqual(self._resolve(), Decimal('0.3500'))
+        with self.assertNumQueries(1):
+            self.assertEqual(self._resolve(), Decimal('0.3500'))
+
+    def test_update_view_invalidates(self):
+        UserExchangeRebateRate.objects.create(
+            user=self.user, exchange=self.exchange, custom_rebate_rate=Decimal('0.5000')
+        )
+        self.assertEqual(self._resolve(), Decimal('0.5000'))
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.put(
+            reverse('exchanges:update_user_rebate_rate', args=[self.exchange.pk]),
+            {'custom_rebate_rate': '0.5500'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._resolve(), Decimal('0.5500'))
+
+    def test_stats_endpoint_is_admin_only(self):
+        self._resolve()
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('exchanges:rebate_rate_cache_stats')
+        self.assertEqual(client.get(url).status_code, 403)
+
+        admin = User.objects.create_superuser(username='admin', password='pass1234')
+        client.force_authenticate(admin)
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['misses'], 1)
+        self.assertIn('hit_ratio', response.data)
+
+
+@override_settings(ENCRYPTION_KEY=TEST_ENCRYPTION_KEY, ENCRYPTION_KEY_FALLBACKS=[])
+class CredentialCodecTest(TestCase):
+    """ExchangeAPI 자격 증명 코덱 검증"""
+
+    def setUp(self):
+        self.exchange = Exchange.objects.create(name='OKX')
+        self.apis = [
+            ExchangeAPI.objects.create(
+                user=User.objects.create_user(username=f'user{i}'),
+                exchange=self.exchange,
+                api_key=f'key-{i}',
+                api_secret=f'secret-{i}',
+                passphrase=f'pass-{i}' if i % 2 == 0 else None,
+            )
+            for i in range(3)
+        ]
+
+    def test_round_trip(self):
+        api = ExchangeAPI.objects.get(pk=self.apis[0].pk)
+        self.assertNotEqual(api.api_key, 'key-0')
+        self.assertEqual(api.get_credentials(), Credentials('key-0', 'secret-0', 'pass-0'))
+        self.assertIsNone(ExchangeAPI.objects.get(pk=self.apis[1].pk).get_passphrase())
+
+    def test_fernet_built_once(self):
+        fernet = codec.fernet
+        api = ExchangeAPI.objects.get(pk=self.apis[0].pk)
+        api.get_credentials()
+        self.assertIs(codec.fernet, fernet)
+
+    def test_decrypt_many(self):
+        with self.assertNumQueries(1):
+            credentials = codec.decrypt_many(ExchangeAPI.objects.filter(exchange=self.exchange))
+        self.assertEqual(credentials[self.apis[2].pk], Credentials('key-2', 'secret-2', 'pass-2'))
+        self.assertIsNone(credentials[self.apis[1].pk].passphrase)
+
+    def test_key_rotation(self):
+        new_key = Fernet.generate_key().decode()
+        with override_settings(ENCRYPTION_KEY=new_key, ENCRYPTION_KEY_FALLBACKS=[TEST_ENCRYPTION_KEY]):
+            # 이전 키로 암호화된 값도 복호화 가능
+            self.assertEqual(ExchangeAPI.objects.get(pk=self.apis[0].pk).get_api_key(), 'key-0')
+            call_command('rotate_exchange_api_keys', stdout=StringIO())
+
+        with override_settings(ENCRYPTION_KEY=new_key, ENCRYPTION_KEY_FALLBACKS=[]):
+            credentials = codec.decrypt_many(ExchangeAPI.objects.all())
+        self.assertEqual(credentials[self.apis[0].pk], Credentials('key-0', 'secret-0', 'pass-0'))
+
+    def test_missing_key(self):
+        with override_settings(ENCRYPTION_KEY='', ENCRYPTION_KEY_FALLBACKS=[]):
+            with self.assertRaises(ImproperlyConfigured):
+                codec.encrypt('value')
+
+
+class StubExchangeServer:
+    """거래소 API를 흉내내는 로컬 HTTP 서버
+
+    routes: {path: handler(query_dict) -> (status, payload)}
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                stub.requests.append((url.path, query, dict(self.headers)))
+                handler = stub.routes.get(url.path)
+                status, payload = handler(query) if handler else (404, {})
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def calls(self, path):
+        return [query for request_path, query, _ in self.requests if request_path == path]
+
+
+def binance_pages(rows, page_size=BinanceAdapter.page_size):
+    """Binance 페이지 번호 응답 핸들러 (startTime 이후만 반환)"""
+    def handler(query):
+        if 'startTime' in query:
+            rows_since = [row for row in rows if row['updateTime'] >= int(query['startTime'])]
+        else:
+            rows_since = rows
+        page = int(query.get('page', 1))
+        total_pages = max(1, -(-len(rows_since) // page_size))
+        start = (page - 1) * page_size
+        return 200, {'status': 'OK', 'data': {
+            'page': page, 'totalPageNum': total_pages, 'data': rows_since[start:start + page_size]
+        }}
+    return handler
+
+
+def okx_pages(rows, page_size=OKXAdapter.page_size):
+    """OKX after(billId) 응답 핸들러 (최신순, begin 이후만 반환)"""
+    def handler(query):
+        rows_since = [row for row in rows if int(row['ts']) >= int(query.get('begin', 0))]
+        start = 0
+        if 'after' in query:
+            start = next(i for i, row in enumerate(rows_since) if row['billId'] == query['after']) + 1
+        return 200, {'code': '0', 'data': rows_since[start:start + page_size]}
+    return handler
+
+
+def binance_row(i, commission='1.5'):
+    return {'tranId': i, 'tradeVolume': '100', 'amount': commission,
+            'rebateRate': '0.2', 'updateTime': 1700000000000 + i * 1000}
+
+
+def okx_row(i):
+    return {'billId': str(i), 'volume': '50', 'rebate': '0.25',
+            'rebateRate': '0.3', 'ts': str(1700000000000 + i * 1000)}
+
+
+@override_settings(ENCRYPTION_KEY=TEST_ENCRYPTION_KEY, ENCRYPTION_KEY_FALLBACKS=[])
+class ExchangeSyncPipelineTest(TestCase):
+    """거래소 동기화 파이프라인을 로컬 스텁 서버로 검증"""
+
+    def setUp(self):
+        reset_rate_limiters()
+        self.user = User.objects.create_user(username='trader')
+        self.binance = Exchange.objects.create(name='Binance')
+        self.okx = Exchange.objects.create(name='OKX')
+        self.binance_api = ExchangeAPI.objects.create(
+            user=self.user, exchange=self.binance, api_key='bkey', api_secret='bsecret'
+        )
+        self.okx_api = ExchangeAPI.objects.create(
+            user=self.user, exchange=self.okx, api_key='okey', api_secret='osecret', passphrase='opass'
+        )
+        self.stub = StubExchangeServer().__enter__()
+        self.addCleanup(self.stub.__exit__)
+        self.settings_override = override_settings(EXCHANGE_SYNC={
+            'WORKERS': 4,
+            'QUEUE_SIZE': 4,
+            'TIMEOUT': 5,
+            'RATE_LIMITS': {'Binance': (1000, 10), 'OKX': (1000, 10)},
+            'BASE_URLS': {'Binance': self.stub.url, 'OKX': self.stub.url},
+        })
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.addCleanup(reset_rate_limiters)
+
+    def test_sync_pages_through_history_and_upserts(self):
+        commissions = BinanceAdapter.paths['commissions']
+        self.stub.routes[commissions] = binance_pages([binance_row(i) for i in range(250)])
+
+        result = sync_exchange_data(self.binance_api.pk, 'commissions')
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['created'], 250)
+        self.assertEqual(len(self.stub.calls(commissions)), 3)
+        self.assertEqual(ReferralTransaction.objects.filter(exchange=self.binance).count(), 250)
+
+        tx = ReferralTransaction.objects.get(transaction_id='binance-7')
+        self.assertEqual(tx.commission, Decimal('1.50'))
+        self.assertEqual(tx.created_at, datetime.fromtimestamp(1700000007, tz=dt_timezone.utc))
+        self.binance_api.refresh_from_db()
+        self.assertIsNotNone(self.binance_api.last_sync)
+
+        # 커서를 지우고 전체 재동기화하면 transaction_id 기준으로 갱신만 발생
+        ExchangeSyncCursor.objects.all().delete()
+        self.stub.routes[commissions] = binance_pages(
+            [binance_row(i, commission='2.0' if i == 7 else '1.5') for i in range(250)]
+        )
+        result = sync_exchange_data(self.binance_api.pk, 'commissions')
+        self.assertEqual((result['created'], result['updated']), (0, 250))
+        self.assertEqual(ReferralTransaction.objects.count(), 250)
+        self.assertEqual(ReferralTransaction.objects.get(transaction_id='binance-7').commission, Decimal('2.00'))
+
+    def test_requests_are_signed(self):
+        commissions = BinanceAdapter.paths['commissions']
+        self.stub.routes[commissions] = binance_pages([binance_row(1)])
+        self.stub.routes[OKXAdapter.paths['commissions']] = okx_pages([okx_row(1)])
+
+        sync_all_exchange_data('commissions')
+
+        headers = {path: headers for path, _, headers in self.stub.requests}
+        binance_query = self.stub.calls(commissions)[0]
+        self.assertEqual(headers[commissions]['X-MBX-APIKEY'], 'bkey')
+        self.assertIn('signature', binance_query)
+        okx_headers = headers[OKXAdapter.paths['commissions']]
+        self.assertEqual(okx_headers['OK-ACCESS-KEY'], 'okey')
+        self.assertEqual(okx_headers['OK-ACCESS-PASSPHRASE'], 'opass')
+
+    def test_last_sync_advances_only_on_success(self):
+        self.stub.routes[BinanceAdapter.paths['transactions']] = binance_pages([binance_row(i) for i in range(5)])
+        self.stub.routes[BinanceAdapter.paths['commissions']] = binance_pages([binance_row(i) for i in range(5, 10)])
+        okx_rows = [okx_row(i) for i in range(150)]
+        self.stub.routes[OKXAdapter.paths['transactions']] = okx_pages(okx_rows)
+        self.stub.routes[OKXAdapter.paths['commissions']] = lambda query: (500, {})
+
+        with self.assertLogs('crypto_rebate.apps.exchanges.sync', 'WARNING'):
+            results = {result['exchange']: result for result in sync_all_exchange_data('all')}
+
+        self.assertEqual(results['Binance']['status'], 'success')
+        self.assertEqual(results['Binance']['created'], 10)
+        self.assertEqual(results['OKX']['status'], 'failed')
+        self.binance_api.refresh_from_db()
+        self.okx_api.refresh_from_db()
+        self.assertIsNotNone(self.binance_api.last_sync)
+        self.assertIsNone(self.okx_api.last_sync)
+        # 실패 전까지 받은 페이지는 transaction_id 기준으로 반영되어 다음 실행 시 갱신된다
+        self.assertEqual(ReferralTransaction.objects.filter(exchange=self.okx).count(), 150)
+
+    def test_undecryptable_credentials_fail_only_that_api(self):
+        # 설정에 없는 키로 암호화된 행
+        other_key = Fernet(Fernet.generate_key())
+        ExchangeAPI.objects.filter(pk=self.okx_api.pk).update(
+            api_key=other_key.encrypt(b'okey').decode(), api_secret=other_key.encrypt(b'osecret').decode(),
+        )
+        self.stub.routes[BinanceAdapter.paths['commissions']] = binance_pages([binance_row(i) for i in range(5)])
+
+        with self.assertLogs('crypto_rebate.apps.exchanges.credentials', 'WARNING'):
+            results = {result['exchange']: result for result in sync_all_exchange_data('commissions')}
+
+        self.assertEqual(results['Binance']['status'], 'success')
+        self.assertEqual(results['Binance']['created'], 5)
+        self.assertEqual(results['OKX']['status'], 'failed')
+        self.assertIn('복호화', results['OKX']['error'])
+        self.assertFalse(self.stub.calls(OKXAdapter.paths['commissions']))
+        self.okx_api.refresh_from_db()
+        self.assertIsNone(self.okx_api.last_sync)
+
+    def test_gate_offset_paging(self):
+        adapter = GateAdapter(Credentials('k', 's', None))
+        rows = [{'id': i, 'amount': '1', 'commission_amount': '0.1', 'rate': '0.2',
+                 'commission_time': 1700000000} for i in range(GateAdapter.page_size)]
+        self.assertEqual(adapter.parse_page(rows, None), (rows, GateAdapter.page_size))
+        self.assertEqual(adapter.parse_page(rows[:3], 100), (rows[:3], None))
+
+    def test_incremental_sync_fetches_only_new_records(self):
+        commissions = BinanceAdapter.paths['commissions']
+        rows = [binance_row(i) for i in range(100000)]
+        self.stub.routes[commissions] = binance_pages(rows, page_size=1000)
+
+        with override_settings(EXCHANGE_SYNC={**settings.EXCHANGE_SYNC, 'PAGE_SIZES': {'Binance': 1000}}):
+            result = sync_exchange_data(self.binance_api.pk, 'commissions')
+            self.assertEqual(result['created'], 100000)
+            self.assertEqual(len(self.stub.calls(commissions)), 100)
+
+            cursor = ExchangeSyncCursor.objects.get(exchange_api=self.binance_api, stream='commissions')
+            self.assertEqual(cursor.last_id, 'binance-99999')
+            self.assertEqual(cursor.last_timestamp, datetime.fromtimestamp(1700099999, tz=dt_timezone.utc))
+
+            # 새 기록 50건만 추가되면 한 페이지만 요청하고 기존 기록은 다시 쓰지 않는다
+            rows.extend(binance_row(i) for i in range(100000, 100050))
+            self.stub.requests.clear()
+            result = sync_exchange_data(self.binance_api.pk, 'commissions')
+            self.assertEqual((result['fetched'], result['created'], result['updated']), (50, 50, 0))
+            self.assertEqual(len(self.stub.calls(commissions)), 1)
+            self.assertEqual(self.stub.calls(commissions)[0]['startTime'], '1700099999000')
+            self.assertEqual(ReferralTransaction.objects.count(), 100050)
+
+    def test_streams_keep_separate_cursors(self):
+        self.stub.routes[BinanceAdapter.paths['transactions']] = binance_pages([binance_row(i) for i in range(5)])
+        self.stub.routes[BinanceAdapter.paths['commissions']] = binance_pages([binance_row(i) for i in range(5, 10)])
+
+        sync_exchange_data(self.binance_api.pk, 'all')
+
+        cursors = dict(ExchangeSyncCursor.objects.filter(exchange_api=self.binance_api).values_list('stream', 'last_id'))
+        self.assertEqual(cursors, {'transactions': 'binance-4', 'commissions': 'binance-9'})
+
+        self.stub.requests.clear()
+        sync_exchange_data(self.binance_api.pk, 'transactions')
+        self.assertEqual(self.stub.calls(BinanceAdapter.paths['transactions'])[0]['startTime'], '1700000004000')
+        self.assertEqual(self.stub.calls(BinanceAdapter.paths['commissions']), [])
+
+    def test_resume_after_failure(self):
+        commissions = BinanceAdapter.paths['commissions']
+        rows = [binance_row(i) for i in range(250)]
+        pages = binance_pages(rows)
+
+        def fail_on_third_page(query):
+            if query.get('page') == '3':
+                return 500, {}
+            return pages(query)
+
+        self.stub.routes[commissions] = fail_on_third_page
+        with self.assertLogs('crypto_rebate.apps.exchanges.sync', 'WARNING'):
+            result = sync_exchange_data(self.binance_api.pk, 'commissions')
+        self.assertEqual(result['status'], 'failed')
+        # 반영된 페이지까지 워터마크가 전진한다
+        cursor = ExchangeSyncCursor.objects.get(exchange_api=self.binance_api, stream='commissions')
+        self.assertEqual(cursor.last_id, 'binance-199')
+
+        self.stub.routes[commissions] = pages
+        self.stub.requests.clear()
+        result = sync_exchange_data(self.binance_api.pk, 'commissions')
+        self.assertEqual((result['status'], result['created']), ('success', 50))
+        self.assertEqual(len(self.stub.calls(commissions)), 1)
+        self.assertEqual(ReferralTransaction.objects.count(), 250)
+
+    def test_descending_stream_advances_only_at_stream_end(self):
+        commissions = OKXAdapter.paths['commissions']
+        rows = [okx_row(i) for i in reversed(range(150))]
+        self.stub.routes[commissions] = okx_pages(rows)
+
+        sync_exchange_data(self.okx_api.pk, 'commissions')
+        cursor = ExchangeSyncCursor.objects.get(exchange_api=self.okx_api, stream='commissions')
+        self.assertEqual(cursor.last_id, 'okx-149')
+
+        rows.insert(0, okx_row(150))
+        self.stub.requests.clear()
+        result = sync_exchange_data(self.okx_api.pk, 'commissions')
+        self.assertEqual((result['fetched'], result['created']), (1, 1))
+        self.assertEqual(len(self.stub.calls(commissions)), 1)
+
+
+class ReferralTransactionBulkIngestTest(TestCase):
+    """ReferralTransaction 일괄 upsert와 레퍼럴 링크 집계"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ingest')
+        self.exchange = Exchange.objects.create(name='Binance')
+        self.other_exchange = Exchange.objects.create(name='OKX')
+        self.link = ReferralLink.objects.create(user=self.user, exchange=self.exchange)
+        self.other_link = ReferralLink.objects.create(user=self.user, exchange=self.other_exchange)
+
+    def _transactions(self, link, ids, commission='1.25'):
+        return [
+            ReferralTransaction(
+                user=self.user, exchange=link.exchange, referral_link=link,
+                transaction_id=f'{link.exchange.name}-{i}', amount=Decimal('100'),
+                commission=Decimal(commission), commission_rate=Decimal('0.2'), status='confirmed',
+            )
+            for i in ids
+        ]
+
+    def _assert_ingest(self):
+        rows = self._transactions(self.link, range(30)) + self._transactions(self.other_link, range(10))
+        self.assertEqual(ReferralTransaction.objects.bulk_ingest(rows, batch_size=16), (40, 0))
+
+        self.link.refresh_from_db()
+        self.other_link.refresh_from_db()
+        self.assertEqual((self.link.conversions, self.link.total_commission), (30, Decimal('37.50')))
+        self.assertEqual((self.other_link.conversions, self.other_link.total_commission), (10, Decimal('12.50')))
+
+        # 재수집 시 커미션 변경분만 집계에 반영되고 전환 수는 그대로
+        rows = self._transactions(self.link, range(20, 40), commission='2.00')
+        self.assertEqual(ReferralTransaction.objects.bulk_ingest(rows, batch_size=16), (10, 10))
+
+        self.link.refresh_from_db()
+        self.assertEqual((self.link.conversions, self.link.total_commission), (40, Decimal('65.00')))
+        self.assertEqual(ReferralTransaction.objects.count(), 50)
+        self.assertEqual(
+            ReferralTransaction.objects.get(transaction_id='Binance-25').commission, Decimal('2.00')
+        )
+
+    def test_upsert_on_conflict(self):
+        self.assertTrue(connection.features.supports_update_conflicts_with_target)
+        self._assert_ingest()
+
+    def test_fallback_without_on_conflict(self):
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            self._assert_ingest()
+
+    def test_link_counters_updated_once_per_chunk(self):
+        rows = self._transactions(self.link, range(300)) + self._transactions(self.other_link, range(300))
+        with CaptureQueriesContext(connection) as ctx:
+            ReferralTransaction.objects.bulk_ingest(rows, batch_size=200)
+        link_updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "referral_links"')]
+        self.assertEqual(len(link_updates), 3)
+        # 사용자 일별 집계도 청크마다 UPDATE 한 번 (청크당 쿼리 수는 행 수와 무관)
+        stats_updates = [
+            q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "analytics_userdailystatistics"')
+        ]
+        self.assertEqual(len(stats_updates), 3)
+        self.assertLess(len(ctx.captured_queries), 60)
+
+
+@override_settings(REDIS_URL='', REFERRAL_CLICKS={'SHARDS': 8, 'FLUSH_INTERVAL': 3600, 'BACKGROUND': False})
+class ReferralClickCounterTest(TestCase):
+    """레퍼럴 링크 클릭 버퍼와 리다이렉트 API"""
+
+    def setUp(self):
+        cache.clear()
+        click_counter.reset()
+        self.addCleanup(click_counter.reset)
+        self.user = User.objects.create_user(username='clicker')
+        self.exchange = Exchange.objects.create(name='Binance', website='https://www.binance.com')
+        self.link = ReferralLink.objects.create(
+            user=self.user, exchange=self.exchange, referral_link='https://accounts.binance.com/register?ref=ABC'
+        )
+        self.url = reverse('exchanges:referral_redirect', args=[self.link.pk])
+
+    def test_concurrent_clicks_are_not_lost(self):
+        threads, clicks_per_thread = 16, 5000
+        start = threading.Barrier(threads + 1)
+
+        def click():
+            start.wait()
+            for _ in range(clicks_per_thread):
+                click_counter.record(self.link.pk)
+
+        workers = [threading.Thread(target=click) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        start.wait()
+        # 클릭이 들어오는 중에도 반복해서 DB에 반영
+        flushed = 0
+        while any(worker.is_alive() for worker in workers):
+            flushed += click_counter.flush()
+        for worker in workers:
+            worker.join()
+        flushed += click_counter.flush()
+
+        self.link.refresh_from_db()
+        self.assertEqual(flushed, threads * clicks_per_thread)
+        self.assertEqual(self.link.clicks, threads * clicks_per_thread)
+
+    def test_redirect_records_click(self):
+        client = APIClient()
+        for _ in range(3):
+            response = client.get(self.url)
+            self.assertEqual(response.status_code, 302)
+            self.assertEqual(response['Location'], self.link.referral_link)
+
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.clicks, 0)  # 아직 버퍼에만 있음
+        self.assertEqual(click_counter.flush(), 3)
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.clicks, 3)
+
+    def test_redirect_target_cache_invalidated(self):
+        client = APIClient()
+        client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.link.is_active = False
+            self.link.save()
+        self.assertEqual(client.get(self.url).status_code, 404)
+        self.assertEqual(client.get(reverse('exchanges:referral_redirect', args=[0])).status_code, 404)
+
+    def test_redirect_only_to_exchange_domains(self):
+        client = APIClient()
+        for url in [
+            'https://evil.example/register?ref=ABC',
+            'https://binance.com.evil.example/register',
+            'https://evil.example\\@binance.com/register',
+            'javascript://binance.com/%0aalert(1)',
+        ]:
+            with self.captureOnCommitCallbacks(execute=True):
+                ReferralLink.objects.filter(pk=self.link.pk).update(referral_link=url)
+                cache.delete(ReferralLink.redirect_cache_key(self.link.pk))
+            self.assertEqual(client.get(self.url).status_code, 404, url)
+        self.assertEqual(click_counter.flush(), 0)
+
+        # 거래소에 허용 도메인을 추가하면 (캐시 무효화 후) 이동
+        with self.captureOnCommitCallbacks(execute=True):
+            ReferralLink.objects.filter(pk=self.link.pk).update(referral_link='https://www.binance.tr/join?ref=ABC')
+            cache.delete(ReferralLink.redirect_cache_key(self.link.pk))
+        self.assertEqual(client.get(self.url).status_code, 404)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.exchange.referral_domains = ['binance.tr']
+            self.exchange.save()
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], 'https://www.binance.tr/join?ref=ABC')
+
+    def test_failed_flush_keeps_clicks(self):
+        click_counter.record(self.link.pk)
+        with mock.patch('django.db.models.query.QuerySet.update', side_effect=RuntimeError('db down')):
+            with self.assertRaises(RuntimeError):
+                click_counter.flush()
+        self.assertEqual(click_counter.flush(), 1)
+
+
+@override_settings(REDIS_URL='', REFERRAL_CLICKS={'SHARDS': 8, 'FLUSH_INTERVAL': 0.05})
+class ReferralClickCounterBackgroundTest(TransactionTestCase):
+    """프로세스 내 버퍼의 반영 스레드 검증 (클릭 기록은 DB에 쓰지 않음)"""
+
+    def setUp(self):
+        click_counter.reset()
+        self.addCleanup(click_counter.reset)
+        self.link = ReferralLink.objects.create(
+            user=User.objects.create_user(username='clicker'), exchange=Exchange.objects.create(name='Binance')
+        )
+
+    def wait_for_clicks(self, clicks):
+        deadline = time.monotonic() + 5
+        while ReferralLink.objects.get(pk=self.link.pk).clicks != clicks and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(ReferralLink.objects.get(pk=self.link.pk).clicks, clicks)
+
+    def test_flush_thread_stores_clicks_without_further_requests(self):
+        with self.assertNumQueries(0):
+            click_counter.record(self.link.pk)
+            click_counter.record(self.link.pk)
+        self.wait_for_clicks(2)
+
+        # 반영에 실패한 클릭은 로그를 남기고 다음 반영에 다시 시도한다
+        with mock.patch('django.db.models.query.QuerySet.update', side_effect=RuntimeError('db down')):
+            with self.assertLogs('crypto_rebate.apps.exchanges.counters', 'ERROR'):
+                click_counter.record(self.link.pk)
+                time.sleep(0.2)
+        self.wait_for_clicks(3)
+
+
+@override_settings(ENCRYPTION_KEY=TEST_ENCRYPTION_KEY, ENCRYPTION_KEY_FALLBACKS=[])
+class UserExchangeStatsQueryTest(TestCase):
+    """거래소별 통계가 연동 거래소 수와 무관한 쿼리 수로 계산되는지 검증"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='stats')
+        self.policy = RebatePolicy.objects.create(name='기본', description='', policy_type='percentage')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('exchanges:user_stats')
+
+    def _link_exchange(self, name, transactions):
+        exchange = Exchange.objects.create(name=name, base_rebate_rate=Decimal('0.4000'))
+        ExchangeAPI.objects.create(user=self.user, exchange=exchange, api_key='k', api_secret='s')
+        link = ReferralLink.objects.create(user=self.user, exchange=exchange)
+        for i in range(transactions):
+            tx = ReferralTransaction.objects.create(
+                user=self.user, exchange=exchange, referral_link=link,
+                transaction_id=f'{name}-{i}', commission=Decimal('10.00'),
+            )
+            Rebate.objects.create(
+                user=self.user, referral_transaction=tx, policy=self.policy,
+                amount=Decimal('4'), currency='USDT', status='paid' if i % 2 == 0 else 'pending',
+            )
+        return exchange
+
+    def _get_stats(self):
+        cache.clear()
+        rebate_rate_cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), {row['exchange_name']: row for row in response.data}
+
+    def test_query_count_independent_of_exchange_count(self):
+        binance = self._link_exchange('Binance', 3)
+        UserExchangeRebateRate.objects.create(user=self.user, exchange=binance, custom_rebate_rate=Decimal('0.5'))
+        one_count, stats = self._get_stats()
+
+        self.assertEqual(stats['Binance']['total_commission'], Decimal('30.00'))
+        self.assertEqual(stats['Binance']['total_rebate'], Decimal('8'))
+        self.assertEqual(stats['Binance']['transaction_count'], 3)
+        self.assertEqual(
+            stats['Binance']['last_transaction'],
+            ReferralTransaction.objects.filter(exchange=binance).latest('created_at').created_at,
+        )
+        self.assertEqual(stats['Binance']['effective_rebate_rate_percentage'], 50.0)
+
+        for name in ('Bybit', 'OKX', 'Gate.io'):
+            self._link_exchange(name, 2)
+        self._link_exchange('Bitget', 0)
+        many_count, stats = self._get_stats()
+
+        self.assertEqual(one_count, many_count)
+        self.assertEqual(len(stats), 5)
+        self.assertEqual(stats['OKX']['total_rebate'], Decimal('4'))
+        self.assertEqual(stats['OKX']['effective_rebate_rate_percentage'], 40.0)
+        self.assertEqual(
+            (stats['Bitget']['total_commission'], stats['Bitget']['transaction_count'],
+             stats['Bitget']['last_transaction']),
+            (0, 0, None),
+        )
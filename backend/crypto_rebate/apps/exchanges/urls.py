@@ -13,6 +13,7 @@ urlpatterns = [
     path('rebate-rates/<int:pk>/', views.UserExchangeRebateRateDetailView.as_view(), name='user_rebate_rate_detail'),
     path('rebate-rates/create/', views.create_user_rebate_rate, name='create_user_rebate_rate'),
     path('rebate-rates/<int:exchange_id>/update/', views.update_user_rebate_rate, name='update_user_rebate_rate'),
+    path('rebate-rates/cache-stats/', views.rebate_rate_cache_stats, name='rebate_rate_cache_stats'),
     
     # 사용자 거래소 API 연동
     path('api/list/', views.UserExchangeAPIListView.as_view(), name='user_api_list'),
@@ -21,6 +22,7 @@ urlpatterns = [
     # 레퍼럴 링크
     path('referral/list/', views.ReferralLinkListView.as_view(), name='referral_list'),
     path('referral/detail/<int:pk>/', views.ReferralLinkDetailView.as_view(), name='referral_detail'),
+    path('referral/<int:pk>/go/', views.referral_redirect, name='referral_redirect'),
     
     # 거래 내역
     path('transaction/list/', views.ReferralTransactionListView.as_view(), name='transaction_list'),
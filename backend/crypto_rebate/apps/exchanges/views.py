@@ -1,12 +1,17 @@
+from django.http import Http404, HttpResponseRedirect
 from django.shortcuts import render
 from rest_framework import status, generics, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Sum, Count
+from django.db.models import Sum, Count, Max
 from django.utils import timezone
 from datetime import datetime, timedelta
+from crypto_rebate.pagination import KeysetPagination
+
 from .models import Exchange, UserExchangeRebateRate, ExchangeAPI, ReferralLink, ReferralTransaction
+from .counters import click_counter, get_redirect_target
+from .rates import RebateRateResolver, rebate_rate_cache
 from .serializers import (
     ExchangeSerializer, UserExchangeRebateRateSerializer, ExchangeAPISerializer, 
     ExchangeAPICreateSerializer, ReferralLinkSerializer, ReferralTransactionSerializer,
@@ -53,7 +58,7 @@ class UserExchangeAPIListView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return ExchangeAPI.objects.filter(user=self.request.user)
+        return ExchangeAPI.objects.filter(user=self.request.user).select_related('exchange')
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -76,7 +81,7 @@ class ReferralLinkListView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return ReferralLink.objects.filter(user=self.request.user)
+        return ReferralLink.objects.filter(user=self.request.user).select_related('exchange')
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -95,9 +100,10 @@ class ReferralTransactionListView(generics.ListAPIView):
     """레퍼럴 거래 내역 목록 API"""
     serializer_class = ReferralTransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
-        return ReferralTransaction.objects.filter(user=self.request.user).order_by('-created_at')
+        return ReferralTransaction.objects.filter(user=self.request.user).select_related('exchange')
 
 
 class ReferralTransactionDetailView(generics.RetrieveAPIView):
@@ -193,38 +199,44 @@ def user_exchange_stats(request):
     """사용자 거래소별 통계 API"""
     user = request.user
     
-    # 사용자의 거래소 API 목록
-    exchange_apis = ExchangeAPI.objects.filter(user=user, is_active=True)
+    # 사용자의 거래소 API 목록 (리베이트 비율은 한 번에 조회)
+    exchange_apis = list(ExchangeAPI.objects.filter(user=user, is_active=True).select_related('exchange'))
+    if not exchange_apis:
+        return Response([], status=status.HTTP_200_OK)
+    RebateRateResolver.attach(exchange_apis)
+    exchange_ids = [api.exchange_id for api in exchange_apis]
+    
+    # 거래소별 총 수수료, 거래 수, 마지막 거래
+    transaction_stats = {
+        row['exchange_id']: row
+        for row in ReferralTransaction.objects.filter(
+            user=user, exchange_id__in=exchange_ids
+        ).order_by().values('exchange_id').annotate(
+            total_commission=Sum('commission'),
+            transaction_count=Count('id'),
+            last_transaction=Max('created_at'),
+        )
+    }
+    
+    # 거래소별 총 페이백
+    from crypto_rebate.apps.rebates.models import Rebate
+    rebate_totals = dict(
+        Rebate.objects.filter(
+            user=user, status='paid', referral_transaction__exchange_id__in=exchange_ids
+        ).order_by().values('referral_transaction__exchange_id').annotate(
+            total=Sum('amount')
+        ).values_list('referral_transaction__exchange_id', 'total')
+    )
     
     stats = []
     for api in exchange_apis:
-        # 총 수수료
-        total_commission = ReferralTransaction.objects.filter(
-            user=user, exchange=api.exchange
-        ).aggregate(total=Sum('commission'))['total'] or 0
-        
-        # 총 페이백
-        from crypto_rebate.apps.rebates.models import Rebate
-        total_rebate = Rebate.objects.filter(
-            user=user, exchange=api.exchange, status='paid'
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        # 거래 수
-        transaction_count = ReferralTransaction.objects.filter(
-            user=user, exchange=api.exchange
-        ).count()
-        
-        # 마지막 거래
-        last_transaction = ReferralTransaction.objects.filter(
-            user=user, exchange=api.exchange
-        ).order_by('-created_at').first()
-        
+        transactions = transaction_stats.get(api.exchange_id, {})
         stats.append({
             'exchange_name': api.exchange.name,
-            'total_commission': total_commission,
-            'total_rebate': total_rebate,
-            'transaction_count': transaction_count,
-            'last_transaction': last_transaction.created_at if last_transaction else None,
+            'total_commission': transactions.get('total_commission') or 0,
+            'total_rebate': rebate_totals.get(api.exchange_id) or 0,
+            'transaction_count': transactions.get('transaction_count', 0),
+            'last_transaction': transactions.get('last_transaction'),
             'is_active': api.is_active,
             'effective_rebate_rate_percentage': api.effective_rebate_rate_percentage
         })
@@ -283,14 +295,10 @@ def sync_exchange_data(request):
         exchange_api = serializer.validated_data['exchange_api']
         sync_type = serializer.validated_data['sync_type']
         
-        # 실제 동기화 로직 (여기서는 시뮬레이션)
         try:
             # Celery 태스크로 비동기 처리
-            from crypto_rebate.celery import app
-            task = app.send_task(
-                'crypto_rebate.apps.exchanges.tasks.sync_exchange_data',
-                args=[exchange_api.id, sync_type]
-            )
+            from .tasks import sync_exchange_data as sync_task
+            task = sync_task.delay(exchange_api.id, sync_type)
             
             return Response({
                 'success': True,
@@ -315,42 +323,22 @@ def exchange_dashboard(request):
     """거래소 대시보드 API"""
     user = request.user
     
-    # 활성 거래소 수
-    active_exchanges = ExchangeAPI.objects.filter(user=user, is_active=True).count()
-    
-    # 총 수수료
-    total_commission = ReferralTransaction.objects.filter(user=user).aggregate(
-        total=Sum('commission')
-    )['total'] or 0
-    
-    # 총 페이백
-    from crypto_rebate.apps.rebates.models import Rebate
-    total_rebate = Rebate.objects.filter(user=user, status='paid').aggregate(
-        total=Sum('amount')
-    )['total'] or 0
-    
-    # 이번 달 통계
-    current_month = datetime.now().month
-    monthly_commission = ReferralTransaction.objects.filter(
-        user=user, created_at__month=current_month
-    ).aggregate(total=Sum('commission'))['total'] or 0
-    
-    monthly_rebate = Rebate.objects.filter(
-        user=user, status='paid', created_at__month=current_month
-    ).aggregate(total=Sum('amount'))['total'] or 0
+    # 활성 거래소 수, 총/이번 달 수수료와 페이백은 스냅샷에서 읽는다
+    from crypto_rebate.apps.rebates.models import UserDashboardSnapshot
+    snapshot = UserDashboardSnapshot.for_user(user)
     
     # 최근 거래 내역
     recent_transactions = ReferralTransaction.objects.filter(
         user=user
-    ).order_by('-created_at')[:10]
+    ).select_related('exchange').order_by('-created_at')[:10]
     
     return Response({
         'statistics': {
-            'active_exchanges': active_exchanges,
-            'total_commission': total_commission,
-            'total_rebate': total_rebate,
-            'monthly_commission': monthly_commission,
-            'monthly_rebate': monthly_rebate
+            'active_exchanges': len(snapshot.active_exchanges),
+            'total_commission': snapshot.total_commission,
+            'total_rebate': snapshot.total_earnings,
+            'monthly_commission': snapshot.this_month_commission,
+            'monthly_rebate': snapshot.this_month_earnings
         },
         'recent_transactions': ReferralTransactionSerializer(
             recent_transactions, many=True
@@ -375,6 +363,7 @@ def update_user_rebate_rate(request, exchange_id):
     serializer = UserRebateRateUpdateSerializer(user_rate, data=request.data, partial=True)
     if serializer.is_valid():
         serializer.save()
+        rebate_rate_cache.invalidate(user_rate.user_id, user_rate.exchange_id)
         return Response({
             'success': True,
             'message': '리베이트 비율이 업데이트되었습니다.',
@@ -405,3 +394,22 @@ def create_user_rebate_rate(request):
         }, status=status.HTTP_201_CREATED)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def rebate_rate_cache_stats(request):
+    """리베이트 비율 캐시 적중률 통계 API (관리자 전용)"""
+    return Response(rebate_rate_cache.stats(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def referral_redirect(request, pk):
+    """레퍼럴 링크 클릭 기록 후 거래소 가입 페이지로 이동 (공개)"""
+    target = get_redirect_target(pk)
+    if target is None:
+        raise Http404
+    click_counter.record(pk)
+    return HttpResponseRedirect(target)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import RebatePolicy, Rebate, RebatePayment, UserRebateSummary
+from .models import RebatePolicy, Rebate, RebatePayment, UserRebateSummary, UserDashboardSnapshot
 
 
 @admin.register(RebatePolicy)
@@ -75,3 +75,11 @@ class UserRebateSummaryAdmin(admin.ModelAdmin):
     search_fields = ('user__username', 'user__email')
     readonly_fields = ('updated_at',)
     ordering = ('-updated_at',)
+
+
+@admin.register(UserDashboardSnapshot)
+class UserDashboardSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('user', 'total_earnings', 'pending_rebates', 'rebate_count', 'total_commission', 'transaction_count', 'updated_at')
+    search_fields = ('user__username', 'user__email')
+    readonly_fields = [field.name for field in UserDashboardSnapshot._meta.fields]
+    ordering = ('-updated_at',)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from crypto_rebate.apps.rebates.models import UserDashboardSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Rebuild user dashboard snapshots from the rebate and transaction tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Rebuild only this user id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        rebuilt = UserDashboardSnapshot.objects.rebuild(options['user_ids'], batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt {rebuilt} dashboard snapshots.')
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from crypto_rebate.apps.rebates.models import UserRebateSummary
+
+
+class Command(BaseCommand):
+    help = 'Compare rebate summary ledgers with the rebate and payment tables (and repair drift with --fix)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Check only this user id (repeatable)')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--fix', action='store_true', help='Overwrite drifted ledgers with recomputed values')
+
+    def handle(self, *args, **options):
+        checked, drifted = UserRebateSummary.objects.reconcile(
+            options['user_ids'], chunk_size=options['chunk_size'], fix=options['fix']
+        )
+        for user_id in drifted:
+            self.stdout.write(self.style.WARNING(f'Ledger drift for user {user_id}'))
+        action = 'repaired' if options['fix'] else 'found'
+        self.stdout.write(
+            self.style.SUCCESS(f'Checked {checked} users, {action} {len(drifted)} drifted ledgers.')
+        )
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:04
+
+import crypto_rebate.apps.rebates.models
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rebates', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDashboardSnapshot',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='dashboard_snapshot', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_earnings', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('monthly_earnings', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('pending_rebates', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('rebate_count', models.IntegerField(default=0)),
+                ('status_counts', models.JSONField(blank=True, default=dict)),
+                ('exchange_rebates', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('total_commission', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('monthly_commission', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('active_exchanges', models.JSONField(blank=True, default=list)),
+                ('month', models.DateField(default=crypto_rebate.apps.rebates.models.month_start)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'User Dashboard Snapshot',
+                'verbose_name_plural': 'User Dashboard Snapshots',
+            },
+        ),
+    ]
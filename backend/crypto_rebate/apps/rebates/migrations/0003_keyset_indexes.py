@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchanges', '0004_referraltransaction_keyset_index'),
+        ('rebates', '0002_userdashboardsnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rebate',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='rebate_user_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rebatepayment',
+            index=models.Index(fields=['-payment_date', '-id'], name='rebate_payment_date_id_idx'),
+        ),
+    ]
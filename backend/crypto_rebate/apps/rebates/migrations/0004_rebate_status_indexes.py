@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchanges', '0005_referraltransaction_user_exchange_index'),
+        ('rebates', '0003_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rebate',
+            index=models.Index(fields=['user', 'status', '-created_at'], name='rebate_user_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rebate',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'approved'])), fields=['user', '-created_at'], name='rebate_user_unpaid_idx'),
+        ),
+    ]
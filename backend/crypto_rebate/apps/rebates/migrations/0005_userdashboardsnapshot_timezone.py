@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rebates', '0004_rebate_status_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userdashboardsnapshot',
+            name='timezone',
+            field=models.CharField(blank=True, default='', max_length=63),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchanges', '0006_referraltransaction_created_index'),
+        ('rebates', '0005_userdashboardsnapshot_timezone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rebate',
+            index=models.Index(fields=['created_at'], name='rebate_created_idx'),
+        ),
+    ]
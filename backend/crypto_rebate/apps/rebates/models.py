@@ -1,6 +1,21 @@
-from django.db import models
+from collections import Counter, defaultdict
+from decimal import Decimal
+from itertools import islice
+
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth.models import User
-from crypto_rebate.apps.exchanges.models import ReferralTransaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from crypto_rebate.apps.exchanges.models import ExchangeAPI, ReferralTransaction
+from crypto_rebate.apps.exchanges.signals import transactions_changed
+from crypto_rebate.apps.users.models import UserProfile
+from crypto_rebate.periods import get_timezone, month_start, period_window
+
+from .signals import rebates_changed
 
 
 class RebatePolicy(models.Model):
@@ -29,6 +44,27 @@ class RebatePolicy(models.Model):
         verbose_name_plural = "Rebate Policies"
 
 
+class RebateQuerySet(models.QuerySet):
+    def update_status(self, status):
+        """선택된 페이백의 상태를 일괄 변경하고 rebates_changed 발송
+
+        QuerySet.update()는 post_save를 거치지 않으므로 변경 전/후 행을 직접 모아
+        대시보드 스냅샷과 페이백 원장이 함께 갱신되게 한다.
+        """
+        with transaction.atomic(using=self.db):
+            previous = {
+                row.pop('pk'): row for row in _rebate_states(self.select_for_update(of=('self',)), 'pk')
+            }
+            if not previous:
+                return 0
+            updated = self.model._base_manager.using(self.db).filter(pk__in=previous).update(
+                status=status, updated_at=timezone.now()
+            )
+            rows = [(state, {**state, 'status': status}) for state in previous.values()]
+            rebates_changed.send(sender=self.model, rows=rows, using=self.db)
+        return updated
+
+
 class Rebate(models.Model):
     REBATE_STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -36,6 +72,9 @@ class Rebate(models.Model):
         ('rejected', 'Rejected'),
         ('paid', 'Paid'),
     ]
+    # 원장 합계에서 제외되는 상태 / 아직 지급되지 않은 상태
+    UNCOUNTED_STATUSES = ('rejected',)
+    UNPAID_STATUSES = ('pending', 'approved')
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='rebates')
     referral_transaction = models.ForeignKey(ReferralTransaction, on_delete=models.CASCADE, related_name='rebates')
@@ -48,6 +87,8 @@ class Rebate(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = RebateQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.user.username} - {self.amount} {self.currency}"
 
@@ -55,6 +96,19 @@ class Rebate(models.Model):
         verbose_name = "Rebate"
         verbose_name_plural = "Rebates"
         ordering = ('-created_at',)
+        indexes = [
+            # 사용자별 (created_at, id) 키셋 페이지네이션
+            models.Index(fields=['user', '-created_at', '-id'], name='rebate_user_created_id_idx'),
+            # 사용자별 상태 필터 (히스토리 상태 필터, 지급 합계, 월 범위 집계)
+            models.Index(fields=['user', 'status', '-created_at'], name='rebate_user_status_created_idx'),
+            # 미지급 페이백만 담는 부분 인덱스 (지급 요청 가능 금액, 원장 pending_amount)
+            models.Index(
+                fields=['user', '-created_at'], name='rebate_user_unpaid_idx',
+                condition=models.Q(status__in=['pending', 'approved']),
+            ),
+            # 전체 페이백의 일별 롤업 구간 조회
+            models.Index(fields=['created_at'], name='rebate_created_idx'),
+        ]
 
 
 class RebatePayment(models.Model):
@@ -81,9 +135,115 @@ class RebatePayment(models.Model):
     class Meta:
         verbose_name = "Rebate Payment"
         verbose_name_plural = "Rebate Payments"
+        indexes = [
+            models.Index(fields=['-payment_date', '-id'], name='rebate_payment_date_id_idx'),
+        ]
+
+
+class UserRebateSummaryQuerySet(models.QuerySet):
+    LEDGER_FIELDS = ['total_rebates', 'total_paid', 'pending_amount', 'last_payment_date']
+
+    def apply_delta(self, user_id, create=True, last_payment_date=None, recompute_last_payment=False, **deltas):
+        """사용자 원장에 F() 증분 반영
+
+        원장이 없으면 원본 테이블에서 계산해 만든다(이미 반영된 변경 포함).
+        삭제 경로에서는 create=False로 호출해 삭제 중인 사용자의 원장을 만들지 않는다.
+        """
+        updates = {field: F(field) + amount for field, amount in deltas.items() if amount}
+        if last_payment_date is not None:
+            paid_at = Value(last_payment_date, output_field=models.DateTimeField())
+            updates['last_payment_date'] = Greatest(Coalesce(F('last_payment_date'), paid_at), paid_at)
+        if recompute_last_payment:
+            updates['last_payment_date'] = Subquery(
+                RebatePayment.objects.filter(rebate__user_id=OuterRef('user_id')).order_by()
+                .values('rebate__user_id').annotate(last=Max('payment_date')).values('last')
+            )
+        if not updates:
+            return
+        updates['updated_at'] = timezone.now()
+
+        with transaction.atomic(using=self.db):
+            if self.filter(user_id=user_id).update(**updates) or not create:
+                return
+            try:
+                with transaction.atomic(using=self.db):
+                    self.create(user_id=user_id, **self.expected([user_id])[user_id])
+            except IntegrityError:
+                # 다른 트랜잭션이 먼저 만든 원장에는 증분만 반영
+                self.filter(user_id=user_id).update(**updates)
+
+    def expected(self, user_ids):
+        """원본 테이블(Rebate/RebatePayment)에서 계산한 {user_id: 원장 값}"""
+        values = {
+            user_id: {'total_rebates': Decimal(0), 'total_paid': Decimal(0),
+                      'pending_amount': Decimal(0), 'last_payment_date': None}
+            for user_id in user_ids
+        }
+        for row in Rebate.objects.using(self.db).filter(user_id__in=user_ids).order_by().values('user_id').annotate(
+            total_rebates=Sum('amount', filter=~Q(status__in=Rebate.UNCOUNTED_STATUSES)),
+            pending_amount=Sum('amount', filter=Q(status__in=Rebate.UNPAID_STATUSES)),
+        ):
+            values[row['user_id']]['total_rebates'] = row['total_rebates'] or Decimal(0)
+            values[row['user_id']]['pending_amount'] = row['pending_amount'] or Decimal(0)
+        for row in RebatePayment.objects.using(self.db).filter(rebate__user_id__in=user_ids).order_by().values(
+            'rebate__user_id'
+        ).annotate(total_paid=Sum('amount'), last_payment_date=Max('payment_date')):
+            values[row['rebate__user_id']]['total_paid'] = row['total_paid']
+            values[row['rebate__user_id']]['last_payment_date'] = row['last_payment_date']
+        return values
+
+    def reconcile(self, user_ids=None, chunk_size=1000, fix=False):
+        """원장을 원본 테이블과 비교해 (검사한 사용자 수, 어긋난 user_id 목록) 반환
+
+        fix=True면 어긋난 원장을 다시 계산한 값으로 덮어쓴다. 사용자를 chunk_size 단위로 나누어
+        처리하므로 전체 사용자를 메모리에 올리지 않는다.
+        """
+        users = User.objects.using(self.db).order_by('pk').values_list('pk', flat=True)
+        if user_ids is not None:
+            users = users.filter(pk__in=list(user_ids))
+        users = users.iterator(chunk_size=chunk_size)
+        checked, drifted = 0, []
+        while True:
+            chunk = list(islice(users, chunk_size))
+            if not chunk:
+                return checked, drifted
+            with transaction.atomic(using=self.db):
+                summaries = self.filter(user_id__in=chunk)
+                if fix:
+                    # 비교와 덮어쓰기 사이에 증분이 끼어들지 않도록 잠근다
+                    summaries = summaries.select_for_update()
+                summaries = {summary.user_id: summary for summary in summaries}
+                to_create, to_update = [], []
+                for user_id, expected in self.expected(chunk).items():
+                    summary = summaries.get(user_id)
+                    if summary is None:
+                        if not any(expected.values()):
+                            continue
+                        summary = UserRebateSummary(user_id=user_id)
+                        to_create.append(summary)
+                    elif all(getattr(summary, field) == value for field, value in expected.items()):
+                        continue
+                    else:
+                        to_update.append(summary)
+                    drifted.append(user_id)
+                    for field, value in expected.items():
+                        setattr(summary, field, value)
+                if fix:
+                    now = timezone.now()
+                    for summary in to_update:
+                        summary.updated_at = now
+                    self.bulk_create(to_create)
+                    self.bulk_update(to_update, [*self.LEDGER_FIELDS, 'updated_at'])
+            checked += len(chunk)
 
 
 class UserRebateSummary(models.Model):
+    """사용자 페이백 원장
+
+    Rebate 상태/금액 변경과 RebatePayment 생성 시 F() 증분으로 같은 트랜잭션에서 갱신된다.
+    total_rebates는 거절되지 않은 페이백, pending_amount는 아직 지급되지 않은(pending/approved)
+    페이백, total_paid는 지급 내역의 합계다.
+    """
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='rebate_summary')
     total_rebates = models.DecimalField(max_digits=20, decimal_places=8, default=0)
     total_paid = models.DecimalField(max_digits=20, decimal_places=8, default=0)
@@ -91,9 +251,364 @@ class UserRebateSummary(models.Model):
     last_payment_date = models.DateTimeField(null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UserRebateSummaryQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.user.username}'s Rebate Summary"
 
     class Meta:
         verbose_name = "User Rebate Summary"
         verbose_name_plural = "User Rebate Summaries"
+
+
+class DashboardDelta:
+    """UserDashboardSnapshot 증분 (변경 전 행은 sign=-1, 변경 후 행은 sign=1로 누적)
+
+    이번 달 집계는 사용자 시간대에 따라 달라지므로 (필드, 발생 시각, 금액)으로 모아 두고
+    스냅샷에 반영할 때 스냅샷 시간대 기준의 월로 판정한다.
+    """
+
+    def __init__(self):
+        self.totals = defaultdict(int)
+        self.monthly = []
+        self.status_counts = Counter()
+        self.exchange_rebates = defaultdict(lambda: {'total': Decimal(0), 'paid': Decimal(0)})
+        self.active_exchanges = None  # 다시 계산한 활성 거래소 목록 (변경 없으면 None)
+
+    def __bool__(self):
+        return bool(self.totals or self.monthly or self.status_counts or self.exchange_rebates) or (
+            self.active_exchanges is not None
+        )
+
+    def add_rebates(self, status, exchange_name, amount, count=1):
+        self.totals['rebate_count'] += count
+        self.status_counts[status] += count
+        self.exchange_rebates[exchange_name]['total'] += amount
+        if status == 'paid':
+            self.totals['total_earnings'] += amount
+            self.exchange_rebates[exchange_name]['paid'] += amount
+        elif status == 'pending':
+            self.totals['pending_rebates'] += amount
+
+    def add_transactions(self, commission, count=1):
+        self.totals['transaction_count'] += count
+        self.totals['total_commission'] += commission
+
+    def add_rebate(self, state, sign=1):
+        amount = state['amount'] * sign
+        self.add_rebates(state['status'], state['exchange_name'], amount, sign)
+        if state['status'] == 'paid':
+            self.monthly.append(('monthly_earnings', state['created_at'], amount))
+
+    def add_transaction(self, state, sign=1):
+        commission = state['commission'] * sign
+        self.add_transactions(commission, sign)
+        self.monthly.append(('monthly_commission', state['created_at'], commission))
+
+
+class UserDashboardSnapshotQuerySet(models.QuerySet):
+    DELTA_FIELDS = [
+        'total_earnings', 'monthly_earnings', 'pending_rebates', 'rebate_count', 'status_counts',
+        'exchange_rebates', 'total_commission', 'monthly_commission', 'transaction_count',
+        'active_exchanges', 'month', 'timezone', 'updated_at',
+    ]
+
+    def apply(self, deltas):
+        """{user_id: DashboardDelta}를 사용자별 스냅샷 행을 잠근 뒤 반영
+
+        스냅샷이 아직 없는 사용자는 건너뛴다. 첫 조회 시 원본 테이블에서 만들어진다.
+        """
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        with transaction.atomic(using=self.db):
+            snapshots = list(self.select_for_update().filter(pk__in=list(deltas)).order_by('pk'))
+            now = timezone.now()
+            for snapshot in snapshots:
+                snapshot.apply_delta(deltas[snapshot.pk])
+                snapshot.updated_at = now
+            self.bulk_update(snapshots, self.DELTA_FIELDS)
+
+    def rebuild(self, user_ids=None, batch_size=500):
+        """원본 테이블(Rebate/ReferralTransaction/ExchangeAPI)에서 스냅샷을 일괄 재구성, 재구성한 수 반환"""
+        users = User.objects.order_by('pk').values_list('pk', flat=True)
+        if user_ids is not None:
+            users = users.filter(pk__in=list(user_ids))
+        users = users.iterator(chunk_size=batch_size)
+        rebuilt = 0
+        while True:
+            batch = list(islice(users, batch_size))
+            if not batch:
+                return rebuilt
+            with transaction.atomic(using=self.db):
+                # 재구성하는 동안 증분 반영이 끼어들지 않도록 기존 행을 잠근다
+                list(self.select_for_update().filter(pk__in=batch).values_list('pk'))
+                snapshots = self._build(batch)
+                self.filter(pk__in=batch).delete()
+                self.bulk_create(snapshots)
+            rebuilt += len(snapshots)
+
+    def _build(self, user_ids):
+        deltas = {user_id: DashboardDelta() for user_id in user_ids}
+        timezones = dict.fromkeys(user_ids, '')
+        timezones.update(
+            UserProfile.objects.using(self.db).filter(user_id__in=user_ids).values_list('user_id', 'timezone')
+        )
+        # 이번 달 구간은 시간대마다 다르므로 같은 시간대 사용자끼리 묶어 집계한다
+        by_timezone = defaultdict(list)
+        for user_id, name in timezones.items():
+            by_timezone[name].append(user_id)
+
+        rebates = Rebate.objects.using(self.db).filter(user_id__in=user_ids).order_by()
+        for row in rebates.values(
+            'user_id', 'status', exchange_name=F('referral_transaction__exchange__name')
+        ).annotate(amount=Sum('amount'), count=Count('id')):
+            deltas[row['user_id']].add_rebates(row['status'], row['exchange_name'], row['amount'], row['count'])
+
+        transactions = ReferralTransaction.objects.using(self.db).filter(user_id__in=user_ids).order_by()
+        for row in transactions.values('user_id').annotate(commission=Sum('commission'), count=Count('id')):
+            deltas[row['user_id']].add_transactions(row['commission'], row['count'])
+
+        for name, group in by_timezone.items():
+            start, end = period_window('month', get_timezone(name))
+            for user_id, amount in rebates.filter(
+                user_id__in=group, status='paid', created_at__gte=start, created_at__lt=end
+            ).values('user_id').annotate(amount=Sum('amount')).values_list('user_id', 'amount'):
+                deltas[user_id].totals['monthly_earnings'] += amount
+            for user_id, commission in transactions.filter(
+                user_id__in=group, created_at__gte=start, created_at__lt=end
+            ).values('user_id').annotate(commission=Sum('commission')).values_list('user_id', 'commission'):
+                deltas[user_id].totals['monthly_commission'] += commission
+
+        active_exchanges = defaultdict(list)
+        for user_id, name in ExchangeAPI.objects.using(self.db).filter(
+            user_id__in=user_ids, is_active=True
+        ).order_by('exchange__name').values_list('user_id', 'exchange__name'):
+            active_exchanges[user_id].append(name)
+
+        snapshots = []
+        for user_id, delta in deltas.items():
+            delta.active_exchanges = active_exchanges[user_id]
+            zone = get_timezone(timezones[user_id])
+            snapshot = UserDashboardSnapshot(user_id=user_id, timezone=timezones[user_id], month=month_start(tz=zone))
+            snapshot.apply_delta(delta)
+            snapshots.append(snapshot)
+        return snapshots
+
+
+class UserDashboardSnapshot(models.Model):
+    """사용자 대시보드 집계 스냅샷
+
+    Rebate/ReferralTransaction/ExchangeAPI 변경 시 신호로 증분 갱신되고
+    users/exchanges/rebates 대시보드는 기본 키 조회 한 번으로 이 값을 읽는다.
+    이번 달 집계(monthly_*)는 사용자 프로필 시간대(timezone) 기준의 month에 대한 값이며,
+    month가 지난 달이면 0으로 본다. 프로필 시간대가 바뀌면 스냅샷을 다시 만든다.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='dashboard_snapshot')
+    total_earnings = models.DecimalField(max_digits=20, decimal_places=8, default=0)  # 지급 완료 페이백
+    monthly_earnings = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    pending_rebates = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    rebate_count = models.IntegerField(default=0)
+    status_counts = models.JSONField(default=dict, blank=True)
+    # {거래소명: {'total': 전체 페이백, 'paid': 지급 완료 페이백}}
+    exchange_rebates = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    total_commission = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    monthly_commission = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    transaction_count = models.IntegerField(default=0)
+    active_exchanges = models.JSONField(default=list, blank=True)
+    month = models.DateField(default=month_start)
+    timezone = models.CharField(max_length=63, blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = UserDashboardSnapshotQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.user.username}'s Dashboard Snapshot"
+
+    class Meta:
+        verbose_name = "User Dashboard Snapshot"
+        verbose_name_plural = "User Dashboard Snapshots"
+
+    @classmethod
+    def for_user(cls, user):
+        """사용자 스냅샷 (없으면 원본 테이블에서 만든다)"""
+        snapshot = cls.objects.filter(pk=user.pk).first()
+        if snapshot is None:
+            cls.objects.rebuild([user.pk])
+            snapshot = cls.objects.get(pk=user.pk)
+        return snapshot
+
+    @property
+    def zone(self):
+        return get_timezone(self.timezone)
+
+    @property
+    def is_current_month(self):
+        return self.month == month_start(tz=self.zone)
+
+    @property
+    def this_month_earnings(self):
+        return self.monthly_earnings if self.is_current_month else Decimal(0)
+
+    @property
+    def this_month_commission(self):
+        return self.monthly_commission if self.is_current_month else Decimal(0)
+
+    def exchange_totals(self, key='total'):
+        """{거래소명: 금액} (key: 'total' 전체, 'paid' 지급 완료)"""
+        return {name: Decimal(values[key]) for name, values in self.exchange_rebates.items()}
+
+    def status_count(self, status):
+        return self.status_counts.get(status, 0)
+
+    def apply_delta(self, delta):
+        zone = self.zone
+        month = month_start(tz=zone)
+        if self.month != month:
+            self.month, self.monthly_earnings, self.monthly_commission = month, Decimal(0), Decimal(0)
+        for field, value in delta.totals.items():
+            setattr(self, field, getattr(self, field) + value)
+        for field, created_at, value in delta.monthly:
+            if month_start(created_at, zone) == month:
+                setattr(self, field, getattr(self, field) + value)
+
+        status_counts = Counter(self.status_counts)
+        status_counts.update(delta.status_counts)
+        self.status_counts = {status: count for status, count in status_counts.items() if count}
+
+        exchange_rebates = {
+            name: {key: Decimal(value) for key, value in values.items()}
+            for name, values in self.exchange_rebates.items()
+        }
+        for name, values in delta.exchange_rebates.items():
+            current = exchange_rebates.setdefault(name, {'total': Decimal(0), 'paid': Decimal(0)})
+            for key, amount in values.items():
+                current[key] += amount
+        self.exchange_rebates = {name: values for name, values in exchange_rebates.items() if any(values.values())}
+
+        if delta.active_exchanges is not None:
+            self.active_exchanges = delta.active_exchanges
+
+
+def _rebate_states(queryset, *fields):
+    return queryset.values(
+        *fields, 'user_id', 'status', 'amount', 'created_at',
+        exchange_id=F('referral_transaction__exchange_id'),
+        exchange_name=F('referral_transaction__exchange__name'),
+    )
+
+
+def _rebate_state(pk):
+    return _rebate_states(Rebate.objects.filter(pk=pk)).first()
+
+
+def _apply_changes(add, rows, using=None):
+    deltas = defaultdict(DashboardDelta)
+    for previous, current in rows:
+        if previous:
+            add(deltas[previous['user_id']], previous, -1)
+        if current:
+            add(deltas[current['user_id']], current, 1)
+    UserDashboardSnapshot.objects.using(using).apply(deltas)
+
+
+def _ledger_amounts(state):
+    """페이백 한 건이 원장에 기여하는 금액"""
+    return {
+        'total_rebates': state['amount'] if state['status'] not in Rebate.UNCOUNTED_STATUSES else 0,
+        'pending_amount': state['amount'] if state['status'] in Rebate.UNPAID_STATUSES else 0,
+    }
+
+
+def _apply_ledger_changes(rows, using=None):
+    deltas, created = defaultdict(Counter), set()
+    for previous, current in rows:
+        if previous:
+            deltas[previous['user_id']].subtract(_ledger_amounts(previous))
+        if current:
+            deltas[current['user_id']].update(_ledger_amounts(current))
+            created.add(current['user_id'])
+    for user_id, amounts in deltas.items():
+        UserRebateSummary.objects.using(using).apply_delta(user_id, create=user_id in created, **amounts)
+
+
+@receiver(pre_save, sender=Rebate)
+@receiver(pre_delete, sender=Rebate)
+def remember_rebate_state(sender, instance, raw=False, **kwargs):
+    """변경 전 페이백 상태 보관 (스냅샷/원장 증분 계산용)"""
+    instance._previous_state = _rebate_state(instance.pk) if instance.pk and not raw else None
+
+
+@receiver(post_save, sender=Rebate)
+def send_rebate_saved(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        rows = [(instance._previous_state, _rebate_state(instance.pk))]
+        rebates_changed.send(sender=sender, rows=rows, using=using)
+
+
+@receiver(post_delete, sender=Rebate)
+def send_rebate_deleted(sender, instance, using=None, **kwargs):
+    rebates_changed.send(sender=sender, rows=[(instance._previous_state, None)], using=using)
+
+
+@receiver(rebates_changed)
+def update_aggregates_on_rebates_changed(sender, rows, using, **kwargs):
+    """페이백 생성/변경/삭제 시 대시보드 스냅샷과 페이백 원장 증분 갱신"""
+    _apply_changes(DashboardDelta.add_rebate, rows, using)
+    _apply_ledger_changes(rows, using)
+
+
+@receiver(pre_save, sender=RebatePayment)
+def remember_payment_amount(sender, instance, raw=False, **kwargs):
+    """변경 전 지급 금액 보관 (원장 증분 계산용)"""
+    previous = None
+    if instance.pk and not raw:
+        previous = RebatePayment.objects.filter(pk=instance.pk).values_list('amount', flat=True).first()
+    instance._previous_amount = previous or 0
+
+
+@receiver(post_save, sender=RebatePayment)
+def update_ledger_on_payment_save(sender, instance, raw=False, **kwargs):
+    """지급 내역 생성/변경 시 페이백 원장 증분 갱신"""
+    if not raw:
+        UserRebateSummary.objects.apply_delta(
+            instance.rebate.user_id,
+            total_paid=instance.amount - instance._previous_amount,
+            last_payment_date=instance.payment_date,
+        )
+
+
+@receiver(post_delete, sender=RebatePayment)
+def update_ledger_on_payment_delete(sender, instance, **kwargs):
+    """지급 내역 삭제 시 페이백 원장 증분 갱신"""
+    user_id = Rebate.objects.filter(pk=instance.rebate_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        UserRebateSummary.objects.apply_delta(
+            user_id, create=False, total_paid=-instance.amount, recompute_last_payment=True
+        )
+
+
+@receiver(transactions_changed)
+def update_dashboard_on_transactions_changed(sender, rows, using, **kwargs):
+    """거래 생성/변경/삭제(일괄 수집 포함) 시 사용자별로 모아 대시보드 스냅샷 증분 갱신"""
+    _apply_changes(DashboardDelta.add_transaction, rows, using)
+
+
+@receiver(post_save, sender=UserProfile)
+def rebuild_dashboard_on_timezone_change(sender, instance, raw=False, **kwargs):
+    """프로필 시간대 변경 시 이번 달 집계 기준이 바뀌므로 스냅샷 재구성"""
+    if not raw and UserDashboardSnapshot.objects.filter(pk=instance.user_id).exclude(
+        timezone=instance.timezone
+    ).exists():
+        UserDashboardSnapshot.objects.rebuild([instance.user_id])
+
+
+@receiver([post_save, post_delete], sender=ExchangeAPI)
+def update_dashboard_active_exchanges(sender, instance, **kwargs):
+    """거래소 API 연동 변경 시 스냅샷의 활성 거래소 목록 갱신"""
+    delta = DashboardDelta()
+    delta.active_exchanges = list(
+        ExchangeAPI.objects.filter(user_id=instance.user_id, is_active=True)
+        .order_by('exchange__name').values_list('exchange__name', flat=True)
+    )
+    UserDashboardSnapshot.objects.apply({instance.user_id: delta})
@@ -17,45 +17,42 @@ class RebatePolicySerializer(serializers.ModelSerializer):
 
 class RebateSerializer(serializers.ModelSerializer):
     """페이백 내역 시리얼라이저"""
-    exchange_name = serializers.CharField(source='exchange.name', read_only=True)
+    exchange_name = serializers.CharField(source='referral_transaction.exchange.name', read_only=True)
     user_username = serializers.CharField(source='user.username', read_only=True)
     
     class Meta:
         model = Rebate
         fields = [
-            'id', 'user', 'user_username', 'exchange', 'exchange_name',
-            'referral_transaction', 'amount', 'rebate_rate', 'status',
-            'payment_method', 'payment_address', 'created_at', 'updated_at'
+            'id', 'user', 'user_username', 'exchange_name',
+            'referral_transaction', 'policy', 'amount', 'currency', 'status',
+            'payment_date', 'notes', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
 
 class RebatePaymentSerializer(serializers.ModelSerializer):
     """페이백 지급 내역 시리얼라이저"""
-    rebate_exchange = serializers.CharField(source='rebate.exchange.name', read_only=True)
+    rebate_exchange = serializers.CharField(source='rebate.referral_transaction.exchange.name', read_only=True)
     
     class Meta:
         model = RebatePayment
         fields = [
-            'id', 'rebate', 'rebate_exchange', 'amount', 'payment_method',
-            'payment_address', 'transaction_hash', 'status', 'processed_at',
-            'created_at'
+            'id', 'rebate', 'rebate_exchange', 'payment_method', 'transaction_id',
+            'amount', 'currency', 'fee', 'net_amount', 'payment_date', 'notes'
         ]
-        read_only_fields = ['id', 'created_at']
+        read_only_fields = ['id', 'payment_date']
 
 
 class UserRebateSummarySerializer(serializers.ModelSerializer):
     """사용자 페이백 요약 시리얼라이저"""
-    exchange_name = serializers.CharField(source='exchange.name', read_only=True)
-    
+
     class Meta:
         model = UserRebateSummary
         fields = [
-            'id', 'user', 'exchange', 'exchange_name', 'total_commission',
-            'total_rebate', 'pending_rebate', 'paid_rebate', 'transaction_count',
-            'last_updated'
+            'id', 'user', 'total_rebates', 'total_paid', 'pending_amount',
+            'last_payment_date', 'updated_at'
         ]
-        read_only_fields = ['id', 'last_updated']
+        read_only_fields = fields
 
 
 class RebateRequestSerializer(serializers.Serializer):
@@ -86,7 +83,7 @@ class RebateRequestSerializer(serializers.Serializer):
         # 사용자의 해당 거래소 페이백 확인
         from .models import Rebate
         available_rebate = Rebate.objects.filter(
-            user=user, exchange=exchange, status='pending'
+            user=user, referral_transaction__exchange=exchange, status='pending'
         ).aggregate(total=models.Sum('amount'))['total'] or 0
         
         if amount > available_rebate:
@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Rebate 생성/변경/삭제 후 발송
+# rows: [(변경 전, 변경 후)] 목록, 각 값은 user_id/exchange_id/exchange_name/status/amount/created_at dict
+# (신규 행의 변경 전 값과 삭제된 행의 변경 후 값은 None)
+rebates_changed = Signal()
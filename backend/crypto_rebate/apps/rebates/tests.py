@@ -1,3 +1,515 @@
-from django.test import TestCase
+from base64 import b64encode
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from urllib.parse import urlencode
+from zoneinfo import ZoneInfo
 
-# Create your tests here.
+from cryptography.fernet import Fernet
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from crypto_rebate.apps.exchanges.models import Exchange, ExchangeAPI, ReferralLink, ReferralTransaction
+from crypto_rebate.periods import month_start, period_window
+
+from .models import Rebate, RebatePayment, RebatePolicy, UserDashboardSnapshot, UserRebateSummary
+
+SNAPSHOT_FIELDS = [
+    'total_earnings', 'monthly_earnings', 'pending_rebates', 'rebate_count', 'status_counts',
+    'total_commission', 'monthly_commission', 'transaction_count', 'active_exchanges', 'month',
+]
+
+
+@override_settings(ENCRYPTION_KEY=Fernet.generate_key().decode(), ENCRYPTION_KEY_FALLBACKS=[])
+class UserDashboardSnapshotTest(TestCase):
+    """대시보드 스냅샷 증분 갱신과 재구성 결과 일치 검증"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='dashboard')
+        self.policy = RebatePolicy.objects.create(name='기본', description='', policy_type='percentage')
+        self.binance = Exchange.objects.create(name='Binance')
+        self.okx = Exchange.objects.create(name='OKX')
+        self.links = {
+            exchange.pk: ReferralLink.objects.create(user=self.user, exchange=exchange)
+            for exchange in (self.binance, self.okx)
+        }
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _transaction(self, exchange, tx_id, commission='10.00', created_at=None):
+        return ReferralTransaction.objects.create(
+            user=self.user, exchange=exchange, referral_link=self.links[exchange.pk],
+            transaction_id=tx_id, commission=Decimal(commission), created_at=created_at or timezone.now(),
+        )
+
+    def _rebate(self, tx, amount, status='pending'):
+        return Rebate.objects.create(
+            user=self.user, referral_transaction=tx, policy=self.policy,
+            amount=Decimal(amount), currency='USDT', status=status,
+        )
+
+    def _snapshot_values(self):
+        snapshot = UserDashboardSnapshot.objects.get(pk=self.user.pk)
+        values = {field: getattr(snapshot, field) for field in SNAPSHOT_FIELDS}
+        values['exchange_rebates'] = {key: snapshot.exchange_totals(key) for key in ('total', 'paid')}
+        return values
+
+    def assertMatchesRebuild(self):
+        incremental = self._snapshot_values()
+        UserDashboardSnapshot.objects.rebuild([self.user.pk])
+        self.assertEqual(incremental, self._snapshot_values())
+
+    def test_incremental_updates_match_rebuild(self):
+        UserDashboardSnapshot.for_user(self.user)
+
+        ExchangeAPI.objects.create(user=self.user, exchange=self.binance, api_key='k', api_secret='s')
+        okx_api = ExchangeAPI.objects.create(user=self.user, exchange=self.okx, api_key='k', api_secret='s')
+        tx1 = self._transaction(self.binance, 'b-1')
+        tx2 = self._transaction(self.okx, 'o-1', commission='5.00')
+        old_tx = self._transaction(self.binance, 'b-0', created_at=timezone.now() - timedelta(days=70))
+        paid = self._rebate(tx1, '4.00', status='paid')
+        pending = self._rebate(tx2, '2.00')
+        self._rebate(old_tx, '3.00', status='paid')
+        self.assertMatchesRebuild()
+
+        pending.status = 'paid'
+        pending.save()
+        paid.amount = Decimal('4.50')
+        paid.save()
+        tx1.commission = Decimal('12.00')
+        tx1.save()
+        okx_api.is_active = False
+        okx_api.save()
+        self.assertMatchesRebuild()
+
+        # 일괄 수집 경로 (post_save 없이 transactions_changed 신호로 반영)
+        ReferralTransaction.objects.bulk_ingest([
+            ReferralTransaction(
+                user=self.user, exchange=self.okx, referral_link=self.links[self.okx.pk],
+                transaction_id=tx_id, commission=Decimal(commission), created_at=timezone.now(),
+            )
+            for tx_id, commission in (('o-1', '7.00'), ('o-2', '1.00'))
+        ])
+        self.assertMatchesRebuild()
+
+        # 일괄 상태 변경 경로 (post_save 없이 rebates_changed 신호로 반영)
+        self.assertEqual(Rebate.objects.filter(pk=pending.pk).update_status('approved'), 1)
+        self.assertMatchesRebuild()
+        Rebate.objects.filter(pk=pending.pk).update_status('paid')
+        self.assertMatchesRebuild()
+
+        # 거래 삭제 시 연결된 페이백도 함께 빠진다
+        old_tx.delete()
+        pending.delete()
+        self.assertMatchesRebuild()
+
+        snapshot = UserDashboardSnapshot.objects.get(pk=self.user.pk)
+        self.assertEqual(snapshot.total_earnings, Decimal('4.50'))
+        self.assertEqual(snapshot.monthly_earnings, Decimal('4.50'))
+        self.assertEqual(snapshot.total_commission, Decimal('20.00'))
+        self.assertEqual(snapshot.transaction_count, 3)
+        self.assertEqual(snapshot.status_counts, {'paid': 1})
+        self.assertEqual(snapshot.exchange_totals('paid'), {'Binance': Decimal('4.50')})
+        self.assertEqual(snapshot.active_exchanges, ['Binance'])
+
+    def test_monthly_totals_reset_in_new_month(self):
+        self._rebate(self._transaction(self.binance, 'b-1'), '4.00', status='paid')
+        snapshot = UserDashboardSnapshot.for_user(self.user)
+        self.assertEqual(snapshot.this_month_earnings, Decimal('4.00'))
+
+        last_month = month_start(timezone.now() - timedelta(days=40))
+        UserDashboardSnapshot.objects.filter(pk=self.user.pk).update(month=last_month)
+        snapshot = UserDashboardSnapshot.objects.get(pk=self.user.pk)
+        self.assertEqual((snapshot.this_month_earnings, snapshot.this_month_commission), (0, 0))
+
+        # 새 달의 첫 변경이 들어오면 이번 달 집계를 0에서 다시 시작한다
+        self._transaction(self.okx, 'o-1', commission='3.00')
+        snapshot = UserDashboardSnapshot.objects.get(pk=self.user.pk)
+        self.assertEqual(snapshot.month, month_start())
+        self.assertEqual(snapshot.monthly_commission, Decimal('3.00'))
+        self.assertEqual(snapshot.total_commission, Decimal('13.00'))
+
+    def test_dashboards_read_snapshot_with_constant_queries(self):
+        ExchangeAPI.objects.create(user=self.user, exchange=self.binance, api_key='k', api_secret='s')
+        urls = [
+            reverse('users:dashboard'), reverse('exchanges:dashboard'),
+            reverse('rebates:dashboard'), reverse('rebates:stats'),
+        ]
+
+        def query_counts():
+            counts = []
+            for url in urls:
+                with CaptureQueriesContext(connection) as ctx:
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                counts.append(len(ctx.captured_queries))
+            return counts
+
+        self._rebate(self._transaction(self.binance, 'b-1'), '4.00', status='paid')
+        UserDashboardSnapshot.for_user(self.user)
+        few = query_counts()
+        for i in range(20):
+            exchange = self.binance if i % 2 else self.okx
+            self._rebate(self._transaction(exchange, f'tx-{i}'), '1.00', status='paid' if i % 3 else 'pending')
+        self.assertEqual(few, query_counts())
+
+        stats = self.client.get(reverse('rebates:stats')).data
+        self.assertEqual(stats['total_earnings'], Decimal('17.00'))
+        self.assertEqual(stats['pending_rebates'], Decimal('7.00'))
+        self.assertEqual(stats['exchange_breakdown'], {'Binance': Decimal('14.00'), 'OKX': Decimal('10.00')})
+        dashboard = self.client.get(reverse('rebates:dashboard')).data
+        self.assertEqual(dashboard['statistics']['total_transactions'], 21)
+        self.assertEqual(dashboard['status_counts'], {'pending': 7, 'processing': 0, 'paid': 14, 'failed': 0})
+        user_dashboard = self.client.get(reverse('users:dashboard')).data
+        self.assertEqual(user_dashboard['statistics']['active_exchanges'], 1)
+        self.assertEqual(user_dashboard['exchange_earnings'], {'Binance': Decimal('11.00')})
+        exchange_dashboard = self.client.get(reverse('exchanges:dashboard')).data
+        self.assertEqual(exchange_dashboard['statistics']['total_commission'], Decimal('210.00'))
+
+    def test_rebuild_command_repairs_drift(self):
+        self._rebate(self._transaction(self.binance, 'b-1'), '4.00', status='paid')
+        other = User.objects.create_user(username='other')
+        UserDashboardSnapshot.for_user(self.user)
+        UserDashboardSnapshot.objects.filter(pk=self.user.pk).update(total_earnings=999, rebate_count=0)
+
+        out = StringIO()
+        call_command('rebuild_dashboard_snapshots', batch_size=1, stdout=out)
+        self.assertIn('rebuilt 2 dashboard snapshots', out.getvalue())
+
+        snapshot = UserDashboardSnapshot.objects.get(pk=self.user.pk)
+        self.assertEqual((snapshot.total_earnings, snapshot.rebate_count), (Decimal('4.00'), 1))
+        self.assertTrue(UserDashboardSnapshot.objects.filter(pk=other.pk).exists())
+
+
+class UserRebateSummaryLedgerTest(TestCase):
+    """페이백 원장 증분 갱신과 정합성 검사 명령 검증"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ledger')
+        self.policy = RebatePolicy.objects.create(name='기본', description='', policy_type='percentage')
+        self.exchange = Exchange.objects.create(name='Binance')
+        self.link = ReferralLink.objects.create(user=self.user, exchange=self.exchange)
+
+    def _rebate(self, tx_id, amount, status='pending', user=None):
+        user = user or self.user
+        tx = ReferralTransaction.objects.create(
+            user=user, exchange=self.exchange, referral_link=self.link,
+            transaction_id=tx_id, commission=Decimal('10.00'), created_at=timezone.now(),
+        )
+        return Rebate.objects.create(
+            user=user, referral_transaction=tx, policy=self.policy,
+            amount=Decimal(amount), currency='USDT', status=status,
+        )
+
+    def _pay(self, rebate):
+        rebate.status = 'paid'
+        rebate.save()
+        return RebatePayment.objects.create(
+            rebate=rebate, payment_method='crypto', transaction_id=f'pay-{rebate.pk}',
+            amount=rebate.amount, currency='USDT', net_amount=rebate.amount,
+        )
+
+    def _ledger(self, user=None):
+        summary = UserRebateSummary.objects.get(user=user or self.user)
+        return summary.total_rebates, summary.pending_amount, summary.total_paid
+
+    def test_ledger_follows_rebate_lifecycle(self):
+        first = self._rebate('tx-1', '5.00')
+        second = self._rebate('tx-2', '3.00')
+        self.assertEqual(self._ledger(), (Decimal('8.00'), Decimal('8.00'), 0))
+
+        first.status = 'approved'
+        first.save()
+        second.status = 'rejected'
+        second.save()
+        self.assertEqual(self._ledger(), (Decimal('5.00'), Decimal('5.00'), 0))
+
+        earlier = self._pay(self._rebate('tx-3', '2.00', status='approved')).payment_date
+        later = self._pay(first)
+        self.assertEqual(self._ledger(), (Decimal('7.00'), 0, Decimal('7.00')))
+        summary = UserRebateSummary.objects.get(user=self.user)
+        self.assertEqual(summary.last_payment_date, later.payment_date)
+
+        later.delete()
+        summary.refresh_from_db()
+        self.assertEqual((summary.total_paid, summary.last_payment_date), (Decimal('2.00'), earlier))
+        second.delete()
+        self.assertEqual(UserRebateSummary.objects.reconcile(), (1, []))
+
+        # 지급 요청의 일괄 상태 변경도 원장에 반영된다
+        self._rebate('tx-4', '6.00')
+        Rebate.objects.filter(user=self.user, status='pending').update_status('processing')
+        self.assertEqual(self._ledger(), (Decimal('13.00'), 0, Decimal('2.00')))
+        self.assertEqual(UserRebateSummary.objects.reconcile(), (1, []))
+
+        # 사용자 삭제 시 원장도 함께 지워진다
+        self.user.delete()
+        self.assertFalse(UserRebateSummary.objects.exists())
+
+    def test_reconcile_command_reports_and_repairs_drift(self):
+        self._pay(self._rebate('tx-1', '4.00'))
+        self._rebate('tx-2', '1.00')
+        other = User.objects.create_user(username='other')
+        self._rebate('tx-3', '6.00', user=other)
+
+        out = StringIO()
+        call_command('reconcile_rebate_summaries', chunk_size=1, stdout=out)
+        self.assertIn('Checked 2 users, found 0 drifted ledgers.', out.getvalue())
+
+        UserRebateSummary.objects.filter(user=self.user).update(total_paid=0, pending_amount=99)
+        UserRebateSummary.objects.filter(user=other).delete()
+        out = StringIO()
+        call_command('reconcile_rebate_summaries', stdout=out)
+        self.assertIn('found 2 drifted ledgers', out.getvalue())
+        self.assertEqual(self._ledger(), (Decimal('5.00'), Decimal('99.00'), 0))
+
+        out = StringIO()
+        call_command('reconcile_rebate_summaries', fix=True, stdout=out)
+        self.assertIn('repaired 2 drifted ledgers', out.getvalue())
+        self.assertEqual(self._ledger(), (Decimal('5.00'), Decimal('1.00'), Decimal('4.00')))
+        self.assertEqual(self._ledger(other), (Decimal('6.00'), Decimal('6.00'), 0))
+        self.assertEqual(UserRebateSummary.objects.reconcile(), (2, []))
+
+    def test_summary_endpoint_reads_ledger(self):
+        self._pay(self._rebate('tx-1', '4.00'))
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(reverse('rebates:summary_list'))
+        self.assertEqual(response.status_code, 200)
+        results = response.data['results'] if isinstance(response.data, dict) else response.data
+        self.assertEqual(len(results), 1)
+        self.assertEqual(Decimal(results[0]['total_paid']), Decimal('4.00'))
+        self.assertEqual(Decimal(results[0]['pending_amount']), 0)
+
+        payments = client.get(reverse('rebates:payment_list')).data
+        self.assertEqual([payment['rebate_exchange'] for payment in payments['results']], ['Binance'])
+
+
+class UserTimezonePeriodTest(TestCase):
+    """사용자 시간대 기준 기간 구간과 이번 달 집계 검증"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='seoul')
+        self.user.profile.timezone = 'Asia/Seoul'
+        self.user.profile.save()
+        self.zone = ZoneInfo('Asia/Seoul')
+        self.policy = RebatePolicy.objects.create(name='기본', description='', policy_type='percentage')
+        self.exchange = Exchange.objects.create(name='Binance')
+        self.link = ReferralLink.objects.create(user=self.user, exchange=self.exchange)
+
+    def _rebate(self, tx_id, created_at):
+        tx = ReferralTransaction.objects.create(
+            user=self.user, exchange=self.exchange, referral_link=self.link,
+            transaction_id=tx_id, commission=Decimal('10.00'), created_at=created_at,
+        )
+        rebate = Rebate.objects.create(
+            user=self.user, referral_transaction=tx, policy=self.policy,
+            amount=Decimal('1.00'), currency='USDT', status='paid',
+        )
+        Rebate.objects.filter(pk=rebate.pk).update(created_at=created_at)
+        return rebate
+
+    def test_period_window_is_half_open_in_timezone(self):
+        value = datetime(2024, 2, 29, 20, 0, tzinfo=ZoneInfo('UTC'))  # 서울 3월 1일 05:00 (금)
+        self.assertEqual(period_window('month', self.zone, value), (
+            datetime(2024, 3, 1, tzinfo=self.zone), datetime(2024, 4, 1, tzinfo=self.zone),
+        ))
+        self.assertEqual(period_window('week', self.zone, value), (
+            datetime(2024, 2, 26, tzinfo=self.zone), datetime(2024, 3, 4, tzinfo=self.zone),
+        ))
+        self.assertEqual(period_window('today', self.zone, value)[0], datetime(2024, 3, 1, tzinfo=self.zone))
+        self.assertEqual(month_start(value), datetime(2024, 2, 1).date())
+
+    def test_month_follows_user_timezone(self):
+        start, _ = period_window('month', self.zone)
+        self._rebate('first', start)
+        self._rebate('before', start - timedelta(seconds=1))
+        # 작년 같은 달은 이번 달 집계에 섞이지 않는다
+        self._rebate('last-year', start.replace(year=start.year - 1))
+
+        snapshot = UserDashboardSnapshot.for_user(self.user)
+        self.assertEqual(snapshot.timezone, 'Asia/Seoul')
+        self.assertEqual((snapshot.this_month_commission, snapshot.this_month_earnings), (10, 1))
+        self._rebate('second', start + timedelta(hours=1))
+        snapshot.refresh_from_db()
+        self.assertEqual((snapshot.this_month_commission, snapshot.this_month_earnings), (20, 2))
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(reverse('rebates:history'), {'period': 'month'})
+        self.assertEqual(len(response.data['results']), 2)
+
+        # 시간대를 바꾸면 스냅샷을 새 시간대 기준으로 다시 만든다
+        self.user.profile.timezone = 'UTC'
+        self.user.profile.save()
+        snapshot.refresh_from_db()
+        self.assertEqual(snapshot.timezone, 'UTC')
+        self.assertEqual(snapshot.month, month_start(tz=ZoneInfo('UTC')))
+
+class KeysetPaginationTest(TestCase):
+    """(created_at, id) 키셋 커서 페이지네이션 검증"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='pager')
+        policy = RebatePolicy.objects.create(name='기본', description='', policy_type='percentage')
+        exchange = Exchange.objects.create(name='Binance')
+        link = ReferralLink.objects.create(user=self.user, exchange=exchange)
+        now = timezone.now()
+        # 세 건씩 같은 created_at을 갖도록 만들어 동률 처리를 확인한다
+        self.rebates = []
+        for i in range(25):
+            tx = ReferralTransaction.objects.create(
+                user=self.user, exchange=exchange, referral_link=link,
+                transaction_id=f'tx-{i}', created_at=now,
+            )
+            rebate = Rebate.objects.create(
+                user=self.user, referral_transaction=tx, policy=policy,
+                amount=Decimal('1.00'), currency='USDT',
+            )
+            self.rebates.append(rebate)
+        for i, rebate in enumerate(self.rebates):
+            Rebate.objects.filter(pk=rebate.pk).update(created_at=now - timedelta(seconds=i // 3))
+        self.expected = list(
+            Rebate.objects.filter(user=self.user).order_by('-created_at', '-id').values_list('pk', flat=True)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _walk(self, url, link='next'):
+        pages, counts = [], []
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any('COUNT(' in query['sql'] for query in ctx.captured_queries))
+            counts.append(len(ctx.captured_queries))
+            pages.append([item['id'] for item in response.data['results']])
+            url = response.data[link]
+        return pages, counts
+
+    def test_walks_every_row_once_in_both_directions(self):
+        for name in ('rebates:rebate_list', 'rebates:history'):
+            pages, counts = self._walk(reverse(name) + '?page_size=4')
+            self.assertEqual([pk for page in pages for pk in page], self.expected)
+            self.assertEqual(len(pages), 7)
+            self.assertEqual(len(set(counts)), 1)
+
+        # 마지막 페이지에서 previous 링크로 거슬러 올라가도 같은 페이지가 나온다
+        last = self.client.get(reverse('rebates:rebate_list'), {'page_size': 10})
+        last = self.client.get(last.data['next'])
+        last = self.client.get(last.data['next'])
+        self.assertIsNone(last.data['next'])
+        backwards, _ = self._walk(last.data['previous'], link='previous')
+        self.assertEqual([pk for page in reversed(backwards) for pk in page], self.expected[:20])
+
+    def test_history_filters_and_invalid_cursor(self):
+        response = self.client.get(reverse('rebates:history'), {'status': 'paid'})
+        self.assertEqual(response.data['results'], [])
+        for position in ('garbage', '["not-a-date",1]', '[1]'):
+            cursor = b64encode(urlencode({'p': position}).encode()).decode()
+            response = self.client.get(reverse('rebates:rebate_list'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+
+
+@override_settings(ENCRYPTION_KEY=Fernet.generate_key().decode(), ENCRYPTION_KEY_FALLBACKS=[])
+class HotQueryPlanTest(TestCase):
+    """주요 조회 API의 쿼리가 대용량 테이블을 전체 스캔하지 않는지 EXPLAIN으로 검증
+
+    PostgreSQL은 enable_seqscan=off로 인덱스를 쓸 수 있는 쿼리에서 Seq Scan이 사라지는지,
+    SQLite는 EXPLAIN QUERY PLAN에 대상 테이블 SCAN이 없는지 확인한다.
+    """
+    LARGE_TABLES = {
+        Rebate._meta.db_table, RebatePayment._meta.db_table, ReferralTransaction._meta.db_table,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='planner')
+        other = User.objects.create_user(username='neighbour')
+        policy = RebatePolicy.objects.create(name='기본', description='', policy_type='percentage')
+        cls.exchanges = [Exchange.objects.create(name=name) for name in ('Binance', 'OKX')]
+        now = timezone.now()
+        for owner in (cls.user, other):
+            for exchange in cls.exchanges:
+                ExchangeAPI.objects.create(user=owner, exchange=exchange, api_key='k', api_secret='s')
+                link = ReferralLink.objects.create(user=owner, exchange=exchange)
+                for i, status in enumerate(['pending', 'approved', 'paid', 'paid', 'rejected']):
+                    tx = ReferralTransaction.objects.create(
+                        user=owner, exchange=exchange, referral_link=link,
+                        transaction_id=f'{owner.pk}-{exchange.pk}-{i}', commission=Decimal('10.00'),
+                        created_at=now - timedelta(days=i * 20),
+                    )
+                    rebate = Rebate.objects.create(
+                        user=owner, referral_transaction=tx, policy=policy,
+                        amount=Decimal('2.00'), currency='USDT', status=status,
+                    )
+                    if status == 'paid':
+                        RebatePayment.objects.create(
+                            rebate=rebate, payment_method='crypto', transaction_id=f'pay-{rebate.pk}',
+                            amount=rebate.amount, currency='USDT', net_amount=rebate.amount,
+                        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _full_scans(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute(f'EXPLAIN {sql}')
+                return [
+                    row[0].strip() for row in cursor.fetchall()
+                    if any(f'Seq Scan on {table}' in row[0] for table in self.LARGE_TABLES)
+                ]
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [
+                row[-1] for row in cursor.fetchall()
+                if row[-1].startswith('SCAN') and row[-1].split()[1] in self.LARGE_TABLES
+            ]
+
+    def assertNoFullScans(self, url, params=None, method='get'):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, params or {})
+        self.assertLess(response.status_code, 500, url)
+        checked = 0
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or not any(table in sql for table in self.LARGE_TABLES):
+                continue
+            checked += 1
+            self.assertEqual(self._full_scans(sql), [], f'{url}: {sql}')
+        return checked
+
+    def test_hot_endpoints_use_indexes(self):
+        endpoints = [
+            (reverse('rebates:rebate_list'), None),
+            (reverse('rebates:history'), None),
+            (reverse('rebates:history'), {'status': 'paid', 'exchange': self.exchanges[0].pk}),
+            (reverse('rebates:payment_list'), None),
+            (reverse('rebates:stats'), None),
+            (reverse('rebates:dashboard'), None),
+            (reverse('exchanges:transaction_list'), None),
+            (reverse('exchanges:user_stats'), None),
+            (reverse('exchanges:dashboard'), None),
+            (reverse('users:dashboard'), None),
+            (reverse('users:profile'), None),
+        ]
+        checked = sum(self.assertNoFullScans(url, params) for url, params in endpoints)
+        self.assertGreater(checked, len(endpoints))
+
+    def test_aggregate_rebuilds_use_indexes(self):
+        with CaptureQueriesContext(connection) as ctx:
+            UserDashboardSnapshot.objects.rebuild([self.user.pk])
+            UserRebateSummary.objects.expected([self.user.pk])
+            Rebate.objects.filter(user=self.user, status='pending').aggregate(total=Sum('amount'))
+        for query in ctx.captured_queries:
+            if query['sql'].startswith('SELECT'):
+                self.assertEqual(self._full_scans(query['sql']), [], query['sql'])
@@ -6,7 +6,11 @@ from rest_framework.views import APIView
 from django.db.models import Sum, Count
 from django.utils import timezone
 from datetime import datetime, timedelta
-from .models import RebatePolicy, Rebate, RebatePayment, UserRebateSummary
+from crypto_rebate.apps.users.models import user_timezone
+from crypto_rebate.pagination import KeysetPagination, PaymentKeysetPagination
+from crypto_rebate.periods import PERIODS, period_window
+
+from .models import RebatePolicy, Rebate, RebatePayment, UserRebateSummary, UserDashboardSnapshot
 from .serializers import (
     RebatePolicySerializer, RebateSerializer, RebatePaymentSerializer,
     UserRebateSummarySerializer, RebateRequestSerializer, RebateStatsSerializer,
@@ -18,9 +22,10 @@ class RebateListView(generics.ListAPIView):
     """페이백 내역 목록 API"""
     serializer_class = RebateSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
-        return Rebate.objects.filter(user=self.request.user).order_by('-created_at')
+        return Rebate.objects.filter(user=self.request.user).select_related('user', 'referral_transaction__exchange')
 
 
 class RebateDetailView(generics.RetrieveAPIView):
@@ -36,9 +41,12 @@ class RebatePaymentListView(generics.ListAPIView):
     """페이백 지급 내역 목록 API"""
     serializer_class = RebatePaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PaymentKeysetPagination
     
     def get_queryset(self):
-        return RebatePayment.objects.filter(rebate__user=self.request.user).order_by('-created_at')
+        return RebatePayment.objects.filter(rebate__user=self.request.user).select_related(
+            'rebate__referral_transaction__exchange'
+        )
 
 
 class UserRebateSummaryListView(generics.ListAPIView):
@@ -47,7 +55,7 @@ class UserRebateSummaryListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return UserRebateSummary.objects.filter(user=self.request.user)
+        return UserRebateSummary.objects.filter(user=self.request.user).order_by('pk')
 
 
 @api_view(['POST'])
@@ -64,7 +72,7 @@ def request_rebate(request):
         
         # 사용 가능한 페이백 확인
         available_rebates = Rebate.objects.filter(
-            user=user, exchange=exchange, status='pending'
+            user=user, referral_transaction__exchange=exchange, status='pending'
         )
         
         total_available = available_rebates.aggregate(
@@ -87,8 +95,8 @@ def request_rebate(request):
                 status='processing'
             )
             
-            # 페이백 상태 업데이트
-            available_rebates.update(status='processing')
+            # 페이백 상태 업데이트 (스냅샷/원장 갱신 신호 포함)
+            available_rebates.update_status('processing')
             
             return Response({
                 'success': True,
@@ -124,45 +132,20 @@ def rebate_stats(request):
     """페이백 통계 API"""
     user = request.user
     
-    # 총 수익
-    total_earnings = Rebate.objects.filter(
-        user=user, status='paid'
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    # 이번 달 수익
-    current_month = datetime.now().month
-    monthly_earnings = Rebate.objects.filter(
-        user=user, status='paid', created_at__month=current_month
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    # 대기 중인 페이백
-    pending_rebates = Rebate.objects.filter(
-        user=user, status='pending'
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    # 지급된 페이백
-    paid_rebates = Rebate.objects.filter(
-        user=user, status='paid'
-    ).aggregate(total=Sum('amount'))['total'] or 0
-    
-    # 거래소별 분석
-    exchange_breakdown = {}
-    for rebate in Rebate.objects.filter(user=user).values('exchange__name').annotate(
-        total=Sum('amount')
-    ):
-        exchange_breakdown[rebate['exchange__name']] = rebate['total']
+    # 총/이번 달/대기/지급 합계와 거래소별 합계는 스냅샷에서 읽는다
+    snapshot = UserDashboardSnapshot.for_user(user)
     
     # 최근 페이백 내역
     recent_rebates = Rebate.objects.filter(
         user=user
-    ).order_by('-created_at')[:10]
+    ).select_related('user', 'referral_transaction__exchange').order_by('-created_at')[:10]
     
     return Response({
-        'total_earnings': total_earnings,
-        'monthly_earnings': monthly_earnings,
-        'pending_rebates': pending_rebates,
-        'paid_rebates': paid_rebates,
-        'exchange_breakdown': exchange_breakdown,
+        'total_earnings': snapshot.total_earnings,
+        'monthly_earnings': snapshot.this_month_earnings,
+        'pending_rebates': snapshot.pending_rebates,
+        'paid_rebates': snapshot.total_earnings,
+        'exchange_breakdown': snapshot.exchange_totals(),
         'recent_rebates': RebateSerializer(recent_rebates, many=True).data
     }, status=status.HTTP_200_OK)
 
@@ -172,44 +155,30 @@ def rebate_stats(request):
 def rebate_dashboard(request):
     """페이백 대시보드 API"""
     user = request.user
+    snapshot = UserDashboardSnapshot.for_user(user)
     
     # 통계 데이터
     stats = {
-        'total_earnings': Rebate.objects.filter(
-            user=user, status='paid'
-        ).aggregate(total=Sum('amount'))['total'] or 0,
-        'monthly_earnings': Rebate.objects.filter(
-            user=user, status='paid', 
-            created_at__month=datetime.now().month
-        ).aggregate(total=Sum('amount'))['total'] or 0,
-        'pending_rebates': Rebate.objects.filter(
-            user=user, status='pending'
-        ).aggregate(total=Sum('amount'))['total'] or 0,
-        'total_transactions': Rebate.objects.filter(user=user).count()
+        'total_earnings': snapshot.total_earnings,
+        'monthly_earnings': snapshot.this_month_earnings,
+        'pending_rebates': snapshot.pending_rebates,
+        'total_transactions': snapshot.rebate_count
     }
     
-    # 거래소별 페이백
-    exchange_rebates = {}
-    for rebate in Rebate.objects.filter(user=user).values('exchange__name').annotate(
-        total=Sum('amount')
-    ):
-        exchange_rebates[rebate['exchange__name']] = rebate['total']
-    
     # 최근 페이백 내역
     recent_rebates = Rebate.objects.filter(
         user=user
-    ).order_by('-created_at')[:5]
+    ).select_related('user', 'referral_transaction__exchange').order_by('-created_at')[:5]
     
     # 페이백 상태별 개수
-    status_counts = {}
-    for status_choice in ['pending', 'processing', 'paid', 'failed']:
-        status_counts[status_choice] = Rebate.objects.filter(
-            user=user, status=status_choice
-        ).count()
+    status_counts = {
+        status_choice: snapshot.status_count(status_choice)
+        for status_choice in ['pending', 'processing', 'paid', 'failed']
+    }
     
     return Response({
         'statistics': stats,
-        'exchange_rebates': exchange_rebates,
+        'exchange_rebates': snapshot.exchange_totals(),
         'recent_rebates': RebateSerializer(recent_rebates, many=True).data,
         'status_counts': status_counts
     }, status=status.HTTP_200_OK)
@@ -226,12 +195,13 @@ def rebate_history(request):
     status_filter = request.GET.get('status')
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
+    period = request.GET.get('period')  # today / week / month (사용자 시간대 기준)
     
-    queryset = Rebate.objects.filter(user=user)
+    queryset = Rebate.objects.filter(user=user).select_related('user', 'referral_transaction__exchange')
     
     # 거래소 필터
     if exchange_id:
-        queryset = queryset.filter(exchange_id=exchange_id)
+        queryset = queryset.filter(referral_transaction__exchange_id=exchange_id)
     
     # 상태 필터
     if status_filter:
@@ -242,14 +212,12 @@ def rebate_history(request):
         queryset = queryset.filter(created_at__gte=start_date)
     if end_date:
         queryset = queryset.filter(created_at__lte=end_date)
+    if period in PERIODS:
+        start, end = period_window(period, user_timezone(user))
+        queryset = queryset.filter(created_at__gte=start, created_at__lt=end)
     
-    # 정렬
-    queryset = queryset.order_by('-created_at')
-    
-    # 페이지네이션
-    from rest_framework.pagination import PageNumberPagination
-    paginator = PageNumberPagination()
-    paginator.page_size = 20
+    # 페이지네이션 ((created_at, id) 키셋 커서, 정렬은 페이지네이터가 지정)
+    paginator = KeysetPagination()
     paginated_queryset = paginator.paginate_queryset(queryset, request)
     
     serializer = RebateSerializer(paginated_queryset, many=True)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'crypto_rebate.apps.users'
+
+    def ready(self):
+        from . import availability  # noqa: F401 (사용 가능 여부 필터 시그널 등록)
@@ -0,0 +1,367 @@
+"""
+사용자명/이메일 사용 가능 여부 확인
+
+가입 폼은 입력할 때마다 check_username/check_email을 호출하므로 소문자로 정규화한 사용자명과
+이메일을 Bloom 필터에 넣어 두고, 필터에 없으면(확실히 사용되지 않음) DB를 조회하지 않고 답한다.
+필터에 있으면(오탐 가능) DB로 확인한다. REDIS_URL이 설정되면 프로세스 간 공유되는 Redis
+비트맵(SETBIT/GETBIT)을, 아니면 프로세스 내 bytearray를 필터로 쓴다.
+
+필터는 auth_user 전체로 만들고(Redis는 Celery 작업, 프로세스 내 필터는 처음 확인할 때 띄우는
+백그라운드 스레드) User post_save 시그널로 새 값을 추가한다. 만들기 전이나 만드는 중에는 DB로 확인한다.
+시그널을 거치지 않는 쓰기(다른 프로세스의 저장, bulk_create, 가져오기)는 백그라운드 스레드가
+SYNC_INTERVAL마다 필터에 반영된 마지막 pk 이후의 사용자를 읽어 추가하고, .update()로 바뀐
+사용자명/이메일은 프로세스 내 필터는 그 스레드가 MAX_AGE마다, Redis 필터는 Celery beat가 다시 만들어
+반영한다. 요청 처리 스레드는 필터를 만들거나 반영하지 않는다.
+BACKGROUND가 꺼져 있으면 스레드를 띄우지 않으며 refresh()를 호출해야 만들고 반영한다(테스트용).
+Bloom 필터는 값을 지울 수 없으므로 삭제/변경된 이전 값도 다시 만들 때까지 DB 확인으로
+넘어갈 뿐 결과가 틀리지는 않는다.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import Counter
+
+import redis
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.db.models.functions import Lower
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('username', 'email')
+
+
+def availability_config(key, default):
+    return getattr(settings, 'USERNAME_AVAILABILITY', {}).get(key, default)
+
+
+def bloom_size(capacity, error_rate):
+    """capacity개를 error_rate 오탐률로 담는 (비트 수, 해시 수)"""
+    bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+    return bits, max(1, round(bits / capacity * math.log(2)))
+
+
+def bloom_key(field, value):
+    """필터에 넣는 값 (DB의 LOWER(email) 비교보다 넓게 잡도록 소문자로 정규화)"""
+    return f'{field}:{value.lower()}'
+
+
+class LocalBloomFilter:
+    """프로세스 내 bytearray Bloom 필터"""
+
+    builds_in_process = True
+
+    def __init__(self, bits, hashes):
+        self.bits, self.hashes = bits, hashes
+        self._live = None  # 만들기 전에는 None
+        self._building = None
+        self._max_pk = None  # 필터에 반영된 마지막 사용자 pk
+        self.built_at = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def positions(self, key):
+        # 128비트 해시 하나를 둘로 나눠 hashes개 위치를 만든다 (double hashing)
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def _set(self, array, keys):
+        for key in keys:
+            for position in self.positions(key):
+                array[position >> 3] |= 1 << (position & 7)
+
+    def add(self, keys):
+        with self._lock:
+            # 만드는 중인 필터에도 넣어 교체 후에 빠지지 않게 한다
+            for array in (self._live, self._building):
+                if array is not None:
+                    self._set(array, keys)
+
+    def contains(self, key):
+        """True/False, 아직 만들지 않았으면 None"""
+        array = self._live
+        if array is None:
+            return None
+        return all(array[position >> 3] & (1 << (position & 7)) for position in self.positions(key))
+
+    def watermark(self):
+        """필터에 반영된 마지막 사용자 pk (만들기 전이면 None)"""
+        return self._max_pk
+
+    def advance(self, pk):
+        with self._lock:
+            if self._max_pk is not None and pk > self._max_pk:
+                self._max_pk = pk
+
+    def expired(self, max_age):
+        return self.built_at is not None and time.monotonic() - self.built_at > max_age
+
+    def rebuild(self, batches):
+        """batches((최대 pk, 값 목록)들)로 새 필터를 만들어 교체, 다른 스레드가 만드는 중이면 False"""
+        if not self._build_lock.acquire(blocking=False):
+            return False
+        try:
+            with self._lock:
+                self._building = bytearray((self.bits + 7) // 8)
+            max_pk = 0
+            for batch_max_pk, keys in batches:
+                max_pk = max(max_pk, batch_max_pk)
+                with self._lock:
+                    self._set(self._building, keys)
+            with self._lock:
+                self._live, self._building = self._building, None
+                self._max_pk, self.built_at = max_pk, time.monotonic()
+            return True
+        finally:
+            with self._lock:
+                self._building = None
+            self._build_lock.release()
+
+
+class RedisBloomFilter(LocalBloomFilter):
+    """Redis 비트맵 Bloom 필터 (SETBIT/GETBIT, 프로세스 간 공유)
+
+    마지막 비트(bits 위치)는 다 만들었다는 표시다. 시그널이 만들기 전의 키에 비트를 넣거나
+    메모리 부족으로 키가 지워져도 이 비트가 없으면 만들기 전으로 보고 DB로 확인한다.
+    """
+
+    KEY = 'username_availability'
+    builds_in_process = False
+
+    def __init__(self, url, bits, hashes):
+        super().__init__(bits, hashes)
+        self.client = redis.Redis.from_url(url)
+        self.building_key = f'{self.KEY}:building'
+        self.lock_key = f'{self.KEY}:lock'
+        self.pk_key = f'{self.KEY}:max_pk'
+
+    def add(self, keys):
+        # 만드는 중이 아니어도 building 키에 넣는다 (다음에 만들 때 먼저 지운다)
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            for position in self.positions(key):
+                pipe.setbit(self.KEY, position, 1)
+                pipe.setbit(self.building_key, position, 1)
+        pipe.execute()
+
+    def contains(self, key):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.getbit(self.KEY, self.bits)
+        for position in self.positions(key):
+            pipe.getbit(self.KEY, position)
+        ready, *found = pipe.execute()
+        if not ready:
+            return None
+        return all(found)
+
+    def watermark(self):
+        # 프로세스마다 따로 따라간다 (처음에는 마지막 재생성 시점의 pk부터)
+        if self._max_pk is None:
+            max_pk = self.client.get(self.pk_key)
+            self._max_pk = int(max_pk) if max_pk is not None else None
+        return self._max_pk
+
+    def expired(self, max_age):
+        return False  # Celery beat가 다시 만든다
+
+    def schedule_rebuild(self):
+        """다른 프로세스가 이미 예약하지 않았으면 재생성 작업 예약"""
+        if self.client.set(f'{self.KEY}:scheduled', 1, nx=True, ex=availability_config('BUILD_TIMEOUT', 600)):
+            from .tasks import rebuild_username_availability
+            rebuild_username_availability.delay()
+
+    def rebuild(self, batches):
+        if not self.client.set(self.lock_key, 1, nx=True, ex=availability_config('BUILD_TIMEOUT', 600)):
+            return False
+        try:
+            self.client.delete(self.building_key)
+            max_pk = 0
+            for batch_max_pk, keys in batches:
+                max_pk = max(max_pk, batch_max_pk)
+                pipe = self.client.pipeline(transaction=False)
+                for key in keys:
+                    for position in self.positions(key):
+                        pipe.setbit(self.building_key, position, 1)
+                pipe.execute()
+            pipe = self.client.pipeline(transaction=True)
+            pipe.setbit(self.building_key, self.bits, 1)
+            pipe.rename(self.building_key, self.KEY)
+            pipe.set(self.pk_key, max_pk)
+            pipe.delete(f'{self.KEY}:scheduled')
+            pipe.execute()
+            with self._lock:
+                self._max_pk = max(self._max_pk or 0, max_pk)
+            return True
+        finally:
+            self.client.delete(self.lock_key)
+
+
+class UsernameAvailability:
+    """사용자명/이메일 사용 여부 확인 (필터는 설정에 따라 지연 생성)"""
+
+    def __init__(self):
+        self._filter = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._stats = Counter()
+
+    @property
+    def filter(self):
+        if self._filter is None:
+            with self._lock:
+                if self._filter is None:
+                    bits, hashes = bloom_size(
+                        availability_config('CAPACITY', 2_000_000), availability_config('ERROR_RATE', 0.01)
+                    )
+                    if settings.REDIS_URL:
+                        self._filter = RedisBloomFilter(settings.REDIS_URL, bits, hashes)
+                    else:
+                        self._filter = LocalBloomFilter(bits, hashes)
+        return self._filter
+
+    def reset(self):
+        """스레드를 멈추고 필터와 통계를 비움 (설정 변경/테스트용)"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stop.set()
+        if thread is not None:
+            thread.join()
+        with self._lock:
+            self._stop = threading.Event()
+            self._filter = None
+            self._stats.clear()
+
+    def stats(self):
+        return dict(self._stats)
+
+    def is_taken(self, field, value):
+        """field(username/email)의 value가 이미 쓰이는지 (필터에 없으면 DB를 조회하지 않는다)"""
+        if field not in FIELDS:
+            raise ValueError(f'Unknown field: {field}')
+        if availability_config('ENABLED', True):
+            if availability_config('BACKGROUND', True):
+                self._ensure_thread()
+            found = self.filter.contains(bloom_key(field, value))
+            if found is None:
+                self._stats['not_ready'] += 1
+                if not self.filter.builds_in_process:
+                    self.filter.schedule_rebuild()
+            elif not found:
+                self._stats['negatives'] += 1
+                return False
+
+        self._stats['db_checks'] += 1
+        if field == 'email':
+            taken = User.objects.alias(email_lower=Lower('email')).filter(email_lower=value.lower()).exists()
+        else:
+            taken = User.objects.filter(username=value).exists()
+        if not taken:
+            self._stats['false_positives'] += 1
+        return taken
+
+    def add_user(self, user):
+        self.filter.add([bloom_key(field, getattr(user, field)) for field in FIELDS if getattr(user, field)])
+
+    def rebuild(self):
+        """auth_user 전체로 필터를 다시 만들고 성공 여부 반환 (이미 만드는 중이면 False)"""
+        return self.filter.rebuild(self._batches())
+
+    def sync(self):
+        """시그널을 거치지 않고 추가된 사용자(마지막 반영 pk 이후)를 필터에 추가하고 새 사용자 수 반환
+
+        커밋 순서가 pk 순서와 다를 수 있으므로 마지막 SYNC_OVERLAP개 pk는 다시 읽는다.
+        """
+        watermark = self.filter.watermark()
+        if watermark is None:
+            return 0
+        batch_size = availability_config('BUILD_BATCH_SIZE', 5000)
+        after, synced = max(watermark - availability_config('SYNC_OVERLAP', 100), 0), 0
+        while True:
+            rows = list(User.objects.filter(pk__gt=after).order_by('pk').values_list('pk', *FIELDS)[:batch_size])
+            if not rows:
+                return synced
+            self.filter.add([bloom_key(field, value) for _, *values in rows
+                             for field, value in zip(FIELDS, values) if value])
+            after = rows[-1][0]
+            self.filter.advance(after)
+            synced += sum(1 for pk, *_ in rows if pk > watermark)
+
+    def refresh(self):
+        """만들기 전이거나 MAX_AGE가 지난 프로세스 내 필터는 다시 만들고, 아니면 새 사용자를 반영"""
+        # 다른 스레드가 반영 중이면 기다리지 않는다
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            if self.filter.builds_in_process and (
+                    self.filter.watermark() is None or self.filter.expired(availability_config('MAX_AGE', 3600))):
+                self._stats['rebuilds'] += 1
+                self.rebuild()
+            else:
+                self._stats['synced_users'] += self.sync()
+        finally:
+            self._refresh_lock.release()
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, args=(self._stop,), name='username-availability', daemon=True
+                    )
+                    self._thread.start()
+
+    def _run(self, stop):
+        try:
+            while not stop.is_set():
+                try:
+                    self.refresh()
+                except Exception:
+                    logger.exception('Failed to refresh the username availability filter')
+                close_old_connections()
+                stop.wait(availability_config('SYNC_INTERVAL', 10))
+        finally:
+            close_old_connections()
+
+    def _batches(self):
+        batch_size = availability_config('BUILD_BATCH_SIZE', 5000)
+        batch, max_pk = [], 0
+        rows = User.objects.order_by().values_list('pk', *FIELDS).iterator(chunk_size=batch_size)
+        for pk, *values in rows:
+            max_pk = max(max_pk, pk)
+            batch.extend(bloom_key(field, value) for field, value in zip(FIELDS, values) if value)
+            if len(batch) >= batch_size:
+                yield max_pk, batch
+                batch = []
+        if batch:
+            yield max_pk, batch
+
+
+username_availability = UsernameAvailability()
+
+
+@receiver(post_save, sender=User)
+def add_user_to_availability_filter(sender, instance, update_fields=None, **kwargs):
+    if not availability_config('ENABLED', True):
+        return
+    # last_login 갱신처럼 사용자명/이메일을 저장하지 않는 경우는 건너뛴다
+    if update_fields is not None and not set(FIELDS) & set(update_fields):
+        return
+    username_availability.add_user(instance)
+    # 커밋 전에 스냅샷을 읽은 재생성이 이 값을 빠뜨리지 않도록 커밋 후에 한 번 더 넣는다
+    transaction.on_commit(lambda: username_availability.add_user(instance))
+
+
+@receiver(setting_changed)
+def reset_username_availability(*, setting, **kwargs):
+    if setting in ('REDIS_URL', 'USERNAME_AVAILABILITY'):
+        username_availability.reset()
@@ -0,0 +1,169 @@
+"""
+Google ID 토큰 로컬 검증
+
+로그인마다 tokeninfo 엔드포인트를 호출하지 않고, Google 공개키(JWKS)로 JWT 서명과
+aud/iss/exp를 직접 검증한다. 공개키는 2단계 캐시(프로세스 내 + CACHES 공유 캐시)에
+응답의 Cache-Control max-age 동안 보관한다.
+
+모르는 kid(키 교체)나 만료로 다시 받아야 하면 프로세스당 한 스레드만 요청하고(single-flight)
+나머지는 그 결과를 기다린다. 모르는 kid로 인한 재요청은 MIN_REFRESH_INTERVAL에 한 번으로 제한하고,
+받기에 실패하면 만료된 키라도 있으면 MIN_REFRESH_INTERVAL 동안 그대로 쓴다.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+import jwt
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+MAX_AGE_RE = re.compile(r'(?:^|,)\s*max-age=(\d+)', re.IGNORECASE)
+
+
+class InvalidGoogleToken(Exception):
+    """검증에 실패한 Google ID 토큰"""
+
+
+def google_token_config(key, default):
+    return getattr(settings, 'GOOGLE_ID_TOKEN', {}).get(key, default)
+
+
+class GoogleKeySet:
+    """Google JWKS 2단계 캐시 (kid -> PyJWK)"""
+
+    SHARED_KEY = 'google_jwks'
+
+    def __init__(self):
+        self._refresh_lock = threading.Lock()
+        self._stats = Counter()
+        self.reset()
+
+    @property
+    def shared(self):
+        return caches[google_token_config('CACHE_ALIAS', 'default')]
+
+    def reset(self):
+        """로컬 키와 통계 초기화 (테스트/운영 도구용)"""
+        with self._refresh_lock:
+            self._keys = {}
+            self._expires_at = 0.0
+            self._checked_at = float('-inf')
+            self._stats.clear()
+
+    def get_key(self, kid):
+        """kid의 공개키 (받은 키 목록에 없으면 None)"""
+        key = self._keys.get(kid)
+        if key is not None and self._expires_at > time.time():
+            self._stats['local_hits'] += 1
+            return key
+
+        seen_keys = self._keys
+        with self._refresh_lock:
+            # 기다리는 동안 다른 스레드가 새 키를 받았으면 그대로 쓴다
+            if self._keys is not seen_keys and kid in self._keys and self._expires_at > time.time():
+                self._stats['local_hits'] += 1
+                return self._keys[kid]
+            # 다른 프로세스가 받아 둔 키
+            cached = self.shared.get(self.SHARED_KEY)
+            if cached and cached['expires_at'] > time.time():
+                keys = self._parse(cached['jwks'])
+                if kid in keys:
+                    self._keys, self._expires_at = keys, cached['expires_at']
+                    self._stats['shared_hits'] += 1
+                    return keys[kid]
+            if self._expires_at > time.time() and (
+                time.monotonic() - self._checked_at < google_token_config('MIN_REFRESH_INTERVAL', 60)
+            ):
+                # 키가 아직 유효한데 모르는 kid면 최근에 받은 목록을 믿는다
+                return None
+            self._fetch()
+            return self._keys.get(kid)
+
+    def _fetch(self):
+        self._checked_at = time.monotonic()
+        try:
+            response = requests.get(
+                google_token_config('CERTS_URL', 'https://www.googleapis.com/oauth2/v3/certs'),
+                timeout=google_token_config('FETCH_TIMEOUT', 3),
+            )
+            response.raise_for_status()
+            jwks = response.json()
+            keys = self._parse(jwks)
+        except (requests.RequestException, ValueError) as exc:
+            self._stats['fetch_errors'] += 1
+            logger.warning('Failed to fetch Google JWKS: %s', exc)
+            if self._keys:
+                # 만료된 키라도 있으면 MIN_REFRESH_INTERVAL 동안 계속 쓰고 그 뒤에 다시 받는다
+                self._expires_at = time.time() + google_token_config('MIN_REFRESH_INTERVAL', 60)
+            return
+        match = MAX_AGE_RE.search(response.headers.get('Cache-Control', ''))
+        max_age = int(match.group(1)) if match else google_token_config('DEFAULT_MAX_AGE', 3600)
+        expires_at = time.time() + max_age
+        self._keys, self._expires_at = keys, expires_at
+        self._stats['fetches'] += 1
+        if max_age > 0:
+            self.shared.set(self.SHARED_KEY, {'jwks': jwks, 'expires_at': expires_at}, timeout=max_age)
+
+    @staticmethod
+    def _parse(jwks):
+        keys = {}
+        for data in jwks.get('keys', []):
+            try:
+                keys[data['kid']] = jwt.PyJWK(data)
+            except (KeyError, jwt.PyJWTError):
+                continue
+        return keys
+
+    def stats(self):
+        return {
+            key: self._stats[key]
+            for key in ('local_hits', 'shared_hits', 'fetches', 'fetch_errors')
+        }
+
+
+google_key_set = GoogleKeySet()
+
+
+def verify_google_id_token(token, audiences=None):
+    """서명/aud/iss/exp와 이메일 인증 여부를 확인한 Google ID 토큰 클레임 반환
+
+    audiences 기본값은 GOOGLE_ID_TOKEN['AUDIENCES'] (OAuth 클라이언트 ID).
+    검증에 실패하면 InvalidGoogleToken.
+    """
+    audiences = [audience for audience in (audiences or google_token_config('AUDIENCES', [])) if audience]
+    if not audiences:
+        raise InvalidGoogleToken('Google client ID is not configured')
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.PyJWTError as exc:
+        raise InvalidGoogleToken(f'Malformed token: {exc}') from exc
+    key = google_key_set.get_key(header.get('kid'))
+    if key is None:
+        raise InvalidGoogleToken('Unknown signing key')
+    try:
+        claims = jwt.decode(
+            token, key.key, algorithms=['RS256'], audience=audiences,
+            leeway=google_token_config('LEEWAY', 60),
+            options={'require': ['exp', 'iat', 'iss', 'aud', 'sub']},
+        )
+    except jwt.PyJWTError as exc:
+        raise InvalidGoogleToken(str(exc)) from exc
+    if claims['iss'] not in GOOGLE_ISSUERS:
+        raise InvalidGoogleToken('Invalid issuer')
+    if claims.get('email') and not claims.get('email_verified'):
+        raise InvalidGoogleToken('Email is not verified')
+    return claims
+
+
+@receiver(setting_changed)
+def reset_google_key_set(*, setting, **kwargs):
+    if setting in ('GOOGLE_ID_TOKEN', 'CACHES'):
+        google_key_set.reset()
@@ -1,26 +1,64 @@
+import time
+
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from crypto_rebate.apps.users.models import UserProfile
 
 
 class Command(BaseCommand):
-    help = 'Create UserProfile for users who don\'t have one'
+    help = 'Create UserProfile for users who don\'t have one (batched, resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Profiles inserted per bulk_create (and user ids fetched per chunk)')
+        parser.add_argument('--start-after', type=int, default=0,
+                            help='Skip users with an id up to this value (resume from a reported id)')
+        parser.add_argument('--dry-run', action='store_true', help='Only count users without a profile')
 
     def handle(self, *args, **options):
-        users_without_profile = User.objects.filter(profile__isnull=True)
-        
-        if not users_without_profile.exists():
+        batch_size = options['batch_size']
+        # 프로필이 없는 사용자만 id 순서로 읽으므로 중단 후 다시 실행하면 남은 사용자부터 이어서 만든다
+        user_ids = User.objects.filter(
+            profile__isnull=True, pk__gt=options['start_after']
+        ).order_by('pk').values_list('pk', flat=True)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{user_ids.count()} users have no profile (dry run).'))
+            return
+
+        started = time.monotonic()
+        processed_count, created_count, batch = 0, 0, []
+        for user_id in user_ids.iterator(chunk_size=batch_size):
+            batch.append(user_id)
+            if len(batch) >= batch_size:
+                processed_count += len(batch)
+                created_count += self._create(batch, processed_count, started)
+                batch = []
+        if batch:
+            processed_count += len(batch)
+            created_count += self._create(batch, processed_count, started)
+
+        if not created_count:
             self.stdout.write(
                 self.style.SUCCESS('All users already have profiles.')
             )
             return
-        
-        created_count = 0
-        for user in users_without_profile:
-            UserProfile.objects.create(user=user)
-            created_count += 1
-            self.stdout.write(f'Created profile for user: {user.username}')
-        
         self.stdout.write(
             self.style.SUCCESS(f'Successfully created {created_count} user profiles.')
         )
+
+    def _create(self, user_ids, processed_count, started):
+        # 다른 경로(지연 생성 등)가 먼저 만든 프로필은 건너뛰므로
+        # 삽입 전후 프로필 수 차이로 실제 생성 수를 센다
+        profiles = UserProfile.objects.filter(user_id__in=user_ids)
+        existing = profiles.count()
+        UserProfile.objects.bulk_create(
+            [UserProfile(user_id=user_id) for user_id in user_ids], ignore_conflicts=True
+        )
+        created = profiles.count() - existing
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'Processed {processed_count} users ({processed_count / elapsed if elapsed else 0:,.0f}/s), '
+            f'created {created}, last user id {user_ids[-1]}'
+        )
+        return created
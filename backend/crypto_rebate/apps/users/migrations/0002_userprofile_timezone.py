@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 01:14
+
+import crypto_rebate.apps.users.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='timezone',
+            field=models.CharField(blank=True, default='', max_length=63, validators=[crypto_rebate.apps.users.models.validate_timezone]),
+        ),
+    ]
@@ -1,8 +1,25 @@
+from functools import lru_cache
+from zoneinfo import available_timezones
+
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import User
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from crypto_rebate.periods import get_timezone
+
+
+@lru_cache(maxsize=None)
+def known_timezones():
+    """IANA 시간대 이름 집합 (시간대 파일을 모두 훑으므로 프로세스당 한 번만 만든다)"""
+    return frozenset(available_timezones())
+
+
+def validate_timezone(value):
+    if value and value not in known_timezones():
+        raise ValidationError(f'알 수 없는 시간대입니다: {value}')
+
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -10,23 +27,43 @@ class UserProfile(models.Model):
     address = models.TextField(blank=True, null=True)
     birth_date = models.DateField(blank=True, null=True)
     is_verified = models.BooleanField(default=False)
+    # IANA 시간대 이름 (예: Asia/Seoul), 비어 있으면 서버 기본 시간대(TIME_ZONE)
+    timezone = models.CharField(max_length=63, blank=True, default='', validators=[validate_timezone])
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.username}'s Profile"
 
+    @property
+    def zone(self):
+        """기간 집계에 쓰는 사용자 시간대 (tzinfo)"""
+        return get_timezone(self.timezone)
+
     class Meta:
         verbose_name = "User Profile"
         verbose_name_plural = "User Profiles"
 
 
-@receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
-    if created:
-        UserProfile.objects.create(user=instance)
+def user_timezone(user):
+    """사용자 프로필 시간대 (프로필이 없으면 서버 기본 시간대)"""
+    profile = getattr(user, 'profile', None)
+    return profile.zone if profile is not None else get_timezone()
+
+
+def get_profile(user):
+    """사용자 프로필 (프로필이 없는 기존 사용자는 처음 접근할 때 만든다)"""
+    try:
+        return user.profile
+    except UserProfile.DoesNotExist:
+        profile, _ = UserProfile.objects.get_or_create(user=user)
+        user.profile = profile
+        return profile
 
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save()
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    # 생성 시에만 만들고 이후 User 저장(로그인의 last_login 갱신 등)에서는 프로필을 건드리지 않는다.
+    # 프로필 변경은 프로필을 직접 저장한다
+    if created and not raw:
+        instance.profile = UserProfile.objects.create(user=instance)
@@ -2,7 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.db import models
-from .models import UserProfile
+from .models import UserProfile, get_profile
 
 User = get_user_model()
 
@@ -13,10 +13,10 @@ class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserProfile
         fields = [
-            'id', 'user', 'phone_number', 'country', 'timezone',
-            'preferred_currency', 'notification_settings', 'created_at', 'updated_at'
+            'id', 'user', 'phone_number', 'address', 'birth_date', 'is_verified', 'timezone',
+            'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'user', 'is_verified', 'created_at', 'updated_at']
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -47,8 +47,12 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
         
         user = User.objects.create_user(**validated_data)
         
-        # 프로필 생성
-        UserProfile.objects.create(user=user, **profile_data)
+        # 프로필은 post_save에서 생성되므로 입력값이 있을 때만 반영
+        if profile_data:
+            profile = get_profile(user)
+            for attr, value in profile_data.items():
+                setattr(profile, attr, value)
+            profile.save()
         
         return user
 
@@ -105,7 +109,7 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         
         # 프로필 정보 업데이트
         if profile_data:
-            profile = instance.profile
+            profile = get_profile(instance)
             for attr, value in profile_data.items():
                 setattr(profile, attr, value)
             profile.save()
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .availability import username_availability
+
+
+@shared_task
+def rebuild_username_availability():
+    """사용자명/이메일 Bloom 필터 재생성 (.update()로 바뀐 값 반영과 삭제/변경된 이전 값 정리, Celery beat 주기 작업)"""
+    return username_availability.rebuild()
@@ -1,3 +1,462 @@
-from django.test import TestCase
+import json
+from io import StringIO
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from . import models, usernames
+from .availability import username_availability
+from .management.commands.create_user_profiles import Command
+from .models import UserProfile, get_profile, validate_timezone
+from .google_tokens import GoogleKeySet, InvalidGoogleToken, google_key_set, verify_google_id_token
+from .usernames import create_user_with_unique_username, next_username, username_base
+
+CLIENT_ID = 'client-id.apps.googleusercontent.com'
+
+
+def make_key(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    return private_key, {**jwk, 'kid': kid, 'alg': 'RS256', 'use': 'sig'}
+
+
+class StubJWKSHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits += 1
+        time.sleep(server.delay)
+        body = json.dumps({'keys': server.keys}).encode()
+        self.send_response(server.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Cache-Control', f'public, max-age={server.max_age}, must-revalidate')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class GoogleIdTokenTest(TestCase):
+    """Google ID 토큰 로컬 검증과 공개키 캐시 검증 (로컬 키 + 스텁 JWKS 서버)"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.old_private, cls.old_jwk = make_key('old')
+        cls.new_private, cls.new_jwk = make_key('new')
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubJWKSHandler)
+        cls.server.lock = threading.Lock()
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.addClassCleanup(cls.server.server_close)
+        cls.addClassCleanup(cls.server.shutdown)
+
+    def setUp(self):
+        self.server.hits, self.server.delay, self.server.status = 0, 0, 200
+        self.server.keys, self.server.max_age = [self.old_jwk], 120
+        override = self.settings(GOOGLE_ID_TOKEN={
+            'CERTS_URL': f'http://127.0.0.1:{self.server.server_port}/certs',
+            'AUDIENCES': [CLIENT_ID], 'FETCH_TIMEOUT': 2, 'MIN_REFRESH_INTERVAL': 60, 'LEEWAY': 0,
+        })
+        override.enable()
+        self.addCleanup(override.disable)
+        caches['default'].delete(GoogleKeySet.SHARED_KEY)
+        self.addCleanup(google_key_set.reset)
+
+    def token(self, private_key=None, kid='old', **claims):
+        now = int(time.time())
+        payload = {
+            'iss': 'https://accounts.google.com', 'aud': CLIENT_ID, 'sub': '1234567890',
+            'email': 'alice@gmail.com', 'email_verified': True, 'name': 'Alice',
+            'iat': now, 'exp': now + 3600, **claims,
+        }
+        return jwt.encode(payload, private_key or self.old_private, algorithm='RS256', headers={'kid': kid})
+
+    def test_verifies_locally_and_caches_keys(self):
+        self.assertEqual(verify_google_id_token(self.token())['email'], 'alice@gmail.com')
+        verify_google_id_token(self.token())
+        self.assertEqual(self.server.hits, 1)
+
+        # 다른 프로세스(로컬 캐시 없음)는 공유 캐시의 키를 쓴다
+        google_key_set.reset()
+        verify_google_id_token(self.token())
+        self.assertEqual(self.server.hits, 1)
+        self.assertEqual(google_key_set.stats()['shared_hits'], 1)
+
+    def test_honors_cache_control_max_age(self):
+        token = self.token()
+        verify_google_id_token(token)
+        with mock.patch('crypto_rebate.apps.users.google_tokens.time.time', return_value=time.time() + 121):
+            verify_google_id_token(token)
+        self.assertEqual(self.server.hits, 2)
+
+    def test_key_rotation_refreshes_once(self):
+        verify_google_id_token(self.token())
+        # 마지막으로 받은 지 MIN_REFRESH_INTERVAL이 지난 뒤 새 kid로 서명된 토큰이 들어온 경우
+        google_key_set._checked_at -= 60
+        self.server.keys, self.server.delay = [self.old_jwk, self.new_jwk], 0.2
+        token, results = self.token(self.new_private, kid='new'), []
+
+        def verify():
+            results.append(verify_google_id_token(token)['sub'])
+
+        workers = [threading.Thread(target=verify) for _ in range(8)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(results, ['1234567890'] * 8)
+        self.assertEqual(self.server.hits, 2)
+
+    def test_unknown_kid_refresh_is_rate_limited(self):
+        unknown_private, _ = make_key('unknown')
+        for _ in range(3):
+            with self.assertRaisesMessage(InvalidGoogleToken, 'Unknown signing key'):
+                verify_google_id_token(self.token(unknown_private, kid='unknown'))
+        self.assertEqual(self.server.hits, 1)
+
+    def test_fetch_failure_keeps_stale_keys(self):
+        token = self.token()
+        verify_google_id_token(token)
+        self.server.status = 500
+        with mock.patch('crypto_rebate.apps.users.google_tokens.time.time', return_value=time.time() + 121):
+            with self.assertLogs('crypto_rebate.apps.users.google_tokens', 'WARNING'):
+                verify_google_id_token(token)
+            verify_google_id_token(token)
+        self.assertEqual(self.server.hits, 2)
+        self.assertEqual(google_key_set.stats()['fetch_errors'], 1)
+
+    def test_rejects_invalid_tokens(self):
+        now = int(time.time())
+        forged_private, _ = make_key('old')
+        for token in (
+            'not-a-jwt',
+            self.token(aud='other-client'),
+            self.token(iss='https://evil.example.com'),
+            self.token(iat=now - 7200, exp=now - 3600),
+            self.token(email_verified=False),
+            self.token(forged_private),
+        ):
+            with self.assertRaises(InvalidGoogleToken):
+                verify_google_id_token(token)
+        with self.settings(GOOGLE_ID_TOKEN={'AUDIENCES': ['']}):
+            with self.assertRaisesMessage(InvalidGoogleToken, 'not configured'):
+                verify_google_id_token(self.token())
+
+    def test_google_login_view(self):
+        client = APIClient()
+        with mock.patch('builtins.print'):
+            response = client.post(reverse('users:google_login'), {'credential': self.token()}, format='json')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['user']['email'], 'alice@gmail.com')
+            self.assertTrue(User.objects.filter(email='alice@gmail.com').exists())
+
+            with self.assertLogs('crypto_rebate.apps.users.views', 'WARNING') as logs:
+                response = client.post(
+                    reverse('users:google_login'), {'credential': self.token(aud='other')}, format='json'
+                )
+            self.assertEqual(response.status_code, 401)
+            self.assertIn('Invalid Google credential', logs.output[0])
+        self.assertEqual(self.server.hits, 1)
+
+
+class UsernameAllocationTest(TestCase):
+    """숫자 접미사 사용자명 할당 (쿼리 한 번) 과 충돌 재시도 검증"""
+
+    def test_username_base(self):
+        self.assertEqual(username_base('John.Doe+tag@gmail.com'), 'John.Doe+tag')
+        self.assertEqual(username_base('\'"!@example.com'), 'user')
+        self.assertEqual(len(username_base('a' * 200 + '@example.com')), 150 - usernames.MAX_SUFFIX_DIGITS - 1)
+
+    def test_next_username_uses_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(next_username('john'), 'john')
+        for username in ('john', 'john1', 'john007', 'john12', 'johnny', 'johnny99', 'john.doe', 'xjohn50', 'john2x'):
+            User.objects.create(username=username)
+        with self.assertNumQueries(1):
+            self.assertEqual(next_username('john'), 'john13')
+        self.assertEqual(next_username('john.doe'), 'john.doe1')
+        # 기본 이름이 비어 있으면 접미사가 있어도 기본 이름을 쓴다
+        self.assertEqual(next_username('johnny9'), 'johnny9')
+
+    def test_retries_when_a_concurrent_signup_takes_the_name(self):
+        User.objects.create(username='john')
+        # 첫 계산 결과(john)를 다른 요청이 먼저 가져간 상황
+        with mock.patch.object(usernames, 'next_username', side_effect=['john', 'john1']) as allocate:
+            user = create_user_with_unique_username('john', email='john@example.com')
+        self.assertEqual(allocate.call_count, 2)
+        self.assertEqual(user.username, 'john1')
+
+        with mock.patch.object(usernames, 'next_username', return_value='john'):
+            with self.assertRaises(IntegrityError):
+                create_user_with_unique_username('john', attempts=2)
+
+
+class ProfilePersistenceTest(TestCase):
+    """User 저장 시 프로필 재저장 제거와 프로필 지연 생성 검증"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='alice', email='alice@gmail.com', password='pw-12345')
+        self.client = APIClient()
+
+    def queries(self, func):
+        """func 실행 중 실행된 SQL 목록 (테스트 클라이언트는 요청마다 queries_log를 비운다)"""
+        executed = []
+
+        def record(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            func()
+        return executed
+
+    def profile_queries(self, func):
+        return [sql.split()[0] for sql in self.queries(func) if 'users_userprofile' in sql]
+
+    def test_login_flows_touch_profile_only_when_needed(self):
+        # 이전에는 last_login 갱신 저장마다 프로필 SELECT + UPDATE가 실행됐다
+        login = lambda: self.assertEqual(self.client.post(
+            reverse('users:login'), {'username': 'alice', 'password': 'pw-12345'}
+        ).status_code, 200)
+        self.assertEqual(self.profile_queries(login), [])
+
+        claims = {'email': 'alice@gmail.com', 'email_verified': True, 'name': 'Alice'}
+        google_login = lambda: self.assertEqual(self.client.post(
+            reverse('users:google_login'), {'credential': 'token'}, format='json'
+        ).status_code, 200)
+        with mock.patch('crypto_rebate.apps.users.views.verify_google_id_token', return_value=claims), \
+                mock.patch('builtins.print'):
+            # 기존 사용자는 처음 Google 로그인할 때만 인증 표시를 저장한다
+            self.assertEqual(self.profile_queries(google_login), ['SELECT', 'UPDATE'])
+            self.assertEqual(self.profile_queries(google_login), ['SELECT'])
+            # 새 Google 사용자는 프로필 INSERT + 인증 표시 (이전에는 INSERT + SELECT + UPDATE + is_active 재저장)
+            claims['email'] = 'bob@gmail.com'
+            self.assertEqual(self.profile_queries(google_login), ['INSERT', 'UPDATE'])
+            # 프로필이 없는 기존 사용자는 인증된 프로필을 새로 받는다
+            carol = User.objects.create_user(username='carol', email='carol@gmail.com')
+            UserProfile.objects.filter(user=carol).delete()
+            claims['email'] = 'carol@gmail.com'
+            google_login()
+        self.assertEqual(
+            set(UserProfile.objects.filter(is_verified=True).values_list('user__username', flat=True)),
+            {'alice', 'bob', 'carol'},
+        )
+
+    def test_registration_creates_profile_once(self):
+        data = {'username': 'carol', 'email': 'carol@example.com',
+                'password': 'Str0ng-pass!', 'password_confirm': 'Str0ng-pass!'}
+        register = lambda: self.assertEqual(
+            self.client.post(reverse('users:register'), data, format='json').status_code, 201
+        )
+        self.assertEqual(self.profile_queries(register), ['INSERT'])
+
+        data = {**data, 'username': 'dave', 'email': 'dave@example.com', 'profile': {'timezone': 'Asia/Seoul'}}
+        self.assertEqual(self.profile_queries(register), ['INSERT', 'UPDATE'])
+        self.assertEqual(UserProfile.objects.get(user__username='dave').timezone, 'Asia/Seoul')
+
+    def test_user_save_does_not_resave_profile(self):
+        updated_at = self.user.profile.updated_at
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Alice'
+        self.assertEqual(self.profile_queries(user.save), [])
+        self.assertEqual(UserProfile.objects.get(user=user).updated_at, updated_at)
+
+    def test_profile_is_created_lazily_for_users_without_one(self):
+        UserProfile.objects.filter(user=self.user).delete()
+        user = User.objects.get(pk=self.user.pk)
+        self.assertEqual(self.profile_queries(lambda: get_profile(user)), ['SELECT', 'SELECT', 'INSERT'])
+        self.assertEqual(self.profile_queries(lambda: get_profile(user)), [])
+
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        response = self.client.patch(reverse('users:profile_details'), {'timezone': 'UTC'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(UserProfile.objects.get(user=self.user).timezone, 'UTC')
+
+    def test_timezone_names_are_loaded_once(self):
+        models.known_timezones.cache_clear()
+        self.addCleanup(models.known_timezones.cache_clear)
+        with mock.patch.object(models, 'available_timezones', wraps=models.available_timezones) as available:
+            for value in ['Asia/Seoul', 'UTC', '']:
+                validate_timezone(value)
+            with self.assertRaises(ValidationError):
+                validate_timezone('Mars/Olympus_Mons')
+        self.assertEqual(available.call_count, 1)
+
+
+class CreateUserProfilesCommandTest(TestCase):
+    """create_user_profiles 배치 생성/드라이런/재개 검증"""
+
+    def setUp(self):
+        self.users = [User.objects.create(username=f'user{i}') for i in range(7)]
+        UserProfile.objects.filter(user__in=self.users[1:]).delete()
+
+    def call(self, *args):
+        out = StringIO()
+        call_command('create_user_profiles', *args, stdout=out)
+        return out.getvalue()
+
+    def test_bulk_creates_missing_profiles_in_batches(self):
+        with self.assertNumQueries(1 + 3 * 3):  # id 조회 + 배치당 전후 COUNT와 INSERT
+            out = self.call('--batch-size', '2')
+        self.assertIn('Successfully created 6 user profiles.', out)
+        self.assertIn('Processed 6 users', out)
+        self.assertIn(f'last user id {self.users[-1].pk}', out)
+        self.assertEqual(UserProfile.objects.filter(user__in=self.users).count(), 7)
+        self.assertIn('All users already have profiles.', self.call())
+
+    def test_counts_only_real_inserts(self):
+        # 명령이 id를 읽은 뒤 다른 경로가 먼저 만든 프로필은 생성 수에서 빠진다
+        create = Command._create
+
+        def racing_create(command, user_ids, *args):
+            UserProfile.objects.create(user=self.users[1])
+            return create(command, user_ids, *args)
+
+        with mock.patch.object(Command, '_create', racing_create):
+            out = self.call()
+        self.assertIn('Successfully created 5 user profiles.', out)
+        self.assertIn('Processed 6 users', out)
+        self.assertEqual(UserProfile.objects.filter(user__in=self.users).count(), 7)
+
+    def test_dry_run_and_resume(self):
+        self.assertIn('6 users have no profile (dry run).', self.call('--dry-run'))
+        self.assertEqual(UserProfile.objects.filter(user__in=self.users).count(), 1)
+
+        self.call('--start-after', str(self.users[3].pk))
+        self.assertEqual(
+            set(UserProfile.objects.filter(user__in=self.users).values_list('user_id', flat=True)),
+            {self.users[0].pk, *(user.pk for user in self.users[4:])},
+        )
+        # 이미 만든 프로필은 다시 실행해도 건너뛴다
+        self.assertIn('Successfully created 3 user profiles.', self.call())
+        self.assertEqual(UserProfile.objects.filter(user__in=self.users).count(), 7)
+
+
+AVAILABILITY_TEST_SETTINGS = {
+    'ENABLED': True, 'BACKGROUND': False, 'CAPACITY': 1000, 'ERROR_RATE': 0.001, 'SYNC_OVERLAP': 0, 'MAX_AGE': 3600,
+}
+
+
+@override_settings(REDIS_URL='', USERNAME_AVAILABILITY=AVAILABILITY_TEST_SETTINGS)
+class UsernameAvailabilityTest(TestCase):
+    """사용자명/이메일 사용 가능 여부 Bloom 필터 검증"""
+
+    def setUp(self):
+        username_availability.reset()
+        self.addCleanup(username_availability.reset)
+        self.user = User.objects.create_user(username='Alice', email='Alice@Gmail.com', password='pw-12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # 요청은 필터를 만들지 않고 만들기 전에는 DB로 확인한다
+        with self.assertNumQueries(1):
+            self.assertTrue(username_availability.is_taken('username', 'Alice'))
+        username_availability.refresh()
+
+    def test_negatives_do_not_query_the_database(self):
+        with self.assertNumQueries(0):
+            for i in range(50):
+                self.assertFalse(username_availability.is_taken('username', f'bob{i}'))
+                self.assertFalse(username_availability.is_taken('email', f'bob{i}@gmail.com'))
+        self.assertEqual(username_availability.stats()['negatives'], 100)
+
+    def test_probable_positives_are_checked_in_the_database(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(username_availability.is_taken('username', 'Alice'))
+        # 필터는 소문자로 정규화하므로 대소문자만 다른 사용자명은 DB에서 가려낸다
+        with self.assertNumQueries(1):
+            self.assertFalse(username_availability.is_taken('username', 'alice'))
+        # 이메일은 대소문자를 무시한다
+        with self.assertNumQueries(1):
+            self.assertTrue(username_availability.is_taken('email', 'alice@gmail.com'))
+        self.assertEqual(username_availability.stats()['false_positives'], 1)
+
+    def test_signals_keep_the_filter_in_sync(self):
+        User.objects.create_user(username='carol', email='carol@example.com')
+        self.assertTrue(username_availability.is_taken('username', 'carol'))
+        self.user.email = 'alice@example.com'
+        self.user.save()
+        self.assertTrue(username_availability.is_taken('email', 'alice@example.com'))
+
+        # 삭제한 사용자는 재생성 전까지 DB 확인으로 넘어가고, 재생성하면 필터에서 빠진다
+        User.objects.filter(username='carol').delete()
+        self.assertFalse(username_availability.is_taken('username', 'carol'))
+        self.assertTrue(username_availability.rebuild())
+        with self.assertNumQueries(0):
+            self.assertFalse(username_availability.is_taken('username', 'carol'))
+
+    def test_writes_without_signals_are_picked_up(self):
+        # 다른 프로세스/bulk_create로 추가된 사용자는 이 프로세스의 시그널을 거치지 않는다
+        User.objects.bulk_create([User(username='bob', email='bob@example.com')])
+        self.assertFalse(username_availability.is_taken('username', 'bob'))
+        username_availability.refresh()
+        self.assertTrue(username_availability.is_taken('username', 'bob'))
+        self.assertTrue(username_availability.is_taken('email', 'BOB@example.com'))
+        self.assertEqual(username_availability.stats()['synced_users'], 1)
+
+        # .update()로 바뀐 값은 MAX_AGE가 지나 필터를 다시 만들면 반영된다
+        User.objects.filter(username='Alice').update(username='zed')
+        username_availability.refresh()
+        self.assertFalse(username_availability.is_taken('username', 'zed'))
+        username_availability.filter.built_at -= 3600
+        username_availability.refresh()
+        self.assertTrue(username_availability.is_taken('username', 'zed'))
+        self.assertEqual(username_availability.stats()['rebuilds'], 2)  # 처음 만들 때 포함
+
+    def test_disabled_filter_uses_the_database(self):
+        with override_settings(USERNAME_AVAILABILITY={'ENABLED': False}), self.assertNumQueries(1):
+            self.assertFalse(username_availability.is_taken('username', 'bob'))
+
+    def test_check_views(self):
+        response = self.client.post(reverse('users:check_username'), {'username': 'bob'}, format='json')
+        self.assertTrue(response.data['available'])
+        response = self.client.post(reverse('users:check_username'), {'username': 'Alice'}, format='json')
+        self.assertFalse(response.data['available'])
+        response = self.client.post(reverse('users:check_email'), {'email': 'ALICE@gmail.com'}, format='json')
+        self.assertFalse(response.data['available'])
+        response = self.client.post(reverse('users:check_email'), {}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_email_lower_index(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, 'auth_user')
+        self.assertIn('auth_user_email_lower_idx', constraints)
+
+
+@override_settings(REDIS_URL='', USERNAME_AVAILABILITY={**AVAILABILITY_TEST_SETTINGS, 'BACKGROUND': True, 'SYNC_INTERVAL': 0.05})
+class UsernameAvailabilityBackgroundTest(TransactionTestCase):
+    """백그라운드 스레드의 필터 생성/반영 검증 (요청은 DB를 훑지 않음)"""
+
+    def setUp(self):
+        username_availability.reset()
+        self.addCleanup(username_availability.reset)
+        User.objects.create_user(username='alice')
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertTrue(condition())
+
+    def test_thread_builds_and_syncs_the_filter(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(username_availability.is_taken('username', 'alice'))
+        self.wait_for(lambda: username_availability.filter.watermark() is not None)
+        with self.assertNumQueries(0):
+            self.assertFalse(username_availability.is_taken('username', 'bob'))
+
+        User.objects.bulk_create([User(username='bob')])
+        self.wait_for(lambda: username_availability.filter.contains('username:bob'))
+        self.assertTrue(username_availability.is_taken('username', 'bob'))
@@ -0,0 +1,54 @@
+"""
+고유 사용자명 할당
+
+이메일 로컬 파트 같은 기본 이름(john)이 이미 쓰이면 같은 접두어 + 숫자 접미사 사용자명
+(john, john1, john27 ...) 중 가장 큰 접미사를 쿼리 한 번으로 찾아 그다음 번호를 붙인다.
+접두어 조건은 username 인덱스(PostgreSQL은 varchar_pattern_ops *_like 인덱스) 범위 스캔을 쓰고,
+숫자 접미사 여부는 정규식으로 거른다. 동시 가입이 같은 이름을 먼저 가져가면 IntegrityError 후
+다시 계산한다.
+"""
+import re
+
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import BigIntegerField, Case, Count, Max, Q, Value, When
+from django.db.models.functions import Cast, Substr
+
+MAX_SUFFIX_DIGITS = 18  # BigIntegerField 범위
+USERNAME_MAX_LENGTH = User._meta.get_field('username').max_length
+INVALID_CHARS_RE = re.compile(r'[^\w.@+-]')
+
+
+def username_base(email, default='user'):
+    """이메일 로컬 파트에서 사용자명에 쓸 수 없는 문자를 뺀 기본 이름 (접미사 자리 확보)"""
+    base = INVALID_CHARS_RE.sub('', email.split('@')[0])
+    return base[:USERNAME_MAX_LENGTH - MAX_SUFFIX_DIGITS - 1] or default
+
+
+def next_username(base):
+    """base가 비어 있으면 base, 아니면 base + (기존 최대 숫자 접미사 + 1)"""
+    taken = User.objects.filter(
+        username__startswith=base, username__regex=rf'^{re.escape(base)}[0-9]{{0,{MAX_SUFFIX_DIGITS}}}$'
+    ).aggregate(
+        exact=Count('pk', filter=Q(username=base)),
+        suffix=Max(Case(
+            When(username=base, then=Value(0, output_field=BigIntegerField())),
+            default=Cast(Substr('username', len(base) + 1), BigIntegerField()),
+        )),
+    )
+    if not taken['exact']:
+        return base
+    return f'{base}{taken["suffix"] + 1}'
+
+
+def create_user_with_unique_username(base, attempts=5, **fields):
+    """next_username으로 사용자 생성, 동시 가입과 이름이 겹치면 attempts번까지 다시 할당"""
+    for attempt in range(attempts):
+        username = next_username(base)
+        try:
+            with transaction.atomic():
+                return User.objects.create_user(username=username, **fields)
+        except IntegrityError:
+            # 사용자명 충돌이 아닌 무결성 오류이거나 재시도를 다 썼으면 그대로 올린다
+            if attempt == attempts - 1 or not User.objects.filter(username=username).exists():
+                raise
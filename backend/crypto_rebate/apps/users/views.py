@@ -9,16 +9,21 @@ from rest_framework import generics, status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes
-from .models import UserProfile
+from .availability import username_availability
+from .google_tokens import InvalidGoogleToken, verify_google_id_token
+from .models import get_profile
+from .usernames import create_user_with_unique_username, username_base
 from .serializers import (
     UserLoginSerializer, UserProfileSerializer,
     UserRegistrationSerializer, UserDetailSerializer, UserUpdateSerializer,
     PasswordChangeSerializer
 )
 import json
-import requests
+import logging
 from django.db import models
 
+logger = logging.getLogger(__name__)
+
 
 # Create your views here.
 
@@ -138,7 +143,7 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
-        return self.request.user.profile
+        return get_profile(self.request.user)
 
 
 @api_view(['GET'])
@@ -147,38 +152,21 @@ def user_dashboard(request):
     """사용자 대시보드 API"""
     user = request.user
     
-    # 총 수익 계산
-    from crypto_rebate.apps.rebates.models import Rebate
-    total_earnings = Rebate.objects.filter(
-        user=user, status='paid'
-    ).aggregate(total=models.Sum('amount'))['total'] or 0
-    
-    # 이번 달 수익
-    from datetime import datetime
-    current_month = datetime.now().month
-    monthly_earnings = Rebate.objects.filter(
-        user=user, status='paid', created_at__month=current_month
-    ).aggregate(total=models.Sum('amount'))['total'] or 0
-    
-    # 활성 거래소 수
-    from crypto_rebate.apps.exchanges.models import ExchangeAPI
-    active_exchanges = ExchangeAPI.objects.filter(
-        user=user, is_active=True
-    ).count()
+    # 총/이번 달 수익, 활성 거래소, 거래소별 수익은 스냅샷에서 읽는다
+    from crypto_rebate.apps.rebates.models import UserDashboardSnapshot
+    snapshot = UserDashboardSnapshot.for_user(user)
     
     # 최근 거래 내역
     from crypto_rebate.apps.exchanges.models import ReferralTransaction
     recent_transactions = ReferralTransaction.objects.filter(
         user=user
-    ).order_by('-created_at')[:10]
+    ).select_related('exchange').order_by('-created_at')[:10]
     
-    # 거래소별 수익
-    exchange_earnings = {}
-    for api in ExchangeAPI.objects.filter(user=user, is_active=True):
-        earnings = Rebate.objects.filter(
-            user=user, exchange=api.exchange, status='paid'
-        ).aggregate(total=models.Sum('amount'))['total'] or 0
-        exchange_earnings[api.exchange.name] = earnings
+    # 활성 거래소별 수익
+    paid_by_exchange = snapshot.exchange_totals('paid')
+    exchange_earnings = {
+        name: paid_by_exchange.get(name, 0) for name in snapshot.active_exchanges
+    }
     
     return Response({
         'user': {
@@ -187,9 +175,9 @@ def user_dashboard(request):
             'email': user.email
         },
         'statistics': {
-            'total_earnings': total_earnings,
-            'monthly_earnings': monthly_earnings,
-            'active_exchanges': active_exchanges
+            'total_earnings': snapshot.total_earnings,
+            'monthly_earnings': snapshot.this_month_earnings,
+            'active_exchanges': len(snapshot.active_exchanges)
         },
         'exchange_earnings': exchange_earnings,
         'recent_transactions': [
@@ -215,10 +203,8 @@ def check_username(request):
             'error': '사용자명을 입력해주세요.'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    from django.contrib.auth import get_user_model
-    User = get_user_model()
-    
-    exists = User.objects.filter(username=username).exists()
+    # 입력마다 호출되므로 Bloom 필터에 없으면 DB를 조회하지 않는다
+    exists = username_availability.is_taken('username', username)
     return Response({
         'available': not exists,
         'message': '사용 가능한 사용자명입니다.' if not exists else '이미 사용 중인 사용자명입니다.'
@@ -235,10 +221,8 @@ def check_email(request):
             'error': '이메일을 입력해주세요.'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    from django.contrib.auth import get_user_model
-    User = get_user_model()
-    
-    exists = User.objects.filter(email=email).exists()
+    # 입력마다 호출되므로 Bloom 필터에 없으면 DB를 조회하지 않는다
+    exists = username_availability.is_taken('email', email)
     return Response({
         'available': not exists,
         'message': '사용 가능한 이메일입니다.' if not exists else '이미 사용 중인 이메일입니다.'
@@ -265,30 +249,23 @@ class GoogleLoginView(APIView):
     def post(self, request):
         try:
             credential = request.data.get('credential')
-            print(f"Received Google credential: {credential[:50]}...")
             
             if not credential:
                 return Response({
                     'error': 'Google credential is required'
                 }, status=status.HTTP_400_BAD_REQUEST)
+            print(f"Received Google credential: {credential[:50]}...")
             
-            # Google ID Token을 검증하고 사용자 정보 추출
+            # Google ID Token을 공개키로 로컬 검증하고 사용자 정보 추출
             print("Validating Google credential...")
-            google_response = requests.get(
-                f'https://oauth2.googleapis.com/tokeninfo?id_token={credential}'
-            )
-            
-            print(f"Google API response status: {google_response.status_code}")
-            
-            if google_response.status_code != 200:
-                print(f"Google API error: {google_response.text}")
+            try:
+                google_data = verify_google_id_token(credential)
+            except InvalidGoogleToken as e:
+                logger.warning('Invalid Google credential: %s', e)
                 return Response({
                     'error': 'Invalid Google credential'
                 }, status=status.HTTP_401_UNAUTHORIZED)
             
-            google_data = google_response.json()
-            print(f"Google user data: {google_data}")
-            
             email = google_data.get('email')
             name = google_data.get('name')
             
@@ -299,49 +276,26 @@ class GoogleLoginView(APIView):
             
             print(f"Processing user with email: {email}")
             
-            # 사용자가 이미 존재하는지 확인
+            # 사용자가 이미 존재하는지 확인 (프로필은 생성 시 post_save에서 만들어진다)
             try:
                 user = User.objects.get(email=email)
                 print(f"Existing user found: {user.username}")
-                
-                # 기존 사용자의 경우 UserProfile이 없으면 생성
-                if not hasattr(user, 'profile'):
-                    print(f"Creating profile for existing user: {user.username}")
-                    UserProfile.objects.create(
-                        user=user,
-                        is_verified=True
-                    )
-                    
             except User.DoesNotExist:
-                # 새 사용자 생성
-                username = email.split('@')[0]  # 이메일에서 사용자명 생성
-                # 사용자명 중복 방지
-                counter = 1
-                original_username = username
-                while User.objects.filter(username=username).exists():
-                    username = f"{original_username}{counter}"
-                    counter += 1
-                
-                print(f"Creating new user: {username}")
-                user = User.objects.create_user(
-                    username=username,
+                # 새 사용자 생성 (이메일 로컬 파트 + 기존 최대 숫자 접미사 다음 번호)
+                user = create_user_with_unique_username(
+                    username_base(email),
                     email=email,
                     first_name=name or '',
                     password=None  # Google 로그인은 비밀번호가 없음
                 )
-                user.is_active = True
-                user.save()
-                
-                # UserProfile은 post_save 시그널에 의해 자동 생성되지만, 
-                # 확실히 하기 위해 한 번 더 확인
-                if not hasattr(user, 'profile'):
-                    print(f"Creating profile for new user: {user.username}")
-                    UserProfile.objects.create(
-                        user=user,
-                        is_verified=True
-                    )
                 print(f"New user created successfully: {user.username}")
             
+            # Google이 확인한 이메일이므로 프로필을 인증됨으로 표시 (프로필이 없는 기존 사용자는 여기서 만든다)
+            profile = get_profile(user)
+            if not profile.is_verified:
+                profile.is_verified = True
+                profile.save(update_fields=['is_verified', 'updated_at'])
+            
             # 로그인 처리 (Django 기본 백엔드 사용)
             login(request, user, backend='django.contrib.auth.backends.ModelBackend')
             print(f"User logged in successfully: {user.username}")
@@ -0,0 +1,105 @@
+"""
+공용 페이지네이션
+
+KeysetPagination은 (정렬 시각, id) 복합 키로 커서를 만들어 다음 페이지를
+`WHERE (created_at, id) < (:created_at, :id) ORDER BY created_at DESC, id DESC LIMIT n`
+형태로 조회한다. OFFSET 스캔과 COUNT(*)가 없으므로 페이지 깊이와 무관하게
+응답 시간이 일정하며, 같은 순서의 복합 인덱스((user, -created_at, -id) 등)와 함께 쓴다.
+"""
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """(created_at, id) 복합 키셋 커서 페이지네이션
+
+    ordering의 마지막 필드는 유일해야 한다(기본값 id). 모든 필드는 같은 방향으로 정렬한다.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor else None
+
+        descending = self.ordering[0].startswith('-')
+        fields = [order.lstrip('-') for order in self.ordering]
+        if reverse:
+            queryset = queryset.order_by(*(field if descending else f'-{field}' for field in fields))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(
+                    self._after(fields, self._decode_position(position), descending != reverse)
+                )
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # 다음 페이지 유무 확인을 위해 한 건 더 조회
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > self.page_size
+        following = self._get_position_from_instance(results[-1], self.ordering) if has_following else None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = True, position
+            self.has_previous, self.previous_position = has_following, following
+        else:
+            self.has_next, self.next_position = has_following, following
+            self.has_previous, self.previous_position = position is not None, position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    @staticmethod
+    def _after(fields, values, descending):
+        """정렬 순서상 values 다음 행 조건
+
+        첫 필드에 범위 조건(<=/>=)을 함께 걸어 인덱스 범위 스캔이 가능하게 한다.
+        """
+        lookup, bound = ('lt', 'lte') if descending else ('gt', 'gte')
+        condition = Q()
+        for index in reversed(range(len(fields))):
+            equal = {field: value for field, value in zip(fields[:index], values[:index])}
+            condition |= Q(**equal, **{f'{fields[index]}__{lookup}': values[index]})
+        return Q(**{f'{fields[0]}__{bound}': values[0]}) & condition
+
+    def _decode_position(self, position):
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field = order.lstrip('-')
+            value = instance[field] if isinstance(instance, dict) else getattr(instance, field)
+            # 마이크로초까지 보존해야 같은 초의 행을 건너뛰지 않는다
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return json.dumps(values, separators=(',', ':'))
+
+
+class PaymentKeysetPagination(KeysetPagination):
+    """지급일 기준 키셋 페이지네이션 (RebatePayment는 created_at 대신 payment_date 사용)"""
+    ordering = ('-payment_date', '-id')
@@ -0,0 +1,63 @@
+"""
+기간 구간 헬퍼
+
+"오늘/이번 주/이번 달"을 사용자 시간대 기준의 반열린 구간 [start, end)의
+aware datetime으로 바꾼다. `created_at__gte=start, created_at__lt=end`로 필터하면
+`created_at__month` 같은 EXTRACT 조회와 달리 (user, ..., created_at) 인덱스 범위 스캔을
+쓸 수 있고, 다른 해의 같은 달 행이 섞이지 않는다.
+"""
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.utils import timezone
+
+PERIODS = ('today', 'week', 'month')
+
+
+def get_timezone(name=None):
+    """시간대 이름의 tzinfo (비어 있거나 알 수 없는 이름이면 현재 기본 시간대)"""
+    if name:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return timezone.get_current_timezone()
+
+
+def period_start(period, tz=None, value=None):
+    """value(기본값 현재 시각)가 속한 기간의 첫날 (tz 기준 현지 날짜)"""
+    day = timezone.localdate(value, tz or timezone.get_current_timezone())
+    if period == 'today':
+        return day
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    raise ValueError(f'Unknown period: {period}')
+
+
+def period_bounds(period, start, tz=None):
+    """start(첫날)부터 다음 기간 첫날 전까지의 aware datetime 구간"""
+    if period == 'today':
+        end = start + timedelta(days=1)
+    elif period == 'week':
+        end = start + timedelta(days=7)
+    elif period == 'month':
+        end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    else:
+        raise ValueError(f'Unknown period: {period}')
+    tz = tz or timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start, time.min), tz),
+        timezone.make_aware(datetime.combine(end, time.min), tz),
+    )
+
+
+def period_window(period, tz=None, value=None):
+    """value(기본값 현재 시각)가 속한 기간의 [start, end) 구간"""
+    return period_bounds(period, period_start(period, tz, value), tz)
+
+
+def month_start(value=None, tz=None):
+    """tz 기준 해당 월(기본값 이번 달)의 1일"""
+    return period_start('month', tz, value)
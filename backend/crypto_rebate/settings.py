@@ -60,6 +60,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'crypto_rebate.apps.analytics.metrics.MetricsMiddleware',  # 라우트별 지연/쿼리 수 (가장 바깥에서 측정)
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -69,6 +70,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',  # allauth 미들웨어 추가
+    'crypto_rebate.apps.analytics.audit.AuditMiddleware',  # 감사 로그 (큐에 넣기만 함)
 ]
 
 ROOT_URLCONF = 'crypto_rebate.urls'
@@ -163,6 +165,9 @@ MEDIA_ROOT = BASE_DIR / 'crypto_rebate' / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# 테스트 실행기 (백그라운드 저장 등 테스트용 설정을 모든 테스트에 적용, crypto_rebate/testing.py)
+TEST_RUNNER = 'crypto_rebate.testing.TestRunner'
+
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -196,6 +201,31 @@ CSRF_COOKIE_SECURE = False  # 개발 환경에서는 False
 CSRF_COOKIE_HTTPONLY = False  # JavaScript에서 접근 가능하도록
 CSRF_COOKIE_SAMESITE = 'Lax'
 
+# Cache
+# REDIS_URL이 설정되면 프로세스 간 공유 캐시로 Redis를 사용
+REDIS_URL = os.getenv('REDIS_URL', '')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+if REDIS_URL:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+
+# 리베이트 비율 캐시 (프로세스 내 LRU + 공유 캐시)
+REBATE_RATE_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'LOCAL_MAXSIZE': 10000,
+    'LOCAL_TTL': 30,  # 초
+    'SHARED_TTL': 3600,  # 초
+    'INVALIDATED_TTL': 60,  # 초, 개별 무효화 후 이전 값으로 다시 채우지 못하게 막는 시간
+}
+
 # Celery Configuration
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
@@ -204,6 +234,136 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 
+CELERY_BEAT_SCHEDULE = {
+    'sync-all-exchange-data': {
+        'task': 'crypto_rebate.apps.exchanges.tasks.sync_all_exchange_data',
+        'schedule': 15 * 60,  # 15분
+    },
+    'flush-referral-clicks': {
+        'task': 'crypto_rebate.apps.exchanges.tasks.flush_referral_clicks',
+        'schedule': 10,  # 10초
+    },
+    'rollup-daily-statistics': {
+        'task': 'crypto_rebate.apps.analytics.tasks.rollup_daily_statistics',
+        'schedule': 15 * 60,  # 15분
+    },
+    'flush-user-activity': {
+        'task': 'crypto_rebate.apps.analytics.tasks.flush_user_activity',
+        'schedule': 10,  # 10초
+    },
+    'rotate-analytics-partitions': {
+        'task': 'crypto_rebate.apps.analytics.tasks.rotate_analytics_partitions',
+        'schedule': 24 * 60 * 60,  # 1일
+    },
+    'rollup-system-metrics': {
+        'task': 'crypto_rebate.apps.analytics.tasks.rollup_system_metrics',
+        'schedule': 60,  # 1분
+    },
+    'rebuild-username-availability': {
+        'task': 'crypto_rebate.apps.users.tasks.rebuild_username_availability',
+        'schedule': 60 * 60,  # 1시간
+    },
+}
+
+# 일별/거래소별 통계 롤업
+ANALYTICS_ROLLUP = {
+    'LOOKBACK_DAYS': 3,  # 주기 작업이 다시 계산하는 최근 일수 (늦게 동기화된 거래 반영)
+    'CHUNK_DAYS': 31,  # 백필 시 한 번에 집계하는 일수
+}
+
+# AuditLog/SystemMetrics 월 파티션과 보관 기간
+# PostgreSQL은 월 단위 RANGE 파티션을 통째로 DROP, 그 외 DB는 같은 구간을 청크 단위로 DELETE
+ANALYTICS_RETENTION = {
+    # 이번 달을 포함해 보관할 개월 수
+    'MONTHS': {
+        'analytics.AuditLog': 12,
+        'analytics.SystemMetrics': 3,
+    },
+    'ARCHIVE_DIR': os.getenv('ANALYTICS_ARCHIVE_DIR', '') or None,  # 지우기 전에 .jsonl.gz로 보관할 디렉토리
+    'PARTITIONS_AHEAD': 2,  # 미리 만들어 둘 다음 달 파티션 수
+    'DELETE_CHUNK_SIZE': 10000,  # 파티션이 없는 DB에서 한 번에 지우는 행 수
+}
+
+# 사용자 활동(로그인/거래 수) 기록 버퍼
+# REDIS_URL이 없으면 프로세스 내 샤드 카운터를 그 프로세스의 백그라운드 스레드가 FLUSH_INTERVAL마다 반영
+# (이때 flush_user_activity beat 작업은 아무 일도 하지 않는다)
+USER_ACTIVITY = {
+    'SHARDS': 16,
+    'FLUSH_INTERVAL': 5,  # 초
+    'BACKGROUND': True,  # False면 반영 스레드 없이 activity_recorder.flush()로 반영 (테스트용)
+    'BATCH_SIZE': 500,  # upsert 한 번에 반영하는 (사용자, 날짜) 행 수
+}
+
+# 감사 로그 비동기 기록
+# 이벤트는 bounded 큐에 넣고 백그라운드 스레드가 BATCH_SIZE개씩 bulk_create로 저장
+AUDIT_LOG = {
+    'ENABLED': os.getenv('AUDIT_LOG_ENABLED', 'True').lower() == 'true',
+    'BACKGROUND': True,  # False면 저장 스레드 없이 audit_sink.flush()로 저장 (테스트용)
+    'QUEUE_SIZE': 10000,  # 대기 이벤트 상한
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 1,  # 초, 배치가 차지 않아도 저장하는 주기
+    'BLOCK_TIMEOUT': 0.005,  # 초, 큐가 가득 찼을 때 기다리는 시간 (이후 버리고 dropped 집계)
+    'PATH_PREFIX': '/api/',  # api_call로 기록하는 요청 경로
+    # create/update/delete를 기록하는 모델
+    'MODELS': [
+        'users.UserProfile', 'exchanges.ExchangeAPI', 'exchanges.ReferralLink',
+        'rebates.RebatePolicy', 'rebates.Rebate', 'rebates.RebatePayment',
+    ],
+}
+
+# 요청 지연/DB 쿼리 계측
+# 라우트별 히스토그램을 프로세스 내에 누적하고 FLUSH_INTERVAL마다 라우트별 SystemMetrics 한 행으로 요약 저장
+REQUEST_METRICS = {
+    'ENABLED': os.getenv('REQUEST_METRICS_ENABLED', 'True').lower() == 'true',
+    'FLUSH_INTERVAL': 60,  # 초
+    'AUTO_FLUSH': True,  # 백그라운드 스레드가 FLUSH_INTERVAL마다 저장, False면 metrics_registry.flush()로 저장 (테스트용)
+    'PROMETHEUS_TOKEN': os.getenv('PROMETHEUS_TOKEN', ''),  # /metrics/prometheus/ Bearer 토큰 (비우면 관리자만)
+}
+
+# 시스템 메트릭 minute/hour 롤업과 시계열 조회
+SYSTEM_METRICS_ROLLUP = {
+    'LOOKBACK_MINUTES': 5,  # 주기 작업이 다시 계산하는 최근 분 (늦게 저장된 요약 반영)
+    'CHUNK_HOURS': 24,  # 백필 시 한 번에 집계하는 시간
+    'MINUTE_RETENTION_DAYS': 14,
+    'HOUR_RETENTION_DAYS': 400,
+    'MAX_POINTS': 5000,  # 시계열 API가 한 번에 반환하는 버킷 수 상한 (라우트당)
+}
+
+# 레퍼럴 링크 클릭 카운터
+# REDIS_URL이 없으면 프로세스 내 샤드 카운터를 그 프로세스의 백그라운드 스레드가 FLUSH_INTERVAL마다 반영
+# (이때 flush_referral_clicks beat 작업은 아무 일도 하지 않는다)
+REFERRAL_CLICKS = {
+    'SHARDS': 16,
+    'FLUSH_INTERVAL': 5,  # 초
+    'BACKGROUND': True,  # False면 반영 스레드 없이 click_counter.flush()로 반영 (테스트용)
+    'TARGET_TTL': 3600,  # 이동 URL 캐시, 초
+}
+
+# 거래소 데이터 동기화
+EXCHANGE_SYNC = {
+    'WORKERS': 8,  # 동시에 조회할 거래소 API 수
+    'QUEUE_SIZE': 64,  # DB 반영 대기 페이지 수
+    'TIMEOUT': 10,  # 초
+    # 거래소별 (초당 요청 수, 버스트)
+    'RATE_LIMITS': {
+        'Binance': (10, 5),
+        'Bybit': (10, 5),
+        'OKX': (5, 2),
+        'Gate.io': (5, 2),
+    },
+    # 스텁 서버/테스트넷 사용 시 거래소별 base URL 덮어쓰기
+    'BASE_URLS': {},
+    # 거래소별 페이지 크기 덮어쓰기 (거래소 허용 최대치 이내)
+    'PAGE_SIZES': {},
+}
+
+# 거래소 API 자격 증명 암호화 키 (Fernet)
+# 키 교체 시 새 키를 ENCRYPTION_KEY에, 이전 키를 ENCRYPTION_KEY_FALLBACKS에 둔다
+ENCRYPTION_KEY = os.getenv('ENCRYPTION_KEY', '')
+ENCRYPTION_KEY_FALLBACKS = [
+    key for key in os.getenv('ENCRYPTION_KEY_FALLBACKS', '').split(',') if key
+]
+
 # Security settings
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
@@ -263,6 +423,34 @@ SOCIALACCOUNT_PROVIDERS = {
     }
 }
 
+# Google ID 토큰 로컬 검증 (공개키는 Cache-Control max-age 동안 프로세스 내 + 공유 캐시에 보관)
+GOOGLE_ID_TOKEN = {
+    'CERTS_URL': 'https://www.googleapis.com/oauth2/v3/certs',
+    'AUDIENCES': [os.getenv('GOOGLE_OAUTH2_CLIENT_ID', '')],  # 허용할 aud (OAuth 클라이언트 ID)
+    'CACHE_ALIAS': 'default',
+    'FETCH_TIMEOUT': 3,  # 초
+    'DEFAULT_MAX_AGE': 3600,  # 초, 응답에 Cache-Control max-age가 없을 때
+    'MIN_REFRESH_INTERVAL': 60,  # 초, 모르는 kid로 공개키를 다시 받는 최소 간격
+    'LEEWAY': 60,  # 초, exp/iat 허용 오차
+}
+
+# 사용자명/이메일 사용 가능 여부 Bloom 필터
+# REDIS_URL이 있으면 공유 Redis 비트맵(Celery 작업이 생성), 없으면 프로세스 내 필터를 처음 확인할 때 띄우는
+# 백그라운드 스레드가 생성 (프로세스 내 필터는 MAX_AGE마다 그 스레드가 다시 만든다)
+USERNAME_AVAILABILITY = {
+    'ENABLED': True,
+    'CAPACITY': 2_000_000,  # 담을 사용자명 + 이메일 수, 넘으면 오탐(DB 확인)이 늘어난다
+    'ERROR_RATE': 0.01,  # 목표 오탐률 (약 2.4MB)
+    'BUILD_BATCH_SIZE': 5000,  # 필터를 만들 때 한 번에 읽는 사용자 수
+    'BUILD_TIMEOUT': 600,  # 초, Redis 필터 재생성 잠금
+    # 필터를 만들고 반영하는 백그라운드 스레드, False면 username_availability.refresh()로 (테스트용)
+    'BACKGROUND': True,
+    # 시그널을 거치지 않은 새 사용자(다른 프로세스, bulk_create, 가져오기)를 반영하는 주기, 초
+    'SYNC_INTERVAL': 10,
+    'SYNC_OVERLAP': 100,  # 커밋 순서가 pk 순서와 다를 때를 대비해 다시 읽는 마지막 pk 수
+    'MAX_AGE': 3600,  # 초, .update()로 바뀐 값을 반영하려고 프로세스 내 필터를 다시 만드는 주기
+}
+
 # Social account settings
 SOCIALACCOUNT_AUTO_SIGNUP = True
 SOCIALACCOUNT_EMAIL_REQUIRED = False
@@ -0,0 +1,36 @@
+"""
+테스트 실행기
+
+운영 기본값 중 백그라운드 스레드나 요청 처리 중 저장처럼 테스트 트랜잭션과 섞이면 안 되는 동작을
+모든 테스트에 한 번에 끈다. 이 동작을 검증하는 테스트는 override_settings로 다시 켠다.
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+def test_overrides():
+    """테스트 실행 중 적용하는 설정"""
+    return {
+        # 감사 로그 저장 스레드가 테스트 트랜잭션과 SQLite 테이블 잠금을 다투지 않도록 flush()로만 저장
+        'AUDIT_LOG': {**settings.AUDIT_LOG, 'BACKGROUND': False},
+        # 요청 메트릭 저장 스레드도 띄우지 않는다 (metrics_registry.flush()로만 저장)
+        'REQUEST_METRICS': {**settings.REQUEST_METRICS, 'AUTO_FLUSH': False},
+        # 사용자 활동도 반영 스레드 없이 activity_recorder.flush()로만 반영
+        'USER_ACTIVITY': {**settings.USER_ACTIVITY, 'BACKGROUND': False},
+        # 레퍼럴 링크 클릭도 반영 스레드 없이 click_counter.flush()로만 반영
+        'REFERRAL_CLICKS': {**settings.REFERRAL_CLICKS, 'BACKGROUND': False},
+        # 사용자명 Bloom 필터도 스레드 없이 username_availability.refresh()로만 만들고 반영
+        'USERNAME_AVAILABILITY': {**settings.USERNAME_AVAILABILITY, 'BACKGROUND': False},
+    }
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._overrides = override_settings(**test_overrides())
+        self._overrides.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._overrides.disable()
+        super().teardown_test_environment(**kwargs)